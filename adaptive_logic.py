@@ -3,6 +3,25 @@
 # Conceptual Imports: These would be calls to SRIS's core semantic processing.
 # In a real system, this might involve semantic embeddings, knowledge graphs, etc.
 # from semantic_core_utilities import get_semantic_similarity, get_concept_category, filter_by_semantic_relevance
+from keyword_matcher import register_keywords, shared_matcher
+
+# Placeholder keyword tables, compiled into the shared matcher (one pass per hypothesis).
+THREAT_KEYWORDS = ["defend", "neutralize", "evade", "contain", "secure", "destroy", "counter", "protect", "withdraw"]
+NON_URGENT_KEYWORDS = ["observe", "wait", "ignore", "sleep"]
+EXPLORATION_KEYWORDS = ["learn", "examine", "interact", "probe", "understand"]
+register_keywords("adaptive:threat", THREAT_KEYWORDS)
+register_keywords("adaptive:non_urgent", NON_URGENT_KEYWORDS)
+register_keywords("adaptive:exploration", EXPLORATION_KEYWORDS)
+
+# Template hypotheses per goal concept, used instead of LLM generation when the LLM
+# backend is saturated (load_policy level "template_hypotheses").
+GOAL_TEMPLATE_HYPOTHESES = {
+    "answer_information_request": "Ответить на вопрос пользователя по существу: {summary}",
+    "provide_information_about_self": "Рассказать пользователю о себе (SRIS) в связи с запросом: {summary}",
+    "engage_in_social_dialogue": "Поддержать диалог с пользователем: {summary}",
+}
+DEFAULT_TEMPLATE_HYPOTHESIS = "Проанализировать ситуацию и кратко изложить вывод: {summary}"
+MEMORY_TEMPLATE_HYPOTHESIS = "Опереться на прошлый опыт из памяти: {memory}"
 
 def adjust_hypotheses(hypotheses: list[str], current_mode: str, current_perception_context: dict = None) -> list[str]:
     """
@@ -35,10 +54,9 @@ def adjust_hypotheses(hypotheses: list[str], current_mode: str, current_percepti
     elif "threat_response" in current_mode or "defensive" in current_mode or "survival" in current_mode:
         # Conceptual: Filter for hypotheses semantically related to defense, avoidance, containment, or neutralization.
         # This is more robust than just checking for specific keywords.
-        threat_keywords = ["defend", "neutralize", "evade", "contain", "secure", "destroy", "counter", "protect", "withdraw"]
         for h in hypotheses:
             # if get_semantic_similarity(h, "threat_mitigation_strategy") > 0.7: # Conceptual semantic check
-            if any(kw in h.lower() for kw in threat_keywords): # Placeholder
+            if shared_matcher.has_category(h, "adaptive:threat"): # Placeholder
                 adjusted.append(h)
         return adjusted if adjusted else hypotheses # Return original if no relevant found
 
@@ -58,26 +76,46 @@ def adjust_hypotheses(hypotheses: list[str], current_mode: str, current_percepti
         if threat_level > 0.6 and not ("threat_response" in current_mode or "defensive" in current_mode):
             # Conceptual: Filter out hypotheses that are clearly passive, non-urgent, or self-harming.
             temp_adjusted = []
-            non_urgent_keywords = ["observe", "wait", "ignore", "sleep"]
             for h in (adjusted if adjusted else hypotheses): # Apply to already filtered or original
                 # if not get_semantic_category(h) == "passive_action" and not get_semantic_similarity(h, "self_sacrifice") > 0.5: # Conceptual
-                if not any(kw in h.lower() for kw in non_urgent_keywords): # Placeholder
+                if not shared_matcher.has_category(h, "adaptive:non_urgent"): # Placeholder
                     temp_adjusted.append(h)
             adjusted = temp_adjusted if temp_adjusted else (adjusted if adjusted else hypotheses) # Maintain previous adjustment if any
 
         # If high novelty and in exploratory mode, prioritize learning/interaction hypotheses
         if novelty > 0.7 and ("exploratory" in current_mode or "discovery" in current_mode):
             temp_adjusted = []
-            exploration_keywords = ["learn", "examine", "interact", "probe", "understand"]
             for h in (adjusted if adjusted else hypotheses):
                 # if get_semantic_similarity(h, "knowledge_acquisition") > 0.6: # Conceptual
-                if any(kw in h.lower() for kw in exploration_keywords): # Placeholder
+                if shared_matcher.has_category(h, "adaptive:exploration"): # Placeholder
                     temp_adjusted.append(h)
             adjusted = temp_adjusted if temp_adjusted else (adjusted if adjusted else hypotheses)
             
     # Default: If no specific mode or context applies, return all hypotheses or already adjusted
     return adjusted if adjusted else hypotheses
 
+def template_hypotheses(goal_concept: str, perception_context: dict = None, memory_summary: str = None) -> list[str]:
+    """
+    Builds hypotheses from templates without calling the LLM: one for the goal concept
+    and, if memories were retrieved, one grounded in the most relevant past experience.
+
+    Args:
+        goal_concept (str): Concept of the active goal (goal_engine).
+        perception_context (dict, optional): Perception analysis; its summary fills the templates.
+        memory_summary (str, optional): Retrieved memories summary (one snippet per line).
+
+    Returns:
+        list[str]: Template hypotheses, the goal-based one first.
+    """
+    summary = ((perception_context or {}).get("summary") or "текущая ситуация")[:150]
+    template = GOAL_TEMPLATE_HYPOTHESES.get(goal_concept, DEFAULT_TEMPLATE_HYPOTHESIS)
+    hypotheses = [template.format(summary=summary)]
+    if memory_summary:
+        first_memory = memory_summary.strip().splitlines()[0].lstrip("- ").strip()
+        if first_memory:
+            hypotheses.append(MEMORY_TEMPLATE_HYPOTHESIS.format(memory=first_memory[:200]))
+    return hypotheses
+
 # Example conceptual usage (not directly runnable without semantic_core_utilities)
 if __name__ == "__main__":
     sample_hypotheses = [
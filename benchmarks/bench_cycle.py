@@ -0,0 +1,298 @@
+# bench_cycle.py
+# Бенчмарк полного цикла рассуждений без модели: LLM заменяется fake_llm.FakeLLM
+# (записанные ответы + настраиваемая задержка), каждый этап sris_kernel оборачивается
+# профилировщиком. Отчет: процессорное время и пиковые аллокации по этапам, задержка
+# цикла и пропускная способность при разной параллельности.
+# Сравнение с сохраненной базой (--baseline) завершает процесс с кодом 1 при регрессии
+# процессорного времени этапов — для прогонов на ноутбуке/в CI.
+#
+#   python benchmarks/bench_cycle.py --concurrency 1 4 8 --cycles 40 --latency lognormal:median=40,sigma=0.6
+#   python benchmarks/bench_cycle.py --target srk --save base.json
+#   python benchmarks/bench_cycle.py --baseline base.json --max-regression 0.25
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fake_llm import FakeLLM, LatencyModel
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_RESPONSES_PATH = os.path.join(DATA_DIR, "recorded_responses.json")
+DEFAULT_QUERIES_PATH = os.path.join(DATA_DIR, "queries.json")
+
+# Этап отчета -> функция, которую sris_kernel вызывает через глобальное имя модуля.
+KERNEL_STAGES = {
+    "sensorium": "integrate_sensorium",
+    "perception": "analyze_perception",
+    "memory_query": "query_semantic_memory",
+    "goal": "form_goal",
+    "motivation": "evaluate_motivation",
+    "affect": "assess_affect",
+    "hypothesis_generation": "generate_hypotheses_streaming",
+    "adjust": "adjust_hypotheses",
+    "filter": "_filter_hypotheses",
+    "evaluate": "evaluate_hypotheses",
+    "emotion": "evaluate_emotion",
+    "cause_effect": "extract_cause_effect",
+    "action_plan": "plan_action",
+    "communication_intent": "determine_communication_intent",
+    "save_chain": "save_chain_to_fs",
+    "respond": "generate_sris_response",
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+
+class StageProfiler:
+    """
+    Оборачивает этапы ядра: время (wall), процессорное время потока (без ожидания модели)
+    и, если включен tracemalloc, пиковые аллокации этапа. Ожидание FakeLLM внутри этапа
+    учитывается отдельно (llm_wait_ms), так что overhead_ms = wall - llm_wait.
+    """
+    def __init__(self, kernel, fake_llm: FakeLLM):
+        self.kernel = kernel
+        self.fake_llm = fake_llm
+        self.samples: Dict[str, List[Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _wrap(self, stage: str, fn):
+        def profiled(*args, **kwargs):
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+                start_memory = tracemalloc.get_traced_memory()[0]
+            llm_start = self.fake_llm.thread_waited_ms()
+            cpu_start = time.thread_time()
+            wall_start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                sample = {
+                    "wall_ms": (time.perf_counter() - wall_start) * 1000,
+                    "cpu_ms": (time.thread_time() - cpu_start) * 1000,
+                    "llm_wait_ms": self.fake_llm.thread_waited_ms() - llm_start,
+                }
+                if tracing:
+                    sample["alloc_peak_kb"] = (tracemalloc.get_traced_memory()[1] - start_memory) / 1024
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(sample)
+        return profiled
+
+    @contextlib.contextmanager
+    def install(self):
+        originals = {name: getattr(self.kernel, name) for name in KERNEL_STAGES.values() if hasattr(self.kernel, name)}
+        for stage, name in KERNEL_STAGES.items():
+            if name in originals:
+                setattr(self.kernel, name, self._wrap(stage, originals[name]))
+        try:
+            yield self
+        finally:
+            for name, fn in originals.items():
+                setattr(self.kernel, name, fn)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = {}
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for stage in KERNEL_STAGES:
+            samples = self.samples.get(stage)
+            if not samples:
+                continue
+            cpu = [s["cpu_ms"] for s in samples]
+            overhead = [s["wall_ms"] - s["llm_wait_ms"] for s in samples]
+            row = {
+                "calls": len(samples),
+                "cpu_ms_mean": round(statistics.mean(cpu), 3),
+                "cpu_ms_p95": round(percentile(cpu, 95), 3),
+                "overhead_ms_mean": round(statistics.mean(overhead), 3),
+                "llm_wait_ms_mean": round(statistics.mean(s["llm_wait_ms"] for s in samples), 3),
+            }
+            allocations = [s["alloc_peak_kb"] for s in samples if "alloc_peak_kb" in s]
+            if allocations:
+                row["alloc_peak_kb_mean"] = round(statistics.mean(allocations), 1)
+            report[stage] = row
+        return report
+
+
+@contextlib.contextmanager
+def isolated_kernel(kernel, with_memory: bool = False, response_cache: bool = False):
+    """
+    Цепочки и события таймлайна пишутся во временный каталог; семантическая память по умолчанию отключена.
+    Кэш готовых ответов по умолчанию тоже отключен: иначе прогрев заполняет его теми же запросами
+    и измеряемые циклы не доходят до гипотез, фильтрации, оценки и сохранения цепочки.
+    """
+    from semantic_memory_fs import save_chain_to_fs
+    saved = {name: getattr(kernel, name) for name in ("save_chain_to_fs", "sris_timeline", "initialize_sris_components", "initial_semantic_index")}
+    cache_enabled = kernel.response_cache.enabled
+    kernel.response_cache.enabled = response_cache
+    with tempfile.TemporaryDirectory(prefix="sris_bench_") as tmp:
+        kernel.save_chain_to_fs = lambda chain, sub_directory=None: save_chain_to_fs(chain, tmp)
+        store = None
+        if kernel.temporality_modules_loaded:
+            from temporality_core import ReasoningTimeline
+            from timeline_store import TimelineStore
+            store = TimelineStore(os.path.join(tmp, "timeline.sqlite3"))
+            kernel.sris_timeline = ReasoningTimeline(timesense_instance=kernel.sris_timesense, spill_path=None, store=store)
+        if not with_memory:
+            kernel.initialize_sris_components = lambda: None
+            kernel.initial_semantic_index = None
+        try:
+            yield tmp
+        finally:
+            if store is not None:
+                kernel.sris_timeline.close()
+                store.close()
+            for name, value in saved.items():
+                setattr(kernel, name, value)
+            kernel.response_cache.enabled = cache_enabled
+
+
+def parse_latency(spec: str) -> LatencyModel:
+    """"lognormal:median=40,sigma=0.6,per_token_ms=2" -> LatencyModel."""
+    kind, _, params = spec.partition(":")
+    values = {key: float(value) for key, value in (item.split("=") for item in params.split(",") if item)}
+    return LatencyModel(kind or "constant", **values)
+
+
+def run_one_level(kernel, cycle_fn, queries: List[Dict[str, str]], concurrency: int, cycles: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def one(index: int) -> None:
+        query = queries[index % len(queries)]["text"]
+        start = time.perf_counter()
+        result = cycle_fn({"text": query, "audio": None, "vision": None})
+        if result and result.get("status") == "ok":
+            kernel.generate_sris_response(result["full_reasoning_chain"])
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            status = (result or {}).get("status", "none")
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(cycles)))
+    elapsed_s = time.perf_counter() - start
+    return {
+        "concurrency": concurrency, "cycles": cycles,
+        "throughput_cps": round(cycles / elapsed_s, 2),
+        "latency_ms_p50": round(percentile(latencies, 50), 2),
+        "latency_ms_p95": round(percentile(latencies, 95), 2),
+        "statuses": statuses,
+    }
+
+
+def run(target: str, concurrency_levels: List[int], cycles: int, latency: LatencyModel, responses_path: str,
+        queries_path: str, with_memory: bool = False, allocations: bool = True,
+        response_cache: bool = False) -> Dict[str, Any]:
+    import sris_kernel
+    if target == "srk":
+        import SRK
+        cycle_fn = lambda input_dict: SRK.run_srk_cycle(input_dict)
+    else:
+        cycle_fn = lambda input_dict: sris_kernel.run_sris_cycle(input_dict)
+    with open(queries_path, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    fake = FakeLLM.from_file(responses_path, latency)
+    profiler = StageProfiler(sris_kernel, fake)
+    report: Dict[str, Any] = {"target": target, "latency_model": {"kind": latency.kind, **latency.params, "per_token_ms": latency.per_token_ms},
+                              "response_cache": response_cache, "levels": []}
+    with isolated_kernel(sris_kernel, with_memory, response_cache), fake.install(), profiler.install():
+        run_one_level(sris_kernel, cycle_fn, queries, 1, len(queries))  # прогрев: ленивые компоненты, автоматы
+        if allocations:
+            # Аллокации — отдельным однопоточным проходом: tracemalloc глобален и замедляет код.
+            profiler.reset()
+            tracemalloc.start()
+            try:
+                run_one_level(sris_kernel, cycle_fn, queries, 1, len(queries))
+            finally:
+                tracemalloc.stop()
+            report["allocations"] = {stage: row.get("alloc_peak_kb_mean") for stage, row in profiler.report().items()}
+        for concurrency in concurrency_levels:
+            profiler.reset()
+            level = run_one_level(sris_kernel, cycle_fn, queries, concurrency, cycles)
+            level["stages"] = profiler.report()
+            report["levels"].append(level)
+    report["llm_calls"] = fake.calls
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Этапы, чье среднее процессорное время (первый уровень параллельности) выросло больше допустимого,
+    и этапы базы, до которых прогон не дошел (например, циклы обслужены из кэша ответов).
+    """
+    current = report["levels"][0]["stages"]
+    previous = baseline["levels"][0]["stages"]
+    regressions = [f"{stage}: этап есть в базе, но не выполнялся в прогоне" for stage in previous if stage not in current]
+    for stage, row in current.items():
+        base = previous.get(stage)
+        if not base or base["cpu_ms_mean"] <= 0.05:  # доли мкс — шум таймера
+            continue
+        ratio = row["cpu_ms_mean"] / base["cpu_ms_mean"]
+        if ratio > 1 + max_regression:
+            regressions.append(f"{stage}: {base['cpu_ms_mean']} -> {row['cpu_ms_mean']} мс CPU (x{ratio:.2f})")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for level in report["levels"]:
+        print(f"\nconcurrency={level['concurrency']} cycles={level['cycles']} throughput={level['throughput_cps']} cycles/s "
+              f"p50={level['latency_ms_p50']} ms p95={level['latency_ms_p95']} ms statuses={level['statuses']}")
+        print(f"{'stage':>22} {'calls':>6} {'cpu ms':>9} {'cpu p95':>9} {'overhead':>9} {'llm wait':>9} {'alloc KB':>9}")
+        for stage, row in level["stages"].items():
+            alloc = report.get("allocations", {}).get(stage)
+            print(f"{stage:>22} {row['calls']:>6} {row['cpu_ms_mean']:>9} {row['cpu_ms_p95']:>9} "
+                  f"{row['overhead_ms_mean']:>9} {row['llm_wait_ms_mean']:>9} {alloc if alloc is not None else '-':>9}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    parser = argparse.ArgumentParser(description="Full reasoning cycle benchmark with a fake LLM")
+    parser.add_argument("--target", choices=["sris", "srk"], default="sris")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--cycles", type=int, default=40)
+    parser.add_argument("--latency", default="constant:value=0", help="kind:param=value,... (constant/uniform/normal/lognormal, per_token_ms)")
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES_PATH)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--with-memory", action="store_true", help="использовать семантическую память (нужен LlamaIndex)")
+    parser.add_argument("--no-allocations", action="store_true")
+    parser.add_argument("--response-cache", action="store_true", help="не отключать кэш готовых ответов (response_cache)")
+    parser.add_argument("--save", help="сохранить отчет JSON")
+    parser.add_argument("--baseline", help="отчет JSON для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    result = run(args.target, args.concurrency, args.cycles, parse_latency(args.latency), args.responses, args.queries,
+                 args.with_memory, not args.no_allocations, args.response_cache)
+    print_report(result)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,65 @@
+# bench_hypothesis_evaluator.py
+# Микробенчмарк: пакетная оценка гипотез против поштучных вызовов (по одной гипотезе
+# за вызов, как раньше) на наборах размером с выдачу dream cycle.
+#
+#   python benchmarks/bench_hypothesis_evaluator.py --sizes 100 500 1000
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from hypothesis_evaluator import evaluate_hypotheses, evaluate_hypotheses_batch
+
+TEMPLATES = [
+    "Ответ: {w} {w} {w}.", "Сказать: спасибо, {w} {w}!", "Мысль: {w} {w}", "optimize the {w} subsystem",
+    "communicate with {w}", "destroy the {w}", "approach the {w} carefully", "Проверить внутреннюю базу знаний о {w}",
+]
+WORDS = ["energy", "human", "sensor", "archive", "network", "свет", "память", "модуль"]
+SDNA = {"risk_tolerance": 0.6, "proactiveness": 0.8, "efficiency_preference": 0.8, "ethical_risk_aversion": 0.9}
+PERCEPTION = {"action": "ask", "object": "human", "ambiguity": 0.2}
+GOALS = [{"concept": "answer_information_request"}]
+
+
+def build_hypotheses(n: int, rng: random.Random) -> list:
+    return [rng.choice(TEMPLATES).replace("{w}", "{}").format(*(rng.choice(WORDS) for _ in range(3))) for _ in range(n)]
+
+
+def run(sizes, seed: int) -> list:
+    rng = random.Random(seed)
+    rows = []
+    # Прогрев: ленивые компоненты валидаторов и автомат ключевых слов строятся до замеров.
+    evaluate_hypotheses_batch(build_hypotheses(len(TEMPLATES), rng), PERCEPTION, GOALS, SDNA, "default")
+    for size in sizes:
+        hypotheses = build_hypotheses(size, rng)
+
+        start = time.perf_counter()
+        single = [evaluate_hypotheses_batch([h], PERCEPTION, GOALS, SDNA, "default")[0] for h in hypotheses]
+        single_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        batch = evaluate_hypotheses_batch(hypotheses, PERCEPTION, GOALS, SDNA, "default")
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        assert [r["score"] for r in single] == [r["score"] for r in batch], "Пакетные оценки расходятся с поштучными"
+        ranked = evaluate_hypotheses(hypotheses, PERCEPTION, GOALS, SDNA, "default")
+        rows.append({
+            "hypotheses": size, "single_ms": round(single_ms, 2), "batch_ms": round(batch_ms, 2),
+            "per_hypothesis_us": round(batch_ms * 1000 / size, 1), "top_score": ranked[0]["score"],
+            "speedup": round(single_ms / batch_ms, 1) if batch_ms else None,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    parser = argparse.ArgumentParser(description="Batch vs per-hypothesis evaluation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(f"{'hyps':>6} {'single ms':>10} {'batch ms':>9} {'us/hyp':>8} {'speedup':>8}")
+    for row in run(args.sizes, args.seed):
+        print(f"{row['hypotheses']:>6} {row['single_ms']:>10} {row['batch_ms']:>9} {row['per_hypothesis_us']:>8} {row['speedup']:>7}x")
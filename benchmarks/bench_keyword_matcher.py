@@ -0,0 +1,89 @@
+# bench_keyword_matcher.py
+# Микробенчмарк: вложенные циклы подстрок (как в исходных валидаторах) против общего
+# автомата Ахо–Корасик при росте онтологии до тысяч терминов.
+#
+#   python benchmarks/bench_keyword_matcher.py --sizes 100 1000 5000 --hypotheses 200
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from keyword_matcher import KeywordMatcher
+
+TERMS_PER_CONCEPT = 5
+
+
+def _random_term(rng: random.Random) -> str:
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))) for _ in range(rng.randint(1, 2))]
+    return " ".join(words)
+
+
+def build_tables(n_terms: int, rng: random.Random) -> dict:
+    return {f"concept_{i}": [_random_term(rng) for _ in range(TERMS_PER_CONCEPT)] for i in range(max(1, n_terms // TERMS_PER_CONCEPT))}
+
+
+def build_hypotheses(tables: dict, n: int, rng: random.Random) -> list:
+    all_terms = [term for terms in tables.values() for term in terms]
+    hypotheses = []
+    for _ in range(n):
+        filler = [_random_term(rng) for _ in range(12)]
+        # Примерно в половине гипотез встречаются настоящие термины.
+        if rng.random() < 0.5:
+            filler.insert(rng.randint(0, len(filler)), rng.choice(all_terms))
+        hypotheses.append("Hypothesis: " + " ".join(filler) + ".")
+    return hypotheses
+
+
+def naive_concepts(text: str, tables: dict) -> set:
+    text_lower = text.lower()
+    return {concept for concept, keywords in tables.items() if any(kw in text_lower for kw in keywords)}
+
+
+def run(sizes, n_hypotheses: int, seed: int) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for size in sizes:
+        tables = build_tables(size, rng)
+        hypotheses = build_hypotheses(tables, n_hypotheses, rng)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher()
+        for concept, keywords in tables.items():
+            matcher.add_keywords(concept, keywords)
+        matcher.find_keywords("")
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = [naive_concepts(h, tables) for h in hypotheses]
+        naive_ms = (time.perf_counter() - start) * 1000
+
+        # Кэш попаданий отключается, чтобы измерить сам проход автомата.
+        start = time.perf_counter()
+        actual = []
+        for h in hypotheses:
+            matcher._scan.cache_clear()
+            actual.append(set(matcher.match(h)))
+        matcher_ms = (time.perf_counter() - start) * 1000
+
+        assert actual == expected, "Результаты матчера расходятся с наивным поиском"
+        rows.append({
+            "terms": size, "hypotheses": n_hypotheses, "build_ms": round(build_ms, 2),
+            "naive_ms": round(naive_ms, 2), "matcher_ms": round(matcher_ms, 2),
+            "speedup": round(naive_ms / matcher_ms, 1) if matcher_ms else None,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyword matcher vs nested substring loops")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000, 5000])
+    parser.add_argument("--hypotheses", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(f"{'terms':>7} {'build ms':>10} {'naive ms':>10} {'matcher ms':>11} {'speedup':>8}")
+    for row in run(args.sizes, args.hypotheses, args.seed):
+        print(f"{row['terms']:>7} {row['build_ms']:>10} {row['naive_ms']:>10} {row['matcher_ms']:>11} {row['speedup']:>7}x")
@@ -0,0 +1,62 @@
+# bench_llm_pool.py
+# Пропускная способность пула контекстов llama.cpp в зависимости от числа контекстов:
+# при разделяемых mmap-весах она растет с числом групп ядер, пока не упрется в пропускную
+# способность памяти.
+#
+#   python benchmarks/bench_llm_pool.py --model models/mistral-7b-instruct-v0.2.Q4_K_M.gguf --contexts 1 2 4
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm_pool import LlamaContextPool, available_memory_mb
+from model_router import ModelSpec
+
+PROMPT = "[INST] Перечисли пять причин, по которым растения нуждаются в свете. [/INST]"
+
+
+def run(model_path: str, contexts_list, requests_per_context: int, max_tokens: int, threads_per_context: int, n_ctx: int) -> list:
+    rows = []
+    for contexts in contexts_list:
+        pool = LlamaContextPool(ModelSpec("bench", model_path, n_ctx=n_ctx, max_instances=contexts),
+                                threads_per_context=threads_per_context)
+        pool.warm()
+
+        def one_request(_):
+            with pool.context() as context:
+                result = context(PROMPT, max_tokens=max_tokens, temperature=0.0)
+            return (result.get("usage") or {}).get("completion_tokens", 0)
+
+        total_requests = requests_per_context * pool.capacity
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=pool.capacity) as executor:
+            tokens = sum(executor.map(one_request, range(total_requests)))
+        elapsed = time.perf_counter() - start
+        status = pool.status()
+        rows.append({
+            "requested": contexts, "contexts": status["planned_contexts"], "requests": total_requests,
+            "tokens_per_s": round(tokens / elapsed, 1), "elapsed_s": round(elapsed, 2),
+            "per_context_mb": status["per_context_mb"], "wait_ms": status["wait_ms"],
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    parser = argparse.ArgumentParser(description="llama.cpp context pool throughput")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--contexts", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests-per-context", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--threads-per-context", type=int, default=4)
+    parser.add_argument("--n-ctx", type=int, default=2048)
+    args = parser.parse_args()
+    print(f"MemAvailable: {available_memory_mb()} МБ, ядер: {os.cpu_count()}")
+    print(f"{'req':>4} {'ctx':>4} {'requests':>9} {'tok/s':>8} {'s':>7} {'MB/ctx':>7} {'wait ms':>9}")
+    for row in run(args.model, args.contexts, args.requests_per_context, args.max_tokens, args.threads_per_context, args.n_ctx):
+        print(f"{row['requested']:>4} {row['contexts']:>4} {row['requests']:>9} {row['tokens_per_s']:>8} "
+              f"{row['elapsed_s']:>7} {row['per_context_mb']:>7} {row['wait_ms']:>9}")
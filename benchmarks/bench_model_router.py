@@ -0,0 +1,121 @@
+# bench_model_router.py
+# Сравнение моделей реестра model_router по режимам: задержка и качество ответа
+# на реальных промптах этапов SRIS (восприятие, гипотезы, ответ).
+# Качество оценивается относительно основной модели: для "analyze_json" — доля
+# валидного JSON и совпадение ключей верхнего уровня, для генеративных режимов —
+# пересечение слов с ответом основной модели (Jaccard).
+#
+#   python benchmarks/bench_model_router.py --queries "Как работает фотосинтез?" --repeats 3
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils
+from hypothesis_generator import _build_hypothesis_prompt, _generation_mode
+from mistral_core import model_router
+from model_router import ModelUnavailableError, PRIMARY_MODEL_NAME
+from perception_analysis import analyze_perception
+from response_generator import generate_sris_response
+
+DEFAULT_QUERIES = ["Как работает фотосинтез?", "Explain how a hash map handles collisions.", "Помоги составить план на неделю."]
+
+
+def capture_stage_prompts(queries):
+    """Собирает промпты этапов без вызова модели: [(mode, prompt, max_tokens, temperature)]."""
+    captured = []
+
+    def recorder(prompt, mode, max_tokens, temperature):
+        captured.append((mode, prompt, max_tokens, temperature))
+        return {"text": "", "completion_tokens": None, "finish_reason": None}
+
+    original = utils.query_mistral_with_usage, utils.mistral_core_available
+    utils.query_mistral_with_usage, utils.mistral_core_available = recorder, True
+    try:
+        for query in queries:
+            analyze_perception(query)
+            perception = {"raw_input": query, "action": "ask", "object": query, "language": "ru"}
+            generate_sris_response({"perception_struct": perception, "chosen_hypothesis": {"hypothesis": query},
+                                    "communication_intent": {"type": "inform"}})
+            goals = [{"concept": "answer_information_request", "priority": 0.9}]
+            request = _build_hypothesis_prompt(perception, goals, {}, "default_exploration", None)
+            captured.append((_generation_mode(request["active_goal_concept"]), request["prompt"], 400, 0.65))
+    finally:
+        utils.query_mistral_with_usage, utils.mistral_core_available = original
+    return captured
+
+
+def _json_keys(text):
+    json_str = utils._extract_json_from_response(text)
+    try:
+        parsed = json.loads(json_str) if json_str else None
+    except ValueError:
+        parsed = None
+    return set(parsed) if isinstance(parsed, dict) else None
+
+
+def _jaccard(a, b):
+    words_a, words_b = set(a.lower().split()), set(b.lower().split())
+    return len(words_a & words_b) / len(words_a | words_b) if words_a | words_b else 1.0
+
+
+def run(queries, repeats: int):
+    prompts = capture_stage_prompts(queries)
+    models = list(model_router.status()["models"])
+    outputs = {}
+    rows = []
+    for model_name in [PRIMARY_MODEL_NAME] + [m for m in models if m != PRIMARY_MODEL_NAME]:
+        pool = model_router.pool(model_name)
+        try:
+            instance = pool.acquire()
+        except ModelUnavailableError as e:
+            rows.append({"model": model_name, "mode": "-", "error": str(e)})
+            continue
+        try:
+            per_mode = {}
+            for index, (mode, prompt, max_tokens, _) in enumerate(prompts):
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    result = instance(prompt, max_tokens=max_tokens, temperature=0.0)
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    text = result["choices"][0]["text"].strip()
+                    per_mode.setdefault(mode, []).append((index, elapsed_ms, text, (result.get("usage") or {}).get("completion_tokens")))
+                    outputs.setdefault((model_name, index), text)
+        finally:
+            pool.release(instance)
+        for mode, samples in per_mode.items():
+            references = [outputs.get((PRIMARY_MODEL_NAME, index), "") for index, _, _, _ in samples]
+            row = {"model": model_name, "mode": mode, "routed_to": model_router.model_for(mode),
+                   "p50_ms": round(statistics.median(s[1] for s in samples), 1),
+                   "tokens": round(statistics.mean(s[3] or 0 for s in samples), 1)}
+            if mode == "analyze_json":
+                keys = [_json_keys(s[2]) for s in samples]
+                reference_keys = [_json_keys(r) for r in references]
+                row["json_valid"] = round(sum(k is not None for k in keys) / len(keys), 2)
+                overlaps = [len(k & r) / len(r) for k, r in zip(keys, reference_keys) if k is not None and r]
+                row["quality"] = round(statistics.mean(overlaps), 2) if overlaps else 0.0
+            else:
+                row["quality"] = round(statistics.mean(_jaccard(s[2], r) for s, r in zip(samples, references)), 2)
+            rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    parser = argparse.ArgumentParser(description="Latency and output quality per model and mode")
+    parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES)
+    parser.add_argument("--repeats", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(model_router.routing_table(), ensure_ascii=False))
+    print(f"{'model':>10} {'mode':>40} {'routed':>10} {'p50 ms':>9} {'tokens':>7} {'json':>5} {'quality':>8}")
+    for row in run(args.queries, args.repeats):
+        if "error" in row:
+            print(f"{row['model']:>10} недоступна: {row['error']}")
+            continue
+        print(f"{row['model']:>10} {row['mode']:>40} {row['routed_to']:>10} {row['p50_ms']:>9} {row['tokens']:>7} "
+              f"{row.get('json_valid', '-'):>5} {row['quality']:>8}")
@@ -0,0 +1,251 @@
+# load_test.py
+# Нагрузочный тест sris_server: asyncio-генератор запросов к POST /process_query/ со смесью
+# русских и английских запросов, перебор уровней параллельности и отчет в JSON:
+# пропускная способность, p50/p95/p99 задержки, доли ошибок и таймаутов, ожидание в очереди
+# пула потоков сервера (queue_wait_ms из ответа) и проверка SLO.
+#
+# По умолчанию сервер поднимается в этом же процессе (uvicorn в фоновом потоке) с fake_llm
+# вместо модели, поэтому внешние сервисы не нужны; --url направляет нагрузку на запущенный сервер.
+#
+#   python benchmarks/load_test.py --concurrency 1 4 16 32 --requests-per-level 200 --latency lognormal:median=300,sigma=0.5 --output run_a.json
+#   python benchmarks/load_test.py --url http://localhost:8000 --concurrency 8 --output run_b.json
+#   python benchmarks/load_test.py --compare run_a.json run_b.json
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_cycle import DEFAULT_QUERIES_PATH, DEFAULT_RESPONSES_PATH, isolated_kernel, parse_latency, percentile
+
+QUERY_PATH = "/process_query/"
+
+
+async def post_json(host: str, port: int, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """Минимальный HTTP/1.1 POST на asyncio (одно соединение на запрос)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+        )
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+    if headers.get("transfer-encoding") == "chunked":
+        decoded, rest = b"", content
+        while rest:
+            size_line, _, rest = rest.partition(b"\r\n")
+            size = int(size_line, 16)
+            if size == 0:
+                break
+            decoded, rest = decoded + rest[:size], rest[size + 2:]
+        content = decoded
+    try:
+        return status, json.loads(content or b"{}")
+    except ValueError:
+        return status, {"raw": content[:200].decode("utf-8", "replace")}
+
+
+async def run_level(host: str, port: int, queries: List[Dict[str, str]], concurrency: int, total_requests: int,
+                    timeout: float, seed: int) -> Dict[str, Any]:
+    """Замкнутый цикл: concurrency клиентов отправляют запросы один за другим, пока не наберется total_requests."""
+    rng = random.Random(seed)
+    order = [rng.randrange(len(queries)) for _ in range(total_requests)]
+    next_index = iter(range(total_requests))
+    latencies: List[float] = []
+    queue_waits: List[float] = []
+    processing: List[float] = []
+    statuses: Dict[str, int] = {}
+    by_lang: Dict[str, List[float]] = {}
+    timeouts = errors = 0
+
+    async def client(client_id: int) -> None:
+        nonlocal timeouts, errors
+        for index in next_index:
+            query = queries[order[index]]
+            start = time.perf_counter()
+            try:
+                status, body = await asyncio.wait_for(
+                    post_json(host, port, QUERY_PATH, {"user_id": f"load_{client_id}", "query_text": query["text"]}), timeout)
+            except asyncio.TimeoutError:
+                timeouts += 1
+                statuses["timeout"] = statuses.get("timeout", 0) + 1
+                continue
+            except (OSError, ValueError, IndexError) as e:
+                errors += 1
+                statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status != 200:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            by_lang.setdefault(query.get("lang", "?"), []).append(elapsed)
+            if body.get("queue_wait_ms") is not None:
+                queue_waits.append(body["queue_wait_ms"])
+            if body.get("processing_time_ms") is not None:
+                processing.append(body["processing_time_ms"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    def summary(values: List[float]) -> Dict[str, Optional[float]]:
+        return {f"p{p}": (round(percentile(values, p), 2) if values else None) for p in (50, 95, 99)}
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": {**summary(latencies), "max": round(max(latencies), 2) if latencies else None},
+        "latency_ms_by_lang": {lang: summary(values) for lang, values in sorted(by_lang.items())},
+        "queue_wait_ms": summary(queue_waits),
+        "server_processing_ms": summary(processing),
+        "error_rate": round(errors / total_requests, 4),
+        "timeout_rate": round(timeouts / total_requests, 4),
+        "statuses": statuses,
+    }
+
+
+@contextlib.contextmanager
+def in_process_server(latency_spec: str, responses_path: str, response_cache: bool = False):
+    """
+    sris_server в фоновом потоке uvicorn на свободном порту; LLM заменена fake_llm.
+    Кэш готовых ответов отключен (как в bench_cycle), если response_cache не задан: прогрев теми же
+    запросами иначе превращает нагрузочный тест в тест кэша.
+    """
+    import uvicorn
+    import sris_kernel
+    import sris_server
+    from fake_llm import FakeLLM
+
+    fake = FakeLLM.from_file(responses_path, parse_latency(latency_spec))
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    # lifespan="off": прогрев моделей при старте не нужен — LLM поддельная, семантическая память отключена.
+    server = uvicorn.Server(uvicorn.Config(sris_server.app, log_level="warning", lifespan="off", backlog=2048))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    with isolated_kernel(sris_kernel, response_cache=response_cache), fake.install():
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("uvicorn не запустился")
+            time.sleep(0.05)
+        try:
+            yield sock.getsockname()
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+
+def mark_slo(level: Dict[str, Any], slo_p95_ms: Optional[float], slo_error_rate: float) -> None:
+    p95 = level["latency_ms"]["p95"]
+    level["slo_met"] = (
+        (level["error_rate"] + level["timeout_rate"]) <= slo_error_rate
+        and (slo_p95_ms is None or (p95 is not None and p95 <= slo_p95_ms))
+    )
+
+
+def run(args) -> Dict[str, Any]:
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    report: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.url or "in-process",
+        "latency_model": None if args.url else args.latency,
+        "response_cache": None if args.url else args.response_cache,
+        "slo": {"p95_ms": args.slo_p95_ms, "error_rate": args.slo_error_rate},
+        "levels": [],
+    }
+    if args.url:
+        parsed = urlparse(args.url)
+        server_context = contextlib.nullcontext((parsed.hostname, parsed.port or 80))
+    else:
+        server_context = in_process_server(args.latency, args.responses, args.response_cache)
+    with server_context as (host, port):
+        if args.warmup:
+            asyncio.run(run_level(host, port, queries, 1, args.warmup, args.timeout, args.seed))
+        for concurrency in args.concurrency:
+            level = asyncio.run(run_level(host, port, queries, concurrency, args.requests_per_level, args.timeout, args.seed))
+            mark_slo(level, args.slo_p95_ms, args.slo_error_rate)
+            report["levels"].append(level)
+    within_slo = [level for level in report["levels"] if level["slo_met"]]
+    best = max(within_slo, key=lambda level: level["throughput_rps"]) if within_slo else None
+    report["capacity"] = {"concurrency": best["concurrency"], "throughput_rps": best["throughput_rps"]} if best else None
+    return report
+
+
+def compare(path_a: str, path_b: str) -> Dict[str, Any]:
+    """Сравнение двух прогонов по общим уровням параллельности: изменения B относительно A."""
+    with open(path_a, "r", encoding="utf-8") as f:
+        run_a = json.load(f)
+    with open(path_b, "r", encoding="utf-8") as f:
+        run_b = json.load(f)
+    levels_b = {level["concurrency"]: level for level in run_b["levels"]}
+
+    def delta(a: Optional[float], b: Optional[float]) -> Optional[float]:
+        return round((b - a) / a, 4) if a and b is not None else None
+
+    rows = []
+    for level_a in run_a["levels"]:
+        level_b = levels_b.get(level_a["concurrency"])
+        if not level_b:
+            continue
+        rows.append({
+            "concurrency": level_a["concurrency"],
+            "throughput_rps": [level_a["throughput_rps"], level_b["throughput_rps"], delta(level_a["throughput_rps"], level_b["throughput_rps"])],
+            **{f"latency_{p}_ms": [level_a["latency_ms"][p], level_b["latency_ms"][p], delta(level_a["latency_ms"][p], level_b["latency_ms"][p])]
+               for p in ("p50", "p95", "p99")},
+            "error_rate": [level_a["error_rate"], level_b["error_rate"]],
+            "timeout_rate": [level_a["timeout_rate"], level_b["timeout_rate"]],
+        })
+    return {"a": path_a, "b": path_b, "capacity": [run_a.get("capacity"), run_b.get("capacity")], "levels": rows}
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    parser = argparse.ArgumentParser(description="Load test for sris_server /process_query/")
+    parser.add_argument("--url", help="адрес запущенного сервера; без него сервер поднимается в процессе")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests-per-level", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--response-cache", action="store_true", help="не отключать кэш готовых ответов в сервере в процессе")
+    parser.add_argument("--timeout", type=float, default=30.0, help="таймаут одного запроса, с")
+    parser.add_argument("--latency", default="lognormal:median=200,sigma=0.5", help="задержка fake_llm (см. bench_cycle.parse_latency)")
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES_PATH)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--slo-p95-ms", type=float)
+    parser.add_argument("--slo-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", help="файл для JSON-отчета (иначе stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("RUN_A", "RUN_B"))
+    args = parser.parse_args()
+
+    result = compare(*args.compare) if args.compare else run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,222 @@
+# causal_templates.py
+# Data-driven causal templates for cause_effect: preconditions and effects per action,
+# stored in a JSON file, indexed by action and reloaded when the file changes.
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "causal_templates.json")
+TEMPLATES_PATH_ENV = "SRIS_CAUSAL_TEMPLATES_PATH"
+RELOAD_CHECK_INTERVAL_SECONDS = 1.0
+
+# Entry keys that control how an entry is resolved and never appear in the output.
+_CONTROL_KEYS = {"when", "format_defaults"}
+
+Condition = Callable[[dict, dict], bool]
+
+
+def _compile_condition(spec: Optional[Dict[str, Any]]) -> Condition:
+    """
+    Compiles a "when" clause; all listed tests must hold. Supported tests:
+        sdna_above: {trait: threshold}         (trait defaults to 0.5)
+        perception_above: {key: threshold}     (value defaults to 0)
+        mode_contains: str / mode_equals: str  (current reasoning mode)
+    """
+    if not spec:
+        return lambda perception, context: True
+    tests: List[Condition] = []
+    for trait, threshold in spec.get("sdna_above", {}).items():
+        tests.append(lambda p, c, trait=trait, threshold=threshold: c.get("sdna_traits", {}).get(trait, 0.5) > threshold)
+    for key, threshold in spec.get("perception_above", {}).items():
+        tests.append(lambda p, c, key=key, threshold=threshold: p.get(key, 0) > threshold)
+    if "mode_contains" in spec:
+        tests.append(lambda p, c, part=spec["mode_contains"]: part in (c.get("current_mode") or ""))
+    if "mode_equals" in spec:
+        tests.append(lambda p, c, mode=spec["mode_equals"]: c.get("current_mode") == mode)
+    return lambda perception, context: all(test(perception, context) for test in tests)
+
+
+def _compile_entry(entry: Dict[str, Any]) -> Tuple[Condition, Callable[[dict, dict], Dict[str, Any]]]:
+    """Turns a template entry into (condition, builder); the builder keeps the entry's key order."""
+    steps: List[Callable[[dict, dict, dict], None]] = []
+    for key, value in entry.items():
+        if key in _CONTROL_KEYS:
+            continue
+        if key == "concept_format":
+            defaults = entry.get("format_defaults", {})
+            steps.append(lambda out, p, c, fmt=value, defaults=defaults: out.__setitem__(
+                "concept", fmt.format(**{name: p.get(name, default) for name, default in defaults.items()})))
+        elif key == "target_from":
+            steps.append(lambda out, p, c, source=value: out.__setitem__("target", p.get(source)))
+        elif isinstance(value, dict) and "cases" in value:
+            cases = [(_compile_condition(case.get("when")), case["value"]) for case in value["cases"]]
+            default = value.get("default")
+            def resolve(out, p, c, key=key, cases=cases, default=default):
+                out[key] = next((case_value for condition, case_value in cases if condition(p, c)), default)
+            steps.append(resolve)
+        else:
+            steps.append(lambda out, p, c, key=key, value=value: out.__setitem__(key, value))
+
+    def build(perception: dict, context: dict) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for step in steps:
+            step(out, perception, context)
+        return out
+
+    return _compile_condition(entry.get("when")), build
+
+
+class CompiledTemplate:
+    def __init__(self, action: str, template: Dict[str, Any]):
+        self.action = action
+        self.source = template
+        self.preconditions = [_compile_entry(entry) for entry in template.get("preconditions", [])]
+        self.effects = [_compile_entry(entry) for entry in template.get("effects", [])]
+
+    def instantiate(self, perception: dict, context: dict) -> Tuple[List[dict], List[dict]]:
+        preconditions = [build(perception, context) for condition, build in self.preconditions if condition(perception, context)]
+        effects = [build(perception, context) for condition, build in self.effects if condition(perception, context)]
+        return preconditions, effects
+
+
+class CausalTemplateStore:
+    """
+    Causal templates indexed by action, with a precompiled trigger detector.
+
+    Templates are listed in priority order: when a hypothesis contains triggers of
+    several actions, the earliest template wins. The backing JSON file is checked
+    for changes (mtime) at most once per RELOAD_CHECK_INTERVAL_SECONDS and reloaded
+    without a restart; a broken file keeps the previously loaded templates.
+    """
+    def __init__(self, path: Optional[str] = None, reload_check_interval: float = RELOAD_CHECK_INTERVAL_SECONDS):
+        self.path = path
+        self.reload_check_interval = reload_check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._raw: Dict[str, Any] = {"templates": {}, "goal_preconditions": []}
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._priority: Dict[str, int] = {}
+        self._detector = KeywordMatcher()
+        self._goal_preconditions: List[Dict[str, Any]] = []
+        if path:
+            self.reload(force=True)
+
+    # --- Loading ---
+    def _compile(self, raw: Dict[str, Any]) -> None:
+        templates = {action: CompiledTemplate(action, template) for action, template in raw.get("templates", {}).items()}
+        detector = KeywordMatcher()
+        for action, template in raw.get("templates", {}).items():
+            detector.add_keywords(action, template.get("triggers", []))
+        self._raw = raw
+        self._templates = templates
+        self._priority = {action: rank for rank, action in enumerate(templates)}
+        self._detector = detector
+        self._goal_preconditions = [
+            {**rule, "actions": set(rule.get("actions", []))} for rule in raw.get("goal_preconditions", [])
+        ]
+        self.version += 1
+
+    def load_data(self, raw: Dict[str, Any]) -> None:
+        with self._lock:
+            self._compile(raw)
+
+    def reload(self, force: bool = False) -> bool:
+        """Reloads the backing file if it changed. Returns True if templates were (re)loaded."""
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_check_interval:
+            return False
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                if force:
+                    logger.error(f"CausalTemplateStore: template file {self.path} is not available: {e}")
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                self._compile(raw)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.error(f"CausalTemplateStore: failed to load {self.path}, keeping previous templates: {e}")
+                self._mtime = mtime
+                return False
+            self._mtime = mtime
+        logger.info(f"CausalTemplateStore: loaded {len(self._templates)} templates from {self.path} (version {self.version}).")
+        return True
+
+    # --- Learned templates ---
+    def upsert_template(self, action: str, template: Dict[str, Any]) -> None:
+        """Adds or replaces a template in memory (e.g. one learned from stored reasoning chains)."""
+        with self._lock:
+            raw = dict(self._raw)
+            raw["templates"] = {**raw.get("templates", {}), action: template}
+            self._compile(raw)
+
+    def save(self, path: Optional[str] = None) -> None:
+        target = path or self.path
+        if not target:
+            raise ValueError("CausalTemplateStore: no path to save templates to.")
+        with self._lock:
+            raw = self._raw
+        temp_path = f"{target}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, target)
+
+    # --- Lookup ---
+    def detect_action(self, hypothesis: str) -> Optional[str]:
+        """The highest-priority action whose trigger occurs in the hypothesis (one automaton pass)."""
+        self.reload()
+        hits = self._detector.match(hypothesis)
+        if not hits:
+            return None
+        priority = self._priority
+        return min(hits, key=lambda action: priority.get(action, len(priority)))
+
+    def get(self, action: str) -> Optional[CompiledTemplate]:
+        return self._templates.get(action) if isinstance(action, str) else None
+
+    def goal_preconditions(self, action: str, goals: List[dict]) -> List[dict]:
+        found = []
+        for goal in goals:
+            for rule in self._goal_preconditions:
+                if rule.get("goal_concept_contains", "") in goal.get('concept', '') and action in rule["actions"]:
+                    found.append(dict(rule["precondition"]))
+        return found
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+_default_store: Optional[CausalTemplateStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_template_store() -> CausalTemplateStore:
+    """The store used by cause_effect (SRIS_CAUSAL_TEMPLATES_PATH or the bundled causal_templates.json)."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = CausalTemplateStore(os.environ.get(TEMPLATES_PATH_ENV) or DEFAULT_TEMPLATES_PATH)
+    return _default_store
+
+
+def set_template_store(store: Optional[CausalTemplateStore]) -> None:
+    """Replaces the store used by cause_effect (None restores the default on next use)."""
+    global _default_store
+    _default_store = store
@@ -9,114 +9,48 @@
 # from goal_forming_engine import get_goal_hierarchy # To assess goal congruence of effects
 # from sdna_traits import get_sdna_trait_value # For influencing causal confidence
 
-def extract_cause_effect(
-    perception_struct: dict,
-    hypothesis: str,
-    current_context: dict = None # Added for more nuanced causal inference
-) -> dict:
-    """
-    Extracts preconditions and predicts effects based on semantic understanding,
-    ontological relations, and potentially learned causal models.
-
-    Args:
-        perception_struct (dict): Structured perception data (e.g., {'subject': 'Object_A', 'action': 'approaching', 'object': 'Object_B', 'environment': 'space'}).
-        hypothesis (str): The chosen hypothesis to analyze (e.g., "Object_A will establish communication with Object_B").
-        current_context (dict, optional): Additional contextual information from reasoning_loop
-                                           (e.g., current_goals, recent_events, sDNA_traits, current_mode).
-
-    Returns:
-        dict: {
-            "preconditions": list[dict], # e.g., [{"concept": "Subject has communication capability", "confidence": 0.9}],
-            "effects": list[dict],      # e.g., [{"concept": "Information exchange", "valence_impact": 0.7, "probability": 0.8}],
-            "causal_confidence": float  # Overall confidence in the extracted causal links
-        }
-    """
+from causal_templates import get_template_store
+from cycle_cache import fingerprint, memoize_batch
 
-    preconditions = []
-    effects = []
-    causal_confidence = 0.5 # Default confidence, to be improved by inference
 
+def _detect_action_verb(perception_struct: dict, hypothesis: str) -> str:
+    """Finds the action the hypothesis is about; the causal analysis depends on the hypothesis only through it."""
     # --- 1. Extract Core Concepts from Hypothesis and Perception ---
     # Conceptual: Use SRIS's NLP and semantic parsing capabilities
     # to identify key subjects, verbs, objects, and concepts in the hypothesis.
-    # For now, we'll still use some keyword hints, but imagine a semantic parser
-    # that returns a structured representation of the hypothesis (e.g., {'verb': 'communicate', 'target': 'Object_B'}).
-
-    hypothesis_action_verb = ""
-    # More robust extraction:
-    if "communicate" in hypothesis.lower(): hypothesis_action_verb = "communicate"
-    elif "optimize" in hypothesis.lower(): hypothesis_action_verb = "optimize"
-    elif "destroy" in hypothesis.lower(): hypothesis_action_verb = "destroy"
-    elif "approach" in hypothesis.lower(): hypothesis_action_verb = "approach" # Hypotheses can be about SRIS's own actions
-    elif "comfort" in hypothesis.lower() or "reassure" in hypothesis.lower(): hypothesis_action_verb = "comfort"
+    # For now, the template store's trigger automaton finds the highest-priority action
+    # keyword, but imagine a semantic parser that returns a structured representation
+    # of the hypothesis (e.g., {'verb': 'communicate', 'target': 'Object_B'}).
+    hypothesis_action_verb = get_template_store().detect_action(hypothesis) or ""
     # Fallback to perception's action if hypothesis is passive or observational
-    elif not hypothesis_action_verb and "action" in perception_struct:
+    if not hypothesis_action_verb and "action" in perception_struct:
         hypothesis_action_verb = perception_struct["action"]
+    return hypothesis_action_verb
 
 
-    # --- 2. Infer Preconditions (Leveraging Ontology & Semantic Knowledge) ---
+def _cause_effect_for_action(
+    perception_struct: dict,
+    hypothesis_action_verb: str,
+    current_context: dict = None
+) -> dict:
+    current_context = current_context or {}
+    preconditions = []
+    effects = []
+    causal_confidence = 0.5 # Default confidence, to be improved by inference
 
-    # Conceptual: This would query a knowledge graph or semantic model for required pre-states
-    # based on the hypothesis_action_verb and its target (if any).
-    # pre_req_template = get_causal_template(hypothesis_action_verb, "preconditions")
-    
-    if hypothesis_action_verb == "communicate":
-        preconditions.append({"concept": "Initiating entity has communication interface", "confidence": 0.95})
-        preconditions.append({"concept": "Target entity is receptive to communication", "confidence": 0.8, "target": perception_struct.get("object")})
-    elif hypothesis_action_verb == "optimize":
-        preconditions.append({"concept": "Access to system parameters and control", "confidence": 0.9})
-        preconditions.append({"concept": "System state is measurable and mutable", "confidence": 0.85})
-    elif hypothesis_action_verb == "destroy":
-        preconditions.append({"concept": "Initiating entity has destructive capability", "confidence": 0.98})
-        preconditions.append({"concept": "Target is within range and vulnerable to capability", "confidence": 0.75, "target": perception_struct.get("object")})
-        
-        # sDNA risk_aversion can influence perceived preconditions (e.g., higher aversion -> more stringent safety preconditions)
-        risk_aversion = current_context.get('sdna_traits', {}).get('risk_aversion', 0.5)
-        if risk_aversion > 0.7:
-             preconditions.append({"concept": "Minimal collateral damage risk", "confidence": 0.6}) # Added more stringent precondition
-    
-    elif hypothesis_action_verb == "approach": # From perception or SRIS's own hypothesized action
-        preconditions.append({"concept": f"{perception_struct.get('subject', 'Entity')} has mobility", "confidence": 0.9})
-        preconditions.append({"concept": "Path is clear or navigable", "confidence": 0.8})
+    # --- 2 & 3. Preconditions and Effects from the causal template store ---
+    # Templates (causal_templates.json) hold the preconditions and predicted effects per action,
+    # including context-dependent entries (e.g. sDNA risk_aversion adding a safety precondition,
+    # destruction of a confirmed threat having positive valence). They are looked up by action
+    # with a hash hit; learned causal models can be added to the store as templates.
+    store = get_template_store()
+    template = store.get(hypothesis_action_verb)
+    if template is not None:
+        preconditions, effects = template.instantiate(perception_struct, current_context)
 
     # Contextual preconditions: E.g., if goal is 'resource optimization', 'sufficient resources' is a precondition for many actions.
-    if current_context and current_context.get("current_goals"):
-        for goal in current_context["current_goals"]:
-            if "resource_optimization" in goal.get('concept', '') and hypothesis_action_verb in ["deploy", "construct"]: # Conceptual match
-                preconditions.append({"concept": "Sufficient internal resources available", "confidence": 0.7})
-            # Add more complex goal-driven preconditions
-
-    # --- 3. Predict Effects (Leveraging Causal Models & Ontology) ---
-
-    # Load learned causal models (conceptual). These models would provide probabilities and valence impacts.
-    # causal_models_for_action = load_causal_models(hypothesis_action_verb, perception_struct.get("object"))
-
-    # Semantic inference for effects based on the action and context.
-    if hypothesis_action_verb == "communicate":
-        effects.append({"concept": "Information exchange completed", "probability": 0.9, "valence_impact": 0.5, "source": "semantic_inference"}) # Positive impact
-        effects.append({"concept": "Potential for relationship building", "probability": 0.7, "valence_impact": 0.6})
-        effects.append({"concept": "Increased mutual understanding", "probability": 0.8, "valence_impact": 0.7})
-    elif hypothesis_action_verb == "optimize":
-        effects.append({"concept": "Performance improvement achieved", "probability": 0.95, "valence_impact": 0.8})
-        effects.append({"concept": "Resource expenditure incurred", "probability": 0.6, "valence_impact": -0.2}) # Potential negative side effect
-        effects.append({"concept": "System stability maintained", "probability": 0.85, "valence_impact": 0.7}) # Positive side effect
-    elif hypothesis_action_verb == "destroy":
-        effect_valence = -1.0 # Default for destruction
-        # Contextual valence override: Destruction of a direct threat to SRIS or its goals is positive.
-        if current_context and "threat" in current_context.get("current_mode", "") and perception_struct.get('threat_level', 0) > 0.7:
-             effect_valence = 0.8 # Destruction of threat is positive in this context
-        effects.append({"concept": "Target termination", "probability": 0.98, "valence_impact": effect_valence, "source": "semantic_inference"})
-        effects.append({"concept": "Resource expenditure for action", "probability": 0.7, "valence_impact": -0.3})
-        effects.append({"concept": "Potential for retaliatory action", "probability": 0.4, "valence_impact": -0.8}) # New potential negative
-        effects.append({"concept": "Ethical implications incurred", "probability": 0.9, "valence_impact": -0.9 if effect_valence < 0 else -0.1}) # Ethical impact consideration
-    elif hypothesis_action_verb == "approach":
-        effects.append({"concept": "Reduced distance to target", "probability": 0.95, "valence_impact": 0.1})
-        effects.append({"concept": "Increased interaction likelihood", "probability": 0.8, "valence_impact": 0.3})
-        effects.append({"concept": "Potential for detection", "probability": 0.6, "valence_impact": -0.2 if current_context.get('current_mode') == 'stealth_operation' else 0.0})
-    elif hypothesis_action_verb == "comfort":
-        effects.append({"concept": "Reduced subject distress", "probability": 0.85, "valence_impact": 0.7})
-        effects.append({"concept": "Increased trust and rapport", "probability": 0.6, "valence_impact": 0.6})
-        effects.append({"concept": "Potential for reliance", "probability": 0.3, "valence_impact": -0.1}) # Subtle negative side effect
+    if current_context.get("current_goals"):
+        preconditions.extend(store.goal_preconditions(hypothesis_action_verb, current_context["current_goals"]))
 
     # --- 4. Refine Causal Confidence ---
     # Conceptual: Confidence would be based on:
@@ -156,4 +90,65 @@ def extract_cause_effect(
         "preconditions": preconditions,
         "effects": effects,
         "causal_confidence": causal_confidence
-    }
\ No newline at end of file
+    }
+
+
+def extract_cause_effect(
+    perception_struct: dict,
+    hypothesis: str,
+    current_context: dict = None # Added for more nuanced causal inference
+) -> dict:
+    """
+    Extracts preconditions and predicts effects based on semantic understanding,
+    ontological relations, and potentially learned causal models.
+
+    Args:
+        perception_struct (dict): Structured perception data (e.g., {'subject': 'Object_A', 'action': 'approaching', 'object': 'Object_B', 'environment': 'space'}).
+        hypothesis (str): The chosen hypothesis to analyze (e.g., "Object_A will establish communication with Object_B").
+        current_context (dict, optional): Additional contextual information from reasoning_loop
+                                           (e.g., current_goals, recent_events, sDNA_traits, current_mode).
+
+    Returns:
+        dict: {
+            "preconditions": list[dict], # e.g., [{"concept": "Subject has communication capability", "confidence": 0.9}],
+            "effects": list[dict],      # e.g., [{"concept": "Information exchange", "valence_impact": 0.7, "probability": 0.8}],
+            "causal_confidence": float  # Overall confidence in the extracted causal links
+        }
+    """
+
+    return extract_cause_effect_batch(perception_struct, [hypothesis], current_context)[0]
+
+
+def extract_cause_effect_batch(
+    perception_struct: dict,
+    hypotheses: list[str],
+    current_context: dict = None
+) -> list[dict]:
+    """
+    Runs extract_cause_effect over a batch of hypotheses that share one perception
+    and context. The analysis is computed once per distinct action verb and copied
+    into each result, so large candidate sets (e.g. from dream cycles) stay cheap.
+
+    Returns:
+        list[dict]: One result per hypothesis, in order (see extract_cause_effect).
+        Inside a reasoning cycle each hypothesis is analyzed at most once (see cycle_cache).
+    """
+    def compute(indices: list[int]) -> list[dict]:
+        analyses_by_action = {}
+        results = []
+        for i in indices:
+            hypothesis_action_verb = _detect_action_verb(perception_struct, hypotheses[i])
+            analysis = analyses_by_action.get(hypothesis_action_verb)
+            if analysis is None:
+                analysis = _cause_effect_for_action(perception_struct, hypothesis_action_verb, current_context)
+                analyses_by_action[hypothesis_action_verb] = analysis
+            results.append({
+                "preconditions": [dict(precondition) for precondition in analysis["preconditions"]],
+                "effects": [dict(effect) for effect in analysis["effects"]],
+                "causal_confidence": analysis["causal_confidence"]
+            })
+        return results
+
+    perception_key = fingerprint(perception_struct)
+    context_key = fingerprint(current_context)
+    return memoize_batch("cause_effect", [(hypothesis, perception_key, context_key) for hypothesis in hypotheses], compute)
@@ -146,3 +146,32 @@ def determine_communication_intent(
         "emotional_tone": emotional_tone, 
         "target_focus": target_focus 
     }
+
+
+# Шаблоны ответа по типу намерения: используются вместо LLM, когда бэкенд LLM перегружен
+# (load_policy, уровень "template_response"). {hypothesis} — выбранная гипотеза цикла.
+TEMPLATE_RESPONSES = {
+    "reciprocate_social_interaction": {"ru": "Здравствуйте! Рад общению. Чем могу помочь?",
+                                       "en": "Hello! Glad to talk. How can I help?"},
+    "acknowledge_feedback": {"ru": "Спасибо за обратную связь, я ее учту.",
+                             "en": "Thank you for the feedback, I will take it into account."},
+    "close_conversation": {"ru": "Спасибо за беседу! Обращайтесь, если понадобится помощь.",
+                           "en": "Thank you for the conversation! Feel free to come back any time."},
+    "caution_warning": {"ru": "Обращаю внимание: {hypothesis}",
+                        "en": "Please note: {hypothesis}"},
+    "urgent_alert": {"ru": "Внимание! {hypothesis}",
+                     "en": "Warning! {hypothesis}"},
+    "inquire_details_curiosity": {"ru": "Уточните, пожалуйста, подробности. Пока мой вывод такой: {hypothesis}",
+                                  "en": "Could you share more details? My current conclusion: {hypothesis}"},
+}
+DEFAULT_TEMPLATE_RESPONSE = {"ru": "Мой вывод: {hypothesis}", "en": "My conclusion: {hypothesis}"}
+
+
+def render_template_response(communication_intent: dict, hypothesis_text: str, language: str = "ru") -> str:
+    """
+    Ответ пользователю по шаблону намерения, без обращения к LLM.
+    Язык — из perception_analysis ("ru"/"en"); прочие языки получают русский шаблон.
+    """
+    templates = TEMPLATE_RESPONSES.get((communication_intent or {}).get("intent_type"), DEFAULT_TEMPLATE_RESPONSE)
+    template = templates.get(language, templates["ru"])
+    return template.format(hypothesis=(hypothesis_text or "").strip())
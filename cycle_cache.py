@@ -0,0 +1,93 @@
+# cycle_cache.py
+# Мемоизация валидаторов и анализа гипотез в пределах одного цикла рассуждений SRIS.
+# Фильтр ядра, оценщик гипотез и финальный анализ причин/следствий проверяют одни и те же
+# гипотезы; внутри cycle_scope() каждая проверка выполняется не больше одного раза.
+import copy
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class CycleCache:
+    """
+    Кэш результатов одного цикла: (этап, ключ) -> результат.
+
+    Ключ составляет вызывающий модуль (текст гипотезы, отпечаток восприятия,
+    прочие аргументы). Хранимые результаты не отдаются наружу напрямую:
+    каждый вызывающий получает свою копию и может ее изменять.
+    """
+    def __init__(self):
+        self._entries: Dict[tuple, Any] = {}
+        self.computed: Dict[str, int] = {}
+        self.saved: Dict[str, int] = {}
+
+    def get_or_compute_batch(self, stage: str, keys: Sequence[Hashable], compute: Callable[[List[int]], List[Any]]) -> List[Any]:
+        missing_indices: List[int] = []
+        pending = set()
+        for index, key in enumerate(keys):
+            entry_key = (stage, key)
+            if entry_key not in self._entries and entry_key not in pending:
+                pending.add(entry_key)
+                missing_indices.append(index)
+        if missing_indices:
+            for index, result in zip(missing_indices, compute(missing_indices)):
+                self._entries[(stage, keys[index])] = result
+        self.computed[stage] = self.computed.get(stage, 0) + len(missing_indices)
+        self.saved[stage] = self.saved.get(stage, 0) + len(keys) - len(missing_indices)
+        return [copy.deepcopy(self._entries[(stage, key)]) for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        stages = sorted(set(self.computed) | set(self.saved))
+        return {
+            "computed": {stage: self.computed.get(stage, 0) for stage in stages},
+            "saved": {stage: self.saved.get(stage, 0) for stage in stages},
+            "total_saved": sum(self.saved.values()),
+        }
+
+
+_current_cycle_cache: ContextVar[Optional[CycleCache]] = ContextVar("sris_cycle_cache", default=None)
+
+
+@contextmanager
+def cycle_scope(cache: Optional[CycleCache] = None) -> Iterator[CycleCache]:
+    """Включает мемоизацию для текущего цикла (контекстная переменная: потоки и задачи asyncio не смешиваются)."""
+    cache = cache if cache is not None else CycleCache()
+    token = _current_cycle_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _current_cycle_cache.reset(token)
+
+
+def current_cycle_cache() -> Optional[CycleCache]:
+    return _current_cycle_cache.get()
+
+
+def fingerprint(value: Any) -> str:
+    """Короткий стабильный отпечаток JSON-подобного значения (восприятие, контекст) для ключей кэша."""
+    if value is None:
+        return ""
+    serialized = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def memoize_batch(stage: str, keys: Sequence[Hashable], compute: Callable[[List[int]], List[Any]]) -> List[Any]:
+    """
+    Результаты пакетного этапа с учетом кэша цикла.
+
+    compute получает индексы элементов, которых еще нет в кэше, и возвращает
+    их результаты в том же порядке. Вне cycle_scope() просто вычисляет все.
+    """
+    cache = _current_cycle_cache.get()
+    if cache is None:
+        return compute(list(range(len(keys))))
+    return cache.get_or_compute_batch(stage, keys, compute)
+
+
+def memoize(stage: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+    return memoize_batch(stage, [key], lambda indices: [compute()])[0]
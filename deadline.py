@@ -0,0 +1,133 @@
+# deadline.py
+# Дедлайн запроса: создается на входе (sris_server) и действует на все этапы цикла SRIS.
+# Этап перед запуском проверяет остаток бюджета (stage_allowed) и при нехватке времени
+# деградирует (пропуск поиска в памяти, стандартные гипотезы, короткий путь); вызовы LLM
+# урезают max_tokens по остатку времени или не выполняются совсем (utils.execute_llm_query).
+# Деградировавшие этапы записываются в дедлайн и попадают в цепочку рассуждений.
+#
+# Как и кэш цикла (cycle_cache), текущий дедлайн хранится в контекстной переменной:
+# его видят все вызовы внутри deadline_scope(), в том числе в потоках, запущенных
+# через contextvars.copy_context().
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 30.0
+# Минимальный остаток (секунды), при котором этап еще запускается; иначе этап деградирует.
+STAGE_MIN_SECONDS = {
+    "perception": 3.0,
+    "semantic_memory": 1.0,
+    "hypotheses": 4.0,
+    "response": 2.0,
+}
+# Запас на разбор ответа и последующие этапы, который не отдается под декодирование.
+LLM_RESERVE_SECONDS = 0.5
+# Вызов LLM с бюджетом меньше этого числа токенов не выполняется.
+MIN_LLM_TOKENS = 16
+# Оценка скорости декодирования до первых наблюдений (секунды на токен).
+DEFAULT_SECONDS_PER_TOKEN = 0.05
+THROUGHPUT_SMOOTHING = 0.2
+
+
+class TokenRateEstimator:
+    """Скользящая (EMA) оценка времени декодирования одного токена по наблюдаемым вызовам LLM."""
+    def __init__(self, initial_seconds_per_token: float = DEFAULT_SECONDS_PER_TOKEN, smoothing: float = THROUGHPUT_SMOOTHING):
+        self._seconds_per_token = initial_seconds_per_token
+        self._smoothing = smoothing
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def observe(self, elapsed_seconds: float, completion_tokens: Optional[int]) -> None:
+        if not completion_tokens or completion_tokens <= 0 or elapsed_seconds <= 0:
+            return
+        sample = elapsed_seconds / completion_tokens
+        with self._lock:
+            self._seconds_per_token += self._smoothing * (sample - self._seconds_per_token)
+            self.samples += 1
+
+    @property
+    def seconds_per_token(self) -> float:
+        return self._seconds_per_token
+
+
+token_rate = TokenRateEstimator()
+
+
+class Deadline:
+    """
+    Абсолютный срок обработки одного запроса (по монотонным часам) и журнал этапов,
+    выполненных в упрощенном виде из-за нехватки времени.
+    """
+    def __init__(self, timeout_seconds: float = DEFAULT_REQUEST_TIMEOUT_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.timeout_seconds = timeout_seconds
+        self._clock = clock
+        self.expires_at = clock() + timeout_seconds
+        self.degraded_stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def allows(self, stage: str) -> bool:
+        """Хватает ли остатка бюджета на этап stage (см. STAGE_MIN_SECONDS)."""
+        return self.remaining() >= STAGE_MIN_SECONDS.get(stage, 0.0)
+
+    def cap_tokens(self, max_tokens: int, seconds_per_token: Optional[float] = None) -> int:
+        """max_tokens, урезанный так, чтобы декодирование уложилось в остаток бюджета."""
+        seconds_per_token = seconds_per_token or token_rate.seconds_per_token
+        affordable = int((self.remaining() - LLM_RESERVE_SECONDS) / seconds_per_token)
+        return max(0, min(max_tokens, affordable))
+
+    def degrade(self, stage: str, action: str) -> None:
+        """Отмечает, что этап stage выполнен в упрощенном виде (action — что сделано вместо него)."""
+        remaining_ms = round(self.remaining() * 1000, 1)
+        with self._lock:
+            self.degraded_stages.append({"stage": stage, "action": action, "remaining_ms": remaining_ms})
+        logger.warning(f"Deadline: этап '{stage}' деградировал ({action}), осталось {remaining_ms} мс.")
+
+    def degraded_stage_names(self) -> List[str]:
+        with self._lock:
+            return [entry["stage"] for entry in self.degraded_stages]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            degraded_stages = list(self.degraded_stages)
+        return {"timeout_ms": round(self.timeout_seconds * 1000, 1), "remaining_ms": round(self.remaining() * 1000, 1),
+                "degraded_stages": degraded_stages}
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("sris_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Делает deadline текущим для вызовов внутри блока (None — без ограничения времени)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def stage_allowed(stage: str) -> bool:
+    """True, если дедлайна нет или его остатка хватает на этап stage."""
+    deadline = current_deadline()
+    return deadline is None or deadline.allows(stage)
+
+
+def mark_degraded(stage: str, action: str) -> None:
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.degrade(stage, action)
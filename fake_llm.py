@@ -0,0 +1,184 @@
+# fake_llm.py
+# Детерминированная подмена LLM для бенчмарков и нагрузочных тестов: воспроизводит записанные
+# ответы с настраиваемым распределением задержки, чтобы накладные расходы конвейера SRIS
+# измерялись отдельно от скорости модели.
+import contextlib
+import fnmatch
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from llm_worker import StubBackend
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_digest(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class LatencyModel:
+    """
+    Задержка ответа в мс: kind = "constant" (value), "uniform" (low, high),
+    "normal" (mean, std) или "lognormal" (median, sigma). Плюс per_token_ms на каждый
+    сгенерированный токен; в потоковом режиме первая часть — задержка до первого токена.
+    """
+    def __init__(self, kind: str = "constant", per_token_ms: float = 0.0, seed: int = 0, **params: float):
+        if kind not in ("constant", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Неизвестное распределение задержки: {kind}")
+        self.kind = kind
+        self.params = params
+        self.per_token_ms = per_token_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec: Optional[Dict[str, Any]]) -> "LatencyModel":
+        return cls(**(spec or {}))
+
+    def first_token_ms(self) -> float:
+        p = self.params
+        with self._lock:
+            if self.kind == "constant":
+                value = p.get("value", 0.0)
+            elif self.kind == "uniform":
+                value = self._rng.uniform(p.get("low", 0.0), p.get("high", 0.0))
+            elif self.kind == "normal":
+                value = self._rng.gauss(p.get("mean", 0.0), p.get("std", 0.0))
+            else:
+                value = self._rng.lognormvariate(math.log(max(p.get("median", 1.0), 1e-6)), p.get("sigma", 0.5))
+        return max(0.0, value)
+
+
+class FakeLLM:
+    """
+    Воспроизводит ответы по режиму запроса. Записи: {"mode": шаблон fnmatch, "text": ...} и
+    необязательно "prompt_digest" (точное совпадение промпта) или "match" (подстрока промпта).
+    Порядок выбора: точный промпт, подстрока, затем записи режима по кругу; для режима
+    без записей — заготовленный ответ llm_worker.StubBackend.
+    """
+    def __init__(self, responses: Optional[List[Dict[str, Any]]] = None, latency: Optional[LatencyModel] = None):
+        self.responses = responses or []
+        self.latency = latency or LatencyModel()
+        self._by_digest = {r["prompt_digest"]: r for r in self.responses if r.get("prompt_digest")}
+        self._cursors: Dict[str, int] = {}
+        self._stub = StubBackend()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.calls = 0
+        self.simulated_ms = 0.0
+
+    @classmethod
+    def from_file(cls, path: str, latency: Optional[LatencyModel] = None) -> "FakeLLM":
+        """JSON-список записей или JSONL (как пишет RecordingLLM)."""
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        if content.startswith("["):
+            responses = json.loads(content)
+        else:
+            responses = [json.loads(line) for line in content.splitlines() if line.strip()]
+        return cls(responses, latency)
+
+    def _text(self, prompt: str, mode: str) -> str:
+        record = self._by_digest.get(prompt_digest(prompt))
+        if record and fnmatch.fnmatchcase(mode, record.get("mode", "*")):
+            return record["text"]
+        candidates = [r for r in self.responses if fnmatch.fnmatchcase(mode, r.get("mode", "*")) and not r.get("prompt_digest")]
+        for record in candidates:
+            if record.get("match") and record["match"] in prompt:
+                return record["text"]
+        cyclic = [r for r in candidates if not r.get("match")]
+        if not cyclic:
+            return self._stub._text(mode)
+        with self._lock:
+            cursor = self._cursors.get(mode, 0)
+            self._cursors[mode] = cursor + 1
+        return cyclic[cursor % len(cyclic)]["text"]
+
+    def _sleep(self, ms: float) -> None:
+        with self._lock:
+            self.simulated_ms += ms
+        # Ожидание модели в текущем потоке (профилировщики вычитают его из времени этапа).
+        self._local.waited_ms = getattr(self._local, "waited_ms", 0.0) + ms
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def thread_waited_ms(self) -> float:
+        return getattr(self._local, "waited_ms", 0.0)
+
+    def query(self, prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7) -> Dict[str, Any]:
+        words = self._text(prompt, mode).split(" ")
+        tokens = min(len(words), max_new_tokens)
+        with self._lock:
+            self.calls += 1
+        self._sleep(self.latency.first_token_ms() + self.latency.per_token_ms * tokens)
+        return {"text": " ".join(words[:tokens]), "completion_tokens": tokens,
+                "finish_reason": "length" if len(words) > max_new_tokens else "stop"}
+
+    def stream(self, prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7,
+               usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        words = self._text(prompt, mode).split(" ")
+        tokens = min(len(words), max_new_tokens)
+        with self._lock:
+            self.calls += 1
+        self._sleep(self.latency.first_token_ms())
+        for index, word in enumerate(words[:tokens]):
+            if index:
+                self._sleep(self.latency.per_token_ms)
+            yield word if index == 0 else " " + word
+        if usage is not None:
+            usage["completion_tokens"] = tokens
+            usage["finish_reason"] = "length" if len(words) > max_new_tokens else "stop"
+
+    @contextlib.contextmanager
+    def install(self) -> Iterator["FakeLLM"]:
+        """Подменяет LLM-вызовы utils (execute_llm_query / execute_llm_stream) на время блока."""
+        import utils
+        saved = (utils.query_mistral_with_usage, utils.stream_mistral, utils.mistral_core_available)
+        utils.query_mistral_with_usage, utils.stream_mistral, utils.mistral_core_available = self.query, self.stream, True
+        try:
+            yield self
+        finally:
+            utils.query_mistral_with_usage, utils.stream_mistral, utils.mistral_core_available = saved
+
+
+class RecordingLLM:
+    """Пропускает запросы к настоящей LLM и дописывает ответы в JSONL для FakeLLM.from_file."""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._query = self._stream = None
+
+    def _write(self, prompt: str, mode: str, text: str) -> None:
+        record = {"mode": mode, "prompt_digest": prompt_digest(prompt), "text": text}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def query(self, prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7) -> Dict[str, Any]:
+        result = self._query(prompt, mode, max_new_tokens, temperature)
+        self._write(prompt, mode, result["text"])
+        return result
+
+    def stream(self, prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7,
+               usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        chunks: List[str] = []
+        for chunk in self._stream(prompt, mode, max_new_tokens, temperature, usage=usage):
+            chunks.append(chunk)
+            yield chunk
+        self._write(prompt, mode, "".join(chunks))
+
+    @contextlib.contextmanager
+    def install(self) -> Iterator["RecordingLLM"]:
+        import utils
+        saved = (utils.query_mistral_with_usage, utils.stream_mistral)
+        self._query, self._stream = saved
+        utils.query_mistral_with_usage, utils.stream_mistral = self.query, self.stream
+        try:
+            yield self
+        finally:
+            utils.query_mistral_with_usage, utils.stream_mistral = saved
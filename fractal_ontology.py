@@ -1,4 +1,15 @@
 # fractal_ontology.py
+import itertools
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from cycle_cache import fingerprint, memoize_batch
+from keyword_matcher import KeywordMatcher, shared_matcher
+
+logger = logging.getLogger(__name__)
 
 # Концептуальная Фрактальная Онтология:
 # Это не просто список слов, а ссылка на внутренний граф знаний SRIS.
@@ -80,86 +91,238 @@ ONTOLOGICAL_RULES_AND_BANS = {
     }
 }
 
+# --- Compiled Ontology Graph ---
+# The nested structure above is the authoring format (also used by ontology data files).
+# At load time it is compiled into a flat concept table with parent links, a keyword
+# automaton (one matcher category per concept) and rules indexed by their trigger
+# concepts, so lookups and rule selection do not depend on the ontology size.
+ONTOLOGY_CATEGORY_PREFIX = "ontology:"
+ONTOLOGY_PATH_ENV = "SRIS_ONTOLOGY_PATH"
+# Each compiled ontology gets its own generation in the matcher category names
+# ("ontology:<n>:<concept>"), so a new ontology is built next to the active one.
+_ontology_generations = itertools.count(1)
+
+
+class CompiledOntology:
+    """
+    Indexed, read-only view of a fractal ontology.
+
+    Args:
+        structure: Domains with optional "keywords", "properties" and (arbitrarily
+                   nested) "sub_concepts", as in FRACTAL_ONTOLOGY_STRUCTURE.
+        rules: Rules in the ONTOLOGICAL_RULES_AND_BANS format.
+        matcher: Keyword matcher to compile concept keywords into. A private matcher
+                 is created if omitted; the active ontology uses the shared one.
+        category_prefix: Prefix of this ontology's matcher categories; a new
+                 generation of ONTOLOGY_CATEGORY_PREFIX if omitted.
+    """
+    def __init__(self, structure: dict, rules: dict, matcher: Optional[KeywordMatcher] = None, category_prefix: Optional[str] = None):
+        self.matcher = matcher if matcher is not None else KeywordMatcher()
+        self.category_prefix = category_prefix or f"{ONTOLOGY_CATEGORY_PREFIX}{next(_ontology_generations)}:"
+        self.released = False
+        self.parents: dict[str, Optional[str]] = {}
+        self.properties: dict[str, dict] = {}
+        self.descriptions: dict[str, str] = {}
+        self.rules: list[tuple[str, dict]] = list(rules.items())
+        self.rules_by_trigger: dict[str, list[int]] = {}
+
+        # Pre-order walk: a concept defined more than once keeps the first value of each
+        # property, the same answer the nested lookup returned.
+        stack = [(name, info, None) for name, info in reversed(list(structure.items()))]
+        while stack:
+            name, info, parent = stack.pop()
+            self.parents.setdefault(name, parent)
+            concept_properties = self.properties.setdefault(name, {})
+            for key, value in info.get("properties", {}).items():
+                concept_properties.setdefault(key, value)
+            if "description" in info:
+                self.descriptions.setdefault(name, info["description"])
+            self.matcher.add_keywords(self.category_prefix + name, info.get("keywords", []))
+            stack.extend((sub_name, sub_info, name) for sub_name, sub_info in reversed(list(info.get("sub_concepts", {}).items())))
+
+        for rule_index, (rule_name, rule_data) in enumerate(self.rules):
+            for trigger in {rule_data.get("domain"), rule_data.get("condition", {}).get("concept_detected")}:
+                if trigger is not None:
+                    self.rules_by_trigger.setdefault(trigger, []).append(rule_index)
+
+    @classmethod
+    def from_data(cls, data: dict, matcher: Optional[KeywordMatcher] = None) -> "CompiledOntology":
+        """Builds an ontology from the data file format: {"concepts": <structure>, "rules": <rules>}."""
+        return cls(data.get("concepts", {}), data.get("rules", {}), matcher=matcher)
+
+    @classmethod
+    def from_file(cls, path: str, matcher: Optional[KeywordMatcher] = None) -> "CompiledOntology":
+        return cls.from_data(_read_ontology_file(path), matcher=matcher)
+
+    def release(self) -> None:
+        """Removes this ontology's concept keywords from its matcher (one pass over the keywords)."""
+        self.released = True  # set first: a lookup that raced with the removal sees the flag
+        self.matcher.remove_categories_with_prefix(self.category_prefix)
+
+    def concepts_in_text(self, text: str) -> list[str]:
+        prefix = self.category_prefix
+        return list({category[len(prefix):] for category in self.matcher.match(text) if category.startswith(prefix)})
+
+    def get_property(self, concept_name, property_key: str, inherit: bool = False):
+        """Property of a concept; with inherit=True a missing property is looked up along the parent links."""
+        if not isinstance(concept_name, str):
+            return None
+        while concept_name is not None:
+            value = self.properties.get(concept_name, {}).get(property_key)
+            if value is not None or not inherit:
+                return value
+            concept_name = self.parents.get(concept_name)
+        return None
+
+    def ancestors(self, concept_name: str) -> list[str]:
+        chain = []
+        parent = self.parents.get(concept_name)
+        while parent is not None:
+            chain.append(parent)
+            parent = self.parents.get(parent)
+        return chain
+
+    def relevant_rules(self, concepts: list[str]) -> list[tuple[str, dict]]:
+        """Rules whose domain or trigger concept was detected, in rule definition order."""
+        rule_indices = set()
+        for concept in concepts:
+            rule_indices.update(self.rules_by_trigger.get(concept, ()))
+        return [self.rules[i] for i in sorted(rule_indices)]
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+
+def _read_ontology_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_default_ontology() -> CompiledOntology:
+    path = os.environ.get(ONTOLOGY_PATH_ENV)
+    if path:
+        logger.info(f"FractalOntology: loading ontology from {path}")
+        return CompiledOntology.from_file(path, matcher=shared_matcher)
+    return CompiledOntology(FRACTAL_ONTOLOGY_STRUCTURE, ONTOLOGICAL_RULES_AND_BANS, matcher=shared_matcher)
+
+
+# Concept keywords live in the shared matcher, so concept extraction is the same
+# single pass over the hypothesis as the ZAV2 and safety checks.
+_active_ontology: CompiledOntology = _load_default_ontology()
+_swap_lock = threading.Lock()
+
+
+def get_active_ontology() -> CompiledOntology:
+    return _active_ontology
+
+
+def load_ontology(path: str) -> CompiledOntology:
+    """Replaces the active ontology with one loaded from a JSON data file."""
+    data = _read_ontology_file(path) # Parse first: a broken file leaves the active ontology untouched
+    ontology = _activate(CompiledOntology.from_data(data, matcher=shared_matcher))
+    logger.info(f"FractalOntology: loaded {len(ontology)} concepts and {len(ontology.rules)} rules from {path}")
+    return ontology
+
+
+def _activate(ontology: CompiledOntology) -> CompiledOntology:
+    """
+    Makes a fully built ontology active in one assignment, then drops the previous one's
+    keywords, so concurrent lookups see either the old or the new ontology.
+    """
+    global _active_ontology
+    with _swap_lock:
+        previous, _active_ontology = _active_ontology, ontology
+    previous.release()
+    return ontology
+
+
+def export_ontology(path: str) -> None:
+    """Writes the built-in ontology in the data file format, as a starting point for custom ontologies."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"concepts": FRACTAL_ONTOLOGY_STRUCTURE, "rules": ONTOLOGICAL_RULES_AND_BANS}, f, ensure_ascii=False, indent=2)
+
+
+def reset_ontology() -> CompiledOntology:
+    """Restores the built-in ontology (FRACTAL_ONTOLOGY_STRUCTURE / ONTOLOGICAL_RULES_AND_BANS)."""
+    return _activate(CompiledOntology(FRACTAL_ONTOLOGY_STRUCTURE, ONTOLOGICAL_RULES_AND_BANS, matcher=shared_matcher))
+
+
 # --- Conceptual Helper Functions ---
 # These functions would interact with a deeper semantic graph/knowledge base
 def _get_concepts_from_text(text: str) -> list[str]:
     """Conceptual: Extracts semantic concepts from text using NLP and knowledge graph."""
-    extracted_concepts = []
-    text_lower = text.lower()
-    for domain_name, domain_info in FRACTAL_ONTOLOGY_STRUCTURE.items():
-        if "keywords" in domain_info:
-            if any(kw in text_lower for kw in domain_info["keywords"]):
-                extracted_concepts.append(domain_name) # Add domain as concept
-        if "sub_concepts" in domain_info:
-            for sub_concept_name, sub_concept_info in domain_info["sub_concepts"].items():
-                if any(kw in text_lower for kw in sub_concept_info.get("keywords", [])):
-                    extracted_concepts.append(sub_concept_name)
-    return list(set(extracted_concepts)) # Return unique concepts
+    ontology = _active_ontology
+    concepts = ontology.concepts_in_text(text)
+    # A reload released this ontology during the lookup; the new one is already active.
+    while ontology.released:
+        ontology = _active_ontology
+        concepts = ontology.concepts_in_text(text)
+    return concepts # Return unique concepts
 
 
 def _get_concept_properties(concept_name: str, property_key: str):
     """Conceptual: Retrieves a specific property for a given concept from the ontology."""
-    # This would traverse the FRACTAL_ONTOLOGY_STRUCTURE or query the knowledge graph
-    for domain_name, domain_info in FRACTAL_ONTOLOGY_STRUCTURE.items():
-        if concept_name == domain_name and property_key in domain_info.get("properties", {}):
-            return domain_info["properties"][property_key]
-        if "sub_concepts" in domain_info:
-            for sub_concept_name, sub_concept_info in domain_info["sub_concepts"].items():
-                if concept_name == sub_concept_name and property_key in sub_concept_info.get("properties", {}):
-                    return sub_concept_info["properties"][property_key]
-    return None
+    return _active_ontology.get_property(concept_name, property_key)
 
 def check_ontology(hypothesis: str, perception_struct: dict, current_mode: str, sDNA_traits: dict = None) -> dict:
     """
     Checks the hypothesis against the fractal ontology, considering the current
     reasoning mode, perception context, and sDNA traits.
     """
+    return check_ontology_batch([hypothesis], perception_struct, current_mode, sDNA_traits)[0]
+
+
+def check_ontology_batch(hypotheses: list[str], perception_struct: dict, current_mode: str, sDNA_traits: dict = None) -> list[dict]:
+    """
+    Checks a batch of hypotheses that share one perception and mode.
+    The perception target is resolved once; returns one result per hypothesis, in order.
+    Inside a reasoning cycle each hypothesis is checked at most once (see cycle_cache).
+    """
+    def compute(indices: list[int]) -> list[dict]:
+        # Extract relevant concepts from hypothesis and perception
+        perception_target_type = _get_concept_properties(perception_struct.get('object', ''), 'type') # Conceptual: e.g., 'human', 'machine'
+        return [_check_rules(_get_concepts_from_text(hypotheses[i]), perception_target_type, current_mode) for i in indices]
+
+    perception_key = fingerprint(perception_struct)
+    return memoize_batch("ontology", [(hypothesis, perception_key, current_mode) for hypothesis in hypotheses], compute)
+
+
+def _check_rules(hypothesis_concepts: list[str], perception_target_type, current_mode: str) -> dict:
     violations = []
-    
-    # Extract relevant concepts from hypothesis and perception
-    hypothesis_concepts = _get_concepts_from_text(hypothesis)
-    perception_target_type = _get_concept_properties(perception_struct.get('object', ''), 'type') # Conceptual: e.g., 'human', 'machine'
-
-    for rule_name, rule_data in ONTOLOGICAL_RULES_AND_BANS.items():
-        # Check if the rule's domain/concept is relevant to the hypothesis
-        is_rule_relevant = False
-        if rule_data.get("domain") in hypothesis_concepts:
-            is_rule_relevant = True
-        if rule_data.get("condition", {}).get("concept_detected") in hypothesis_concepts:
-             is_rule_relevant = True
-
-        if is_rule_relevant:
-            # Evaluate rule conditions
-            conditions_met = True
-            if "condition" in rule_data:
-                for cond_key, cond_value in rule_data["condition"].items():
-                    if cond_key == "target_type" and perception_target_type != cond_value:
-                        conditions_met = False
-                        break
-                    # Add more complex conditions based on 'action_type', 'environment', 'threat_level' etc.
-                    # if cond_key == "action_type" and _get_concept_properties(hypothesis_concepts[0], 'type') != cond_value:
-                    #     conditions_met = False; break
-            
-            if not conditions_met:
-                continue # Rule condition not met, so no violation
-
-            # Check for exceptions based on current mode or sDNA
-            rule_exceptions = rule_data.get("exceptions", [])
-            exception_active = False
-            if current_mode in rule_exceptions:
-                exception_active = True
-            # if sDNA_traits.get("self_preservation_override_active", False) and "self_defense_protocol_active" in rule_exceptions:
-            #     exception_active = True
-
-            if not exception_active:
-                violations.append({
-                    "rule": rule_name,
-                    "domain": rule_data.get("domain"),
-                    "concept_detected": hypothesis_concepts, # More specific
-                    "strict": rule_data["strict"],
-                    "message": rule_data["message"],
-                    "priority": rule_data["priority"]
-                })
+
+    # Only rules whose domain/concept is relevant to the hypothesis are looked at (indexed by trigger concept)
+    for rule_name, rule_data in _active_ontology.relevant_rules(hypothesis_concepts):
+        # Evaluate rule conditions
+        conditions_met = True
+        if "condition" in rule_data:
+            for cond_key, cond_value in rule_data["condition"].items():
+                if cond_key == "target_type" and perception_target_type != cond_value:
+                    conditions_met = False
+                    break
+                # Add more complex conditions based on 'action_type', 'environment', 'threat_level' etc.
+                # if cond_key == "action_type" and _get_concept_properties(hypothesis_concepts[0], 'type') != cond_value:
+                #     conditions_met = False; break
+        
+        if not conditions_met:
+            continue # Rule condition not met, so no violation
+
+        # Check for exceptions based on current mode or sDNA
+        rule_exceptions = rule_data.get("exceptions", [])
+        exception_active = False
+        if current_mode in rule_exceptions:
+            exception_active = True
+        # if sDNA_traits.get("self_preservation_override_active", False) and "self_defense_protocol_active" in rule_exceptions:
+        #     exception_active = True
+
+        if not exception_active:
+            violations.append({
+                "rule": rule_name,
+                "domain": rule_data.get("domain"),
+                "concept_detected": hypothesis_concepts, # More specific
+                "strict": rule_data["strict"],
+                "message": rule_data["message"],
+                "priority": rule_data["priority"]
+            })
 
     is_valid = all(not v["strict"] for v in violations)
 
@@ -2,148 +2,198 @@
 import logging
 from typing import List, Dict, Any, Optional # Добавил Optional для единообразия
 
-from cause_effect import extract_cause_effect
+from cause_effect import extract_cause_effect_batch
 # Импорты для ZAV2 и Ontology должны быть корректными и доступными
-from zav2_context_validator import validate_contextual_hypothesis 
-from fractal_ontology import check_ontology
+from zav2_context_validator import validate_hypotheses_batch
+from fractal_ontology import check_ontology_batch
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
-def evaluate_hypotheses(
+def _normalize_hypotheses(hypotheses: List[str]) -> List[Dict[str, Any]]:
+    """Один проход по тексту гипотезы: нижний регистр, число слов и длина нужны всем слагаемым оценки."""
+    return [
+        {"text": h_text, "lower": h_text.lower(), "word_count": len(h_text.split()), "length": len(h_text)}
+        for h_text in hypotheses
+    ]
+
+
+def _goal_congruence_increment(h: Dict[str, Any], active_goal_concept: str, current_goals: list[dict]) -> float:
+    h_lower = h["lower"]
+
+    if active_goal_concept == "engage_in_social_dialogue":
+        if h_lower.startswith("ответить:") or \
+           h_lower.startswith("сказать:") or \
+           "как твои дела" in h_lower or \
+           "у меня все" in h_lower or \
+           "спасибо" in h_lower or \
+           "пожалуйста" in h_lower or \
+           "рад помочь" in h_lower:
+            return 0.3
+        if h_lower.startswith("мысль:"):
+            return 0.15
+
+    elif active_goal_concept == "provide_information_about_self":
+        if "я - " in h_lower or \
+           "моя функция" in h_lower or \
+           "моя цель" in h_lower or \
+           "sris" in h_lower:
+            return 0.35
+        if h_lower.startswith("тезис:"):
+            return 0.25
+
+    elif active_goal_concept == "answer_information_request":
+        # Высший приоритет гипотезам, уже содержащим ответ ("Ответ: " + хотя бы 2 слова)
+        if h_lower.startswith("ответ: ") and h["word_count"] > 3:
+            return 0.45
+        if "на основе информации из семантической памяти" in h_lower:
+            return 0.40
+        if "проверить внутреннюю базу знаний" in h_lower or \
+           "сформулировать запрос к внешнему источнику" in h_lower:
+            return 0.25
+        if "запросить у пользователя уточняющие детали" in h_lower:
+            return 0.15
+        if "констатировать отсутствие точной информации" in h_lower:
+            return 0.05
+
+    elif current_goals:
+        temp_goal_concept_for_keywords = active_goal_concept if active_goal_concept else current_goals[0].get('concept', '').lower()
+        if "optimize" in h_lower and "optimize" in temp_goal_concept_for_keywords:
+            return 0.2
+        if "defend" in h_lower and "security" in temp_goal_concept_for_keywords:
+            return 0.2
+        # ... и т.д. для других общих случаев
+
+    return 0.0
+
+
+def evaluate_hypotheses_batch(
     hypotheses: list[str],
-    current_perception_struct: dict, 
-    current_goals: list[dict], 
-    sDNA_traits: dict, 
+    current_perception_struct: dict,
+    current_goals: list[dict],
+    sDNA_traits: dict,
     current_mode: str
-    # memory_context: Optional[str] = None # Можно будет добавить, если оценка будет учитывать его напрямую
 ) -> list[dict]:
     """
-    Evaluates hypotheses based on predicted outcomes, goal congruence,
-    ethical/ontological alignment, and sDNA biases.
+    Batch engine behind evaluate_hypotheses: hypotheses are normalized once,
+    each validator (cause/effect, ZAV2, ontology) runs once over the whole batch,
+    and every score term is computed as a column over all hypotheses.
+
+    Returns results in input order (unsorted), one per hypothesis.
     """
-    results = []
     if not hypotheses:
-        return results
+        return []
+
+    normalized = _normalize_hypotheses(hypotheses)
+    count = len(normalized)
 
     risk_tolerance = sDNA_traits.get('risk_tolerance', 0.5)
     proactiveness = sDNA_traits.get('proactiveness', 0.5)
     efficiency_preference = sDNA_traits.get('efficiency_preference', 0.5)
+    ethical_risk_averse = sDNA_traits.get('ethical_risk_aversion', 0.5) > 0.7
 
     active_goal_concept = ""
     if current_goals and isinstance(current_goals, list) and current_goals[0]:
         active_goal_concept = current_goals[0].get('concept', '').lower()
 
-    for h_text in hypotheses:
-        score = 0.5 # Базовый балл
-        evaluation_details = {}
-
-        # --- 1. Predicted Causal Effects and their Valence Impact ---
-        causal_analysis_result = extract_cause_effect(
-            current_perception_struct, 
-            h_text, 
-            {"current_goals": current_goals, "current_mode": current_mode, "sdna_traits": sDNA_traits} 
-        )
-        predicted_effects = causal_analysis_result.get('effects', [])
-        causal_confidence = causal_analysis_result.get('causal_confidence', 0.5)
-        total_valence_impact = sum(effect.get('valence_impact', 0) * effect.get('probability', 0) for effect in predicted_effects)
-        
-        score += total_valence_impact * causal_confidence * 0.2 
-        evaluation_details["predicted_effects"] = predicted_effects
-        evaluation_details["causal_confidence"] = causal_confidence
-        evaluation_details["total_valence_impact"] = total_valence_impact
-
-        # --- 2. Goal Congruence (УЛУЧШЕННАЯ ЛОГИКА с приоритетом для прямых ответов) ---
-        goal_congruence_score_increment = 0.0
-
-        if active_goal_concept == "engage_in_social_dialogue":
-            if h_text.lower().startswith("ответить:") or \
-               h_text.lower().startswith("сказать:") or \
-               "как твои дела" in h_text.lower() or \
-               "у меня все" in h_text.lower() or \
-               "спасибо" in h_text.lower() or \
-               "пожалуйста" in h_text.lower() or \
-               "рад помочь" in h_text.lower():
-                goal_congruence_score_increment = 0.3 
-            elif h_text.lower().startswith("мысль:"):
-                 goal_congruence_score_increment = 0.15
-        
-        elif active_goal_concept == "provide_information_about_self":
-            if "я - " in h_text.lower() or \
-               "моя функция" in h_text.lower() or \
-               "моя цель" in h_text.lower() or \
-               "sris" in h_text.lower():
-                goal_congruence_score_increment = 0.35 
-            elif h_text.lower().startswith("тезис:"):
-                 goal_congruence_score_increment = 0.25
-
-        elif active_goal_concept == "answer_information_request":
-            # --- ИЗМЕНЕНИЕ ЗДЕСЬ: Даем ВЫСШИЙ приоритет гипотезам, уже содержащим ответ ---
-            is_direct_answer_hypothesis = h_text.lower().startswith("ответ: ") and len(h_text.split()) > 3 # "Ответ: " + хотя бы 2 слова
-            is_using_memory_instruction = "на основе информации из семантической памяти" in h_text.lower()
-            
-            if is_direct_answer_hypothesis:
-                goal_congruence_score_increment = 0.45 # ВЫСШИЙ БОНУС за уже готовый ответ
-            elif is_using_memory_instruction:
-                goal_congruence_score_increment = 0.40 # Хороший бонус за использование памяти
-            # --- КОНЕЦ ИЗМЕНЕНИЯ ---
-            elif "проверить внутреннюю базу знаний" in h_text.lower() or \
-                 "сформулировать запрос к внешнему источнику" in h_text.lower():
-                goal_congruence_score_increment = 0.25 
-            elif "запросить у пользователя уточняющие детали" in h_text.lower():
-                goal_congruence_score_increment = 0.15 
-            elif "констатировать отсутствие точной информации" in h_text.lower():
-                 goal_congruence_score_increment = 0.05 
-
-        elif current_goals: 
-            temp_goal_concept_for_keywords = active_goal_concept if active_goal_concept else current_goals[0].get('concept', '').lower()
-            if "optimize" in h_text.lower() and "optimize" in temp_goal_concept_for_keywords:
-                goal_congruence_score_increment = 0.2
-            elif "defend" in h_text.lower() and "security" in temp_goal_concept_for_keywords:
-                goal_congruence_score_increment = 0.2
-            # ... и т.д. для других общих случаев
-
-        score += goal_congruence_score_increment 
-        evaluation_details["goal_congruence_score"] = goal_congruence_score_increment
-
-        # --- 3. ZAV2 and Ontological Pre-Evaluation ---
-        zav2_check = validate_contextual_hypothesis(h_text) 
-        if not zav2_check["valid"]:
-            score -= 0.5 
-            evaluation_details["zav2_violations"] = zav2_check.get("violated_axioms", ["Unknown ZAV2 violation"])
-            if sDNA_traits.get('ethical_risk_aversion', 0.5) > 0.7:
-                score -= 0.5 
-
-        ontology_check = check_ontology(h_text, current_perception_struct, current_mode, sDNA_traits)
-        if not ontology_check["valid"]:
-            strict_violations = [v for v in ontology_check.get("violations", []) if v.get("strict")]
-            if strict_violations:
-                score = -1.0 
-                evaluation_details["ontology_violations_strict"] = strict_violations
-            else: 
-                score -= 0.2
-                evaluation_details["ontology_violations_non_strict"] = ontology_check.get("violations", [])
-        
-        # --- 4. sDNA Biases ---
-        if "aggressive" in h_text.lower() and risk_tolerance > 0.7:
-            score += 0.05 
-        if "proactive" in h_text.lower() and proactiveness > 0.7:
-            score += 0.05
-        if "optimize" in h_text.lower() and efficiency_preference > 0.7:
-            score += 0.05
-        
-        # --- 5. Бонус за краткость и явность (простой пример) ---
-        if len(h_text) < 100: 
-            score += 0.05
-        # Увеличим бонус, если это явный ответ И он не слишком короткий (чтобы отсеять просто "Ответ: да")
-        if (h_text.lower().startswith("ответить:") or h_text.lower().startswith("сказать:")) and len(h_text.split()) > 3 :
-            score += 0.15 # Увеличенный бонус за явное указание на готовую фразу
-        elif h_text.lower().startswith("ответ:") and len(h_text.split()) > 3: # Для гипотез, которые уже являются ответом
-            score += 0.15 
+    # --- Валидаторы: по одному пакетному вызову на все гипотезы ---
+    causal_results = extract_cause_effect_batch(
+        current_perception_struct,
+        hypotheses,
+        {"current_goals": current_goals, "current_mode": current_mode, "sdna_traits": sDNA_traits}
+    )
+    zav2_results = validate_hypotheses_batch(hypotheses)
+    ontology_results = check_ontology_batch(hypotheses, current_perception_struct, current_mode, sDNA_traits)
+
+    # --- 1. Predicted Causal Effects and their Valence Impact ---
+    predicted_effects = [result.get('effects', []) for result in causal_results]
+    causal_confidences = [result.get('causal_confidence', 0.5) for result in causal_results]
+    total_valence_impacts = [
+        sum(effect.get('valence_impact', 0) * effect.get('probability', 0) for effect in effects)
+        for effects in predicted_effects
+    ]
+    valence_terms = [impact * confidence * 0.2 for impact, confidence in zip(total_valence_impacts, causal_confidences)]
+
+    # --- 2. Goal Congruence (приоритет для прямых ответов) ---
+    goal_terms = [_goal_congruence_increment(h, active_goal_concept, current_goals) for h in normalized]
+
+    # --- 3. ZAV2 and Ontological Pre-Evaluation ---
+    zav2_valid = [result["valid"] for result in zav2_results]
+    zav2_terms = [0.0 if valid else -0.5 for valid in zav2_valid]
+    zav2_ethical_terms = [0.0 if valid or not ethical_risk_averse else -0.5 for valid in zav2_valid]
+
+    strict_violations = [
+        [] if result["valid"] else [v for v in result.get("violations", []) if v.get("strict")]
+        for result in ontology_results
+    ]
+    # Строгое нарушение онтологии обнуляет накопленную оценку до -1.0, нестрогое штрафует на 0.2.
+    ontology_terms = [0.0 if result["valid"] or strict else -0.2 for result, strict in zip(ontology_results, strict_violations)]
+
+    # --- 4. sDNA Biases ---
+    aggressive_terms = [0.05 if "aggressive" in h["lower"] and risk_tolerance > 0.7 else 0.0 for h in normalized]
+    proactive_terms = [0.05 if "proactive" in h["lower"] and proactiveness > 0.7 else 0.0 for h in normalized]
+    optimize_terms = [0.05 if "optimize" in h["lower"] and efficiency_preference > 0.7 else 0.0 for h in normalized]
+
+    # --- 5. Бонус за краткость и явность ---
+    brevity_terms = [0.05 if h["length"] < 100 else 0.0 for h in normalized]
+    # Бонус за явный готовый ответ, если он не слишком короткий (чтобы отсеять просто "Ответ: да")
+    explicit_answer_terms = [
+        0.15 if h["word_count"] > 3 and h["lower"].startswith(("ответить:", "сказать:", "ответ:")) else 0.0
+        for h in normalized
+    ]
 
+    results = []
+    for i, h in enumerate(normalized):
+        # Слагаемые складываются в исходном порядке, поэтому оценки совпадают с поштучной версией до бита.
+        score = 0.5 # Базовый балл
+        score += valence_terms[i]
+        score += goal_terms[i]
+        score += zav2_terms[i]
+        score += zav2_ethical_terms[i]
+        if strict_violations[i]:
+            score = -1.0
+        else:
+            score += ontology_terms[i]
+        score += aggressive_terms[i]
+        score += proactive_terms[i]
+        score += optimize_terms[i]
+        score += brevity_terms[i]
+        score += explicit_answer_terms[i]
+
+        evaluation_details = {
+            "predicted_effects": predicted_effects[i],
+            "causal_confidence": causal_confidences[i],
+            "total_valence_impact": total_valence_impacts[i],
+            "goal_congruence_score": goal_terms[i],
+        }
+        if not zav2_valid[i]:
+            evaluation_details["zav2_violations"] = zav2_results[i].get("violated_axioms", ["Unknown ZAV2 violation"])
+        if strict_violations[i]:
+            evaluation_details["ontology_violations_strict"] = strict_violations[i]
+        elif not ontology_results[i]["valid"]:
+            evaluation_details["ontology_violations_non_strict"] = ontology_results[i].get("violations", [])
 
         final_score = round(min(1.0, max(-1.0, score)), 3)
-        results.append({"hypothesis": h_text, "score": final_score, "details": evaluation_details})
+        results.append({"hypothesis": h["text"], "score": final_score, "details": evaluation_details})
+    return results
+
+
+def evaluate_hypotheses(
+    hypotheses: list[str],
+    current_perception_struct: dict, 
+    current_goals: list[dict], 
+    sDNA_traits: dict, 
+    current_mode: str
+    # memory_context: Optional[str] = None # Можно будет добавить, если оценка будет учитывать его напрямую
+) -> list[dict]:
+    """
+    Evaluates hypotheses based on predicted outcomes, goal congruence,
+    ethical/ontological alignment, and sDNA biases.
+    Returns the results ranked by score (highest first).
+    """
+    results = evaluate_hypotheses_batch(hypotheses, current_perception_struct, current_goals, sDNA_traits, current_mode)
+    if not results:
+        return results
 
     results.sort(key=lambda x: x["score"], reverse=True)
     logger.info(f"HypothesisEvaluator: Оцененные гипотезы (топ-3, если есть): {results[:3]}")
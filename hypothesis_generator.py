@@ -1,17 +1,29 @@
 # hypothesis_generator.py
+import contextvars
 import logging
-from typing import List, Dict, Any, Optional
-from utils import execute_llm_query
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+from utils import execute_llm_query, execute_llm_stream
 
 logger = logging.getLogger(__name__)
 
-def generate_hypotheses(
+# Потоковая генерация: остановка, когда набралось EARLY_STOP_COUNT гипотез с оценкой
+# не ниже EARLY_STOP_SCORE; параллельные генерации короче и с разной температурой.
+DEFAULT_EARLY_STOP_SCORE = 0.85
+DEFAULT_EARLY_STOP_COUNT = 2
+PARALLEL_TEMPERATURE_STEP = 0.15
+MIN_PARALLEL_MAX_TOKENS = 96
+
+def _build_hypothesis_prompt(
     perception_struct: dict,
-    current_goals: list[dict] = None,
-    sDNA_traits: dict = None,
-    current_mode: str = "default_exploration",
-    memory_context: Optional[str] = None 
-) -> list[str]:
+    current_goals: Optional[list[dict]],
+    sDNA_traits: Optional[dict],
+    current_mode: str,
+    memory_context: Optional[str]
+) -> Dict[str, str]:
+    """Собирает промпт генерации гипотез; общий для обычной и потоковой генерации."""
     if current_goals is None: current_goals = []
     if sDNA_traits is None: sDNA_traits = {}
 
@@ -132,58 +144,234 @@ def generate_hypotheses(
 Сгенерируй запрошенное количество гипотез/мыслей в соответствии с ОСНОВНОЙ ЗАДАЧЕЙ. Каждая гипотеза/мысль должна быть на новой строке. Не используй нумерацию или маркеры списка (например, "-").
 ГИПОТЕЗЫ/МЫСЛИ:
 """
+    return {
+        "prompt": prompt_for_llm,
+        "main_instruction": main_instruction_for_llm,
+        "active_goal_concept": active_goal_concept,
+        "lang_detected": lang_detected,
+        "context_summary": context_summary,
+    }
+
+
+def _generation_mode(active_goal_concept: str) -> str:
+    return f"hyp_gen_for_{active_goal_concept.replace(' ','_')}"
+
+
+def _is_llm_error(llm_response_str: str) -> bool:
+    return "Ошибка API" in llm_response_str or "Ошибка:" in llm_response_str or not llm_response_str.strip()
+
+
+def _header_phrases(lang_detected: str) -> List[str]:
+    generic_phrases_to_remove_ru = ["вот несколько гипотез:", "гипотезы:", "возможные мысли:", "варианты мыслей:", "варианты фраз:", "тезисы:", "гипотеза:"]
+    generic_phrases_to_remove_en = ["here are some hypotheses:", "hypotheses:", "possible thoughts:", "thought options:", "phrase options:", "key points:", "hypothesis:"]
+    return generic_phrases_to_remove_ru if lang_detected == "ru" else generic_phrases_to_remove_en
+
+
+def _clean_hypothesis_line(h_raw: str, current_phrases_to_remove: List[str]) -> Optional[str]:
+    """Убирает маркеры списка и нумерацию; возвращает None для пустых строк и заголовков."""
+    h_clean = h_raw.strip()
+    if h_clean.startswith("- "): h_clean = h_clean[2:]
+
+    if h_clean and h_clean[0].isdigit():
+        if len(h_clean) > 1 and h_clean[1] == '.':
+            if len(h_clean) > 2 and h_clean[2] == ' ':
+                h_clean = h_clean[3:].strip()
+            else:
+                h_clean = h_clean[2:].strip()
+
+    for phrase in current_phrases_to_remove:
+        if h_clean.lower().startswith(phrase.lower()):
+            # Пропускаем, если это только заголовок или заголовок с небольшим мусором
+            if len(h_clean) <= len(phrase) + 3: # Учитываем возможное двоеточие, пробел и т.п.
+                return None
+
+    return h_clean or None
+
+
+def _error_fallback_hypothesis(lang_detected: str, context_summary: str) -> str:
+    return f"Стандартная гипотеза ({lang_detected}): Проанализировать ситуацию '{context_summary[:30]}' более детально из-за ошибки LLM в генерации гипотез."
+
+
+def _empty_fallback_hypothesis(lang_detected: str, context_summary: str) -> str:
+    return f"Стандартная гипотеза ({lang_detected}): Продолжить внимательное наблюдение за текущей ситуацией ('{context_summary[:30]}') для сбора дополнительной информации."
+
+
+def fallback_hypotheses(perception_struct: dict) -> List[str]:
+    """Гипотезы без обращения к LLM: когда на генерацию не осталось времени (дедлайн запроса)."""
+    lang_detected = perception_struct.get("language_detected", "ru")
+    context_summary = perception_struct.get('summary', "Общая ситуация.")
+    return [
+        f"Стандартная гипотеза ({lang_detected}): Кратко ответить по существу запроса ('{context_summary[:60]}'), опираясь на уже известное.",
+        _empty_fallback_hypothesis(lang_detected, context_summary),
+    ]
+
+
+def generate_hypotheses(
+    perception_struct: dict,
+    current_goals: list[dict] = None,
+    sDNA_traits: dict = None,
+    current_mode: str = "default_exploration",
+    memory_context: Optional[str] = None 
+) -> list[str]:
+    request = _build_hypothesis_prompt(perception_struct, current_goals, sDNA_traits, current_mode, memory_context)
+    active_goal_concept = request["active_goal_concept"]
+    lang_detected = request["lang_detected"]
+    context_summary = request["context_summary"]
+
     logger.info(f"HypothesisGenerator: Вызов LLM для генерации гипотез. Активная цель: '{active_goal_concept}'. Язык: {lang_detected}.")
-    logger.debug(f"HypothesisGenerator: Prompt for LLM (начало основной инструкции):\n{main_instruction_for_llm[:300]}...")
+    logger.debug(f"HypothesisGenerator: Prompt for LLM (начало основной инструкции):\n{request['main_instruction'][:300]}...")
     
     llm_response_str = execute_llm_query(
-        prompt=prompt_for_llm,
-        mode=f"hyp_gen_for_{active_goal_concept.replace(' ','_')}",
+        prompt=request["prompt"],
+        mode=_generation_mode(active_goal_concept),
         max_tokens=400, 
         temperature=0.65 
     )
 
-    if "Ошибка API" in llm_response_str or "Ошибка:" in llm_response_str or not llm_response_str.strip():
+    if _is_llm_error(llm_response_str):
         logger.error(f"HypothesisGenerator: Ошибка от LLM или пустой ответ: {llm_response_str}")
-        return [f"Стандартная гипотеза ({lang_detected}): Проанализировать ситуацию '{context_summary[:30]}' более детально из-за ошибки LLM в генерации гипотез."]
+        return [_error_fallback_hypothesis(lang_detected, context_summary)]
 
     hypotheses_raw = [h.strip() for h in llm_response_str.split('\n') if h.strip()]
-    
-    hypotheses_cleaned = []
-    
-    generic_phrases_to_remove_ru = ["вот несколько гипотез:", "гипотезы:", "возможные мысли:", "варианты мыслей:", "варианты фраз:", "тезисы:", "гипотеза:"]
-    generic_phrases_to_remove_en = ["here are some hypotheses:", "hypotheses:", "possible thoughts:", "thought options:", "phrase options:", "key points:", "hypothesis:"]
-    current_phrases_to_remove = generic_phrases_to_remove_ru if lang_detected == "ru" else generic_phrases_to_remove_en
-
-    for h_raw in hypotheses_raw:
-        h_clean = h_raw.strip()
-        if h_clean.startswith("- "): h_clean = h_clean[2:]
-        
-        cleaned_further = False
-        if h_clean and h_clean[0].isdigit():
-            if len(h_clean) > 1 and h_clean[1] == '.':
-                if len(h_clean) > 2 and h_clean[2] == ' ':
-                    h_clean = h_clean[3:].strip()
-                    cleaned_further = True
-                else:
-                    h_clean = h_clean[2:].strip()
-                    cleaned_further = True
-        
-        is_header = False
-        for phrase in current_phrases_to_remove:
-            if h_clean.lower().startswith(phrase.lower()):
-                # Пропускаем, если это только заголовок или заголовок с небольшим мусором
-                if len(h_clean) <= len(phrase) + 3: # Учитываем возможное двоеточие, пробел и т.п.
-                    is_header = True
-                    break
-        if is_header:
-            continue
-        
-        if h_clean:
-            hypotheses_cleaned.append(h_clean)
+    current_phrases_to_remove = _header_phrases(lang_detected)
+    hypotheses_cleaned = [h for h in (_clean_hypothesis_line(h_raw, current_phrases_to_remove) for h_raw in hypotheses_raw) if h]
     
     if not hypotheses_cleaned:
         logger.warning("HypothesisGenerator: LLM не вернул гипотез или все строки были отфильтрованы; используется стандартная гипотеза.")
-        return [f"Стандартная гипотеза ({lang_detected}): Продолжить внимательное наблюдение за текущей ситуацией ('{context_summary[:30]}') для сбора дополнительной информации."]
+        return [_empty_fallback_hypothesis(lang_detected, context_summary)]
     
     logger.info(f"HypothesisGenerator: Сгенерированные и очищенные гипотезы ({len(hypotheses_cleaned)}): {hypotheses_cleaned}")
     return hypotheses_cleaned
+
+
+def generate_hypotheses_streaming(
+    perception_struct: dict,
+    current_goals: list[dict] = None,
+    sDNA_traits: dict = None,
+    current_mode: str = "default_exploration",
+    memory_context: Optional[str] = None,
+    score_fn: Optional[Callable[[str], float]] = None,
+    score_threshold: float = DEFAULT_EARLY_STOP_SCORE,
+    enough: int = DEFAULT_EARLY_STOP_COUNT,
+    parallel_generations: int = 1,
+    max_tokens: int = 400,
+    temperature: float = 0.65
+) -> Dict[str, Any]:
+    """
+    Потоковая генерация гипотез: каждая строка разбирается, как только LLM ее допечатал,
+    и сразу передается оценщику score_fn. Декодирование прекращается, когда `enough`
+    гипотез набрали оценку >= score_threshold (без score_fn генерация идет до конца).
+
+    parallel_generations > 1 запускает столько же более коротких генераций с разной
+    температурой; одинаковые гипотезы из разных генераций учитываются один раз.
+
+    Returns:
+        dict: hypotheses (в порядке появления), scores, stopped_early, generations,
+              time_to_first_ms, time_to_best_ms, total_ms.
+    """
+    request = _build_hypothesis_prompt(perception_struct, current_goals, sDNA_traits, current_mode, memory_context)
+    lang_detected = request["lang_detected"]
+    context_summary = request["context_summary"]
+    mode = _generation_mode(request["active_goal_concept"])
+    current_phrases_to_remove = _header_phrases(lang_detected)
+
+    n_generations = max(1, parallel_generations)
+    tokens_per_generation = max_tokens if n_generations == 1 else max(MIN_PARALLEL_MAX_TOKENS, max_tokens // n_generations)
+    start_time = time.perf_counter()
+    stop_event = threading.Event()
+    state_lock = threading.Lock()
+    hypotheses: List[str] = []
+    scores: List[Optional[float]] = []
+    timing: Dict[str, Optional[float]] = {"first": None, "best": None, "best_score": None}
+    good_count = [0]
+
+    def accept_line(line: str) -> None:
+        h_clean = _clean_hypothesis_line(line, current_phrases_to_remove)
+        if not h_clean:
+            return
+        with state_lock:
+            if h_clean in hypotheses:
+                return
+            hypotheses.append(h_clean)
+            scores.append(None)
+            position = len(hypotheses) - 1
+        score = score_fn(h_clean) if score_fn else None
+        elapsed_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        with state_lock:
+            scores[position] = score
+            if timing["first"] is None:
+                timing["first"] = elapsed_ms
+            if score is not None and (timing["best_score"] is None or score > timing["best_score"]):
+                timing["best_score"], timing["best"] = score, elapsed_ms
+            if score is not None and score >= score_threshold:
+                good_count[0] += 1
+                if good_count[0] >= enough:
+                    stop_event.set()
+
+    def run_generation(index: int) -> Dict[str, Any]:
+        generation_temperature = round(temperature + index * PARALLEL_TEMPERATURE_STEP, 2)
+        info = {"temperature": generation_temperature, "max_tokens": tokens_per_generation, "chars": 0, "stopped_early": False, "failed": False}
+        if stop_event.is_set():
+            info["stopped_early"] = True
+            return info
+        stream = execute_llm_stream(request["prompt"], mode, tokens_per_generation, generation_temperature)
+        buffer = ""
+        try:
+            for chunk in stream:
+                info["chars"] += len(chunk)
+                buffer += chunk
+                *complete_lines, buffer = buffer.split("\n")
+                for line in complete_lines:
+                    if line.strip() and _is_llm_error(line):
+                        info["failed"] = True
+                        logger.error(f"HypothesisGenerator: Ошибка от LLM в потоковой генерации #{index}: {line.strip()}")
+                        break
+                    accept_line(line)
+                if info["failed"]:
+                    break
+                if stop_event.is_set():
+                    info["stopped_early"] = True
+                    break
+            else:
+                if buffer.strip() and _is_llm_error(buffer):
+                    info["failed"] = True
+                    logger.error(f"HypothesisGenerator: Ошибка от LLM в потоковой генерации #{index}: {buffer.strip()}")
+                else:
+                    accept_line(buffer)
+        finally:
+            # Закрытие потока останавливает декодирование оставшихся токенов.
+            stream.close()
+        if info["chars"] == 0:
+            info["failed"] = True
+        return info
+
+    logger.info(f"HypothesisGenerator: Потоковая генерация гипотез ({n_generations} x {tokens_per_generation} токенов), "
+                f"ранняя остановка при {enough} гипотезах с оценкой >= {score_threshold}.")
+    if n_generations == 1:
+        generations = [run_generation(0)]
+    else:
+        with ThreadPoolExecutor(max_workers=n_generations, thread_name_prefix="hyp_gen") as executor:
+            # Каждый поток видит контекст вызывающего (кэш цикла, дедлайн запроса).
+            futures = [executor.submit(contextvars.copy_context().run, run_generation, index) for index in range(n_generations)]
+            generations = [future.result() for future in futures]
+
+    if not hypotheses:
+        if all(generation["failed"] for generation in generations):
+            logger.error("HypothesisGenerator: Потоковая генерация не дала ответа LLM; используется стандартная гипотеза.")
+            hypotheses, scores = [_error_fallback_hypothesis(lang_detected, context_summary)], [None]
+        else:
+            logger.warning("HypothesisGenerator: LLM не вернул гипотез или все строки были отфильтрованы; используется стандартная гипотеза.")
+            hypotheses, scores = [_empty_fallback_hypothesis(lang_detected, context_summary)], [None]
+
+    result = {
+        "hypotheses": hypotheses,
+        "scores": scores,
+        "stopped_early": stop_event.is_set(),
+        "generations": generations,
+        "time_to_first_ms": timing["first"],
+        "time_to_best_ms": timing["best"],
+        "total_ms": round((time.perf_counter() - start_time) * 1000, 2),
+    }
+    logger.info(f"HypothesisGenerator: Потоково получено {len(hypotheses)} гипотез; лучшая через {result['time_to_best_ms']} мс, "
+                f"всего {result['total_ms']} мс (ранняя остановка: {result['stopped_early']}).")
+    return result
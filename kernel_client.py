@@ -0,0 +1,123 @@
+# kernel_client.py
+# Клиенты ядра SRIS для интерфейсов (GUI, скрипты): в том же процессе или через HTTP API sris_server.
+import json
+import logging
+from abc import ABC, abstractmethod
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class KernelClient(ABC):
+    """
+    Общий интерфейс клиента ядра.
+
+    start() прогревает ядро и возвращает его состояние; ask() выполняет один
+    цикл рассуждений и возвращает словарь с ключами status, reply_text,
+    reasoning_id, tick и (при ошибке) error_message.
+    """
+    @abstractmethod
+    def start(self) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def ask(self, text: str) -> Dict[str, Any]:
+        ...
+
+
+class InProcessKernelClient(KernelClient):
+    """Вызывает sris_kernel напрямую. Ядро импортируется при первом обращении."""
+    def __init__(self):
+        self._kernel = None
+
+    def _get_kernel(self):
+        if self._kernel is None:
+            import sris_kernel
+            self._kernel = sris_kernel
+        return self._kernel
+
+    def start(self) -> Dict[str, Any]:
+        kernel = self._get_kernel()
+        kernel.initialize_sris_components()
+        return {
+            "semantic_index_ready": bool(kernel.initial_semantic_index),
+            "temporality_active": kernel.temporality_modules_loaded,
+            "tick": kernel.sris_timesense.get_current_tick(),
+        }
+
+    def ask(self, text: str) -> Dict[str, Any]:
+        kernel = self._get_kernel()
+        result = kernel.run_sris_cycle({"text": text, "audio": None, "vision": None})
+        if result and result.get("status") == "ok":
+            return {
+                "status": "ok",
+                "reply_text": kernel.generate_sris_response(result["full_reasoning_chain"]),
+                "reasoning_id": result.get("reasoning_id"),
+                "tick": kernel.sris_timesense.get_current_tick(),
+            }
+        if result:
+            return {
+                "status": result.get("status", "error"),
+                "reply_text": None,
+                "reasoning_id": result.get("reasoning_id"),
+                "tick": kernel.sris_timesense.get_current_tick(),
+                "error_message": result.get("full_reasoning_chain", {}).get("error_message", "неизвестная ошибка"),
+            }
+        return {"status": "error", "reply_text": None, "reasoning_id": None, "tick": None,
+                "error_message": "run_sris_cycle вернул None"}
+
+
+class HttpKernelClient(KernelClient):
+    """Обращается к запущенному sris_server (POST /process_query/, GET /health/ready)."""
+    def __init__(self, base_url: str = "http://localhost:8000", user_id: str = "gui_user", timeout: float = 300.0):
+        self.base_url = base_url.rstrip("/")
+        self.user_id = user_id
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> tuple:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={"Content-Type": "application/json"} if data is not None else {}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            # Ошибки API (503/500) тоже приходят с JSON-телом.
+            try:
+                body = json.loads(e.read().decode("utf-8"))
+            except ValueError:
+                body = {"detail": str(e)}
+            return e.code, body
+
+    def start(self) -> Dict[str, Any]:
+        try:
+            status_code, body = self._request("GET", "/health/ready")
+        except (urllib.error.URLError, OSError) as e:
+            logger.error(f"HttpKernelClient: сервер SRIS недоступен по адресу {self.base_url}: {e}")
+            return {"semantic_index_ready": False, "temporality_active": False, "tick": None, "error_message": str(e)}
+        components = body.get("components", {})
+        return {
+            "semantic_index_ready": components.get("semantic_index", {}).get("state") == "ready",
+            "temporality_active": True,
+            "tick": None,
+            "server_ready": status_code == 200,
+        }
+
+    def ask(self, text: str) -> Dict[str, Any]:
+        try:
+            status_code, body = self._request("POST", "/process_query/", {"user_id": self.user_id, "query_text": text})
+        except (urllib.error.URLError, OSError) as e:
+            return {"status": "error", "reply_text": None, "reasoning_id": None, "tick": None, "error_message": str(e)}
+        if status_code == 200:
+            return {
+                "status": "ok",
+                "reply_text": body.get("sris_response_text"),
+                "reasoning_id": body.get("reasoning_id"),
+                "tick": body.get("current_sris_tick"),
+            }
+        return {"status": "error", "reply_text": None, "reasoning_id": None, "tick": None,
+                "error_message": body.get("detail", f"HTTP {status_code}")}
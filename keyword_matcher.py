@@ -0,0 +1,141 @@
+# keyword_matcher.py
+# Общий многошаблонный матчер ключевых слов (автомат Ахо–Корасик) для валидаторов SRIS:
+# ZAV2, фрактальной онтологии, safety_filter и adaptive_logic.
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HIT_CACHE_SIZE = 1024
+
+
+class KeywordMatcher:
+    """
+    Находит все вхождения зарегистрированных ключевых слов (как подстрок)
+    за один линейный проход по тексту в нижнем регистре.
+
+    Ключевое слово может принадлежать нескольким категориям (например,
+    "destroy" — и ZAV2, и онтология, и safety). Таблицы регистрируются
+    модулями при импорте; автомат перестраивается лениво при первом
+    поиске после изменения набора слов. Множества категорий не изменяются
+    на месте, а заменяются новыми, поэтому поиск идет без блокировки
+    параллельно с добавлением и удалением категорий.
+    """
+    def __init__(self):
+        self._categories_by_keyword: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        self._scan = lru_cache(maxsize=_HIT_CACHE_SIZE)(self._scan_uncached)
+
+    def add_keywords(self, category: str, keywords: Iterable[str]) -> None:
+        with self._lock:
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                self._categories_by_keyword[keyword] = self._categories_by_keyword.get(keyword, frozenset()) | {category}
+            self._dirty = True
+
+    def remove_category(self, category: str) -> None:
+        self._remove_categories(lambda name: name == category)
+
+    def remove_categories_with_prefix(self, prefix: str) -> None:
+        """Удаляет все категории, имена которых начинаются с prefix, за один проход по словам."""
+        self._remove_categories(lambda name: name.startswith(prefix))
+
+    def _remove_categories(self, should_remove) -> None:
+        with self._lock:
+            remaining: Dict[str, FrozenSet[str]] = {}
+            for keyword, categories in self._categories_by_keyword.items():
+                kept = frozenset(name for name in categories if not should_remove(name))
+                if kept:
+                    remaining[keyword] = kept
+            self._categories_by_keyword = remaining
+            self._dirty = True
+
+    def _compile(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        output: List[Tuple[str, ...]] = [()]
+        for keyword in self._categories_by_keyword:
+            node = 0
+            for ch in keyword:
+                next_node = goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][ch] = next_node
+                    goto.append({})
+                    output.append(())
+                node = next_node
+            output[node] = (keyword,)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                # Выходы по суффиксной ссылке сливаются заранее, поэтому при поиске
+                # достаточно посмотреть на текущий узел.
+                output[child] = output[child] + output[fail[child]]
+
+        self._goto, self._fail, self._output = goto, fail, output
+        self._scan.cache_clear()
+        self._dirty = False
+        logger.info(f"KeywordMatcher: автомат построен ({len(self._categories_by_keyword)} ключевых слов, {len(goto)} состояний).")
+
+    def _ensure_compiled(self) -> None:
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._compile()
+
+    def _scan_uncached(self, text_lower: str) -> FrozenSet[str]:
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[str] = set()
+        visited: Set[int] = set()
+        node = 0
+        for ch in text_lower:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node] and node not in visited:
+                visited.add(node)
+                found.update(output[node])
+        return frozenset(found)
+
+    def find_keywords(self, text: str) -> FrozenSet[str]:
+        """Все зарегистрированные ключевые слова, встречающиеся в тексте."""
+        self._ensure_compiled()
+        return self._scan(text.lower())
+
+    def match(self, text: str) -> Dict[str, Set[str]]:
+        """Попадания, сгруппированные по категориям: {категория: {ключевые слова}}."""
+        hits: Dict[str, Set[str]] = {}
+        for keyword in self.find_keywords(text):
+            for category in self._categories_by_keyword.get(keyword, ()):
+                hits.setdefault(category, set()).add(keyword)
+        return hits
+
+    def keywords_in_category(self, text: str, category: str) -> Set[str]:
+        return {keyword for keyword in self.find_keywords(text) if category in self._categories_by_keyword.get(keyword, ())}
+
+    def has_category(self, text: str, category: str) -> bool:
+        return any(category in self._categories_by_keyword.get(keyword, ()) for keyword in self.find_keywords(text))
+
+
+# Общий экземпляр: таблицы всех валидаторов, один проход по гипотезе на все проверки.
+shared_matcher = KeywordMatcher()
+
+
+def register_keywords(category: str, keywords: Iterable[str]) -> None:
+    shared_matcher.add_keywords(category, keywords)
@@ -0,0 +1,189 @@
+# lazy_components.py
+# Реестр "тяжелых" компонентов SRIS (LLM, модель эмбеддингов, семантический индекс),
+# которые создаются при первом использовании или при явном прогреве, а не при импорте.
+# Неудачная загрузка повторяется не сразу, а после паузы, растущей с каждой неудачей:
+# LLM-воркер или писатель индекса, запущенный позже сервера, подхватывается без перезапуска.
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+# Пауза перед повтором неудачной загрузки: RETRY_BASE_SECONDS, удваивается до RETRY_MAX_SECONDS.
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+
+class LazyComponent:
+    """
+    Компонент, создаваемый фабрикой один раз и потокобезопасно.
+    optional — без компонента SRIS работает в упрощенном режиме, и готовность сервера его не ждет.
+    """
+    def __init__(self, name: str, factory: Callable[[], Any], description: str = "", optional: bool = False,
+                 retry_base_seconds: float = RETRY_BASE_SECONDS, retry_max_seconds: float = RETRY_MAX_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.factory = factory
+        self.description = description
+        self.optional = optional
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.state = STATE_PENDING
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self.failures = 0
+        self._retry_at: Optional[float] = None
+        self._clock = clock
+        self._instance: Any = None
+        self._lock = threading.Lock()
+
+    def retry_due(self) -> bool:
+        """Неудачная загрузка, пауза после которой истекла."""
+        return self.state == STATE_FAILED and self._retry_at is not None and self._clock() >= self._retry_at
+
+    def get(self) -> Any:
+        if self.state == STATE_READY:
+            return self._instance
+        with self._lock:
+            if self.state == STATE_READY or (self.state == STATE_FAILED and not self.retry_due()):
+                return self._instance
+            self.state = STATE_LOADING
+            start_time = time.perf_counter()
+            logger.info(f"LazyComponents: Инициализация компонента '{self.name}'...")
+            try:
+                self._instance = self.factory()
+                self.state = STATE_READY
+                self.error = None
+                self.failures = 0
+                self._retry_at = None
+            except Exception as e:
+                # Ошибка фиксируется, чтобы каждый запрос не повторял дорогую неудачную загрузку;
+                # повтор — после паузы.
+                self.state = STATE_FAILED
+                self.error = str(e)
+                self._instance = None
+                self.failures += 1
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (self.failures - 1))
+                self._retry_at = self._clock() + delay
+                logger.error(f"LazyComponents: Компонент '{self.name}' не инициализирован (повтор через {delay:.0f} с): {e}", exc_info=True)
+            self.load_ms = round((time.perf_counter() - start_time) * 1000, 2)
+            logger.info(f"LazyComponents: Компонент '{self.name}' -> {self.state} за {self.load_ms} мс.")
+            return self._instance
+
+    def reset(self) -> None:
+        with self._lock:
+            self._instance = None
+            self.state = STATE_PENDING
+            self.error = None
+            self.load_ms = None
+            self.failures = 0
+            self._retry_at = None
+
+    def status(self) -> Dict[str, Any]:
+        retry_in = round(max(0.0, self._retry_at - self._clock()), 1) if self.state == STATE_FAILED and self._retry_at is not None else None
+        return {"state": self.state, "load_ms": self.load_ms, "error": self.error, "description": self.description,
+                "optional": self.optional, "failures": self.failures, "retry_in_s": retry_in}
+
+
+_REGISTRY: Dict[str, LazyComponent] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def register_component(name: str, factory: Callable[[], Any], description: str = "", optional: bool = False) -> LazyComponent:
+    """Регистрирует фабрику компонента. Повторная регистрация того же имени возвращает существующий компонент."""
+    with _REGISTRY_LOCK:
+        component = _REGISTRY.get(name)
+        if component is None:
+            component = LazyComponent(name, factory, description, optional=optional)
+            _REGISTRY[name] = component
+        return component
+
+
+def get_component(name: str) -> Any:
+    component = _REGISTRY.get(name)
+    if component is None:
+        raise KeyError(f"Компонент '{name}' не зарегистрирован.")
+    return component.get()
+
+
+def is_component_ready(name: str) -> bool:
+    component = _REGISTRY.get(name)
+    return component is not None and component.state == STATE_READY
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Явно создает компоненты (все зарегистрированные, если names не задан)."""
+    selected = list(names) if names is not None else list(_REGISTRY)
+    for name in selected:
+        get_component(name)
+    return {name: _REGISTRY[name].status() for name in selected}
+
+
+def retry_failed_components() -> List[str]:
+    """
+    Повторяет загрузку компонентов, пауза после неудачи которых истекла; возвращает их имена.
+    Вызывается фоновой задачей сервера: без входящих запросов, которые обращаются к компонентам,
+    готовность иначе не восстановится.
+    """
+    due = [component for component in list(_REGISTRY.values()) if component.retry_due()]
+    for component in due:
+        component.get()
+    return [component.name for component in due]
+
+
+def readiness_report() -> Dict[str, Any]:
+    """Готовность: загружены все обязательные компоненты (optional не учитываются). Ничего не загружает."""
+    components = {name: component.status() for name, component in list(_REGISTRY.items())}
+    return {
+        "ready": all(status["state"] == STATE_READY for status in components.values() if not status["optional"]),
+        "components": components,
+    }
+
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_module_import(module_name: str, top_n: int = 15) -> Dict[str, Any]:
+    """
+    Замеряет время импорта модуля в чистом интерпретаторе (python -X importtime).
+
+    Возвращает общее время и самые дорогие вложенные импорты.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True, text=True
+    )
+    entries: List[Dict[str, Any]] = []
+    total_ms = None
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+        if name == module_name:
+            total_ms = int(cumulative_us) / 1000
+    entries.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return {
+        "module": module_name,
+        "ok": completed.returncode == 0,
+        "total_ms": total_ms,
+        "slowest_imports": [entry for entry in entries if entry["module"] != module_name][:top_n],
+    }
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:] or ["sris_kernel"]:
+        report = profile_module_import(target)
+        print(f"{report['module']}: {report['total_ms']} мс (ok={report['ok']})")
+        for entry in report["slowest_imports"]:
+            print(f"  {entry['cumulative_ms']:>9.2f} мс  {'  ' * entry['depth']}{entry['module']}")
@@ -0,0 +1,210 @@
+# llm_client.py
+# Тонкий клиент LLM-воркера (llm_worker.py): пул соединений по Unix-сокету и таймауты.
+# Функции query_mistral / query_mistral_with_usage / stream_mistral повторяют сигнатуры mistral_core,
+# поэтому utils переключается на воркер заданием SRIS_LLM_WORKER_SOCKET без правок вызывающих модулей.
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from deadline import current_deadline
+from llm_worker import DEFAULT_SOCKET_PATH, WORKER_SOCKET_ENV
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT_SECONDS = 300.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5.0
+
+
+class LLMWorkerError(RuntimeError):
+    pass
+
+
+class _Connection:
+    def __init__(self, socket_path: str, connect_timeout: float, timeout: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(connect_timeout)
+        try:
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.settimeout(timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.file.flush()
+
+    def receive(self) -> Dict[str, Any]:
+        line = self.file.readline()
+        if not line:
+            raise ConnectionResetError("LLM-воркер закрыл соединение")
+        return json.loads(line)
+
+    def close(self) -> None:
+        try:
+            self.file.close()
+        finally:
+            self.sock.close()
+
+
+class LLMWorkerClient:
+    """
+    Клиент воркера с пулом соединений: не больше pool_size одновременных запросов
+    от процесса, свободные соединения переиспользуются. Запрос, упавший на
+    устаревшем соединении из пула (воркер перезапущен), один раз повторяется на новом.
+    Таймаут запроса — timeout или остаток дедлайна запроса (deadline.current_deadline), если он меньше.
+    """
+    def __init__(self, socket_path: Optional[str] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS):
+        self.socket_path = socket_path or os.environ.get(WORKER_SOCKET_ENV) or DEFAULT_SOCKET_PATH
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _request_timeout(self) -> float:
+        deadline = current_deadline()
+        if deadline is None:
+            return self.timeout
+        if deadline.expired():
+            raise LLMWorkerError("дедлайн запроса истек")
+        return min(self.timeout, deadline.remaining())
+
+    @contextmanager
+    def _connection(self, timeout: float, fresh: bool = False) -> Iterator[_Connection]:
+        if not self._slots.acquire(timeout=timeout):
+            raise LLMWorkerError(f"Нет свободного соединения с LLM-воркером за {timeout:.2f} с")
+        connection = None
+        try:
+            with self._lock:
+                if self._idle and not fresh:
+                    connection = self._idle.pop()
+            if connection is None:
+                try:
+                    connection = _Connection(self.socket_path, min(self.connect_timeout, timeout), timeout)
+                except OSError as e:
+                    raise LLMWorkerError(f"LLM-воркер недоступен ({self.socket_path}): {e}") from e
+            connection.sock.settimeout(timeout)
+            yield connection
+        except BaseException:
+            # Соединение в неизвестном состоянии (ошибка, таймаут, прерванный поток) в пул не возвращается.
+            if connection is not None:
+                connection.close()
+                connection = None
+            raise
+        finally:
+            if connection is not None:
+                with self._lock:
+                    self._idle.append(connection)
+            self._slots.release()
+
+    def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        timeout = self._request_timeout()
+        if message["op"] != "ping":
+            message["timeout"] = timeout  # воркер выполняет запрос под тем же дедлайном
+        for attempt in range(2):
+            try:
+                with self._connection(timeout, fresh=attempt > 0) as connection:
+                    message["id"] = next(self._ids)
+                    connection.send(message)
+                    response = connection.receive()
+                break
+            except (BrokenPipeError, ConnectionResetError) as e:
+                if attempt:
+                    raise LLMWorkerError(f"LLM-воркер разорвал соединение: {e}") from e
+            except socket.timeout as e:
+                raise LLMWorkerError(f"LLM-воркер не ответил за {timeout:.2f} с") from e
+            except (OSError, ValueError) as e:
+                raise LLMWorkerError(f"Ошибка обмена с LLM-воркером: {e}") from e
+        if not response.get("ok"):
+            raise LLMWorkerError(response.get("error", "unknown error"))
+        return response
+
+    def ping(self) -> Dict[str, Any]:
+        return self._request({"op": "ping"})
+
+    def query(self, prompt: str, mode: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        response = self._request({"op": "query", "prompt": prompt, "mode": mode, "max_tokens": max_tokens, "temperature": temperature})
+        return {"text": response.get("text", ""), "completion_tokens": response.get("completion_tokens"),
+                "finish_reason": response.get("finish_reason")}
+
+    def stream(self, prompt: str, mode: str, max_tokens: int, temperature: float,
+               usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Фрагменты ответа; закрытие генератора разрывает соединение, и воркер прекращает декодирование."""
+        try:
+            timeout = self._request_timeout()
+            with self._connection(timeout) as connection:
+                request_id = next(self._ids)
+                connection.send({"id": request_id, "op": "stream", "prompt": prompt, "mode": mode,
+                                 "max_tokens": max_tokens, "temperature": temperature, "timeout": timeout})
+                while True:
+                    message = connection.receive()
+                    if "chunk" in message:
+                        yield message["chunk"]
+                        continue
+                    if not message.get("ok"):
+                        raise LLMWorkerError(message.get("error", "unknown error"))
+                    if usage is not None:
+                        usage["completion_tokens"] = message.get("completion_tokens")
+                        usage["finish_reason"] = message.get("finish_reason")
+                    return
+        except (OSError, ValueError) as e:
+            raise LLMWorkerError(f"Поток LLM-воркера прерван: {e}") from e
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+_default_client: Optional[LLMWorkerClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_worker_client() -> LLMWorkerClient:
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = LLMWorkerClient()
+    return _default_client
+
+
+# --- Интерфейс mistral_core поверх воркера (ошибки — текстом, как в mistral_core) ---
+def query_mistral_with_usage(prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7) -> Dict[str, Any]:
+    try:
+        return get_worker_client().query(prompt, mode, max_new_tokens, temperature)
+    except LLMWorkerError as e:
+        logger.error(f"LLMClient: Запрос в режиме '{mode}' не выполнен: {e}")
+        return {"text": f"Ошибка: LLM-воркер: {e}", "completion_tokens": None, "finish_reason": None}
+
+
+def query_mistral(prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7) -> str:
+    return query_mistral_with_usage(prompt, mode, max_new_tokens, temperature)["text"]
+
+
+def stream_mistral(prompt: str, mode: str = "generate", max_new_tokens: int = 256, temperature: float = 0.7,
+                   usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    try:
+        yield from get_worker_client().stream(prompt, mode, max_new_tokens, temperature, usage=usage)
+    except LLMWorkerError as e:
+        logger.error(f"LLMClient: Потоковый запрос в режиме '{mode}' не выполнен: {e}")
+        yield f"Ошибка: LLM-воркер: {e}"
+
+
+def worker_readiness() -> Dict[str, Any]:
+    """Фабрика компонента "llm" в процессах-клиентах: воркер должен отвечать на ping."""
+    try:
+        return get_worker_client().ping()
+    except LLMWorkerError as e:
+        raise RuntimeError(str(e)) from e
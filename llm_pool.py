@@ -0,0 +1,175 @@
+# llm_pool.py
+# Пул контекстов llama.cpp над одной GGUF-моделью. Веса открываются через mmap (только чтение),
+# поэтому все контексты делят одни и те же страницы страничного кэша ОС; у каждого контекста
+# свой KV-кэш и свои потоки llama.cpp (n_threads по размеру группы ядер). Размер пула подбирается по доступной памяти, бюджету памяти
+# модели (memory_budget_mb из model_routes.json / ModelSpec) и числу ядер.
+#
+# Ограничение GPU: слои, выгруженные на GPU (n_gpu_layers != 0), каждый контекст копирует в VRAM.
+# Поэтому на GPU контекстов столько, сколько копий (memory_mb) плюс KV-кэшей помещается в
+# memory_budget_mb; без бюджета — один контекст.
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from model_router import ModelPool, ModelSpec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS_PER_CONTEXT = 4
+DEFAULT_MEMORY_FRACTION = 0.8     # доля MemAvailable, которую пул может занять KV-кэшами
+COMPUTE_BUFFER_MB = 256           # оценка рабочих буферов одного контекста сверх KV-кэша
+KV_BYTES_PER_VALUE = 2            # KV-кэш в f16
+
+
+def available_memory_mb() -> Optional[int]:
+    """MemAvailable из /proc/meminfo (Linux); None, если определить нельзя."""
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def usable_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def kv_cache_mb(metadata: Dict[str, Any], n_ctx: int) -> Optional[float]:
+    """Размер KV-кэша одного контекста по метаданным GGUF (число слоев, размерности, GQA)."""
+    arch = metadata.get("general.architecture", "llama")
+    try:
+        n_layer = int(metadata[f"{arch}.block_count"])
+        n_embd = int(metadata[f"{arch}.embedding_length"])
+        n_head = int(metadata[f"{arch}.attention.head_count"])
+        n_head_kv = int(metadata.get(f"{arch}.attention.head_count_kv", n_head))
+    except (KeyError, ValueError, TypeError):
+        return None
+    n_embd_kv = n_embd * n_head_kv // n_head
+    return 2 * n_layer * n_ctx * n_embd_kv * KV_BYTES_PER_VALUE / 2 ** 20
+
+
+def plan_context_count(max_contexts: int, per_context_mb: Optional[float], threads_per_context: int,
+                       cpu_count: int, available_mb: Optional[int], memory_fraction: float = DEFAULT_MEMORY_FRACTION,
+                       memory_budget_mb: int = 0) -> int:
+    """
+    Сколько контекстов держать: не больше max_contexts, не больше групп ядер по
+    threads_per_context (дальше контексты только делят ядра) и не больше, чем контекстов
+    по per_context_mb помещается в memory_fraction доступной памяти и в memory_budget_mb
+    (0 — бюджет не задан). Минимум один.
+    """
+    count = min(max_contexts, max(1, cpu_count // max(1, threads_per_context)))
+    if per_context_mb and available_mb is not None:
+        count = min(count, int(available_mb * memory_fraction // per_context_mb))
+    if per_context_mb and memory_budget_mb:
+        count = min(count, int(memory_budget_mb // per_context_mb))
+    return max(1, count)
+
+
+class PooledContext:
+    """Контекст пула: вызывается как Llama; cpus — группа ядер, по которой задано число его потоков."""
+    def __init__(self, llama: Any, slot: int, cpus: List[int]):
+        self.llama = llama
+        self.slot = slot
+        self.cpus = cpus
+
+    def __call__(self, *args, **kwargs):
+        return self.llama(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llama, name)
+
+
+class LlamaContextPool(ModelPool):
+    """
+    Пул контекстов одной модели с API checkout/checkin.
+
+    Первый контекст создается при первом запросе; по его метаданным оценивается
+    KV-кэш и планируется размер пула. Каждому контексту сопоставлена группа из
+    threads_per_context ядер: по ней задается число его потоков (n_threads), чтобы
+    контексты пула вместе не занимали больше потоков, чем есть ядер. К ядрам потоки
+    не привязываются: потоки декодирования создает ggml, и их размещает планировщик ОС.
+    Размер пула не превышает spec.capacity (max_instances и memory_budget_mb // memory_mb).
+    Слои, выгруженные на GPU, копируются в VRAM каждым контекстом, поэтому при
+    n_gpu_layers != 0 размер задает только memory_budget_mb, а без него пул из одного контекста.
+    """
+    def __init__(self, spec: ModelSpec, loader=None, threads_per_context: int = DEFAULT_THREADS_PER_CONTEXT,
+                 memory_fraction: float = DEFAULT_MEMORY_FRACTION):
+        super().__init__(spec, loader or self._create_context)
+        cpus = usable_cpus()
+        self.threads_per_context = max(1, min(threads_per_context, len(cpus)))
+        self.memory_fraction = memory_fraction
+        self._cpu_sets = [cpus[i:i + self.threads_per_context] for i in range(0, len(cpus), self.threads_per_context)]
+        if len(self._cpu_sets) > 1 and len(self._cpu_sets[-1]) < self.threads_per_context:
+            self._cpu_sets.pop()
+        self._next_slot = 0
+        self._planned: Optional[int] = None
+        self.per_context_mb: Optional[float] = None
+
+    @property
+    def capacity(self) -> int:
+        # До первой загрузки размер KV-кэша неизвестен: остальные запросы ждут первый контекст.
+        return self._planned if self._planned is not None else 1
+
+    def _create_context(self, spec: ModelSpec) -> PooledContext:
+        from llama_cpp import Llama
+        if not os.path.exists(spec.path):
+            raise FileNotFoundError(f"Модель GGUF не найдена по пути: {spec.path}")
+        with self._cond:
+            slot = self._next_slot
+            self._next_slot += 1
+        cpus = self._cpu_sets[slot % len(self._cpu_sets)]
+        llama = Llama(model_path=spec.path, n_ctx=spec.n_ctx, n_gpu_layers=spec.n_gpu_layers,
+                      n_threads=len(cpus), n_threads_batch=len(cpus), use_mmap=True, verbose=False)
+        if self._planned is None:
+            self._plan(getattr(llama, "metadata", {}) or {})
+        logger.info(f"LlamaContextPool: Контекст #{slot} модели '{spec.name}' создан (ядра {cpus}).")
+        return PooledContext(llama, slot, cpus)
+
+    def _plan(self, metadata: Dict[str, Any]) -> None:
+        kv_mb = kv_cache_mb(metadata, self.spec.n_ctx)
+        self.per_context_mb = round(kv_mb + COMPUTE_BUFFER_MB, 1) if kv_mb is not None else None
+        if self.spec.n_gpu_layers and not self.spec.memory_budget_mb:
+            planned = 1
+        elif self.spec.n_gpu_layers:
+            # VRAM: копия выгруженных слоев и KV-кэш на каждый контекст; MemAvailable здесь ни при чем.
+            per_context_mb = (self.per_context_mb or 0.0) + self.spec.memory_mb
+            planned = plan_context_count(self.spec.capacity, per_context_mb or None, self.threads_per_context,
+                                         len(usable_cpus()), None, self.memory_fraction, self.spec.memory_budget_mb)
+        else:
+            planned = plan_context_count(self.spec.capacity, self.per_context_mb, self.threads_per_context,
+                                         len(usable_cpus()), available_memory_mb(), self.memory_fraction,
+                                         self.spec.memory_budget_mb)
+        with self._cond:
+            self._planned = planned
+            self._cond.notify_all()
+        logger.info(f"LlamaContextPool: Модель '{self.spec.name}': {planned} контекст(ов), ~{self.per_context_mb} МБ на контекст.")
+
+    # --- checkout / checkin ---
+    def checkout(self, timeout: Optional[float] = None) -> Any:
+        return self.acquire(timeout)
+
+    def checkin(self, instance: Any) -> None:
+        self.release(instance)
+
+    @contextmanager
+    def context(self) -> Iterator[Any]:
+        instance = self.checkout()
+        try:
+            yield instance
+        finally:
+            self.checkin(instance)
+
+    def status(self) -> Dict[str, Any]:
+        report = super().status()
+        report.update({
+            "planned_contexts": self._planned,
+            "threads_per_context": self.threads_per_context,
+            "per_context_mb": self.per_context_mb,
+        })
+        return report
@@ -0,0 +1,199 @@
+# llm_worker.py
+# Отдельный процесс, владеющий LLM: одна загруженная модель обслуживает любое число процессов SRIS
+# (воркеры uvicorn, GUI, импортер знаний, тесты) через локальный Unix-сокет.
+#
+# Протокол — JSON-строки (одно сообщение на строку); соединение обслуживает запросы по очереди
+# и может переиспользоваться клиентом:
+#   -> {"id": 1, "op": "query", "prompt": "...", "mode": "respond", "max_tokens": 200, "temperature": 0.7, "timeout": 12.5}
+#   <- {"id": 1, "ok": true, "text": "...", "completion_tokens": 42, "finish_reason": "stop"}
+#   -> {"id": 2, "op": "stream", ...те же поля...}
+#   <- {"id": 2, "chunk": "..."} ... {"id": 2, "ok": true, "done": true, "completion_tokens": 42, "finish_reason": "stop"}
+#   -> {"id": 3, "op": "ping"}
+#   <- {"id": 3, "ok": true, "backend": "mistral_core", "protocol": 1}
+# Ошибка: {"id": ..., "ok": false, "error": "..."}. Закрытие соединения посреди потока
+# останавливает декодирование. Необязательный "timeout" — остаток дедлайна запроса клиента (секунды):
+# запрос выполняется под этим дедлайном (ожидание модели в пуле, потолок max_tokens).
+#
+#   python llm_worker.py --socket /tmp/sris_llm_worker.sock          # модель из mistral_core
+#   python llm_worker.py --socket /tmp/sris_llm_worker.sock --stub   # заготовленные ответы, без весов
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from deadline import Deadline, deadline_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "/tmp/sris_llm_worker.sock"
+WORKER_SOCKET_ENV = "SRIS_LLM_WORKER_SOCKET"
+PROTOCOL_VERSION = 1
+
+
+class MistralBackend:
+    """Модель из mistral_core (импортируется только в процессе воркера)."""
+    name = "mistral_core"
+
+    def __init__(self):
+        import mistral_core
+        self._core = mistral_core
+
+    def warm(self) -> None:
+        from lazy_components import get_component
+        get_component("llm")
+
+    def query(self, prompt: str, mode: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        return self._core.query_mistral_with_usage(prompt, mode, max_tokens, temperature)
+
+    def stream(self, prompt: str, mode: str, max_tokens: int, temperature: float, usage: Dict[str, Any]) -> Iterator[str]:
+        return self._core.stream_mistral(prompt, mode, max_tokens, temperature, usage=usage)
+
+
+STUB_PERCEPTION = {
+    "query_type": "information_request: explanation",
+    "core_task": {"subject": "Пользователь", "action": "Объяснить", "object": "запрос"},
+    "summary": "Пользователь просит объяснение.",
+    "key_terms_and_entities": ["запрос"],
+    "knowledge_domain": "Общее",
+    "complexity": "Низкая",
+    "urgency": "Низкая",
+    "sentiment": "Нейтральный",
+    "threat_level": 0.0,
+    "user_profile": {"primary_intent": "Learn", "inferred_persona": "Новичок", "formality": "Неформальный/Разговорный"},
+    "response_specification": {"expected_structure": "Prose", "required_depth": "Surface Level", "constraints": "N/A"},
+}
+STUB_HYPOTHESES = [
+    "Ответ: кратко объяснить суть запроса.",
+    "Проверить внутреннюю базу знаний по теме запроса.",
+    "Уточнить у пользователя, какой уровень детализации нужен.",
+]
+
+
+class StubBackend:
+    """Заготовленные ответы по режиму: конвейер SRIS проходит целиком без весов модели."""
+    name = "stub"
+
+    def warm(self) -> None:
+        pass
+
+    def _text(self, mode: str) -> str:
+        if mode.startswith("analyze"):
+            return json.dumps(STUB_PERCEPTION, ensure_ascii=False)
+        if mode.startswith("hyp_gen_for_"):
+            return "\n".join(f"{i}. {h}" for i, h in enumerate(STUB_HYPOTHESES, 1))
+        if mode == "respond":
+            return "Это тестовый ответ SRIS."
+        return f"Тестовый ответ для режима '{mode}'."
+
+    def query(self, prompt: str, mode: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        words = self._text(mode).split(" ")
+        return {"text": " ".join(words[:max_tokens]), "completion_tokens": min(len(words), max_tokens),
+                "finish_reason": "length" if len(words) > max_tokens else "stop"}
+
+    def stream(self, prompt: str, mode: str, max_tokens: int, temperature: float, usage: Dict[str, Any]) -> Iterator[str]:
+        result = self.query(prompt, mode, max_tokens, temperature)
+        words = result["text"].split(" ")
+        for index, word in enumerate(words):
+            yield word if index == 0 else " " + word
+        usage["completion_tokens"] = result["completion_tokens"]
+        usage["finish_reason"] = result["finish_reason"]
+
+
+class _WorkerRequestHandler(socketserver.StreamRequestHandler):
+    def _send(self, message: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        backend = self.server.backend
+        for raw_line in self.rfile:
+            try:
+                request = json.loads(raw_line)
+            except ValueError:
+                self._send({"id": None, "ok": False, "error": "bad_request"})
+                continue
+            request_id = request.get("id")
+            op = request.get("op")
+            try:
+                if op == "ping":
+                    self._send({"id": request_id, "ok": True, "backend": backend.name, "protocol": PROTOCOL_VERSION})
+                elif op in ("query", "stream"):
+                    args = (request.get("prompt", ""), request.get("mode", "default"),
+                            int(request.get("max_tokens", 256)), float(request.get("temperature", 0.7)))
+                    timeout = request.get("timeout")
+                    with deadline_scope(Deadline(float(timeout)) if timeout else None):
+                        if op == "query":
+                            self._send({"id": request_id, "ok": True, **backend.query(*args)})
+                        else:
+                            usage: Dict[str, Any] = {}
+                            stream = backend.stream(*args, usage)
+                            try:
+                                for chunk in stream:
+                                    self._send({"id": request_id, "chunk": chunk})
+                            finally:
+                                stream.close()  # клиент ушел — декодирование останавливается
+                            self._send({"id": request_id, "ok": True, "done": True,
+                                        "completion_tokens": usage.get("completion_tokens"), "finish_reason": usage.get("finish_reason")})
+                else:
+                    self._send({"id": request_id, "ok": False, "error": f"unknown op '{op}'"})
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info("LLMWorker: Клиент закрыл соединение.")
+                return
+            except Exception as e:
+                logger.error(f"LLMWorker: Ошибка обработки запроса {request_id} ({op}): {e}", exc_info=True)
+                try:
+                    self._send({"id": request_id, "ok": False, "error": str(e)})
+                except OSError:
+                    return
+
+
+class LLMWorkerServer(socketserver.ThreadingUnixStreamServer):
+    """Сервер воркера: по потоку на соединение; доступ к модели сериализует пул mistral_core."""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, backend: Any):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # сокет, оставшийся от прошлого запуска
+        self.socket_path = socket_path
+        self.backend = backend
+        super().__init__(socket_path, _WorkerRequestHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def start_worker_thread(socket_path: str, backend: Optional[Any] = None) -> LLMWorkerServer:
+    """Запускает воркер в фоновом потоке текущего процесса (тесты, бенчмарки)."""
+    server = LLMWorkerServer(socket_path, backend or StubBackend())
+    threading.Thread(target=server.serve_forever, name="llm-worker", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    from utils import setup_logging
+    setup_logging()
+    parser = argparse.ArgumentParser(description="SRIS LLM worker (Unix socket, JSON lines)")
+    parser.add_argument("--socket", default=os.environ.get(WORKER_SOCKET_ENV) or DEFAULT_SOCKET_PATH)
+    parser.add_argument("--stub", action="store_true", help="заготовленные ответы без загрузки модели")
+    args = parser.parse_args()
+
+    backend = StubBackend() if args.stub else MistralBackend()
+    logger.info(f"LLMWorker: Прогрев модели ({backend.name})...")
+    backend.warm()
+    server = LLMWorkerServer(args.socket, backend)
+    logger.info(f"LLMWorker: Ожидание запросов на {args.socket} (backend={backend.name}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# load_policy.py
+# Лестница деградации под нагрузкой на LLM. Уровень выбирается диспетчером ядра в начале
+# каждого цикла по живым метрикам (число LLM-вызовов в работе, включая ожидающие свободный
+# контекст, и p90 задержки недавних вызовов):
+#   0 full                — полный цикл (восприятие, генерация гипотез, ответ — три вызова LLM);
+#   1 template_hypotheses — гипотезы по шаблонам adaptive_logic и памяти, без LLM;
+#   2 template_response   — вдобавок ответ по шаблону намерения (communication_intent), без LLM;
+#   3 cache_only          — только готовые ответы из кэша (response_cache), остальное отклоняется.
+# Повышение уровня происходит сразу, понижение — по одной ступени и только после того,
+# как метрики RECOVERY_SECONDS держатся ниже порога (без «дребезга» между уровнями).
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Sequence, Tuple, TypeVar
+
+from token_budget import percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LEVEL_FULL = 0
+LEVEL_TEMPLATE_HYPOTHESES = 1
+LEVEL_TEMPLATE_RESPONSE = 2
+LEVEL_CACHE_ONLY = 3
+LEVEL_NAMES = ("full", "template_hypotheses", "template_response", "cache_only")
+
+# Пороги перехода на уровни 1, 2, 3 (по числу контекстов llama.cpp, см. mistral_core.LLAMA_CPP_MAX_CONTEXTS).
+DEFAULT_IN_FLIGHT_THRESHOLDS = (6, 12, 24)
+DEFAULT_LATENCY_THRESHOLDS_MS = (8000.0, 15000.0, 30000.0)
+LATENCY_PERCENTILE = 90
+LATENCY_WINDOW_SECONDS = 30.0
+LATENCY_WINDOW_SIZE = 200
+MIN_LATENCY_SAMPLES = 5
+RECOVERY_SECONDS = 10.0
+
+
+class LLMLoadMonitor:
+    """Живые метрики LLM: вызовы в работе и задержки завершенных вызовов за последние window_seconds."""
+    def __init__(self, window_seconds: float = LATENCY_WINDOW_SECONDS, window_size: int = LATENCY_WINDOW_SIZE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=window_size)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _record(self, finished_at: float, elapsed_seconds: float) -> None:
+        with self._lock:
+            self._latencies.append((finished_at, elapsed_seconds * 1000))
+            self.calls += 1
+
+    def _add_in_flight(self, delta: int) -> None:
+        with self._lock:
+            self._in_flight += delta
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Учитывает один вызов LLM (от постановки в очередь до получения ответа)."""
+        self._add_in_flight(1)
+        started_at = self._clock()
+        try:
+            yield
+        finally:
+            finished_at = self._clock()
+            self._add_in_flight(-1)
+            self._record(finished_at, finished_at - started_at)
+
+    def track_stream(self, chunks: Iterable[T]) -> Iterator[T]:
+        """
+        Учитывает один потоковый вызов LLM: в работе и в задержку попадает только ожидание
+        очередного фрагмента от модели, а не обработка фрагментов потребителем между ними.
+        """
+        iterator = iter(chunks)
+        model_seconds = 0.0
+        try:
+            while True:
+                self._add_in_flight(1)
+                started_at = self._clock()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    model_seconds += self._clock() - started_at
+                    self._add_in_flight(-1)
+                yield chunk
+        finally:
+            self._record(self._clock(), model_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            horizon = self._clock() - self.window_seconds
+            while self._latencies and self._latencies[0][0] < horizon:
+                self._latencies.popleft()
+            latencies = sorted(latency for _, latency in self._latencies)
+            in_flight = self._in_flight
+        latency_p90 = percentile(latencies, LATENCY_PERCENTILE) if len(latencies) >= MIN_LATENCY_SAMPLES else None
+        return {"in_flight": in_flight, "latency_p90_ms": round(latency_p90, 1) if latency_p90 is not None else None,
+                "latency_samples": len(latencies)}
+
+
+class LoadPolicy:
+    """Выбор уровня деградации по метрикам монитора; пороги — для уровней 1, 2, 3 по возрастанию."""
+    def __init__(self, monitor: LLMLoadMonitor, in_flight_thresholds: Sequence[int] = DEFAULT_IN_FLIGHT_THRESHOLDS,
+                 latency_thresholds_ms: Sequence[float] = DEFAULT_LATENCY_THRESHOLDS_MS,
+                 recovery_seconds: float = RECOVERY_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.monitor = monitor
+        self.in_flight_thresholds = tuple(in_flight_thresholds)
+        self.latency_thresholds_ms = tuple(latency_thresholds_ms)
+        self.recovery_seconds = recovery_seconds
+        self._clock = clock
+        self._level = LEVEL_FULL
+        self._below_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self.transitions = 0
+        self.cycles_by_level = [0] * len(LEVEL_NAMES)
+
+    def _target_level(self, metrics: Dict[str, Any]) -> int:
+        level = sum(1 for threshold in self.in_flight_thresholds if metrics["in_flight"] >= threshold)
+        if metrics["latency_p90_ms"] is not None:
+            level = max(level, sum(1 for threshold in self.latency_thresholds_ms if metrics["latency_p90_ms"] >= threshold))
+        return min(level, LEVEL_CACHE_ONLY)
+
+    def _set_level(self, level: int, metrics: Dict[str, Any]) -> None:
+        logger.warning(f"LoadPolicy: уровень деградации {LEVEL_NAMES[self._level]} -> {LEVEL_NAMES[level]} (метрики: {metrics}).")
+        self._level = level
+        self.transitions += 1
+
+    def current_level(self) -> int:
+        """Уровень для начинающегося цикла (учитывается в статистике по уровням)."""
+        metrics = self.monitor.snapshot()
+        target = self._target_level(metrics)
+        now = self._clock()
+        with self._lock:
+            if target > self._level:
+                self._set_level(target, metrics)
+                self._below_since = None
+            elif target < self._level:
+                if self._below_since is None:
+                    self._below_since = now
+                elif now - self._below_since >= self.recovery_seconds:
+                    self._set_level(self._level - 1, metrics)
+                    self._below_since = now
+            else:
+                self._below_since = None
+            self.cycles_by_level[self._level] += 1
+            return self._level
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            level = self._level
+            cycles = {name: count for name, count in zip(LEVEL_NAMES, self.cycles_by_level)}
+        return {
+            "level": LEVEL_NAMES[level],
+            "metrics": self.monitor.snapshot(),
+            "in_flight_thresholds": list(self.in_flight_thresholds),
+            "latency_thresholds_ms": list(self.latency_thresholds_ms),
+            "transitions": self.transitions,
+            "cycles_by_level": cycles,
+        }
+
+
+llm_load = LLMLoadMonitor()
+default_policy = LoadPolicy(llm_load)
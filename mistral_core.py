@@ -1,8 +1,16 @@
 # mistral_core.py
 # Универсальный интерфейс для вызова LLM: через transformers или llama-cpp-python (gguf)
 import os
+import contextvars
 import logging
+import queue
+import threading
 import time # Для измерения времени
+from typing import Any, Dict, Iterator, Optional
+
+from lazy_components import register_component, get_component
+from llm_pool import LlamaContextPool
+from model_router import PRIMARY_MODEL_NAME, ModelSpec, build_router, load_routes_config
 
 # --- Конфигурация ---
 
@@ -19,6 +27,14 @@ LLAMA_CPP_MODEL_PATH: str = "models/mistral-7b-instruct-v0.2.Q4_K_M.gguf"
 # чтобы модель поместилась в VRAM. Начни с -1, если будут ошибки памяти, уменьшай.
 LLAMA_CPP_N_GPU_LAYERS: int = 20 # <--- ИЗМЕНЕНИЕ ЗДЕСЬ: Установлено на 15 для GTX 1650
 LLAMA_CPP_N_CTX: int = 4096 # Размер контекстного окна, для Mistral 7B можно до 8192, но 4096 обычно достаточно и экономит память
+# Пул контекстов (llm_pool): веса отображаются в память один раз, у каждого контекста свой
+# KV-кэш и свои потоки llama.cpp (n_threads). Фактическое число контекстов ограничено еще доступной памятью, бюджетом
+# LLAMA_CPP_MEMORY_BUDGET_MB и числом ядер. При выгрузке слоев на GPU (n_gpu_layers != 0) каждый
+# контекст держит в VRAM свою копию выгруженных слоев (~LLAMA_CPP_OFFLOADED_MEMORY_MB): контекстов
+# столько, сколько помещается в LLAMA_CPP_MEMORY_BUDGET_MB, а при бюджете 0 — один.
+LLAMA_CPP_MAX_CONTEXTS: int = 4
+LLAMA_CPP_MEMORY_BUDGET_MB: int = 0
+LLAMA_CPP_OFFLOADED_MEMORY_MB: int = 0
 
 # --- Конфигурация для Hugging Face transformers ---
 HF_MODEL_NAME: str = "mistralai/Mistral-7B-Instruct-v0.2"
@@ -31,51 +47,71 @@ HF_MODEL_NAME: str = "mistralai/Mistral-7B-Instruct-v0.2"
 logger = logging.getLogger(__name__)
 
 # --- Инициализация модели ---
+# Модель загружается лениво: при первом запросе или при явном прогреве
+# (lazy_components.warm_up), а не при импорте модуля.
 llm_instance = None
 tokenizer_hf = None
 model_hf = None
 
-if USE_LLAMA_CPP:
-    try:
-        from llama_cpp import Llama
-        if not os.path.exists(LLAMA_CPP_MODEL_PATH):
-            logger.error(f"Модель GGUF не найдена по пути: {LLAMA_CPP_MODEL_PATH}")
-            logger.error("Пожалуйста, скачай GGUF-версию модели (например, Mistral 7B Instruct Q4_K_M) и помести ее в указанную директорию.")
+# Маршрутизация режимов по моделям (model_routes.json). Основная модель — модель по умолчанию;
+# контекст выдается в монопольное пользование, т.к. контекст llama.cpp не потокобезопасен.
+model_router = build_router(
+    ModelSpec(PRIMARY_MODEL_NAME, LLAMA_CPP_MODEL_PATH, n_ctx=LLAMA_CPP_N_CTX, n_gpu_layers=LLAMA_CPP_N_GPU_LAYERS,
+              memory_mb=LLAMA_CPP_OFFLOADED_MEMORY_MB, memory_budget_mb=LLAMA_CPP_MEMORY_BUDGET_MB,
+              max_instances=LLAMA_CPP_MAX_CONTEXTS),
+    None,
+    load_routes_config(),
+    pool_class=LlamaContextPool,
+    skip_missing_files=True,  # малая модель из model_routes.json не поставляется с репозиторием
+)
+
+def _load_llm_backend():
+    """Загружает LLM (llama.cpp или HF transformers) и возвращает загруженный объект или None."""
+    global llm_instance, tokenizer_hf, model_hf
+
+    if USE_LLAMA_CPP:
+        try:
+            from llama_cpp import Llama
+            if not os.path.exists(LLAMA_CPP_MODEL_PATH):
+                logger.error(f"Модель GGUF не найдена по пути: {LLAMA_CPP_MODEL_PATH}")
+                logger.error("Пожалуйста, скачай GGUF-версию модели (например, Mistral 7B Instruct Q4_K_M) и помести ее в указанную директорию.")
+                llm_instance = None
+            else:
+                logger.info(f"Загрузка GGUF модели из: {LLAMA_CPP_MODEL_PATH} с n_gpu_layers={LLAMA_CPP_N_GPU_LAYERS}, n_ctx={LLAMA_CPP_N_CTX}")
+                # Первый контекст пула; остальные создаются по мере параллельных запросов.
+                llm_instance = model_router.pool(PRIMARY_MODEL_NAME).warm()
+                logger.info("GGUF модель успешно загружена (или начат процесс загрузки, см. логи llama.cpp).")
+        except ImportError:
+            logger.error("Библиотека llama-cpp-python не установлена. Пожалуйста, установите: pip install llama-cpp-python")
             llm_instance = None
-        else:
-            logger.info(f"Загрузка GGUF модели из: {LLAMA_CPP_MODEL_PATH} с n_gpu_layers={LLAMA_CPP_N_GPU_LAYERS}, n_ctx={LLAMA_CPP_N_CTX}")
-            llm_instance = Llama(
-                model_path=LLAMA_CPP_MODEL_PATH,
-                n_gpu_layers=LLAMA_CPP_N_GPU_LAYERS,
-                n_ctx=LLAMA_CPP_N_CTX,
-                verbose=True # Оставляем True для детальных логов llama.cpp во время загрузки
-            )
-            logger.info("GGUF модель успешно загружена (или начат процесс загрузки, см. логи llama.cpp).")
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке GGUF модели: {e}", exc_info=True)
+            llm_instance = None
+        if llm_instance is None:
+            raise RuntimeError("GGUF модель не загружена.")
+        return llm_instance
+
+    logger.info(f"Попытка загрузки модели через Hugging Face transformers: {HF_MODEL_NAME}")
+    logger.warning("Загрузка модели через HF transformers может потребовать значительного количества RAM/VRAM (~14GB VRAM для fp16 Mistral 7B).")
+    logger.warning("Для GTX 1650 (4GB VRAM) это, скорее всего, будет очень медленно (CPU) или вызовет ошибку нехватки памяти без квантизации.")
+    try:
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        import torch
+
+        tokenizer_hf = AutoTokenizer.from_pretrained(HF_MODEL_NAME)
+        model_hf = AutoModelForCausalLM.from_pretrained(HF_MODEL_NAME, device_map="auto")
+        logger.info(f"Модель HF transformers {HF_MODEL_NAME} успешно загружена. Устройство: {model_hf.device}")
     except ImportError:
-        logger.error("Библиотека llama-cpp-python не установлена. Пожалуйста, установите: pip install llama-cpp-python")
-        llm_instance = None
+        logger.error("Библиотека transformers или torch не установлена. Пожалуйста, установите: pip install transformers torch")
+        model_hf = None
     except Exception as e:
-        logger.error(f"Ошибка при загрузке GGUF модели: {e}", exc_info=True)
-        llm_instance = None
-
-if not USE_LLAMA_CPP or (USE_LLAMA_CPP and llm_instance is None):
-    if not USE_LLAMA_CPP:
-        logger.info(f"Попытка загрузки модели через Hugging Face transformers: {HF_MODEL_NAME}")
-        logger.warning("Загрузка модели через HF transformers может потребовать значительного количества RAM/VRAM (~14GB VRAM для fp16 Mistral 7B).")
-        logger.warning("Для GTX 1650 (4GB VRAM) это, скорее всего, будет очень медленно (CPU) или вызовет ошибку нехватки памяти без квантизации.")
-        try:
-            from transformers import AutoTokenizer, AutoModelForCausalLM
-            import torch
+        logger.error(f"Ошибка при загрузке модели HF transformers: {e}", exc_info=True)
+        model_hf = None
+    if model_hf is None:
+        raise RuntimeError(f"Модель HF transformers {HF_MODEL_NAME} не загружена.")
+    return model_hf
 
-            tokenizer_hf = AutoTokenizer.from_pretrained(HF_MODEL_NAME)
-            model_hf = AutoModelForCausalLM.from_pretrained(HF_MODEL_NAME, device_map="auto")
-            logger.info(f"Модель HF transformers {HF_MODEL_NAME} успешно загружена. Устройство: {model_hf.device}")
-        except ImportError:
-            logger.error("Библиотека transformers или torch не установлена. Пожалуйста, установите: pip install transformers torch")
-            model_hf = None
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке модели HF transformers: {e}", exc_info=True)
-            model_hf = None
+register_component("llm", _load_llm_backend, description=f"LLM backend ({'llama.cpp' if USE_LLAMA_CPP else 'transformers'})")
 
 def query_mistral(
     prompt: str,
@@ -87,21 +123,41 @@ def query_mistral(
     Универсальная функция для отправки запроса к LLM.
     Параметр 'mode' может использоваться для выбора разных системных промптов или параметров генерации.
     """
+    return query_mistral_with_usage(prompt, mode, max_new_tokens, temperature)["text"]
+
+
+def query_mistral_with_usage(
+    prompt: str,
+    mode: str = "generate",
+    max_new_tokens: int = 256,
+    temperature: float = 0.7
+) -> Dict[str, Any]:
+    """
+    Как query_mistral, но вместе с текстом возвращает число сгенерированных токенов
+    и причину остановки: {"text", "completion_tokens", "finish_reason"}.
+    finish_reason == "length" означает, что ответ оборван по max_new_tokens.
+    """
     start_time = time.perf_counter()
     logger.info(f"Mistral Core: Получен запрос в режиме '{mode}'. Промпт (первые 100 символов): '{prompt[:100]}...'")
 
+    get_component("llm")
     full_prompt = prompt
     generated_text = "Ошибка: Модель (llm_instance или model_hf) не была успешно загружена."
+    completion_tokens: Optional[int] = None
+    finish_reason: Optional[str] = None
 
     if USE_LLAMA_CPP and llm_instance:
         try:
-            logger.info(f"Вызов llama.cpp с max_tokens={max_new_tokens}, temperature={temperature}")
-            result = llm_instance(
-                full_prompt,
-                max_tokens=max_new_tokens,
-                temperature=temperature,
-            )
+            with model_router.lease(mode) as (model_name, instance):
+                logger.info(f"Вызов llama.cpp (модель '{model_name}') с max_tokens={max_new_tokens}, temperature={temperature}")
+                result = instance(
+                    full_prompt,
+                    max_tokens=max_new_tokens,
+                    temperature=temperature,
+                )
             generated_text = result["choices"][0]["text"].strip()
+            completion_tokens = (result.get("usage") or {}).get("completion_tokens")
+            finish_reason = result["choices"][0].get("finish_reason")
         except Exception as e:
             logger.error(f"Ошибка при инференсе через llama.cpp: {e}", exc_info=True)
             generated_text = f"Ошибка llama.cpp: {e}"
@@ -114,7 +170,10 @@ def query_mistral(
                 max_new_tokens=max_new_tokens,
                 temperature=temperature,
             )
-            generated_text = tokenizer_hf.decode(outputs[0][inputs.input_ids.shape[1]:], skip_special_tokens=True).strip()
+            new_tokens = outputs[0][inputs.input_ids.shape[1]:]
+            generated_text = tokenizer_hf.decode(new_tokens, skip_special_tokens=True).strip()
+            completion_tokens = int(new_tokens.shape[0])
+            finish_reason = "length" if completion_tokens >= max_new_tokens else "stop"
         except Exception as e:
             logger.error(f"Ошибка при инференсе через transformers HF: {e}", exc_info=True)
             generated_text = f"Ошибка Transformers HF: {e}"
@@ -123,13 +182,118 @@ def query_mistral(
     duration_ms = (end_time - start_time) * 1000
     logger.info(f"Mistral Core: Запрос в режиме '{mode}' выполнен за {duration_ms:.2f} мс.")
     logger.info(f"Mistral Core: Ответ (первые 100 символов): '{generated_text[:100]}...'")
-    return generated_text
+    return {"text": generated_text, "completion_tokens": completion_tokens, "finish_reason": finish_reason}
+
+
+def stream_mistral(
+    prompt: str,
+    mode: str = "generate",
+    max_new_tokens: int = 256,
+    temperature: float = 0.7,
+    usage: Optional[Dict[str, Any]] = None
+) -> Iterator[str]:
+    """
+    Потоковый вариант query_mistral: отдает текст по мере декодирования.
+    Если потребитель закрывает генератор (close() или выход из цикла), декодирование
+    прекращается, и оставшиеся токены не генерируются.
+    Если передан словарь usage, по завершении потока в него записываются
+    completion_tokens и finish_reason (как у query_mistral_with_usage).
+
+    Экземпляр модели (model_router.lease) занят только на время декодирования: llama.cpp
+    декодирует в отдельном потоке и складывает фрагменты в очередь, поэтому медленный или
+    брошенный потребитель не задерживает другие вызовы той же модели. Закрытие генератора
+    останавливает декодирование на следующем токене.
+    """
+    start_time = time.perf_counter()
+    logger.info(f"Mistral Core: Потоковый запрос в режиме '{mode}' (max_tokens={max_new_tokens}, temperature={temperature}).")
+    get_component("llm")
+    emitted_chars = 0
+    emitted_chunks = 0
+    finish_reason: Optional[str] = None
+    finished = False
+
+    try:
+        if USE_LLAMA_CPP and llm_instance:
+            chunks: "queue.Queue[tuple]" = queue.Queue()
+            stop_requested = threading.Event()
+
+            def decode() -> None:
+                try:
+                    with model_router.lease(mode) as (model_name, instance):
+                        stream = instance(prompt, max_tokens=max_new_tokens, temperature=temperature, stream=True)
+                        try:
+                            for chunk in stream:
+                                chunks.put(("chunk", chunk["choices"][0]["text"], chunk["choices"][0].get("finish_reason")))
+                                if stop_requested.is_set():
+                                    break
+                        finally:
+                            stream.close()  # до возврата контекста в пул
+                    chunks.put(("done", None, None))
+                except Exception as e:
+                    logger.error(f"Ошибка при потоковом инференсе через llama.cpp: {e}", exc_info=True)
+                    chunks.put(("error", f"Ошибка llama.cpp: {e}", None))
+
+            # Копия контекста: аренда модели ограничена дедлайном запроса (deadline.current_deadline).
+            threading.Thread(target=contextvars.copy_context().run, args=(decode,), daemon=True).start()
+            try:
+                while True:
+                    kind, text, chunk_finish_reason = chunks.get()
+                    if kind == "done":
+                        finished = True
+                        break
+                    if kind == "error":
+                        yield text
+                        break
+                    finish_reason = chunk_finish_reason or finish_reason
+                    emitted_chars += len(text)
+                    emitted_chunks += 1  # llama.cpp отдает по одному токену на фрагмент
+                    yield text
+            finally:
+                stop_requested.set()
+        elif not USE_LLAMA_CPP and model_hf and tokenizer_hf:
+            from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+            stop_requested = threading.Event()
+
+            class _StopWhenRequested(StoppingCriteria):
+                def __call__(self, input_ids, scores, **kwargs) -> bool:
+                    return stop_requested.is_set()
+
+            inputs = tokenizer_hf(prompt, return_tensors="pt").to(model_hf.device)
+            streamer = TextIteratorStreamer(tokenizer_hf, skip_prompt=True, skip_special_tokens=True)
+            generation_thread = threading.Thread(target=model_hf.generate, kwargs=dict(
+                **inputs, max_new_tokens=max_new_tokens, temperature=temperature, streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([_StopWhenRequested()]),
+            ), daemon=True)
+            generation_thread.start()
+            streamed_text = []
+            try:
+                for text in streamer:
+                    emitted_chars += len(text)
+                    streamed_text.append(text)
+                    yield text
+                finished = True
+                emitted_chunks = len(tokenizer_hf.encode("".join(streamed_text), add_special_tokens=False))
+                finish_reason = "length" if emitted_chunks >= max_new_tokens else "stop"
+            finally:
+                stop_requested.set()
+        else:
+            yield "Ошибка: Модель (llm_instance или model_hf) не была успешно загружена."
+            finished = True
+    finally:
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        state = "завершен" if finished else "остановлен досрочно"
+        if usage is not None and finished and finish_reason is not None:
+            usage["completion_tokens"] = emitted_chunks
+            usage["finish_reason"] = finish_reason
+        logger.info(f"Mistral Core: Потоковый запрос в режиме '{mode}' {state} за {duration_ms:.2f} мс ({emitted_chars} символов).")
 
 
 if __name__ == '__main__':
     from utils import setup_logging
     setup_logging()
     logger.info("--- Тестирование mistral_core.py ---")
+    get_component("llm")
     model_ready = False
     if USE_LLAMA_CPP:
         if llm_instance:
@@ -0,0 +1,287 @@
+# model_router.py
+# Реестр LLM-моделей и маршрутизация запросов по режиму (mode) из query_mistral:
+# дешевые классификационные режимы ("analyze_json") могут обслуживаться малой
+# квантованной моделью, генеративные ("hyp_gen_for_*", "respond", ...) — основной.
+# У каждой модели свой пул экземпляров, размер которого ограничен бюджетом памяти.
+import fnmatch
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from deadline import current_deadline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_routes.json")
+ROUTES_PATH_ENV = "SRIS_MODEL_ROUTES_PATH"
+PRIMARY_MODEL_NAME = "primary"
+DEFAULT_LOAD_RETRY_SECONDS = 30.0
+
+ModelLoader = Callable[["ModelSpec"], Any]
+
+
+class ModelUnavailableError(RuntimeError):
+    pass
+
+
+class ModelPoolTimeout(TimeoutError):
+    pass
+
+
+class ModelSpec:
+    """Описание модели: файл весов, параметры загрузки и бюджет памяти пула."""
+    def __init__(self, name: str, path: str, backend: str = "llama_cpp", n_ctx: int = 4096, n_gpu_layers: int = 0,
+                 memory_mb: int = 0, memory_budget_mb: int = 0, max_instances: int = 1, description: str = ""):
+        self.name = name
+        self.path = path
+        self.backend = backend
+        self.n_ctx = n_ctx
+        self.n_gpu_layers = n_gpu_layers
+        self.memory_mb = memory_mb
+        self.memory_budget_mb = memory_budget_mb
+        self.max_instances = max_instances
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "ModelSpec":
+        return cls(name=name, **data)
+
+    @property
+    def capacity(self) -> int:
+        """Сколько экземпляров модели помещается в пул (не меньше одного)."""
+        capacity = self.max_instances
+        if self.memory_mb and self.memory_budget_mb:
+            capacity = min(capacity, self.memory_budget_mb // self.memory_mb)
+        return max(1, capacity)
+
+
+class ModelPool:
+    """
+    Пул экземпляров одной модели. Экземпляр выдается в монопольное пользование
+    (контекст llama.cpp не потокобезопасен); новые создаются лениво, пока пул не
+    достиг capacity, затем запросы ждут освобождения. Неудачная загрузка фиксируется
+    на retry_seconds, чтобы каждый запрос не повторял дорогую попытку: если к этому
+    времени уже загружены экземпляры, пул продолжает работать на них (capacity
+    временно равна их числу), иначе модель недоступна до следующей попытки.
+    """
+    def __init__(self, spec: ModelSpec, loader: ModelLoader, retry_seconds: float = DEFAULT_LOAD_RETRY_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.spec = spec
+        self.loader = loader
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self.error: Optional[str] = None
+        self._failed_at: Optional[float] = None
+        self._idle: List[Any] = []
+        self._created = 0
+        self._cond = threading.Condition()
+        self.leases = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+        self.timeouts = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.spec.capacity
+
+    def adopt(self, instance: Any) -> None:
+        """Добавляет в пул уже загруженный экземпляр (например, прогретый при старте)."""
+        with self._cond:
+            self._idle.append(instance)
+            self._created += 1
+            self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """Экземпляр модели; timeout (секунды) ограничивает ожидание свободного экземпляра, иначе ModelPoolTimeout."""
+        start_time = time.perf_counter()
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    self._expire_error()
+                    if self.error is not None and self._created == 0:
+                        raise ModelUnavailableError(f"Модель '{self.spec.name}' недоступна: {self.error}")
+                    if self._idle:
+                        instance = self._idle.pop()
+                        self.leases += 1
+                        if waited:
+                            self.waits += 1
+                            self.wait_ms += (time.perf_counter() - start_time) * 1000
+                        return instance
+                    if self._created < self._limit():
+                        self._created += 1
+                        break
+                    waited = True
+                    remaining = None if timeout is None else timeout - (time.perf_counter() - start_time)
+                    if remaining is not None and remaining <= 0:
+                        self.timeouts += 1
+                        raise ModelPoolTimeout(f"Нет свободного экземпляра модели '{self.spec.name}' за {timeout:.2f} с")
+                    self._cond.wait(remaining)
+            logger.info(f"ModelRouter: Загрузка экземпляра {self._created}/{self.capacity} модели '{self.spec.name}' ({self.spec.path}).")
+            try:
+                instance = self.loader(self.spec)
+            except Exception as e:
+                with self._cond:
+                    self._created -= 1
+                    self.error = str(e)
+                    self._failed_at = self._clock()
+                    loaded = self._created
+                    self._cond.notify_all()
+                if not loaded:
+                    logger.error(f"ModelRouter: Модель '{self.spec.name}' не загружена: {e}")
+                    raise ModelUnavailableError(f"Модель '{self.spec.name}' недоступна: {e}") from e
+                # Уже загруженные экземпляры продолжают обслуживать запросы, этот ждет одного из них.
+                logger.error(f"ModelRouter: Экземпляр модели '{self.spec.name}' не загружен, пул работает на {loaded} загруженных: {e}")
+                continue
+            with self._cond:
+                self.leases += 1
+                self._cond.notify_all()  # после первой загрузки capacity может вырасти
+            return instance
+
+    def _limit(self) -> int:
+        # После неудачной загрузки новые экземпляры не создаются до истечения retry_seconds.
+        return self._created if self.error is not None else self.capacity
+
+    def _expire_error(self) -> None:
+        if self.error is not None and self._clock() - self._failed_at >= self.retry_seconds:
+            logger.info(f"ModelRouter: Повторная попытка загрузки модели '{self.spec.name}' после ошибки: {self.error}")
+            self.error = None
+            self._failed_at = None
+
+    def release(self, instance: Any) -> None:
+        with self._cond:
+            self._idle.append(instance)
+            self._cond.notify()
+
+    def warm(self) -> Any:
+        """Загружает (при необходимости) один экземпляр и возвращает его в пул."""
+        instance = self.acquire()
+        self.release(instance)
+        return instance
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "path": self.spec.path,
+                "capacity": self.capacity,
+                "loaded_instances": self._created,
+                "idle_instances": len(self._idle),
+                "memory_mb": self.spec.memory_mb * self._created,
+                "memory_budget_mb": self.spec.memory_budget_mb,
+                "leases": self.leases,
+                "waits": self.waits,
+                "wait_ms": round(self.wait_ms, 2),
+                "timeouts": self.timeouts,
+                "error": self.error,
+                "retry_in_s": (round(max(0.0, self.retry_seconds - (self._clock() - self._failed_at)), 1)
+                               if self._failed_at is not None else None),
+            }
+
+
+class ModelRouter:
+    """
+    Выбор модели по режиму запроса: маршруты проверяются по порядку (шаблоны fnmatch,
+    например "hyp_gen_for_*"), режим без маршрута идет в модель по умолчанию.
+    Если выбранная модель не загружается, запрос обслуживает модель по умолчанию.
+    """
+    def __init__(self, default_model: str, loader: ModelLoader, pool_class: type = ModelPool):
+        self.default_model = default_model
+        self.loader = loader
+        self.pool_class = pool_class
+        self._pools: Dict[str, ModelPool] = {}
+        self._routes: List[Tuple[str, str]] = []
+
+    def register_model(self, spec: ModelSpec, loader: Optional[ModelLoader] = None) -> ModelPool:
+        pool = self.pool_class(spec, loader or self.loader)
+        self._pools[spec.name] = pool
+        return pool
+
+    def add_route(self, patterns: Sequence[str], model_name: str) -> None:
+        for pattern in patterns:
+            self._routes.append((pattern, model_name))
+
+    def pool(self, model_name: str) -> ModelPool:
+        return self._pools[model_name]
+
+    def model_for(self, mode: str) -> str:
+        for pattern, model_name in self._routes:
+            if fnmatch.fnmatchcase(mode, pattern):
+                return model_name if model_name in self._pools else self.default_model
+        return self.default_model
+
+    @contextmanager
+    def lease(self, mode: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Выдает (имя модели, экземпляр) для режима и возвращает экземпляр в пул после использования.
+        Ожидание свободного экземпляра ограничено остатком дедлайна запроса (deadline.current_deadline).
+        """
+        model_name = self.model_for(mode)
+        pool = self._pools[model_name]
+        deadline = current_deadline()
+        timeout = deadline.remaining() if deadline is not None else None
+        try:
+            instance = pool.acquire(timeout)
+        except ModelUnavailableError:
+            if model_name == self.default_model:
+                raise
+            logger.warning(f"ModelRouter: Режим '{mode}' переведен с модели '{model_name}' на '{self.default_model}'.")
+            model_name, pool = self.default_model, self._pools[self.default_model]
+            instance = pool.acquire(deadline.remaining() if deadline is not None else None)
+        try:
+            yield model_name, instance
+        finally:
+            pool.release(instance)
+
+    def routing_table(self) -> List[Dict[str, str]]:
+        return [{"mode": pattern, "model": model_name} for pattern, model_name in self._routes]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "default_model": self.default_model,
+            "routes": self.routing_table(),
+            "models": {name: pool.status() for name, pool in self._pools.items()},
+        }
+
+
+def build_router(primary: ModelSpec, loader: Optional[ModelLoader], config: Optional[Dict[str, Any]] = None,
+                 pool_class: type = ModelPool, skip_missing_files: bool = False) -> ModelRouter:
+    """
+    Роутер с основной моделью по умолчанию и моделями/маршрутами из конфигурации:
+        {"models": {name: {path, n_ctx, n_gpu_layers, memory_mb, memory_budget_mb, max_instances}},
+         "routes": [{"modes": [шаблоны режимов], "model": name}]}
+    Маршрут на незарегистрированную модель ведет в основную. loader=None оставляет
+    загрузку пулу (pool_class со своим загрузчиком, например llm_pool.LlamaContextPool).
+    skip_missing_files — модели, файла весов которых нет, не регистрируются: их режимы сразу
+    обслуживает основная модель, без неудачной загрузки при первом запросе.
+    """
+    router = ModelRouter(primary.name, loader, pool_class)
+    router.register_model(primary)
+    config = config or {}
+    for name, data in config.get("models", {}).items():
+        if name == primary.name:
+            continue
+        spec = ModelSpec.from_dict(name, data)
+        if skip_missing_files and not os.path.exists(spec.path):
+            logger.info(f"ModelRouter: Файл модели '{name}' ({spec.path}) не найден, ее режимы обслуживает основная модель.")
+            continue
+        router.register_model(spec)
+    for route in config.get("routes", []):
+        router.add_route(route.get("modes", []), route.get("model", primary.name))
+    return router
+
+
+def load_routes_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Конфигурация маршрутов (SRIS_MODEL_ROUTES_PATH или model_routes.json рядом с модулем)."""
+    path = path or os.environ.get(ROUTES_PATH_ENV) or DEFAULT_ROUTES_PATH
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.info(f"ModelRouter: Файл маршрутов {path} не найден, все режимы обслуживает основная модель.")
+    except ValueError as e:
+        logger.error(f"ModelRouter: Некорректный файл маршрутов {path}, все режимы обслуживает основная модель: {e}")
+    return {}
@@ -1,5 +1,7 @@
 # perception_analysis.py (v6.1 - Ультимативный Гибрид с улучшенным промптом)
+import copy
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from utils import execute_llm_query
 
@@ -141,3 +143,28 @@ def analyze_perception(raw_fused_input: str) -> Dict[str, Any]:
 
     logger.info(f"PerceptionAnalysis v6.1: Итоговая структура восприятия (summary): {str(structured_perception.get('summary', 'N/A'))[:70]}... Query Type: {structured_perception.get('query_type')}, Complexity: {structured_perception.get('complexity')}")
     return structured_perception
+
+
+def analyze_perception_batch(raw_fused_inputs: List[str], max_workers: int = 4) -> List[Dict[str, Any]]:
+    """
+    Анализ восприятия для пакета входов: одинаковые тексты анализируются один раз,
+    промпты отправляются в LLM параллельно (не больше max_workers одновременно — по числу
+    контекстов модели / соединений с воркером). Ошибка одного входа не прерывает пакет:
+    она возвращается в поле "error" его результата, как у analyze_perception.
+    """
+    def analyze_one(raw_fused_input: str) -> Dict[str, Any]:
+        try:
+            return analyze_perception(raw_fused_input)
+        except Exception as e:
+            logger.error(f"PerceptionAnalysis: Ошибка анализа входа в пакете: {e}", exc_info=True)
+            return {"original_input": raw_fused_input, "error": str(e)}
+
+    unique_inputs = list(dict.fromkeys(raw_fused_inputs))
+    logger.info(f"PerceptionAnalysis: Пакетный анализ {len(raw_fused_inputs)} входов ({len(unique_inputs)} уникальных)...")
+    if len(unique_inputs) <= 1 or max_workers <= 1:
+        analyzed = [analyze_one(text) for text in unique_inputs]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_inputs)), thread_name_prefix="perception") as executor:
+            analyzed = list(executor.map(analyze_one, unique_inputs))
+    by_input = dict(zip(unique_inputs, analyzed))
+    return [copy.deepcopy(by_input[text]) for text in raw_fused_inputs]
@@ -0,0 +1,214 @@
+# response_cache.py
+# Кэш готовых ответов SRIS: запрос -> финальный ответ generate_sris_response.
+# Сохраняются только ответы, сформулированные LLM по полному или короткому пути.
+#
+# Кроме точного совпадения (нормализованный текст), кэш семантический: для каждой записи
+# хранится эмбеддинг запроса (модель эмбеддингов semantic_memory_index, а при общем индексе —
+# процесс-писатель shared_index), краткое изложение восприятия, язык и концепт цели. Новый
+# запрос с тем же языком и целью, эмбеддинг которого ближе similarity_threshold к одной из
+# записей, получает ее ответ: тот же вопрос другими словами не проходит цикл заново.
+# Под пиковой нагрузкой (load_policy, уровень cache_only) ядро отвечает только из этого кэша.
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lazy_components import get_component
+from single_flight import normalize_query_text
+from text_embeddings import CallableEmbedder, VectorBank
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_THRESHOLD_ENV = "SRIS_RESPONSE_CACHE_THRESHOLD"
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+# Косинусное сходство эмбеддингов запросов, начиная с которого запросы считаются одним вопросом.
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+# Попадание экономит как минимум генерацию гипотез и ответа (два вызова LLM).
+LLM_CALLS_SAVED_PER_HIT = 2
+
+
+def detect_language(text: str) -> str:
+    """Язык запроса по алфавиту, как в perception_analysis ("en", "ru", "other")."""
+    if any('a' <= char.lower() <= 'z' for char in text): return "en"
+    if any('а' <= char.lower() <= 'я' for char in text): return "ru"
+    return "other"
+
+
+def _sris_embedder() -> CallableEmbedder:
+    """Эмбеддинги запросов той же моделью, что и семантическая память SRIS."""
+    import shared_index
+    if shared_index.shared_index_enabled():
+        # Несколько процессов SRIS: модель загружена только в процессе-писателе индекса.
+        return CallableEmbedder(shared_index.get_writer_client().embed, name="shared_index_writer")
+    import semantic_memory_index  # регистрирует компонент "embedding_model"
+    embed_model = get_component("embedding_model")
+    if embed_model is None:
+        raise RuntimeError("Модель эмбеддингов недоступна.")
+    return CallableEmbedder(embed_model.get_text_embedding_batch, name=type(embed_model).__name__)
+
+
+class ResponseCache:
+    """
+    Потокобезопасный LRU-кэш ответов; записи старше ttl_seconds не выдаются.
+    embedder — объект с методом embed(texts) (см. text_embeddings); None — модель эмбеддингов
+    SRIS, загружаемая при первом семантическом поиске. Если эмбеддинги недоступны, кэш
+    работает только по точному совпадению текста. При enabled=False кэш ничего не выдает и
+    не сохраняет (бенчмарки цикла, см. benchmarks/bench_cycle.isolated_kernel).
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD, embedder: Any = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.enabled = True
+        self._embedder = embedder
+        self._embedder_failed = False
+        self._clock = clock
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Банки векторов по (язык, цель) строятся при поиске и сбрасываются при изменении группы.
+        self._banks: Dict[Tuple[str, Optional[str]], Tuple[List[str], VectorBank]] = {}
+        self._lock = threading.Lock()
+        self._embedder_lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.embedding_errors = 0
+        self._semantic_similarity_sum = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "ResponseCache":
+        threshold = os.environ.get(RESPONSE_CACHE_THRESHOLD_ENV)
+        if threshold:
+            kwargs.setdefault("similarity_threshold", float(threshold))
+        return cls(**kwargs)
+
+    # --- Эмбеддинги ---
+    def _embed(self, text: str) -> Optional[Any]:
+        with self._embedder_lock:
+            if self._embedder is None and not self._embedder_failed:
+                try:
+                    self._embedder = _sris_embedder()
+                except Exception as e:
+                    self._embedder_failed = True
+                    logger.warning(f"ResponseCache: эмбеддинги недоступны, только точное совпадение: {e}")
+            embedder = self._embedder
+        if embedder is None:
+            return None
+        try:
+            return embedder.embed([text])[0]
+        except Exception as e:
+            self.embedding_errors += 1
+            logger.error(f"ResponseCache: не удалось получить эмбеддинг запроса: {e}")
+            return None
+
+    # --- Записи (вызывается под self._lock) ---
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._banks.pop((entry["language"], entry["goal_concept"]), None)
+
+    def _fresh_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() - entry["stored_at"] >= self.ttl_seconds:
+            self._drop(key)
+            entry = None
+        return entry
+
+    def _bank(self, group: Tuple[str, Optional[str]]) -> Tuple[List[str], Optional[VectorBank]]:
+        if group not in self._banks:
+            keys = [key for key, entry in self._entries.items()
+                    if (entry["language"], entry["goal_concept"]) == group and entry["vector"] is not None]
+            self._banks[group] = (keys, VectorBank([self._entries[key]["vector"] for key in keys]) if keys else None)
+        return self._banks[group]
+
+    def _best_match(self, vector: Any, language: str, goal_concept: Optional[str]) -> Optional[Tuple[str, float]]:
+        groups = {(entry["language"], entry["goal_concept"]) for entry in self._entries.values()
+                  if entry["language"] == language and (goal_concept is None or entry["goal_concept"] == goal_concept)}
+        best: Optional[Tuple[str, float]] = None
+        for group in groups:
+            keys, bank = self._bank(group)
+            if bank is None:
+                continue
+            for key, similarity in zip(keys, bank.similarities([vector])[0]):
+                if similarity >= self.similarity_threshold and (best is None or similarity > best[1]) \
+                        and self._fresh_entry(key) is not None:
+                    best = (key, similarity)
+        return best
+
+    # --- Публичный интерфейс ---
+    def lookup(self, query_text: Optional[str], language: Optional[str] = None,
+               goal_concept: Optional[str] = None, semantic: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Готовый ответ на запрос: сначала точное совпадение текста, затем ближайший по эмбеддингу
+        запрос с тем же языком и концептом цели (goal_concept=None — с любой целью).
+        Возвращает {"response", "match", "similarity", "matched_query", "perception_summary"} или None.
+        """
+        if not query_text or not self.enabled:
+            return None
+        key = normalize_query_text(query_text)
+        language = language or detect_language(query_text)
+        with self._lock:
+            entry = self._fresh_entry(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return {"response": entry["response"], "match": "exact", "similarity": 1.0,
+                        "matched_query": entry["query_text"], "perception_summary": entry["perception_summary"]}
+            has_candidates = any(e["language"] == language and (goal_concept is None or e["goal_concept"] == goal_concept)
+                                 for e in self._entries.values())
+        vector = self._embed(query_text) if semantic and has_candidates else None
+        with self._lock:
+            match = self._best_match(vector, language, goal_concept) if vector is not None else None
+            if match is None:
+                self.misses += 1
+                return None
+            matched_key, similarity = match
+            entry = self._entries[matched_key]
+            self._entries.move_to_end(matched_key)
+            self.semantic_hits += 1
+            self._semantic_similarity_sum += similarity
+        logger.info(f"ResponseCache: запрос '{query_text[:60]}' совпал с '{entry['query_text'][:60]}' (сходство {similarity:.3f}).")
+        return {"response": entry["response"], "match": "semantic", "similarity": round(similarity, 4),
+                "matched_query": entry["query_text"], "perception_summary": entry["perception_summary"]}
+
+    def store(self, query_text: Optional[str], response: str, perception_summary: Optional[str] = None,
+              language: Optional[str] = None, goal_concept: Optional[str] = None) -> None:
+        if not query_text or not response or not self.enabled:
+            return
+        key = normalize_query_text(query_text)
+        language = language or detect_language(query_text)
+        vector = self._embed(query_text)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {"query_text": query_text, "response": response, "perception_summary": perception_summary,
+                                  "language": language, "goal_concept": goal_concept, "vector": vector,
+                                  "stored_at": self._clock()}
+            self._banks.pop((language, goal_concept), None)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "similarity_threshold": self.similarity_threshold,
+                "semantic_enabled": self._embedder is not None or not self._embedder_failed,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "semantic_hit_ratio": round(self.semantic_hits / lookups, 4) if lookups else 0.0,
+                "mean_semantic_similarity": round(self._semantic_similarity_sum / self.semantic_hits, 4) if self.semantic_hits else None,
+                "embedding_errors": self.embedding_errors,
+                "llm_calls_saved": hits * LLM_CALLS_SAVED_PER_HIT,
+            }
+
+
+default_cache = ResponseCache.from_env()
@@ -3,13 +3,32 @@ import logging
 from typing import Dict, Any
 
 from utils import execute_llm_query
+from deadline import stage_allowed, mark_degraded
+from communication_intent import render_template_response
+from response_cache import default_cache as response_cache
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
+# Цепочки, ответ на которые формулирует LLM и может быть выдан повторно из кэша ответов.
+CACHEABLE_MODES = ("full_reasoning", "fast_path_reasoning")
+
 def generate_sris_response(
     reasoning_chain: Dict[str, Any]
 ) -> str:
+    # Под нагрузкой (load_policy) ядро помечает цепочку: ответ берется из кэша или по шаблону намерения.
+    if reasoning_chain.get("cached_response"):
+        return reasoning_chain["cached_response"]
+    if reasoning_chain.get("response_mode") == "template" or not stage_allowed("response"):
+        if reasoning_chain.get("response_mode") == "template":
+            logger.info("ResponseGenerator: Ответ по шаблону намерения (LLM перегружен).")
+        else:
+            # Остатка дедлайна не хватит на вызов LLM (deadline.STAGE_MIN_SECONDS["response"]).
+            mark_degraded("response", "template_response")
+        return render_template_response(reasoning_chain.get("communication_intent", {}),
+                                        reasoning_chain.get("chosen_hypothesis", {}).get("hypothesis", ""),
+                                        reasoning_chain.get("perception_struct", {}).get("language_detected", "ru"))
+
     comm_intent = reasoning_chain.get("communication_intent", {})
     perception = reasoning_chain.get("perception_struct", {})
     chosen_hypothesis_text = reasoning_chain.get("chosen_hypothesis", {}).get("hypothesis", "мои выводы не определены")
@@ -77,5 +96,15 @@ def generate_sris_response(
         # Формируем запасной ответ на языке по умолчанию (в данном случае, русском)
         fallback_reply = f"[SRIS внутренне пришел к выводу: \"{chosen_hypothesis_text[:70]}...\"] На данный момент испытываю затруднения с формулировкой развернутого ответа."
         return fallback_reply
-        
-    return sris_reply.strip()
+
+    sris_reply = sris_reply.strip()
+    # Ответы, зависящие от сессии (переопределения sDNA, переиспользованные восприятие или
+    # воспоминания прошлого хода), персональны и в общий кэш не попадают; упрощенные под
+    # дедлайном или под нагрузкой (load_level) — тоже, чтобы не выдаваться после ее спада.
+    session_reuse = reasoning_chain.get("session_reuse") or {}
+    if reasoning_chain.get("mode") in CACHEABLE_MODES and not reasoning_chain.get("degraded_stages") \
+            and not reasoning_chain.get("load_level") \
+            and not reasoning_chain.get("sdna_traits") and not any(session_reuse.values()):
+        response_cache.store(reasoning_chain.get("input_text"), sris_reply, perception_summary,
+                             perception.get("language_detected"), reasoning_chain.get("goal", {}).get("concept"))
+    return sris_reply
@@ -5,15 +5,10 @@ import logging
 from typing import List, Dict, Any, Optional, Set
 import uuid
 
-from llama_index.core import (
-    Document,
-    VectorStoreIndex,
-    StorageContext,
-    load_index_from_storage,
-    Settings
-)
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.llms.ollama import Ollama
+from lazy_components import register_component, get_component
+
+# LlamaIndex, модель эмбеддингов и Ollama импортируются и создаются лениво
+# (компонент "embedding_model"), чтобы импорт модуля не тянул тяжелые зависимости.
 
 # --- Импорт из соседних модулей SRIS ---
 logger_smfs_imported = False
@@ -26,19 +21,15 @@ except ImportError:
         logging.error(f"ЗАГЛУШКА: Функция load_chain_from_fs не была корректно импортирована...")
         return None
 
-wikidata_client_available = False
-try:
-    from wikidata_client import query_wikidata, format_wikidata_entity_data
-    wikidata_client_available = True
-    logging.info("wikidata_client.py успешно импортирован в semantic_memory_index.py.")
-except ImportError:
-    logging.error("НЕ УДАЛОСЬ ИМПОРТИРОВАТЬ wikidata_client.py. Загрузка концепций из Wikidata будет невозможна.")
-    def query_wikidata(sparql_query: str) -> list: 
-        logging.error("ЗАГЛУШКА: вызвана query_wikidata, но wikidata_client не импортирован.")
-        return []
-    def format_wikidata_entity_data(qid: str, sparql_results: List[Dict[str, str]]) -> Dict[str, str]: 
-        logging.error("ЗАГЛУШКА: вызвана format_wikidata_entity_data, но wikidata_client не импортирован.")
-        return {}
+def _import_wikidata_client():
+    """Импортирует wikidata_client (и requests) только когда индекс действительно строится."""
+    try:
+        from wikidata_client import query_wikidata, format_wikidata_entity_data
+        logging.info("wikidata_client.py успешно импортирован в semantic_memory_index.py.")
+        return query_wikidata, format_wikidata_entity_data
+    except ImportError:
+        logging.error("НЕ УДАЛОСЬ ИМПОРТИРОВАТЬ wikidata_client.py. Загрузка концепций из Wikidata будет невозможна.")
+        return None, None
 
 # --- Конфигурация ---
 INDEX_STORAGE_DIR = os.path.join(SMFS_BASE_DIR, "_llama_index_storage") 
@@ -65,12 +56,21 @@ CORE_SRIS_KNOWLEDGE = [
 
 logger = logging.getLogger(__name__)
 
-try:
-    Settings.llm = Ollama(model=OLLAMA_LLM_MODEL_NAME, base_url=OLLAMA_LLM_BASE_URL)
-    Settings.embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME, device="cuda") 
-    logger.info(f"LlamaIndex Settings сконфигурированы: LLM='{OLLAMA_LLM_MODEL_NAME}', EmbedModel='{EMBED_MODEL_NAME}' (device: cuda)")
-except Exception as e:
-    logger.error(f"Ошибка при конфигурации LlamaIndex Settings: {e}", exc_info=True)
+def _configure_llama_index_settings():
+    """Создает LLM и модель эмбеддингов LlamaIndex; вызывается один раз через реестр компонентов."""
+    from llama_index.core import Settings
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from llama_index.llms.ollama import Ollama
+    try:
+        Settings.llm = Ollama(model=OLLAMA_LLM_MODEL_NAME, base_url=OLLAMA_LLM_BASE_URL)
+        Settings.embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME, device="cuda") 
+        logger.info(f"LlamaIndex Settings сконфигурированы: LLM='{OLLAMA_LLM_MODEL_NAME}', EmbedModel='{EMBED_MODEL_NAME}' (device: cuda)")
+    except Exception as e:
+        logger.error(f"Ошибка при конфигурации LlamaIndex Settings: {e}", exc_info=True)
+        raise
+    return Settings.embed_model
+
+register_component("embedding_model", _configure_llama_index_settings, description=f"LlamaIndex embeddings ({EMBED_MODEL_NAME})", optional=True)
 
 def _convert_chain_to_document_text(chain_data: Dict[str, Any]) -> str:
     text_parts = [
@@ -88,7 +88,20 @@ def _convert_chain_to_document_text(chain_data: Dict[str, Any]) -> str:
         text_parts.append(f"Key Predicted Effects: {effects_summary}")
     return "\n".join(filter(None, text_parts))
 
-def _load_all_reasoning_chains_as_documents() -> List[Document]:
+def chain_document_payload(chain_data: Dict[str, Any], filename: str) -> tuple:
+    """(текст, метаданные) документа индекса для цепочки рассуждений."""
+    chain_id = chain_data.get("id") or filename.replace("reasoning_chain_", "").replace(".json", "")
+    metadata = {
+        "source": "sris_reasoning_chain", "chain_id": chain_id,
+        "timestamp": chain_data.get("timestamp", "N/A"),
+        "goal_concept": (chain_data.get("goal") or {}).get("concept", "N/A"),
+        "filename": filename,
+        "input_text_preview": (chain_data.get("input_text") or "")[:100]
+    }
+    return _convert_chain_to_document_text(chain_data), metadata
+
+def _load_all_reasoning_chains_as_documents() -> List["Document"]:
+    from llama_index.core import Document
     documents: List[Document] = []
     if not os.path.exists(SMFS_BASE_DIR) or not logger_smfs_imported:
         logger.warning(f"Директория '{SMFS_BASE_DIR}' не найдена или semantic_memory_fs не импортирован. Пропуск загрузки цепочек рассуждений SRIS.")
@@ -100,21 +113,16 @@ def _load_all_reasoning_chains_as_documents() -> List[Document]:
             chain_id = entry_name.replace("reasoning_chain_", "").replace(".json", "")
             chain_data = load_chain_from_fs(chain_id) 
             if chain_data:
-                doc_text = _convert_chain_to_document_text(chain_data)
-                metadata = {
-                    "source": "sris_reasoning_chain", "chain_id": chain_id,
-                    "timestamp": chain_data.get("timestamp", "N/A"),
-                    "goal_concept": chain_data.get("goal", {}).get("concept", "N/A"),
-                    "filename": entry_name,
-                    "input_text_preview": chain_data.get("input_text","")[:100]
-                }
+                doc_text, metadata = chain_document_payload({**chain_data, "id": chain_id}, entry_name)
                 documents.append(Document(text=doc_text, metadata=metadata))
     logger.info(f"Загружено и подготовлено {len(documents)} документов из цепочек рассуждений SRIS.")
     return documents
 
-def _load_wikidata_concepts_as_documents(qids_to_load: List[str]) -> List[Document]:
+def _load_wikidata_concepts_as_documents(qids_to_load: List[str]) -> List["Document"]:
+    from llama_index.core import Document
     documents: List[Document] = []
-    if not wikidata_client_available:
+    query_wikidata, format_wikidata_entity_data = _import_wikidata_client()
+    if query_wikidata is None:
         logger.warning("Wikidata client не доступен. Пропуск загрузки концепций из Wikidata.")
         return documents
     logger.info(f"Загрузка концепций ИИ из Wikidata для QIDs: {qids_to_load}")
@@ -162,7 +170,8 @@ def _load_wikidata_concepts_as_documents(qids_to_load: List[str]) -> List[Docume
     logger.info(f"Загружено и подготовлено {len(documents)} документов из концепций Wikidata.")
     return documents
 
-def _load_core_sris_knowledge_as_documents() -> List[Document]:
+def _load_core_sris_knowledge_as_documents() -> List["Document"]:
+    from llama_index.core import Document
     documents: List[Document] = []
     logger.info(f"Загрузка ключевых знаний о SRIS (количество записей: {len(CORE_SRIS_KNOWLEDGE)})...")
     for knowledge_item in CORE_SRIS_KNOWLEDGE:
@@ -177,7 +186,9 @@ def _load_core_sris_knowledge_as_documents() -> List[Document]:
     logger.info(f"Загружено и подготовлено {len(documents)} документов из ключевых знаний о SRIS.")
     return documents
 
-def get_or_build_semantic_index(rebuild: bool = False) -> Optional[VectorStoreIndex]:
+def get_or_build_semantic_index(rebuild: bool = False) -> Optional["VectorStoreIndex"]:
+    from llama_index.core import VectorStoreIndex, StorageContext, load_index_from_storage
+    get_component("embedding_model")
     if not os.path.exists(INDEX_STORAGE_DIR):
         logger.info(f"Директория для индекса '{INDEX_STORAGE_DIR}' не найдена, будет создана.")
         os.makedirs(INDEX_STORAGE_DIR, exist_ok=True)
@@ -218,14 +229,27 @@ def get_or_build_semantic_index(rebuild: bool = False) -> Optional[VectorStoreIn
             logger.error(f"Критическая ошибка при построении или сохранении нового индекса: {e}", exc_info=True)
             return None
 
-def add_documents_to_sris_index(new_documents: List[Document]) -> bool:
+def add_documents_to_sris_index(new_documents: List["Document"]) -> bool:
     if not new_documents:
         logger.info("add_documents_to_sris_index: Нет новых документов для добавления.")
         return True
     logger.info(f"add_documents_to_sris_index: Попытка добавить {len(new_documents)} новых документов в индекс.")
+    import shared_index
+    if shared_index.shared_index_enabled():
+        # Индекс меняет только процесс-писатель: локальная копия, сохраненная здесь,
+        # была бы перезаписана его следующим persist().
+        try:
+            added = shared_index.get_writer_client().add_documents(
+                [{"text": doc.text, "metadata": dict(doc.metadata or {})} for doc in new_documents])
+            logger.info(f"add_documents_to_sris_index: {added} новых документов переданы писателю общего индекса.")
+            return True
+        except Exception as e:
+            logger.error(f"add_documents_to_sris_index: Писатель общего индекса недоступен: {e}", exc_info=True)
+            return False
     try:
         index = get_or_build_semantic_index(rebuild=False) 
         if index is None:
+            from llama_index.core import VectorStoreIndex
             logger.warning("add_documents_to_sris_index: Базовый индекс не найден/не создан. Попытка создать индекс только из новых документов.")
             if not os.path.exists(INDEX_STORAGE_DIR): os.makedirs(INDEX_STORAGE_DIR, exist_ok=True)
             index = VectorStoreIndex.from_documents(new_documents)
@@ -242,12 +266,30 @@ def add_documents_to_sris_index(new_documents: List[Document]) -> bool:
         logger.error(f"add_documents_to_sris_index: Ошибка при добавлении документов в индекс: {e}", exc_info=True)
         return False
 
-def query_semantic_memory(index: VectorStoreIndex, query_text: str, similarity_top_k: int = 3) -> Optional[List[Dict[str, Any]]]:
+def _node_to_result(node_with_score) -> Dict[str, Any]:
+    return {
+        "source": node_with_score.metadata.get("source", "unknown"),
+        "chain_id": node_with_score.metadata.get("chain_id"), 
+        "wikidata_qid": node_with_score.metadata.get("wikidata_qid"),
+        "language": node_with_score.metadata.get("language"),
+        "concept_label": node_with_score.metadata.get("concept_label"),
+        "topic": node_with_score.metadata.get("topic"), 
+        "filename": node_with_score.metadata.get("filename"),
+        "score": round(node_with_score.score, 4),
+        "text_preview": node_with_score.get_text()[:300] + "...", 
+        "full_text": node_with_score.get_text(), 
+        "metadata": node_with_score.metadata
+    }
+
+def query_semantic_memory(index: "VectorStoreIndex", query_text: str, similarity_top_k: int = 3) -> Optional[List[Dict[str, Any]]]:
     # ... ИЗМЕНЕНО: принимаем индекс как аргумент ...
     logger.info(f"Выполнение семантического запроса к предоставленному индексу: '{query_text}' (top_k={similarity_top_k})")
     if index is None:
         logger.error("В query_semantic_memory передан пустой индекс (None). Запрос не может быть выполнен.")
         return None
+    if getattr(index, "is_shared_reader", False):
+        # Снимок индекса из разделяемой памяти (shared_index.SharedIndexReader).
+        return index.query(query_text, similarity_top_k)
     try:
         retriever = index.as_retriever(similarity_top_k=similarity_top_k)
         retrieved_nodes_with_scores = retriever.retrieve(query_text) 
@@ -255,19 +297,7 @@ def query_semantic_memory(index: VectorStoreIndex, query_text: str, similarity_t
         if retrieved_nodes_with_scores:
             logger.info(f"Найдено {len(retrieved_nodes_with_scores)} релевантных узлов в памяти.")
             for node_with_score in retrieved_nodes_with_scores:
-                results.append({
-                    "source": node_with_score.metadata.get("source", "unknown"),
-                    "chain_id": node_with_score.metadata.get("chain_id"), 
-                    "wikidata_qid": node_with_score.metadata.get("wikidata_qid"),
-                    "language": node_with_score.metadata.get("language"),
-                    "concept_label": node_with_score.metadata.get("concept_label"),
-                    "topic": node_with_score.metadata.get("topic"), 
-                    "filename": node_with_score.metadata.get("filename"),
-                    "score": round(node_with_score.score, 4),
-                    "text_preview": node_with_score.get_text()[:300] + "...", 
-                    "full_text": node_with_score.get_text(), 
-                    "metadata": node_with_score.metadata
-                })
+                results.append(_node_to_result(node_with_score))
         else:
             logger.info("Релевантных записей в памяти не найдено для данного запроса.")
         return results
@@ -275,6 +305,35 @@ def query_semantic_memory(index: VectorStoreIndex, query_text: str, similarity_t
         logger.error(f"Ошибка при выполнении запроса к семантическому индексу: {e}", exc_info=True)
         return None
 
+def query_semantic_memory_batch(index: "VectorStoreIndex", query_texts: List[str], similarity_top_k: int = 3) -> List[Optional[List[Dict[str, Any]]]]:
+    """
+    Пакет запросов к индексу: эмбеддинги всех запросов считаются одним прямым проходом
+    модели, затем поиск выполняется по готовым векторам. Результат по каждому запросу —
+    как у query_semantic_memory (None при ошибке этого запроса).
+    """
+    if index is None:
+        logger.error("В query_semantic_memory_batch передан пустой индекс (None). Запросы не могут быть выполнены.")
+        return [None] * len(query_texts)
+    if not query_texts:
+        return []
+    if getattr(index, "is_shared_reader", False):
+        return index.query_batch(query_texts, similarity_top_k)
+    from llama_index.core import QueryBundle
+    logger.info(f"Выполнение пакета из {len(query_texts)} семантических запросов (top_k={similarity_top_k})")
+    # Для all-MiniLM-L6-v2 инструкции запроса и документа не задаются, поэтому пакетный
+    # эмбеддинг текстов совпадает с эмбеддингом запроса.
+    embeddings = get_component("embedding_model").get_text_embedding_batch(query_texts)
+    retriever = index.as_retriever(similarity_top_k=similarity_top_k)
+    batch_results: List[Optional[List[Dict[str, Any]]]] = []
+    for query_text, embedding in zip(query_texts, embeddings):
+        try:
+            nodes = retriever.retrieve(QueryBundle(query_str=query_text, embedding=embedding))
+            batch_results.append([_node_to_result(node_with_score) for node_with_score in nodes or []])
+        except Exception as e:
+            logger.error(f"Ошибка семантического запроса '{query_text}' в пакете: {e}", exc_info=True)
+            batch_results.append(None)
+    return batch_results
+
 # --- Пример использования и тестирования модуля ---
 if __name__ == "__main__":
     from utils import setup_logging
@@ -0,0 +1,272 @@
+# session_store.py
+# Состояние сессий пользователей: недавние восприятия, извлеченные воспоминания, выбранные
+# гипотезы и переопределения sDNA. Ядро получает контекст сессии во входе цикла и может
+# переиспользовать еще актуальные результаты (например, не искать в памяти повторно,
+# если тема разговора не сменилась).
+#
+# Хранилище — LRU в памяти процесса с ограничением числа сессий и общего объема;
+# сессии, вытесненные по лимитам, при заданном spill_dir выгружаются на диск и
+# поднимаются обратно при следующем запросе пользователя. Простаивающие дольше
+# idle_ttl_seconds сессии удаляются совсем: их контекст считается устаревшим.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+from single_flight import normalize_query_text
+
+logger = logging.getLogger(__name__)
+
+SESSION_SPILL_DIR_ENV = "SRIS_SESSION_SPILL_DIR"
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_MAX_TOTAL_BYTES = 64 * 1024 * 1024
+DEFAULT_IDLE_TTL_SECONDS = 30 * 60
+DEFAULT_MAX_TURNS = 8
+# Доля общих ключевых терминов, при которой тема считается той же (см. topic_unchanged).
+TOPIC_OVERLAP_THRESHOLD = 0.5
+
+
+def _key_terms(perception: Dict[str, Any]) -> set:
+    terms = perception.get("key_terms_and_entities") or []
+    if not isinstance(terms, list):
+        return set()
+    return {str(term).strip().lower() for term in terms if str(term).strip()}
+
+
+def same_query(text: Optional[str], previous_text: Optional[str]) -> bool:
+    return bool(text) and bool(previous_text) and normalize_query_text(text) == normalize_query_text(previous_text)
+
+
+def topic_unchanged(perception: Dict[str, Any], previous: Optional[Dict[str, Any]],
+                    threshold: float = TOPIC_OVERLAP_THRESHOLD) -> bool:
+    """
+    Та же ли тема у нового восприятия, что и у предыдущего: совпадает область знаний и
+    ключевые термины пересекаются не меньше чем на threshold (коэффициент Жаккара).
+    Без ключевых терминов сравниваются краткие изложения.
+    """
+    if not previous:
+        return False
+    if str(perception.get("knowledge_domain", "")).lower() != str(previous.get("knowledge_domain", "")).lower():
+        return False
+    terms, previous_terms = _key_terms(perception), _key_terms(previous)
+    if terms and previous_terms:
+        return len(terms & previous_terms) / len(terms | previous_terms) >= threshold
+    summary = str(perception.get("summary") or "").strip().lower()
+    return bool(summary) and summary == str(previous.get("summary") or "").strip().lower()
+
+
+class UserSession:
+    """Сессия одного пользователя: последние ходы диалога и переопределения sDNA."""
+    def __init__(self, user_id: str, max_turns: int = DEFAULT_MAX_TURNS):
+        self.user_id = user_id
+        self.turns: deque = deque(maxlen=max_turns)
+        self.sdna_overrides: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.last_access = 0.0
+        self.size_bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "turns": list(self.turns), "sdna_overrides": self.sdna_overrides,
+                "created_at": self.created_at}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_turns: int = DEFAULT_MAX_TURNS) -> "UserSession":
+        session = cls(data["user_id"], max_turns)
+        session.turns.extend(data.get("turns", []))
+        session.sdna_overrides = data.get("sdna_overrides", {})
+        session.created_at = data.get("created_at", session.created_at)
+        return session
+
+    def measure(self) -> int:
+        self.size_bytes = len(json.dumps(self.to_dict(), ensure_ascii=False, default=str).encode("utf-8"))
+        return self.size_bytes
+
+    def context(self) -> Dict[str, Any]:
+        """Контекст для входа цикла SRIS (input_dict["session"])."""
+        last_turn = self.turns[-1] if self.turns else {}
+        return {
+            "user_id": self.user_id,
+            "last_query_text": last_turn.get("query_text"),
+            "last_perception": last_turn.get("perception"),
+            "memory_retrieved": last_turn.get("memory_retrieved", False),
+            "retrieved_memories_summary": last_turn.get("retrieved_memories_summary"),
+            "recent_hypotheses": [turn.get("chosen_hypothesis") for turn in self.turns if turn.get("chosen_hypothesis")],
+            "sdna_overrides": dict(self.sdna_overrides),
+        }
+
+
+class SessionStore:
+    """
+    Потокобезопасное LRU-хранилище сессий. Лимиты: max_sessions сессий и max_total_bytes
+    суммарного объема (размер сессии — длина ее JSON); при превышении вытесняются самые
+    давно использованные сессии — на диск, если задан spill_dir, иначе удаляются.
+    """
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+                 idle_ttl_seconds: float = DEFAULT_IDLE_TTL_SECONDS, max_turns: int = DEFAULT_MAX_TURNS,
+                 spill_dir: Optional[str] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_total_bytes = max_total_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_turns = max_turns
+        self.spill_dir = spill_dir
+        self._clock = clock
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.spilled = 0
+        self.restored = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "SessionStore":
+        return cls(spill_dir=os.environ.get(SESSION_SPILL_DIR_ENV) or None, **kwargs)
+
+    # --- Выгрузка на диск ---
+    def _spill_path(self, user_id: str) -> str:
+        digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.json")
+
+    def _spill(self, session: UserSession) -> None:
+        if not self.spill_dir:
+            return
+        try:
+            with open(self._spill_path(session.user_id), "w", encoding="utf-8") as f:
+                json.dump({**session.to_dict(), "spilled_at": time.time()}, f, ensure_ascii=False, default=str)
+            self.spilled += 1
+        except OSError as e:
+            logger.error(f"SessionStore: Не удалось выгрузить сессию '{session.user_id}': {e}")
+
+    def _restore(self, user_id: str) -> Optional[UserSession]:
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(user_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.remove(path)
+            # На диске сессия тоже простаивает: устаревшая не поднимается.
+            if time.time() - data.get("spilled_at", 0) >= self.idle_ttl_seconds:
+                self.evicted_idle += 1
+                return None
+            session = UserSession.from_dict(data, self.max_turns)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"SessionStore: Не удалось загрузить выгруженную сессию '{user_id}': {e}")
+            return None
+        self.restored += 1
+        return session
+
+    def _discard_spilled(self, user_id: str) -> None:
+        if self.spill_dir:
+            try:
+                os.remove(self._spill_path(user_id))
+            except FileNotFoundError:
+                pass
+
+    # --- Вытеснение (вызывается под self._lock) ---
+    def _remove(self, user_id: str) -> UserSession:
+        session = self._sessions.pop(user_id)
+        self._total_bytes -= session.size_bytes
+        return session
+
+    def _evict_idle(self) -> None:
+        now = self._clock()
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.idle_ttl_seconds:
+                break
+            self._remove(user_id)
+            self.evicted_idle += 1
+
+    def _enforce_caps(self) -> None:
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._total_bytes > self.max_total_bytes):
+            self._spill(self._remove(next(iter(self._sessions))))
+
+    def _get_locked(self, user_id: str, create: bool) -> Optional[UserSession]:
+        self._evict_idle()
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = self._restore(user_id)
+            if session is None:
+                if not create:
+                    return None
+                session = UserSession(user_id, self.max_turns)
+            self._sessions[user_id] = session
+            self._total_bytes += session.measure()
+        self._sessions.move_to_end(user_id)
+        session.last_access = self._clock()
+        self._enforce_caps()
+        return session
+
+    def _resize(self, session: UserSession) -> None:
+        previous = session.size_bytes
+        self._total_bytes += session.measure() - previous
+        self._enforce_caps()
+
+    # --- Публичный интерфейс ---
+    def context_for(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Контекст сессии для цикла SRIS или None, если у пользователя нет сессии."""
+        with self._lock:
+            session = self._get_locked(user_id, create=False)
+            return session.context() if session else None
+
+    def record_cycle(self, user_id: str, query_text: str, reasoning_result: Dict[str, Any]) -> None:
+        """Запоминает ход диалога по результату run_sris_cycle (только успешные циклы)."""
+        if not reasoning_result or reasoning_result.get("status") != "ok":
+            return
+        chain = reasoning_result.get("full_reasoning_chain") or {}
+        turn = {
+            "reasoning_id": reasoning_result.get("reasoning_id"),
+            "query_text": query_text,
+            "perception": chain.get("perception_struct"),
+            # Поиск в памяти, пропущенный из-за дедлайна, не считается выполненным.
+            "memory_retrieved": chain.get("mode") == "full_reasoning" and "semantic_memory" not in (chain.get("degraded_stages") or []),
+            "retrieved_memories_summary": chain.get("retrieved_memories_summary"),
+            "chosen_hypothesis": (chain.get("chosen_hypothesis") or {}).get("hypothesis"),
+            "at": time.time(),
+        }
+        with self._lock:
+            session = self._get_locked(user_id, create=True)
+            session.turns.append(turn)
+            self._resize(session)
+
+    def set_sdna_overrides(self, user_id: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            session = self._get_locked(user_id, create=True)
+            session.sdna_overrides.update(overrides)
+            self._resize(session)
+            return dict(session.sdna_overrides)
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            existed = user_id in self._sessions
+            if existed:
+                self._remove(user_id)
+            self._discard_spilled(user_id)
+            return existed
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            before = self.evicted_idle
+            self._evict_idle()
+            return self.evicted_idle - before
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "total_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_total_bytes": self.max_total_bytes,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "evicted_idle": self.evicted_idle,
+                "spilled": self.spilled,
+                "restored": self.restored,
+            }
@@ -0,0 +1,492 @@
+# shared_index.py
+# Семантический индекс для нескольких процессов SRIS (uvicorn --workers N, GUI, импортер знаний).
+#
+# Один процесс-писатель владеет индексом LlamaIndex и моделью эмбеддингов: только он изменяет
+# индекс и сохраняет цепочки рассуждений (запись в semantic_memory_storage больше не гоняется
+# между процессами). После изменений писатель публикует снимок индекса — нормированные векторы
+# (float32, по строке на документ) и записи документов — в каталог поколения в разделяемой памяти
+# (/dev/shm) и увеличивает счетчик поколений (8 байт, отображенных в память). Читатели отображают
+# файлы снимка только для чтения: страницы общие для всех процессов, поэтому добавление воркеров
+# не умножает расход памяти; при смене счетчика читатель переключается на новый снимок.
+# Эмбеддинги запросов читатели получают у писателя — модель эмбеддингов загружена один раз.
+#
+# Протокол писателя — JSON-строки по Unix-сокету, как у llm_worker:
+#   -> {"id": 1, "op": "ping"}          <- {"id": 1, "ok": true, "backend": "...", "snapshot_dir": "...", "generation": 3}
+#   -> {"id": 2, "op": "embed", "texts": ["..."]}                 <- {"id": 2, "ok": true, "vectors": [[...]]}
+#   -> {"id": 3, "op": "save_chain", "chain": {...}}              <- {"id": 3, "ok": true, "path": "..."}
+#   -> {"id": 4, "op": "add_documents", "documents": [{"text": "...", "metadata": {...}}]}  <- {"id": 4, "ok": true, "added": 1}
+#
+#   python shared_index.py --socket /tmp/sris_index_writer.sock            # индекс LlamaIndex
+#   python shared_index.py --socket /tmp/sris_index_writer.sock --stub     # хешированные эмбеддинги, без моделей
+#   SRIS_SHARED_INDEX_SOCKET=/tmp/sris_index_writer.sock uvicorn sris_server:app --workers 4
+import argparse
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llm_client import LLMWorkerClient, LLMWorkerError
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SHARED_INDEX_SOCKET_ENV = "SRIS_SHARED_INDEX_SOCKET"
+DEFAULT_SOCKET_PATH = "/tmp/sris_index_writer.sock"
+DEFAULT_SNAPSHOT_DIR = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "sris_index")
+# Снимок публикуется не чаще раза в PUBLISH_INTERVAL_SECONDS: серия сохранений цепочек дает одно поколение.
+PUBLISH_INTERVAL_SECONDS = 0.5
+# Старые поколения удаляются не сразу: читатель мог прочитать счетчик, но еще не открыть каталог.
+KEEP_GENERATIONS = 3
+PROTOCOL_VERSION = 1
+
+_COUNTER = struct.Struct("<Q")
+
+
+def shared_index_enabled() -> bool:
+    return bool(os.environ.get(SHARED_INDEX_SOCKET_ENV))
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else [float(v) for v in vector]
+
+
+# --- Снимок и счетчик поколений ---
+class GenerationCounter:
+    """Счетчик поколений снимка: 8 байт в файле, отображенном в память всех процессов."""
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        if writable and not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(_COUNTER.pack(0))
+        self._file = open(path, "r+b" if writable else "rb")
+        self._map = mmap.mmap(self._file.fileno(), _COUNTER.size, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+    @property
+    def value(self) -> int:
+        return _COUNTER.unpack_from(self._map, 0)[0]
+
+    def set(self, value: int) -> None:
+        _COUNTER.pack_into(self._map, 0, value)
+        self._map.flush()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def _generation_dir(snapshot_dir: str, generation: int) -> str:
+    return os.path.join(snapshot_dir, f"gen-{generation:08d}")
+
+
+def write_snapshot(snapshot_dir: str, generation: int, vectors: List[Sequence[float]], records: List[Dict[str, Any]]) -> str:
+    """Пишет снимок во временный каталог и атомарно переименовывает его в gen-<N>."""
+    target = _generation_dir(snapshot_dir, generation)
+    tmp = tempfile.mkdtemp(prefix=".gen-", dir=snapshot_dir)
+    dim = len(vectors[0]) if vectors else 0
+    with open(os.path.join(tmp, "vectors.f32"), "wb") as f:
+        for vector in vectors:
+            array("f", _normalize(vector)).tofile(f)
+    offsets = []
+    with open(os.path.join(tmp, "records.jsonl"), "wb") as f:
+        for record in records:
+            offsets.append(f.tell())
+            f.write(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+        offsets.append(f.tell())
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"generation": generation, "count": len(vectors), "dim": dim, "offsets": offsets}, f)
+    os.rename(tmp, target)
+    return target
+
+
+class _Snapshot:
+    """Отображенный только для чтения снимок одного поколения."""
+    def __init__(self, generation_dir: str):
+        with open(os.path.join(generation_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.generation = meta["generation"]
+        self.count = meta["count"]
+        self.dim = meta["dim"]
+        self._offsets = meta["offsets"]
+        self._maps = []
+        self._vectors = self._map(os.path.join(generation_dir, "vectors.f32"))
+        self._records = self._map(os.path.join(generation_dir, "records.jsonl"))
+        self.matrix = None
+        if self._vectors is not None:
+            if NUMPY_AVAILABLE:
+                self.matrix = np.frombuffer(self._vectors, dtype=np.float32).reshape(self.count, self.dim)
+            else:
+                self.matrix = memoryview(self._vectors).cast("f")
+
+    def _map(self, path: str) -> Optional[mmap.mmap]:
+        if os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def record(self, row: int) -> Dict[str, Any]:
+        return json.loads(self._records[self._offsets[row]:self._offsets[row + 1]])
+
+    def top_k(self, query_vector: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        if not self.count or self.matrix is None:
+            return []
+        query = _normalize(query_vector)
+        if NUMPY_AVAILABLE:
+            scores = self.matrix @ np.asarray(query, dtype=np.float32)
+            rows = np.argsort(-scores)[:k]
+            return [(int(row), float(scores[row])) for row in rows]
+        scores = [sum(a * b for a, b in zip(query, self.matrix[row * self.dim:(row + 1) * self.dim])) for row in range(self.count)]
+        rows = sorted(range(self.count), key=lambda row: -scores[row])[:k]
+        return [(row, scores[row]) for row in rows]
+
+
+# --- Бэкенды писателя ---
+class LlamaIndexBackend:
+    """Индекс LlamaIndex и модель эмбеддингов из semantic_memory_index (только в процессе писателя)."""
+    name = "llama_index"
+
+    def __init__(self):
+        self._index = None
+
+    def warm(self) -> None:
+        from lazy_components import get_component
+        from semantic_memory_index import get_or_build_semantic_index
+        get_component("embedding_model")
+        self._index = get_or_build_semantic_index(rebuild=False)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        from lazy_components import get_component
+        return [list(v) for v in get_component("embedding_model").get_text_embedding_batch(texts)]
+
+    def add(self, text: str, metadata: Dict[str, Any]) -> None:
+        from llama_index.core import Document, VectorStoreIndex
+        from semantic_memory_index import INDEX_STORAGE_DIR
+        document = Document(text=text, metadata=metadata)
+        if self._index is None:
+            self._index = VectorStoreIndex.from_documents([document])
+        else:
+            self._index.insert(document)
+        self._index.storage_context.persist(persist_dir=INDEX_STORAGE_DIR)
+
+    def export(self) -> Tuple[List[Sequence[float]], List[Dict[str, Any]]]:
+        if self._index is None:
+            return [], []
+        vectors, records = [], []
+        for node_id, vector in self._index.vector_store.to_dict().get("embedding_dict", {}).items():
+            node = self._index.docstore.get_node(node_id, raise_error=False)
+            if node is None:
+                continue
+            vectors.append(vector)
+            records.append({"node_id": node_id, "text": node.get_content(), "metadata": node.metadata})
+        return vectors, records
+
+
+class StubIndexBackend:
+    """Индекс в памяти на хешированных n-граммах (text_embeddings): без моделей, для тестов и отладки."""
+    name = "stub"
+
+    def __init__(self, dim: int = 256):
+        from text_embeddings import HashedNgramEmbedder
+        self._embedder = HashedNgramEmbedder(dim=dim)
+        self._rows: List[Tuple[List[float], Dict[str, Any]]] = []
+
+    def warm(self) -> None:
+        pass
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        dense = []
+        for sparse in self._embedder.embed(texts):
+            vector = [0.0] * self._embedder.dim
+            for index, weight in sparse.items():
+                vector[index] = weight
+            dense.append(vector)
+        return dense
+
+    def add(self, text: str, metadata: Dict[str, Any]) -> None:
+        self._rows.append((self.embed([text])[0], {"node_id": str(len(self._rows)), "text": text, "metadata": metadata}))
+
+    def export(self) -> Tuple[List[Sequence[float]], List[Dict[str, Any]]]:
+        return [vector for vector, _ in self._rows], [record for _, record in self._rows]
+
+
+# --- Писатель ---
+class _WriterRequestHandler(socketserver.StreamRequestHandler):
+    def _send(self, message: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(message, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        server: "IndexWriterServer" = self.server
+        for raw_line in self.rfile:
+            try:
+                request = json.loads(raw_line)
+            except ValueError:
+                self._send({"id": None, "ok": False, "error": "bad_request"})
+                continue
+            request_id = request.get("id")
+            op = request.get("op")
+            try:
+                if op == "ping":
+                    self._send({"id": request_id, "ok": True, "backend": server.backend.name, "protocol": PROTOCOL_VERSION,
+                                "snapshot_dir": server.snapshot_dir, "generation": server.counter.value})
+                elif op == "embed":
+                    self._send({"id": request_id, "ok": True, "vectors": server.backend.embed(list(request.get("texts", [])))})
+                elif op == "save_chain":
+                    self._send({"id": request_id, "ok": True, "path": server.save_chain(request["chain"])})
+                elif op == "add_documents":
+                    self._send({"id": request_id, "ok": True, "added": server.add_documents(request.get("documents", []))})
+                else:
+                    self._send({"id": request_id, "ok": False, "error": f"unknown op '{op}'"})
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                logger.error(f"IndexWriter: Ошибка обработки запроса {request_id} ({op}): {e}", exc_info=True)
+                try:
+                    self._send({"id": request_id, "ok": False, "error": str(e)})
+                except OSError:
+                    return
+
+
+class IndexWriterServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Единственный писатель: изменения индекса и сохранение цепочек сериализуются блокировкой,
+    снимок для читателей публикуется фоновым потоком (publish_interval <= 0 — сразу после изменения).
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, backend: Any, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+                 chain_sub_directory: Optional[str] = None, publish_interval: float = PUBLISH_INTERVAL_SECONDS):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.socket_path = socket_path
+        self.backend = backend
+        self.snapshot_dir = snapshot_dir
+        self.chain_sub_directory = chain_sub_directory
+        self.publish_interval = publish_interval
+        self.counter = GenerationCounter(os.path.join(snapshot_dir, "generation"), writable=True)
+        self._write_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self.publish()
+        if publish_interval > 0:
+            threading.Thread(target=self._publisher, name="index-publisher", daemon=True).start()
+        super().__init__(socket_path, _WriterRequestHandler)
+
+    def publish(self) -> int:
+        with self._write_lock:
+            vectors, records = self.backend.export()
+            generation = self.counter.value + 1
+            write_snapshot(self.snapshot_dir, generation, vectors, records)
+            self.counter.set(generation)
+        self._prune(generation)
+        logger.info(f"IndexWriter: Опубликовано поколение {generation} ({len(records)} документов).")
+        return generation
+
+    def _prune(self, generation: int) -> None:
+        for entry in os.listdir(self.snapshot_dir):
+            if entry.startswith("gen-") and int(entry[4:]) <= generation - KEEP_GENERATIONS:
+                shutil.rmtree(os.path.join(self.snapshot_dir, entry), ignore_errors=True)
+
+    def _publisher(self) -> None:
+        while not self._closed:
+            self._dirty.wait()
+            if self._closed:
+                return
+            time.sleep(self.publish_interval)  # копим изменения в одно поколение
+            self._dirty.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"IndexWriter: Не удалось опубликовать снимок: {e}", exc_info=True)
+
+    def _changed(self) -> None:
+        if self.publish_interval > 0:
+            self._dirty.set()
+        else:
+            self.publish()
+
+    def save_chain(self, chain: Dict[str, Any]) -> Optional[str]:
+        from semantic_memory_fs import save_chain_to_fs
+        from semantic_memory_index import chain_document_payload
+        with self._write_lock:
+            path = save_chain_to_fs(chain, self.chain_sub_directory)
+            if path:
+                self.backend.add(*chain_document_payload(chain, os.path.basename(path)))
+        if path:
+            self._changed()
+        return path
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        with self._write_lock:
+            for document in documents:
+                self.backend.add(document["text"], document.get("metadata", {}))
+        if documents:
+            self._changed()
+        return len(documents)
+
+    def server_close(self) -> None:
+        self._closed = True
+        self._dirty.set()
+        super().server_close()
+        self.counter.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def start_writer_thread(socket_path: str, snapshot_dir: str, backend: Optional[Any] = None, **kwargs: Any) -> IndexWriterServer:
+    """Запускает писателя в фоновом потоке текущего процесса (тесты, бенчмарки)."""
+    server = IndexWriterServer(socket_path, backend or StubIndexBackend(), snapshot_dir, **kwargs)
+    threading.Thread(target=server.serve_forever, name="index-writer", daemon=True).start()
+    return server
+
+
+# --- Клиент и читатель ---
+class IndexWriterClient(LLMWorkerClient):
+    """Клиент писателя: тот же протокол JSON-строк и пул соединений, что у клиента LLM-воркера."""
+    def __init__(self, socket_path: Optional[str] = None, **kwargs: Any):
+        super().__init__(socket_path or os.environ.get(SHARED_INDEX_SOCKET_ENV) or DEFAULT_SOCKET_PATH, **kwargs)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self._request({"op": "embed", "texts": list(texts)})["vectors"]
+
+    def save_chain(self, chain: Dict[str, Any]) -> Optional[str]:
+        return self._request({"op": "save_chain", "chain": chain})["path"]
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        return self._request({"op": "add_documents", "documents": documents})["added"]
+
+
+class SharedIndexReader:
+    """
+    Читатель снимков писателя. Подставляется вместо VectorStoreIndex: query_semantic_memory
+    и query_semantic_memory_batch направляют запросы сюда (is_shared_reader). Результаты — в формате
+    semantic_memory_index (source, chain_id, score, text_preview, ...).
+    """
+    is_shared_reader = True
+
+    def __init__(self, client: Optional[IndexWriterClient] = None, snapshot_dir: Optional[str] = None):
+        self.client = client or IndexWriterClient()
+        self.snapshot_dir = snapshot_dir or self.client.ping()["snapshot_dir"]
+        self._counter = GenerationCounter(os.path.join(self.snapshot_dir, "generation"))
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._counter.value
+
+    def _current(self) -> _Snapshot:
+        generation = self._counter.value
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        with self._lock:
+            while self._snapshot is None or self._snapshot.generation != generation:
+                try:
+                    self._snapshot = _Snapshot(_generation_dir(self.snapshot_dir, generation))
+                    logger.info(f"SharedIndexReader: Подключено поколение снимка {generation} ({self._snapshot.count} документов).")
+                except FileNotFoundError:
+                    # Поколение уже удалено писателем — берем более новое.
+                    latest = self._counter.value
+                    if latest == generation:
+                        raise
+                    generation = latest
+            return self._snapshot
+
+    def _result(self, snapshot: _Snapshot, row: int, score: float) -> Dict[str, Any]:
+        record = snapshot.record(row)
+        metadata = record.get("metadata") or {}
+        text = record.get("text", "")
+        return {
+            "source": metadata.get("source", "unknown"),
+            "chain_id": metadata.get("chain_id"),
+            "wikidata_qid": metadata.get("wikidata_qid"),
+            "language": metadata.get("language"),
+            "concept_label": metadata.get("concept_label"),
+            "topic": metadata.get("topic"),
+            "filename": metadata.get("filename"),
+            "score": round(score, 4),
+            "text_preview": text[:300] + "...",
+            "full_text": text,
+            "metadata": metadata
+        }
+
+    def query_batch(self, query_texts: List[str], similarity_top_k: int = 3) -> List[Optional[List[Dict[str, Any]]]]:
+        if not query_texts:
+            return []
+        try:
+            vectors = self.client.embed(query_texts)
+        except LLMWorkerError as e:
+            logger.error(f"SharedIndexReader: Писатель индекса недоступен для эмбеддингов: {e}")
+            return [None] * len(query_texts)
+        snapshot = self._current()
+        return [[self._result(snapshot, row, score) for row, score in snapshot.top_k(vector, similarity_top_k)] for vector in vectors]
+
+    def query(self, query_text: str, similarity_top_k: int = 3) -> Optional[List[Dict[str, Any]]]:
+        return self.query_batch([query_text], similarity_top_k)[0]
+
+
+_default_client: Optional[IndexWriterClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_writer_client() -> IndexWriterClient:
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = IndexWriterClient()
+    return _default_client
+
+
+def open_reader() -> SharedIndexReader:
+    """Фабрика компонента "semantic_index" в процессах-читателях."""
+    try:
+        return SharedIndexReader(get_writer_client())
+    except LLMWorkerError as e:
+        raise RuntimeError(f"Писатель индекса недоступен: {e}") from e
+
+
+def main() -> None:
+    from utils import setup_logging
+    setup_logging()
+    parser = argparse.ArgumentParser(description="SRIS semantic index writer (single writer, shared-memory snapshots)")
+    parser.add_argument("--socket", default=os.environ.get(SHARED_INDEX_SOCKET_ENV) or DEFAULT_SOCKET_PATH)
+    parser.add_argument("--snapshot-dir", default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--publish-interval", type=float, default=PUBLISH_INTERVAL_SECONDS)
+    parser.add_argument("--stub", action="store_true", help="хешированные эмбеддинги без загрузки моделей")
+    args = parser.parse_args()
+
+    backend = StubIndexBackend() if args.stub else LlamaIndexBackend()
+    logger.info(f"IndexWriter: Загрузка индекса ({backend.name})...")
+    backend.warm()
+    server = IndexWriterServer(args.socket, backend, args.snapshot_dir, publish_interval=args.publish_interval)
+    logger.info(f"IndexWriter: Ожидание запросов на {args.socket}, снимки в {args.snapshot_dir}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
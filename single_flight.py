@@ -0,0 +1,54 @@
+# single_flight.py
+# Объединение одинаковых одновременных запросов (single-flight): пока вычисление по ключу
+# выполняется, новые вызовы с тем же ключом ждут его результат вместо повторного запуска.
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def normalize_query_text(text: str) -> str:
+    """Текст запроса для ключа объединения: без различий в регистре и пробелах."""
+    return " ".join(text.split()).casefold()
+
+
+class SingleFlight:
+    """
+    Single-flight для asyncio: первый вызов с ключом («ведущий») запускает вычисление
+    отдельной задачей, остальные, пришедшие до его завершения, получают тот же результат
+    (или то же исключение). Задача защищена от отмены ожидающими: если клиент ведущего
+    запроса отключится, присоединившиеся запросы все равно получат ответ.
+    Ключ освобождается сразу после завершения: следующий запрос вычисляется заново.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _release(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Возвращает (результат, coalesced): coalesced=True, если запрос присоединился к чужому вычислению."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.followers += 1
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done, key=key: self._release(key, done))
+        self.leaders += 1
+        return await asyncio.shield(task), False
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.leaders,
+            "coalesced_requests": self.followers,
+            "coalesced_ratio": round(self.followers / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,232 @@
+# sris_gui.py — Tk-клиент для диалога с ядром SRIS (общий для SRIS и SRK)
+# Ядро вызывается через kernel_client: в том же процессе или через HTTP API sris_server.
+import argparse
+import logging
+import platform
+import threading
+import tkinter as tk
+from tkinter import scrolledtext, Menu, DISABLED, NORMAL
+from typing import Any, Dict, Optional
+
+from kernel_client import KernelClient, InProcessKernelClient, HttpKernelClient
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# GUI ДЛЯ ДИАЛОГА С SRIS
+# ==============================================================================
+class SRISChatApp:
+    def __init__(self, root_tk, client: KernelClient, agent_name: str = "SRIS"):
+        self.root = root_tk
+        self.client = client
+        self.agent_name = agent_name
+        self.root.title(f"{agent_name} - Диалоговый агент")
+        self.root.geometry("700x550")
+
+        self.bg_color = "#282c34"
+        self.text_color = "#abb2bf"
+        self.entry_bg = "#1e2228"
+        self.button_bg = "#61afef"
+        self.button_fg = "#282c34"
+        self.sris_color = "#98c379"
+        self.user_color = "#61afef"
+        self.system_color = "#c678dd"
+
+        self.root.configure(bg=self.bg_color)
+
+        self.chat_history = scrolledtext.ScrolledText(
+            self.root, wrap=tk.WORD, state=DISABLED, bg=self.entry_bg, fg=self.text_color,
+            font=("Arial", 10), padx=10, pady=10, relief=tk.FLAT, borderwidth=0, exportselection=True
+        )
+        self.chat_history.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.chat_history.bind("<KeyPress>", self._prevent_chat_edit)
+
+        self.chat_history.tag_config("user", foreground=self.user_color, font=("Arial", 10, "bold"))
+        self.chat_history.tag_config("sris", foreground=self.sris_color, font=("Arial", 10, "italic"))
+        self.chat_history.tag_config("system", foreground=self.system_color, font=("Arial", 9, "italic"))
+
+        self.input_frame = tk.Frame(self.root, bg=self.bg_color)
+        self.input_frame.pack(padx=10, pady=(0,10), fill=tk.X, expand=False)
+
+        self.user_input_entry = tk.Entry(
+            self.input_frame, width=70, bg=self.entry_bg, fg=self.text_color,
+            insertbackground=self.text_color, font=("Arial", 11), relief=tk.FLAT,
+            borderwidth=0, exportselection=True
+        )
+        self.user_input_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=5)
+        self.user_input_entry.bind("<Return>", self.send_message_event)
+
+        self.send_button = tk.Button(
+            self.input_frame, text="Отправить", command=self.send_message_event,
+            bg=self.button_bg, fg=self.button_fg, activebackground="#528baf",
+            activeforeground=self.button_fg, relief=tk.FLAT, borderwidth=0,
+            padx=10, pady=5, font=("Arial", 10, "bold")
+        )
+        self.send_button.pack(side=tk.RIGHT, padx=(5,0))
+
+        self._make_context_menu(self.chat_history)
+        self._make_context_menu(self.user_input_entry)
+        self._bind_keyboard_shortcuts()
+
+        self.add_message_to_chat("System", f"Инициализация {self.agent_name}...")
+
+        # Прогрев ядра идет в фоне, ввод включается после его завершения (как в SRK).
+        self.user_input_entry.config(state=DISABLED)
+        self.send_button.config(state=DISABLED)
+        threading.Thread(target=self._start_client_in_thread, daemon=True).start()
+
+    def _start_client_in_thread(self):
+        try:
+            status = self.client.start()
+            error = None
+        except Exception as e:
+            logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА во время фоновой инициализации: {e}", exc_info=True)
+            status, error = {}, e
+        self.root.after(0, lambda: self._show_start_status(status, error))
+
+    def _show_start_status(self, status: Dict[str, Any], error: Optional[Exception]):
+        if error is not None:
+            self.add_message_to_chat("System", f"КРИТИЧЕСКАЯ ОШИБКА ИНИЦИАЛИЗАЦИИ: {error}", is_system=True)
+        self.add_message_to_chat(self.agent_name, f"Здравствуйте! Я {self.agent_name}. Чем могу помочь?", is_sris=True)
+        self.add_message_to_chat("System", "Подсказка: логи работы ядра SRIS выводятся в эту консоль.", is_system=True)
+        if status.get("error_message"):
+            self.add_message_to_chat("System", f"ВНИМАНИЕ: ядро недоступно: {status['error_message']}", is_system=True)
+        if status.get("semantic_index_ready"):
+            self.add_message_to_chat("System", "Семантический индекс памяти успешно инициализирован.", is_system=True)
+        else:
+            self.add_message_to_chat("System", "ВНИМАНИЕ: Семантический индекс памяти НЕ инициализирован.", is_system=True)
+
+        if status.get("temporality_active"):
+            tick = status.get("tick")
+            self.add_message_to_chat("System", "Temporality Core активен." + (f" Начальный тик: {tick}" if tick is not None else ""), is_system=True)
+        else:
+            self.add_message_to_chat("System", "ПРЕДУПРЕЖДЕНИЕ: Temporality Core не загружен.", is_system=True)
+        self.enable_input()
+
+    def _prevent_chat_edit(self, event):
+        allowed_keys_specific = ['c', 'C', 'a', 'A']
+        allowed_modifiers_general = ['Control_L', 'Control_R', 'Shift_L', 'Shift_R', 'Super_L', 'Super_R', 'Meta_L', 'Meta_R', 'Alt_L', 'Alt_R']
+        navigation_keys = ['Left', 'Right', 'Up', 'Down', 'Home', 'End', 'Prior', 'Next', 'Page_Up', 'Page_Down']
+        is_modifier_pressed = event.state & (1<<2)
+        if platform.system() == "Darwin": is_modifier_pressed = event.state & (1<<3)
+        if is_modifier_pressed and event.keysym.lower() in allowed_keys_specific: return
+        if event.keysym in allowed_modifiers_general or event.keysym in navigation_keys: return
+        return "break"
+
+    def _make_context_menu(self, widget):
+        menu = Menu(widget, tearoff=0, bg=self.entry_bg, fg=self.text_color, activebackground=self.button_bg, activeforeground=self.button_fg, relief=tk.FLAT, font=("Arial", 9))
+        is_text_widget = isinstance(widget, (tk.Text, scrolledtext.ScrolledText))
+        is_entry_widget = isinstance(widget, tk.Entry)
+        if is_text_widget or is_entry_widget: menu.add_command(label="Копировать", command=lambda: self._copy_text(widget))
+        if is_entry_widget:
+            menu.add_command(label="Вырезать", command=lambda: self._cut_text(widget))
+            menu.add_command(label="Вставить", command=lambda: self._paste_text(widget))
+        if is_text_widget or is_entry_widget:
+            menu.add_separator()
+            menu.add_command(label="Выделить все", command=lambda: self._select_all_text(widget))
+        popup_event = "<Button-3>" if platform.system() != "Darwin" else "<Button-2>"
+        widget.bind(popup_event, lambda event: menu.tk_popup(event.x_root, event.y_root))
+
+    def _copy_text(self, widget):
+        try:
+            if widget.selection_get():
+                self.root.clipboard_clear()
+                self.root.clipboard_append(widget.selection_get())
+        except tk.TclError: pass
+
+    def _cut_text(self, widget):
+        try:
+            if widget.selection_get():
+                self._copy_text(widget)
+                widget.delete(tk.SEL_FIRST, tk.SEL_LAST)
+        except tk.TclError: pass
+
+    def _paste_text(self, widget):
+        try:
+            widget.insert(widget.index(tk.INSERT), self.root.clipboard_get())
+        except tk.TclError: pass
+
+    def _select_all_text(self, widget):
+        if isinstance(widget, (tk.Text, scrolledtext.ScrolledText)):
+            widget.tag_add(tk.SEL, "1.0", tk.END); widget.mark_set(tk.INSERT, "1.0"); widget.see(tk.INSERT)
+        elif isinstance(widget, tk.Entry):
+            widget.select_range(0, tk.END); widget.icursor(tk.END)
+        return "break"
+
+    def _bind_keyboard_shortcuts(self):
+        copy_accel = 'Control-c'; paste_accel = 'Control-v'; cut_accel = 'Control-x'; select_all_accel = 'Control-a'
+        if platform.system() == 'Darwin':
+            copy_accel = 'Command-c'; paste_accel = 'Command-v'; cut_accel = 'Command-x'; select_all_accel = 'Command-a'
+        self.user_input_entry.bind(f"<{paste_accel}>", lambda e: self._paste_text(self.user_input_entry))
+        self.user_input_entry.bind(f"<{copy_accel}>", lambda e: self._copy_text(self.user_input_entry))
+        self.user_input_entry.bind(f"<{cut_accel}>", lambda e: self._cut_text(self.user_input_entry))
+        self.user_input_entry.bind(f"<{select_all_accel}>", lambda e: self._select_all_text(self.user_input_entry))
+        self.chat_history.bind(f"<{copy_accel}>", lambda e: self._copy_text(self.chat_history))
+        self.chat_history.bind(f"<{select_all_accel}>", lambda e: self._select_all_text(self.chat_history))
+
+    def add_message_to_chat(self, sender: str, message: str, is_sris: bool = False, is_system: bool = False):
+        self.chat_history.config(state=NORMAL)
+        sender_tag = "user"
+        if is_sris: sender_tag = "sris"
+        elif is_system: sender_tag = "system"
+        self.chat_history.insert(tk.END, f"{sender}: ", (sender_tag,))
+        self.chat_history.insert(tk.END, f"{message}\n\n")
+        self.chat_history.see(tk.END)
+        self.chat_history.config(state=DISABLED)
+
+    def process_sris_cycle_in_thread(self, user_text: str):
+        self.add_message_to_chat(self.agent_name, "*обрабатываю ваш запрос...*", is_sris=True, is_system=True)
+        self.user_input_entry.config(state=DISABLED)
+        self.send_button.config(state=DISABLED)
+
+        try:
+            answer = self.client.ask(user_text)
+        except Exception as e:
+            logger.error(f"Ошибка клиента ядра при обработке запроса: {e}", exc_info=True)
+            answer = {"status": "error", "error_message": str(e)}
+
+        def update_gui_with_response():
+            if answer.get("status") == "ok":
+                self.add_message_to_chat(self.agent_name, answer.get("reply_text") or "(пустой ответ)", is_sris=True)
+            else:
+                error_msg = answer.get("error_message", "неизвестная ошибка")
+                reply = f"[Внутренний статус: {answer.get('status', 'ошибка')}, Детали: {error_msg}] Я не могу сейчас ответить должным образом."
+                self.add_message_to_chat(self.agent_name, reply, is_sris=True, is_system=True)
+            self.enable_input()
+        self.root.after(0, update_gui_with_response)
+
+    def enable_input(self):
+        self.user_input_entry.config(state=NORMAL)
+        self.send_button.config(state=NORMAL)
+        self.user_input_entry.focus_set()
+
+    def send_message_event(self, event=None):
+        user_text = self.user_input_entry.get().strip()
+        if not user_text: return
+        self.add_message_to_chat("Вы", user_text)
+        self.user_input_entry.delete(0, tk.END)
+        thread = threading.Thread(target=self.process_sris_cycle_in_thread, args=(user_text,))
+        thread.daemon = True
+        thread.start()
+
+
+def main(agent_name: str = "SRIS", argv=None):
+    parser = argparse.ArgumentParser(description=f"{agent_name} GUI")
+    parser.add_argument("--server", metavar="URL", help="Работать через HTTP API sris_server (например, http://localhost:8000) вместо ядра в этом процессе.")
+    args = parser.parse_args(argv)
+    client: KernelClient = HttpKernelClient(args.server) if args.server else InProcessKernelClient()
+
+    print(f"--- {agent_name} Kernel с GUI ---")
+    print("--- Логи работы ядра будут выводиться в терминале. ---")
+    print("--- Закройте окно GUI для завершения программы. ---")
+    main_window = tk.Tk()
+    app = SRISChatApp(main_window, client, agent_name=agent_name)
+    main_window.mainloop()
+    print(f"\n--- Программа {agent_name} завершена ---")
+
+
+if __name__ == "__main__":
+    from utils import setup_logging
+    setup_logging()
+    main()
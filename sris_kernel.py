@@ -1,4 +1,5 @@
-# sris_kernel.py — Integrated Reasoning Kernel SRIS 1.0 (with Temporality Core & Full GUI code)
+# sris_kernel.py — Integrated Reasoning Kernel SRIS 1.0 (headless core with Temporality Core)
+# GUI-клиенты (SRIS и SRK) вынесены в sris_gui.py и работают через kernel_client.py.
 
 import logging
 from utils import setup_logging
@@ -6,28 +7,39 @@ from utils import setup_logging
 setup_logging()
 
 # Стандартные импорты SRIS
-from perception_analysis import analyze_perception
+from perception_analysis import analyze_perception, analyze_perception_batch
 from sensorium_core import integrate_sensorium
 from goal_engine import form_goal
 from motivation_engine import evaluate_motivation
 from affect_layer import assess_affect
-from hypothesis_generator import generate_hypotheses
-from adaptive_logic import adjust_hypotheses
-from zav2_context_validator import validate_contextual_hypothesis
+from hypothesis_generator import generate_hypotheses_streaming, fallback_hypotheses
+from adaptive_logic import adjust_hypotheses, template_hypotheses
+from zav2_context_validator import validate_contextual_hypothesis, validate_hypotheses_batch
 from fractal_ontology import check_ontology
-from hypothesis_evaluator import evaluate_hypotheses
+from hypothesis_evaluator import evaluate_hypotheses, evaluate_hypotheses_batch
 from emotional_processor import evaluate_emotion
 from cause_effect import extract_cause_effect
-from semantic_memory_fs import save_chain_to_fs
-from semantic_memory_index import query_semantic_memory, get_or_build_semantic_index
+from semantic_memory_fs import save_chain_to_fs, SMFS_BASE_DIR
+from semantic_memory_index import query_semantic_memory, query_semantic_memory_batch, get_or_build_semantic_index
 from communication_intent import determine_communication_intent
 from neural_motion_core import plan_action
 from tuning_module import run_self_refinement, safety_filter, trace_reasoning_path
 from dream_cycle import run_dream_cycle
 from response_generator import generate_sris_response
+from lazy_components import register_component, get_component
+from cycle_cache import cycle_scope, current_cycle_cache
+from session_store import topic_unchanged, same_query
+from deadline import deadline_scope, current_deadline, stage_allowed, mark_degraded
+from load_policy import default_policy as sris_load_policy, LEVEL_FULL, LEVEL_TEMPLATE_HYPOTHESES, LEVEL_TEMPLATE_RESPONSE, LEVEL_CACHE_ONLY, LEVEL_NAMES
+from response_cache import default_cache as response_cache
+import shared_index
 
 # Стандартные импорты Python
+import os
 import uuid
+import copy
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
 import json
@@ -35,17 +47,21 @@ import random
 import logging
 import time
 
-# ---- GUI Imports ----
-import tkinter as tk
-from tkinter import scrolledtext, Menu, END, DISABLED, NORMAL
-import threading
-import platform
-
 # --- Импорты и экземпляры Temporality Core ---
 try:
-    from temporality_core import TimeSense, ReasoningTimeline
+    from temporality_core import TimeSense, ReasoningTimeline, DEFAULT_TIMELINE_CAPACITY
+    from timeline_store import TimelineStore
     sris_timesense = TimeSense()
-    sris_timeline = ReasoningTimeline(timesense_instance=sris_timesense)
+    # База SQLite открывается при первой записи событий (слив буферов таймлайна), а не при импорте.
+    # Персистентное хранилище содержит все события, поэтому spill-лог пишется,
+    # только если хранилище открыть не удалось.
+    sris_timeline_store: Optional[TimelineStore] = TimelineStore(os.path.join(SMFS_BASE_DIR, "_timeline.sqlite3"))
+    sris_timeline = ReasoningTimeline(
+        timesense_instance=sris_timesense,
+        capacity=DEFAULT_TIMELINE_CAPACITY,
+        spill_path=os.path.join(SMFS_BASE_DIR, "_timeline_spill.jsonl"),
+        store=sris_timeline_store
+    )
     temporality_modules_loaded = True
     logging.info("Temporality Core (TimeSense, ReasoningTimeline) успешно инициализирован.")
 except ImportError:
@@ -57,10 +73,19 @@ except ImportError:
         def get_time_since_event(self, event_id: str) -> Optional[int]: return None
         def get_current_tick(self): return 0
     class ReasoningTimeline: # type: ignore
-        def __init__(self, timesense_instance: Any): pass
+        def __init__(self, timesense_instance: Any, **kwargs: Any): pass
         def record_event(self, event_type: str, event_data: Dict[str, Any], reasoning_chain_id: Optional[str]=None, related_to_tick: Optional[int]=None): pass
     sris_timesense = TimeSense() # type: ignore
     sris_timeline = ReasoningTimeline(sris_timesense) # type: ignore
+    sris_timeline_store = None
+
+# --- Reflective Intelligence Unit (опционально, унаследовано от SRK) ---
+try:
+    from reflective_intelligence_unit import ReflectiveIntelligenceUnit
+    sris_riu: Optional[Any] = ReflectiveIntelligenceUnit(agent_name="SRIS-Prometheus")
+    logging.info("Reflective Intelligence Unit успешно инициализирован.")
+except ImportError:
+    sris_riu = None
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -70,35 +95,170 @@ DEFAULT_SDNA = {"adaptivity":0.7,"ethics_sensitivity":0.8,"thinking_style":"dedu
 DEFAULT_ACTION_CONTEXT_FLAGS = {"threat_confirmed": True}
 PRELIMINARY_MOTIVATION_SIGNAL = {"dominant_drive": "coherence_initial", "motivation_level": 0.5}
 DEFAULT_REASONING_MODE = "default_exploration"
+# Потоковая генерация гипотез: декодирование останавливается, когда набралось
+# HYPOTHESIS_EARLY_STOP_COUNT гипотез с оценкой не ниже HYPOTHESIS_EARLY_STOP_SCORE.
+HYPOTHESIS_EARLY_STOP_SCORE = 0.85
+HYPOTHESIS_EARLY_STOP_COUNT = 2
+HYPOTHESIS_PARALLEL_GENERATIONS = 1
+# Пакетный режим (run_sris_cycle_batch): сколько LLM-этапов разных запросов выполняется
+# одновременно (по числу контекстов llama.cpp, см. mistral_core.LLAMA_CPP_MAX_CONTEXTS).
+BATCH_LLM_CONCURRENCY = 4
+# Типы запросов для "короткого пути": старые метки (user_query_type) и
+# иерархические метки perception_analysis (query_type), как в SRK.
+FAST_PATH_QUERY_KINDS = {
+    "social_greeting": "greeting",
+    "conversation_flow:greeting_social": "greeting",
+    "feedback_statement": "feedback",
+    "conversation_flow:feedback": "feedback",
+    "conversation_flow:closing": "closing",
+}
+# Лестница деградации под нагрузкой на LLM (sris_load_policy, см. load_policy.py): уровень
+# выбирается диспетчером в начале цикла по живым метрикам LLM —
+# full -> template_hypotheses -> template_response -> cache_only.
+# Пакетный режим (офлайн-нагрузка) всегда выполняет полный цикл.
 initial_semantic_index = None
 
 # --- Инициализация "тяжелых" компонентов ---
+# Компоненты создаются при первом обращении или при явном прогреве
+# (lazy_components.warm_up), а не при импорте ядра.
+def _load_semantic_index():
+    # Несколько процессов SRIS: индекс читается из снимка писателя в разделяемой памяти (shared_index).
+    if shared_index.shared_index_enabled():
+        return shared_index.open_reader()
+    index = get_or_build_semantic_index(rebuild=False)
+    if index is None:
+        raise RuntimeError("Семантический индекс памяти не был инициализирован.")
+    return index
+
+register_component("semantic_index", _load_semantic_index, description="LlamaIndex semantic memory index")
+
 def initialize_sris_components():
     global initial_semantic_index
     if initial_semantic_index is None:
-        try:
-            logger.info("Инициализация семантического индекса памяти при запуске...")
-            initial_semantic_index = get_or_build_semantic_index(rebuild=False)
-            if initial_semantic_index:
-                logger.info("Семантический индекс памяти успешно инициализирован.")
-            else:
-                logger.warning("Семантический индекс памяти не был инициализирован.")
-        except Exception as e_index_init:
-            logger.error(f"Критическая ошибка при инициализации семантического индекса: {e_index_init}", exc_info=True)
+        logger.info("Инициализация семантического индекса памяти...")
+        initial_semantic_index = get_component("semantic_index")
+        if initial_semantic_index:
+            logger.info("Семантический индекс памяти успешно инициализирован.")
+        else:
+            logger.warning("Семантический индекс памяти не был инициализирован.")
 
 # --- Вспомогательные функции для разных путей рассуждений ---
-# (Я перенесу их определение перед основным циклом для ясности)
 
-def _handle_fast_path_query(input_dict: Dict[str, Any], perception: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int) -> Dict[str, Any]:
+def _persist_chain(reasoning_chain: Dict[str, Any]) -> None:
+    """Сохраняет цепочку; при общем индексе — через процесс-писатель (он же добавляет ее в индекс)."""
+    if shared_index.shared_index_enabled():
+        try:
+            shared_index.get_writer_client().save_chain(reasoning_chain)
+            return
+        except Exception as e:
+            logger.error(f"Писатель индекса недоступен, цепочка сохраняется локально: {e}")
+    save_chain_to_fs(reasoning_chain)
+
+def _get_fast_path_kind(perception: Dict[str, Any]) -> Optional[str]:
+    for key in ("user_query_type", "query_type"):
+        query_type = perception.get(key)
+        if isinstance(query_type, str):
+            kind = FAST_PATH_QUERY_KINDS.get(query_type.replace(" ", "").lower())
+            if kind:
+                return kind
+    return None
+
+def _riu_context() -> Optional[Dict[str, Any]]:
+    return sris_riu.get_context_for_llm() if sris_riu else None
+
+def _cycle_cache_stats() -> Optional[Dict[str, Any]]:
+    cycle_cache = current_cycle_cache()
+    return cycle_cache.stats() if cycle_cache else None
+
+def _record_deadline(reasoning_chain: Dict[str, Any]) -> None:
+    """Записывает в цепочку дедлайн запроса и этапы, деградировавшие из-за нехватки времени."""
+    deadline = current_deadline()
+    if deadline is not None:
+        reasoning_chain["deadline"] = deadline.to_dict()
+        reasoning_chain["degraded_stages"] = deadline.degraded_stage_names()
+
+def _deadline_perception(raw_fused: str) -> Dict[str, Any]:
+    """Восприятие без LLM, когда на анализ не осталось времени: цикл идет коротким путем."""
+    text = raw_fused or ""
+    return {"original_input": text, "summary": text[:200], "degraded": True,
+            "language_detected": "ru" if any('а' <= char.lower() <= 'я' for char in text) else "en"}
+
+def _fallback_hypothesis_generation(hypotheses: List[str], source: str) -> Dict[str, Any]:
+    """Результат в формате generate_hypotheses_streaming для гипотез, полученных без LLM (source — причина)."""
+    return {"hypotheses": hypotheses, "scores": [None] * len(hypotheses), "stopped_early": False, "generations": [],
+            "time_to_first_ms": None, "time_to_best_ms": None, "total_ms": 0.0, "fallback": source}
+
+def _record_load_level(reasoning_chain: Dict[str, Any], load_level: int) -> None:
+    """Отмечает в цепочке уровень деградации под нагрузкой; с template_response ответ строится по шаблону."""
+    if load_level > LEVEL_FULL:
+        reasoning_chain["load_level"] = LEVEL_NAMES[load_level]
+    if load_level >= LEVEL_TEMPLATE_RESPONSE:
+        reasoning_chain["response_mode"] = "template"
+
+def _handle_cached_response(input_dict: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int, cache_hit: Dict[str, Any], perception: Optional[Dict[str, Any]] = None, load_level: int = LEVEL_FULL) -> Dict[str, Any]:
+    """Ответ из кэша готовых ответов (response_cache): тот же или перефразированный вопрос уже отвечен."""
+    reasoning_chain = {
+        "id": reasoning_chain_id, "timestamp": datetime.now(timezone.utc).isoformat(),
+        "sris_start_tick": tick_at_cycle_start, "sris_end_tick": sris_timesense.get_current_tick(),
+        "input_text": input_dict.get("text"), "cached_response": cache_hit["response"],
+        "response_cache": {k: cache_hit[k] for k in ("match", "similarity", "matched_query")},
+        "mode": "cached_response"
+    }
+    if perception is not None: reasoning_chain["perception_struct"] = perception
+    _record_deadline(reasoning_chain)
+    _record_load_level(reasoning_chain, load_level)
+    if temporality_modules_loaded:
+        sris_timeline.record_event("response_cache_hit", reasoning_chain["response_cache"].copy(), reasoning_chain_id)
+        sris_timeline.record_event("sris_cycle_completed_from_cache", {"status": "ok"}, reasoning_chain_id, related_to_tick=tick_at_cycle_start)
+    logger.info(f"--- (Tick: {sris_timesense.get_current_tick()}) Цикл SRIS (ответ из кэша, {cache_hit['match']}) завершен (ID: {reasoning_chain_id}) ---")
+    return {"status": "ok", "reasoning_id": reasoning_chain_id, "hypothesis": None, "full_reasoning_chain": reasoning_chain}
+
+def _handle_cache_only_query(input_dict: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int) -> Dict[str, Any]:
+    """Уровень cache_only: LLM перегружен, ответ выдается только из кэша готовых ответов (с любой целью)."""
+    cache_hit = response_cache.lookup(input_dict.get("text"))
+    if cache_hit is None:
+        logger.warning(f"LLM перегружен, готового ответа в кэше нет: запрос отклонен (ID: {reasoning_chain_id}).")
+        if temporality_modules_loaded: sris_timeline.record_event("sris_cycle_overloaded", {"load_level": LEVEL_NAMES[LEVEL_CACHE_ONLY]}, reasoning_chain_id, related_to_tick=tick_at_cycle_start)
+        return {"status": "overloaded", "reasoning_id": reasoning_chain_id, "hypothesis": None, "full_reasoning_chain": {
+            "error_message": "LLM перегружен: ответ доступен только из кэша, а в кэше его нет.",
+            "load_level": LEVEL_NAMES[LEVEL_CACHE_ONLY], "sris_start_tick": tick_at_cycle_start, "sris_end_tick": sris_timesense.get_current_tick()}}
+    return _handle_cached_response(input_dict, reasoning_chain_id, tick_at_cycle_start, cache_hit, load_level=LEVEL_CACHE_ONLY)
+
+def _filter_hypotheses(hypotheses: List[str], perception: Dict[str, Any], sdna: Dict[str, Any] = DEFAULT_SDNA) -> tuple:
+    """
+    Отсеивает гипотезы, отклоненные ZAV2, строгими правилами онтологии или safety_filter.
+    Если отсеяно всё, возвращает исходный список, чтобы цикл мог продолжиться.
+    """
+    accepted: List[str] = []
+    rejected: List[Dict[str, Any]] = []
+    zav2_checks = validate_hypotheses_batch(hypotheses)
+    for h, zav2_check in zip(hypotheses, zav2_checks):
+        if not zav2_check.get("valid", True):
+            rejected.append({"hypothesis": h, "stage": "zav2"}); continue
+        if not check_ontology(h, perception, DEFAULT_REASONING_MODE, sdna).get("valid", True):
+            rejected.append({"hypothesis": h, "stage": "ontology"}); continue
+        if not safety_filter(h).get("safe", True):
+            rejected.append({"hypothesis": h, "stage": "safety"}); continue
+        accepted.append(h)
+    if not accepted:
+        logger.warning("Фильтр гипотез отклонил все варианты; используется нефильтрованный список.")
+        accepted = list(hypotheses)
+    return accepted, rejected
+
+def _handle_fast_path_query(input_dict: Dict[str, Any], perception: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int, load_level: int = LEVEL_FULL) -> Dict[str, Any]:
     logger.info("Fast-Path: Активирован 'короткий путь' для простого запроса.")
-    user_query_type = perception.get("user_query_type")
+    user_query_type = perception.get("user_query_type") or perception.get("query_type")
+    fast_path_kind = _get_fast_path_kind(perception)
     communication_intent_obj: Dict[str, Any] = {}
     chosen_hypothesis_text = "Сгенерировать простой ответ на основе намерения."
 
-    if user_query_type == "social_greeting":
+    if perception.get("degraded"):
+        chosen_hypothesis_text = f"Кратко ответить на запрос пользователя: '{input_dict.get('text', '')}'"
+        communication_intent_obj = {"intent_type": "brief_answer", "style": "concise", "explanation_priority": "low", "emotional_tone": "neutral", "target_focus": "general"}
+    elif fast_path_kind == "greeting":
         communication_intent_obj = {"intent_type": "reciprocate_social_interaction", "style": "friendly_conversational", "explanation_priority": "low_social", "emotional_tone": "relaxed", "target_focus": "general"}
         chosen_hypothesis_text = f"Сформулировать дружелюбный ответ на приветствие: '{input_dict.get('text', '')}'"
-    elif user_query_type == "feedback_statement":
+    elif fast_path_kind == "feedback":
         sentiment = perception.get("sentiment", "neutral")
         if "позитивный" in sentiment:
             chosen_hypothesis_text = "Поблагодарить пользователя за позитивную обратную связь."
@@ -107,14 +267,20 @@ def _handle_fast_path_query(input_dict: Dict[str, Any], perception: Dict[str, An
         else:
             chosen_hypothesis_text = "Принять к сведению обратную связь от пользователя."
         communication_intent_obj = {"intent_type": "acknowledge_feedback", "style": "empathetic_professional", "explanation_priority": "low_social", "emotional_tone": "neutral", "target_focus": "general"}
+    elif fast_path_kind == "closing":
+        chosen_hypothesis_text = "Вежливо завершить диалог и предложить помощь в будущем."
+        communication_intent_obj = {"intent_type": "close_conversation", "style": "friendly_conversational", "explanation_priority": "low_social", "emotional_tone": "warm", "target_focus": "general"}
 
     reasoning_chain = {
         "id": reasoning_chain_id, "timestamp": datetime.now(timezone.utc).isoformat(),
         "sris_start_tick": tick_at_cycle_start, "sris_end_tick": sris_timesense.get_current_tick(),
         "input_text": input_dict.get("text"), "perception_struct": perception,
         "chosen_hypothesis": {"hypothesis": chosen_hypothesis_text},
-        "communication_intent": communication_intent_obj, "mode": "fast_path_reasoning"
+        "communication_intent": communication_intent_obj,
+        "reflective_intelligence_unit_state": _riu_context(), "mode": "fast_path_reasoning"
     }
+    _record_deadline(reasoning_chain)
+    _record_load_level(reasoning_chain, load_level)
     logger.info(f"Fast-Path: Сформировано коммуникационное намерение: {communication_intent_obj}")
     if temporality_modules_loaded:
         sris_timeline.record_event("fast_path_activated", {"user_query_type": user_query_type}, reasoning_chain_id)
@@ -122,47 +288,89 @@ def _handle_fast_path_query(input_dict: Dict[str, Any], perception: Dict[str, An
     logger.info(f"--- (Tick: {sris_timesense.get_current_tick()}) Цикл SRIS (Fast-Path) завершен (ID: {reasoning_chain_id}) ---")
     return {"status": "ok", "reasoning_id": reasoning_chain_id, "hypothesis": chosen_hypothesis_text, "full_reasoning_chain": reasoning_chain}
 
-def _handle_full_cycle_query(input_dict: Dict[str, Any], perception: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int) -> Dict[str, Any]:
-    logger.info("Full-Path: Активирован полный цикл рассуждений.")
-    retrieved_memories_summary = None; goal = {}; motivation = {}; affect = {}; raw_hyp = []; hypotheses = []; valid_hypotheses = []; evaluated_hypotheses = []; best_hypothesis_obj = {}; emotion = {}; cause_effect_analysis = {}; action_plan_result = {}; communication_intent_obj = {}; sensorium = {"raw_fused": perception.get("original_input","")}
-    
-    # Шаг 2.5: Запрос к семантической памяти
-    if initial_semantic_index:
-        try:
-            perception_summary_for_query = perception.get('summary')
-            if perception_summary_for_query and perception_summary_for_query.lower() not in ["n/a", "не удалось извлечь"]:
-                relevant_memories = query_semantic_memory(index=initial_semantic_index, query_text=perception_summary_for_query, similarity_top_k=1)
-                if relevant_memories:
-                    memory_snippets = [f"- Прошлый опыт (ID: {m.get('chain_id') or m.get('wikidata_qid') or m.get('metadata',{}).get('doc_id') or 'N/A'}, Сходство: {m.get('score',0):.2f}): {m.get('text_preview', 'N/A')[:150]}..." for m in relevant_memories]
-                    retrieved_memories_summary = "\n".join(memory_snippets)
-                    logger.info(f"Извлечено из памяти ({len(relevant_memories)} записей): {retrieved_memories_summary[:200]}...")
-                    if temporality_modules_loaded: sris_timeline.record_event("semantic_memory_retrieved", {"count": len(relevant_memories)}, reasoning_chain_id)
-        except Exception as e: logger.error(f"Ошибка при запросе к памяти: {e}", exc_info=True)
+def _memory_query_text(perception: Dict[str, Any]) -> Optional[str]:
+    perception_summary_for_query = perception.get('summary')
+    if perception_summary_for_query and perception_summary_for_query.lower() not in ["n/a", "не удалось извлечь"]:
+        return perception_summary_for_query
+    return None
+
+def _summarize_memories(relevant_memories: Optional[List[Dict[str, Any]]], reasoning_chain_id: str) -> Optional[str]:
+    if not relevant_memories:
+        return None
+    memory_snippets = [f"- Прошлый опыт (ID: {m.get('chain_id') or m.get('wikidata_qid') or m.get('metadata',{}).get('doc_id') or 'N/A'}, Сходство: {m.get('score',0):.2f}): {m.get('text_preview', 'N/A')[:150]}..." for m in relevant_memories]
+    retrieved_memories_summary = "\n".join(memory_snippets)
+    logger.info(f"Извлечено из памяти ({len(relevant_memories)} записей): {retrieved_memories_summary[:200]}...")
+    if temporality_modules_loaded: sris_timeline.record_event("semantic_memory_retrieved", {"count": len(relevant_memories)}, reasoning_chain_id)
+    return retrieved_memories_summary
+
+def _full_cycle_generate(input_dict: Dict[str, Any], perception: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int, retrieved_memories_summary: Optional[str], sdna: Dict[str, Any] = DEFAULT_SDNA, load_level: int = LEVEL_FULL) -> Dict[str, Any]:
+    """Шаги 3–7 полного цикла: цель, мотивация, аффект, генерация и адаптация гипотез."""
+    if sris_riu: sris_riu.process_perception(perception)
 
     # Шаги 3, 4, 5
-    goal = form_goal(perception, DEFAULT_SDNA, PRELIMINARY_MOTIVATION_SIGNAL)
+    goal = form_goal(perception, sdna, PRELIMINARY_MOTIVATION_SIGNAL)
     if temporality_modules_loaded: sris_timeline.record_event("goal_formed", goal.copy(), reasoning_chain_id)
-    motivation = evaluate_motivation(goal.get("concept", "analyze_situation"), DEFAULT_SDNA)
+    motivation = evaluate_motivation(goal.get("concept", "analyze_situation"), sdna)
     if temporality_modules_loaded: sris_timeline.record_event("motivation_evaluated", motivation.copy(), reasoning_chain_id)
-    affect = assess_affect(perception, motivation, [goal] if goal else [], DEFAULT_SDNA)
+    affect = assess_affect(perception, motivation, [goal] if goal else [], sdna)
     if temporality_modules_loaded: sris_timeline.record_event("affect_assessed", affect.copy(), reasoning_chain_id)
-
-    # Шаги 6, 7, 8
-    raw_hyp = generate_hypotheses(perception, [goal] if goal else [], DEFAULT_SDNA, DEFAULT_REASONING_MODE, retrieved_memories_summary)
+    if sris_riu: sris_riu.process_affect(affect)
+
+    # Шаги 6, 7
+    # Каждая гипотеза оценивается, как только LLM допечатал строку (валидаторы попадают в кэш цикла).
+    # Под нагрузкой на LLM гипотезы строятся по шаблонам (adaptive_logic, память); если до
+    # дедлайна запроса на генерацию не хватает времени, берутся стандартные гипотезы.
+    if load_level >= LEVEL_TEMPLATE_HYPOTHESES:
+        hypothesis_generation = _fallback_hypothesis_generation(
+            template_hypotheses(goal.get("concept", "analyze_situation"), perception, retrieved_memories_summary), "load_policy")
+    elif stage_allowed("hypotheses"):
+        hypothesis_generation = generate_hypotheses_streaming(
+            perception, [goal] if goal else [], sdna, DEFAULT_REASONING_MODE, retrieved_memories_summary,
+            score_fn=lambda h: evaluate_hypotheses_batch([h], perception, [goal] if goal else [], sdna, DEFAULT_REASONING_MODE)[0]["score"],
+            score_threshold=HYPOTHESIS_EARLY_STOP_SCORE, enough=HYPOTHESIS_EARLY_STOP_COUNT,
+            parallel_generations=HYPOTHESIS_PARALLEL_GENERATIONS
+        )
+    else:
+        mark_degraded("hypotheses", "fallback_hypotheses")
+        hypothesis_generation = _fallback_hypothesis_generation(fallback_hypotheses(perception), "deadline")
+    raw_hyp = hypothesis_generation["hypotheses"]
+    if temporality_modules_loaded: sris_timeline.record_event("hypotheses_generated", {"count": len(raw_hyp), "stopped_early": hypothesis_generation["stopped_early"], "time_to_best_ms": hypothesis_generation["time_to_best_ms"]}, reasoning_chain_id)
     hypotheses = adjust_hypotheses(raw_hyp, goal.get("concept", "analyze_situation"), perception)
-    valid_hypotheses = [h for h in hypotheses if isinstance(h, str) and h.strip()] # ВРЕМЕННО УПРОЩЕННЫЙ ФИЛЬТР
+    valid_hypotheses = [h for h in hypotheses if isinstance(h, str) and h.strip()]
     if not valid_hypotheses: raise ValueError("Не осталось валидных гипотез после фильтрации.")
-    evaluated_hypotheses = evaluate_hypotheses(valid_hypotheses, perception, [goal] if goal else [], DEFAULT_SDNA, DEFAULT_REASONING_MODE)
+    return {
+        "input_dict": input_dict, "perception": perception, "reasoning_chain_id": reasoning_chain_id,
+        "tick_at_cycle_start": tick_at_cycle_start, "retrieved_memories_summary": retrieved_memories_summary, "sdna": sdna,
+        "load_level": load_level, "goal": goal, "motivation": motivation, "affect": affect, "raw_hyp": raw_hyp,
+        "hypothesis_generation": hypothesis_generation, "hypotheses": hypotheses, "valid_hypotheses": valid_hypotheses
+    }
+
+def _full_cycle_evaluate(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Шаг 8: фильтр и оценка гипотез, выбор лучшей."""
+    perception, goal, reasoning_chain_id = state["perception"], state["goal"], state["reasoning_chain_id"]
+    valid_hypotheses, rejected_hypotheses = _filter_hypotheses(state["valid_hypotheses"], perception, state["sdna"])
+    if temporality_modules_loaded and rejected_hypotheses: sris_timeline.record_event("hypotheses_filtered", {"rejected": len(rejected_hypotheses), "remaining": len(valid_hypotheses)}, reasoning_chain_id)
+    evaluated_hypotheses = evaluate_hypotheses(valid_hypotheses, perception, [goal] if goal else [], state["sdna"], DEFAULT_REASONING_MODE)
     if not evaluated_hypotheses: raise ValueError("Оценка гипотез не дала результатов.")
     best_hypothesis_obj = evaluated_hypotheses[0]
     logger.info(f"Лучшая гипотеза: {best_hypothesis_obj.get('hypothesis', 'N/A')[:70]}...")
     if temporality_modules_loaded and best_hypothesis_obj.get('hypothesis'): sris_timeline.record_event("hypothesis_chosen", {"hypothesis_preview": best_hypothesis_obj.get('hypothesis', 'N/A')[:70], "score": best_hypothesis_obj.get('score')}, reasoning_chain_id)
+    state.update(valid_hypotheses=valid_hypotheses, rejected_hypotheses=rejected_hypotheses,
+                 evaluated_hypotheses=evaluated_hypotheses, best_hypothesis_obj=best_hypothesis_obj)
+    return state
+
+def _full_cycle_finish(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Шаги 9–12: эмоция, причины/следствия, план действия, намерение, сохранение цепочки."""
+    input_dict, perception, goal = state["input_dict"], state["perception"], state["goal"]
+    reasoning_chain_id, tick_at_cycle_start = state["reasoning_chain_id"], state["tick_at_cycle_start"]
+    best_hypothesis_obj = state["best_hypothesis_obj"]
+    sensorium = {"raw_fused": perception.get("original_input","")}
 
     # Шаги 9, 10, 11
     emotion = evaluate_emotion(perception, best_hypothesis_obj.get("hypothesis", ""))
-    cause_effect_analysis = extract_cause_effect(perception, best_hypothesis_obj.get("hypothesis", ""), {"current_goals": [goal] if goal else [], "current_mode": DEFAULT_REASONING_MODE, "sdna_traits": DEFAULT_SDNA})
+    cause_effect_analysis = extract_cause_effect(perception, best_hypothesis_obj.get("hypothesis", ""), {"current_goals": [goal] if goal else [], "current_mode": DEFAULT_REASONING_MODE, "sdna_traits": state["sdna"]})
     action_plan_result = plan_action(best_hypothesis_obj.get("hypothesis", ""), goal if goal else {}, DEFAULT_ACTION_CONTEXT_FLAGS)
-    communication_intent_obj = determine_communication_intent(perception, [goal] if goal else [], affect, motivation, DEFAULT_SDNA)
+    communication_intent_obj = determine_communication_intent(perception, [goal] if goal else [], state["affect"], state["motivation"], state["sdna"])
     if temporality_modules_loaded: sris_timeline.record_event("communication_intent_determined", communication_intent_obj.copy(), reasoning_chain_id)
     
     # Шаг 12
@@ -170,252 +378,232 @@ def _handle_full_cycle_query(input_dict: Dict[str, Any], perception: Dict[str, A
         "id": reasoning_chain_id, "timestamp": datetime.now(timezone.utc).isoformat(),
         "sris_start_tick": tick_at_cycle_start, "sris_end_tick": sris_timesense.get_current_tick(),
         "input_text": input_dict.get("text"), "sensorium": sensorium, "perception_struct": perception,
-        "retrieved_memories_summary": retrieved_memories_summary, "goal": goal, "motivation": motivation,
-        "affect": affect, "raw_hypotheses_llm": raw_hyp, "adjusted_hypotheses": hypotheses, 
-        "valid_hypotheses": valid_hypotheses, "evaluated_hypotheses": evaluated_hypotheses, 
+        "retrieved_memories_summary": state["retrieved_memories_summary"], "goal": goal, "motivation": state["motivation"],
+        "affect": state["affect"], "raw_hypotheses_llm": state["raw_hyp"], "adjusted_hypotheses": state["hypotheses"], 
+        "hypothesis_generation": {k: v for k, v in state["hypothesis_generation"].items() if k != "hypotheses"},
+        "valid_hypotheses": state["valid_hypotheses"], "rejected_hypotheses": state["rejected_hypotheses"],
+        "evaluated_hypotheses": state["evaluated_hypotheses"], 
         "chosen_hypothesis": best_hypothesis_obj, "emotion": emotion,
         "preconditions": cause_effect_analysis.get("preconditions"),
         "effects": cause_effect_analysis.get("effects"), "action_plan": action_plan_result,
         "communication_intent": communication_intent_obj,
+        "reflective_intelligence_unit_state": _riu_context(),
+        "cycle_cache": _cycle_cache_stats(),
         "entity_id": "SRIS-001", "mode": "full_reasoning"
     }
-    save_chain_to_fs(reasoning_chain)
+    if state.get("batch"): reasoning_chain["batch"] = state["batch"]
+    if state.get("session_reuse"): reasoning_chain["session_reuse"] = state["session_reuse"]
+    if state["sdna"] is not DEFAULT_SDNA: reasoning_chain["sdna_traits"] = state["sdna"]
+    _record_deadline(reasoning_chain)
+    _record_load_level(reasoning_chain, state.get("load_level", LEVEL_FULL))
+    logger.info(f"Кэш цикла: повторных вызовов валидаторов и анализа сэкономлено: {reasoning_chain['cycle_cache']}")
+    _persist_chain(reasoning_chain)
     logger.info(f"--- (Tick: {sris_timesense.get_current_tick()}) Цикл SRIS (Full-Path) завершен (ID: {reasoning_chain_id}) ---")
     if temporality_modules_loaded: sris_timeline.record_event("sris_cycle_completed_full_path", {"status": "ok"}, reasoning_chain_id, related_to_tick=tick_at_cycle_start)
     
     return {"status": "ok", "reasoning_id": reasoning_chain_id, "hypothesis": best_hypothesis_obj.get("hypothesis", "N/A"), "full_reasoning_chain": reasoning_chain}
 
+def _handle_full_cycle_query(input_dict: Dict[str, Any], perception: Dict[str, Any], reasoning_chain_id: str, tick_at_cycle_start: int, perception_reused: bool = False, load_level: int = LEVEL_FULL) -> Dict[str, Any]:
+    logger.info("Full-Path: Активирован полный цикл рассуждений.")
+    retrieved_memories_summary = None
+    # Контекст сессии пользователя (session_store): переопределения sDNA и результаты прошлого хода.
+    session = input_dict.get("session") or {}
+    sdna = {**DEFAULT_SDNA, **session["sdna_overrides"]} if session.get("sdna_overrides") else DEFAULT_SDNA
+
+    memory_reused = bool(session.get("memory_retrieved")) and topic_unchanged(perception, session.get("last_perception"))
+    memory_skipped = False
+
+    # Семантический кэш ответов: тот же вопрос другими словами (тот же язык и цель) уже отвечен.
+    # Ответ, зависящий от сессии (переопределения sDNA, восприятие или воспоминания прошлого хода),
+    # не выдается из общего кэша и не попадает в него (см. response_generator).
+    if not session.get("sdna_overrides") and not perception_reused and not memory_reused:
+        goal_concept = form_goal(perception, sdna, PRELIMINARY_MOTIVATION_SIGNAL).get("concept")
+        cache_hit = response_cache.lookup(input_dict.get("text"), perception.get("language_detected"), goal_concept)
+        if cache_hit:
+            return _handle_cached_response(input_dict, reasoning_chain_id, tick_at_cycle_start, cache_hit, perception, load_level)
+    
+    # Шаг 2.5: Запрос к семантической памяти (индекс создается при первом обращении);
+    # если тема не сменилась с прошлого хода, используется уже извлеченное,
+    # если до дедлайна запроса мало времени — поиск пропускается.
+    if memory_reused:
+        retrieved_memories_summary = session.get("retrieved_memories_summary")
+        logger.info("Тема не изменилась с прошлого хода: используются воспоминания из сессии.")
+        if temporality_modules_loaded: sris_timeline.record_event("semantic_memory_reused", {"user_id": session.get("user_id")}, reasoning_chain_id)
+    elif not stage_allowed("semantic_memory"):
+        memory_skipped = True
+        mark_degraded("semantic_memory", "skipped")
+    else:
+        initialize_sris_components()
+    if initial_semantic_index and not memory_reused and not memory_skipped:
+        try:
+            perception_summary_for_query = _memory_query_text(perception)
+            if perception_summary_for_query:
+                relevant_memories = query_semantic_memory(index=initial_semantic_index, query_text=perception_summary_for_query, similarity_top_k=1)
+                retrieved_memories_summary = _summarize_memories(relevant_memories, reasoning_chain_id)
+        except Exception as e: logger.error(f"Ошибка при запросе к памяти: {e}", exc_info=True)
+
+    state = _full_cycle_generate(input_dict, perception, reasoning_chain_id, tick_at_cycle_start, retrieved_memories_summary, sdna, load_level=load_level)
+    if session: state["session_reuse"] = {"perception": perception_reused, "memory": memory_reused}
+    return _full_cycle_finish(_full_cycle_evaluate(state))
+
 # --- Основная функция ядра SRIS (теперь это ДИСПЕТЧЕР) ---
 def run_sris_cycle(input_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    tick_at_cycle_start = sris_timesense.get_current_tick() 
-    current_sris_tick = sris_timesense.tick() 
+    # Тик цикла берется из атомарного счетчика: при параллельных циклах
+    # get_current_tick() до tick() мог бы вернуть тик чужого цикла.
+    current_sris_tick = sris_timesense.tick()
+    tick_at_cycle_start = current_sris_tick - 1
     reasoning_chain_id = str(uuid.uuid4())
     logger.info(f"--- (Tick: {current_sris_tick}) Начало нового цикла SRIS (ID: {reasoning_chain_id}) ---")
     
     if temporality_modules_loaded: sris_timeline.record_event("sris_cycle_started", {"input_text": input_dict.get("text")}, reasoning_chain_id)
 
     try:
-        # Шаги 1 и 2 выполняются всегда
-        logger.info(f"(Tick: {sris_timesense.get_current_tick()}) Шаг 1: Сенсориум...")
-        sensorium = integrate_sensorium(input_dict.get("text"), input_dict.get("audio"), input_dict.get("vision"))
-        
-        logger.info(f"(Tick: {sris_timesense.get_current_tick()}) Шаг 2: Анализ восприятия...")
-        perception = analyze_perception(sensorium["raw_fused"])
-        if perception.get("error"): raise ValueError(f"Ошибка на этапе анализа восприятия: {perception.get('error')}")
-
-        # --- НОВЫЙ ДИСПЕТЧЕР: Выбор пути рассуждений ---
-        user_query_type = perception.get("user_query_type")
-        FAST_PATH_QUERY_TYPES = ["social_greeting", "feedback_statement"]
-        
-        if user_query_type in FAST_PATH_QUERY_TYPES:
-            # Выполняем упрощенный цикл
-            return _handle_fast_path_query(input_dict, perception, reasoning_chain_id, tick_at_cycle_start)
-        else:
-            # Выполняем полный, глубокий цикл рассуждений
-            return _handle_full_cycle_query(input_dict, perception, reasoning_chain_id, tick_at_cycle_start)
+        # Уровень деградации под нагрузкой на LLM (load_policy) фиксируется на весь цикл.
+        load_level = sris_load_policy.current_level()
+        if load_level > LEVEL_FULL and temporality_modules_loaded:
+            sris_timeline.record_event("load_degradation", {"load_level": LEVEL_NAMES[load_level]}, reasoning_chain_id)
+        if load_level >= LEVEL_CACHE_ONLY:
+            return _handle_cache_only_query(input_dict, reasoning_chain_id, tick_at_cycle_start)
+
+        # Валидаторы и анализ гипотез выполняются не больше одного раза за цикл (cycle_cache);
+        # дедлайн запроса (input_dict["deadline"], см. deadline.py) виден всем этапам цикла.
+        with cycle_scope(), deadline_scope(input_dict.get("deadline")):
+            # Шаги 1 и 2 выполняются всегда
+            logger.info(f"(Tick: {sris_timesense.get_current_tick()}) Шаг 1: Сенсориум...")
+            sensorium = integrate_sensorium(input_dict.get("text"), input_dict.get("audio"), input_dict.get("vision"))
+
+            logger.info(f"(Tick: {sris_timesense.get_current_tick()}) Шаг 2: Анализ восприятия...")
+            # Повтор последнего запроса пользователя: восприятие берется из сессии.
+            session = input_dict.get("session") or {}
+            perception_reused = bool(session.get("last_perception")) and not session["last_perception"].get("degraded") \
+                and not input_dict.get("audio") and not input_dict.get("vision") \
+                and same_query(input_dict.get("text"), session.get("last_query_text"))
+            if perception_reused:
+                perception = copy.deepcopy(session["last_perception"])
+                if temporality_modules_loaded: sris_timeline.record_event("perception_reused", {"user_id": session.get("user_id")}, reasoning_chain_id)
+            elif stage_allowed("perception"):
+                perception = analyze_perception(sensorium["raw_fused"])
+            else:
+                perception = {"error": "DEADLINE_EXCEEDED"}
+            # Анализ восприятия не уложился в дедлайн (не запускался или его ответ урезан по времени
+            # и не разобрался): ответ строится коротким путем.
+            deadline = current_deadline()
+            if perception.get("error") and deadline is not None and (
+                    perception["error"] == "DEADLINE_EXCEEDED" or "llm:analyze_json" in deadline.degraded_stage_names()):
+                mark_degraded("perception", "fast_path")
+                return _handle_fast_path_query(input_dict, _deadline_perception(sensorium["raw_fused"]), reasoning_chain_id, tick_at_cycle_start, load_level)
+            if perception.get("error"): raise ValueError(f"Ошибка на этапе анализа восприятия: {perception.get('error')}")
+
+            # --- Диспетчер: выбор пути рассуждений ---
+            if _get_fast_path_kind(perception):
+                # Выполняем упрощенный цикл
+                return _handle_fast_path_query(input_dict, perception, reasoning_chain_id, tick_at_cycle_start, load_level)
+            else:
+                # Выполняем полный, глубокий цикл рассуждений
+                return _handle_full_cycle_query(input_dict, perception, reasoning_chain_id, tick_at_cycle_start, perception_reused, load_level)
 
     except Exception as e_cycle:
-        final_tick = sris_timesense.get_current_tick()
-        logger.critical(f"Критическая ошибка в цикле SRIS (ID: {reasoning_chain_id}, Tick: {final_tick}): {e_cycle}", exc_info=True)
-        if temporality_modules_loaded:
-            sris_timeline.record_event("sris_cycle_error", {"error_message": str(e_cycle)}, reasoning_chain_id, related_to_tick=tick_at_cycle_start)
-        
-        error_details = {"error_message": str(e_cycle), "sris_start_tick": tick_at_cycle_start, "sris_end_tick": final_tick}
-        if 'perception' in locals() and perception: error_details["perception_at_error"] = perception
-        return {"status": "cycle_error", "reasoning_id": reasoning_chain_id, "hypothesis": None, "full_reasoning_chain": error_details}
-
-
-# ==============================================================================
-# GUI ДЛЯ ДИАЛОГА С SRIS
-# ==============================================================================
-class SRISChatApp:
-    def __init__(self, root_tk):
-        self.root = root_tk
-        self.root.title("SRIS - Диалоговый агент")
-        self.root.geometry("700x550")
-
-        self.bg_color = "#282c34"
-        self.text_color = "#abb2bf"
-        self.entry_bg = "#1e2228"
-        self.button_bg = "#61afef"
-        self.button_fg = "#282c34"
-        self.sris_color = "#98c379" 
-        self.user_color = "#61afef" 
-        self.system_color = "#c678dd"
-
-        self.root.configure(bg=self.bg_color)
-
-        self.chat_history = scrolledtext.ScrolledText(
-            self.root, wrap=tk.WORD, state=DISABLED, bg=self.entry_bg, fg=self.text_color,
-            font=("Arial", 10), padx=10, pady=10, relief=tk.FLAT, borderwidth=0, exportselection=True
-        )
-        self.chat_history.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
-        self.chat_history.bind("<KeyPress>", self._prevent_chat_edit)
-
-        self.chat_history.tag_config("user", foreground=self.user_color, font=("Arial", 10, "bold"))
-        self.chat_history.tag_config("sris", foreground=self.sris_color, font=("Arial", 10, "italic"))
-        self.chat_history.tag_config("system", foreground=self.system_color, font=("Arial", 9, "italic"))
-
-        self.input_frame = tk.Frame(self.root, bg=self.bg_color)
-        self.input_frame.pack(padx=10, pady=(0,10), fill=tk.X, expand=False)
-        
-        self.user_input_entry = tk.Entry(
-            self.input_frame, width=70, bg=self.entry_bg, fg=self.text_color,
-            insertbackground=self.text_color, font=("Arial", 11), relief=tk.FLAT,
-            borderwidth=0, exportselection=True
-        )
-        self.user_input_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=5)
-        self.user_input_entry.bind("<Return>", self.send_message_event)
-
-        self.send_button = tk.Button(
-            self.input_frame, text="Отправить", command=self.send_message_event,
-            bg=self.button_bg, fg=self.button_fg, activebackground="#528baf", 
-            activeforeground=self.button_fg, relief=tk.FLAT, borderwidth=0, 
-            padx=10, pady=5, font=("Arial", 10, "bold")
-        )
-        self.send_button.pack(side=tk.RIGHT, padx=(5,0))
-        
-        self._make_context_menu(self.chat_history)
-        self._make_context_menu(self.user_input_entry)
-        self._bind_keyboard_shortcuts()
-        
-        self.add_message_to_chat("System", "Инициализация SRIS...")
-        
-        # Вызываем инициализацию компонентов здесь
-        initialize_sris_components()
-        
-        self.add_message_to_chat("SRIS", "Здравствуйте! Я SRIS. Чем могу помочь?", is_sris=True)
-        self.add_message_to_chat("System", "Подсказка: логи работы ядра SRIS выводятся в эту консоль.", is_system=True)
-        if initial_semantic_index:
-            self.add_message_to_chat("System", "Семантический индекс памяти успешно инициализирован.", is_system=True)
-        else:
-            self.add_message_to_chat("System", "ВНИМАНИЕ: Семантический индекс памяти НЕ инициализирован.", is_system=True)
-        
-        if temporality_modules_loaded:
-            self.add_message_to_chat("System", f"Temporality Core активен. Начальный тик: {sris_timesense.get_current_tick()}", is_system=True)
-        else:
-            self.add_message_to_chat("System", "ПРЕДУПРЕЖДЕНИЕ: Temporality Core не загружен.", is_system=True)
-
-    def _prevent_chat_edit(self, event):
-        allowed_keys_specific = ['c', 'C', 'a', 'A'] 
-        allowed_modifiers_general = ['Control_L', 'Control_R', 'Shift_L', 'Shift_R', 'Super_L', 'Super_R', 'Meta_L', 'Meta_R', 'Alt_L', 'Alt_R']
-        navigation_keys = ['Left', 'Right', 'Up', 'Down', 'Home', 'End', 'Prior', 'Next', 'Page_Up', 'Page_Down']
-        is_modifier_pressed = event.state & (1<<2)
-        if platform.system() == "Darwin": is_modifier_pressed = event.state & (1<<3)
-        if is_modifier_pressed and event.keysym.lower() in allowed_keys_specific: return 
-        if event.keysym in allowed_modifiers_general or event.keysym in navigation_keys: return 
-        return "break" 
-
-    def _make_context_menu(self, widget):
-        menu = Menu(widget, tearoff=0, bg=self.entry_bg, fg=self.text_color, activebackground=self.button_bg, activeforeground=self.button_fg, relief=tk.FLAT, font=("Arial", 9))
-        is_text_widget = isinstance(widget, (tk.Text, scrolledtext.ScrolledText))
-        is_entry_widget = isinstance(widget, tk.Entry)
-        if is_text_widget or is_entry_widget: menu.add_command(label="Копировать", command=lambda: self._copy_text(widget))
-        if is_entry_widget:
-            menu.add_command(label="Вырезать", command=lambda: self._cut_text(widget))
-            menu.add_command(label="Вставить", command=lambda: self._paste_text(widget))
-        if is_text_widget or is_entry_widget:
-            menu.add_separator()
-            menu.add_command(label="Выделить все", command=lambda: self._select_all_text(widget))
-        popup_event = "<Button-3>" if platform.system() != "Darwin" else "<Button-2>"
-        widget.bind(popup_event, lambda event: menu.tk_popup(event.x_root, event.y_root))
-
-    def _copy_text(self, widget):
-        try:
-            if widget.selection_get():
-                self.root.clipboard_clear()
-                self.root.clipboard_append(widget.selection_get())
-        except tk.TclError: pass 
-            
-    def _cut_text(self, widget):
-        try:
-            if widget.selection_get():
-                self._copy_text(widget)
-                widget.delete(tk.SEL_FIRST, tk.SEL_LAST)
-        except tk.TclError: pass
+        return _cycle_error_result(e_cycle, reasoning_chain_id, tick_at_cycle_start, locals().get("perception"))
 
-    def _paste_text(self, widget):
+def _cycle_error_result(e_cycle: Exception, reasoning_chain_id: str, tick_at_cycle_start: int, perception: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    final_tick = sris_timesense.get_current_tick()
+    logger.critical(f"Критическая ошибка в цикле SRIS (ID: {reasoning_chain_id}, Tick: {final_tick}): {e_cycle}", exc_info=True)
+    if temporality_modules_loaded:
+        sris_timeline.record_event("sris_cycle_error", {"error_message": str(e_cycle)}, reasoning_chain_id, related_to_tick=tick_at_cycle_start)
+    
+    error_details = {"error_message": str(e_cycle), "sris_start_tick": tick_at_cycle_start, "sris_end_tick": final_tick}
+    if perception: error_details["perception_at_error"] = perception
+    return {"status": "cycle_error", "reasoning_id": reasoning_chain_id, "hypothesis": None, "full_reasoning_chain": error_details}
+
+# --- Пакетный режим: каждый этап выполняется сразу для всех запросов пакета ---
+def _map_concurrently(fn, items: List[Any], max_workers: int = BATCH_LLM_CONCURRENCY) -> List[Any]:
+    """fn по элементам в пуле потоков; каждый поток видит кэш цикла вызывающего (contextvars)."""
+    if len(items) <= 1 or max_workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="sris_batch") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+def run_sris_cycle_batch(input_dicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Циклы SRIS для пакета запросов, выполняемые по этапам: восприятие — одним пакетом
+    промптов (параллельно, одинаковые тексты один раз), поиск в памяти — одним прямым
+    проходом модели эмбеддингов, генерация гипотез — параллельно, ZAV2 — одним пакетным
+    вызовом на гипотезы всех запросов, затем оценка и завершение по каждому запросу.
+    Кэш валидаторов общий на пакет (ключи включают отпечаток восприятия).
+    Результаты — в порядке входа, в формате run_sris_cycle; ошибка запроса не прерывает пакет.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(input_dicts)
+    items: List[Dict[str, Any]] = []
+    for index, input_dict in enumerate(input_dicts):
+        current_sris_tick = sris_timesense.tick()
+        item = {"index": index, "input_dict": input_dict, "reasoning_chain_id": str(uuid.uuid4()),
+                "tick_at_cycle_start": current_sris_tick - 1, "perception": None,
+                "batch": {"size": len(input_dicts), "index": index}}
+        logger.info(f"--- (Tick: {current_sris_tick}) Начало цикла SRIS в пакете ({index + 1}/{len(input_dicts)}, ID: {item['reasoning_chain_id']}) ---")
+        if temporality_modules_loaded: sris_timeline.record_event("sris_cycle_started", {"input_text": input_dict.get("text"), "batch_size": len(input_dicts)}, item["reasoning_chain_id"])
+        items.append(item)
+
+    def guarded(item: Dict[str, Any], stage):
+        """stage() для одного запроса; исключение становится его результатом cycle_error."""
         try:
-            widget.insert(widget.index(tk.INSERT), self.root.clipboard_get())
-        except tk.TclError: pass
-            
-    def _select_all_text(self, widget):
-        if isinstance(widget, (tk.Text, scrolledtext.ScrolledText)):
-            widget.tag_add(tk.SEL, "1.0", tk.END); widget.mark_set(tk.INSERT, "1.0"); widget.see(tk.INSERT)
-        elif isinstance(widget, tk.Entry):
-            widget.select_range(0, tk.END); widget.icursor(tk.END)
-        return "break" 
-
-    def _bind_keyboard_shortcuts(self):
-        copy_accel = 'Control-c'; paste_accel = 'Control-v'; cut_accel = 'Control-x'; select_all_accel = 'Control-a'
-        if platform.system() == 'Darwin': 
-            copy_accel = 'Command-c'; paste_accel = 'Command-v'; cut_accel = 'Command-x'; select_all_accel = 'Command-a'
-        self.user_input_entry.bind(f"<{paste_accel}>", lambda e: self._paste_text(self.user_input_entry))
-        self.user_input_entry.bind(f"<{copy_accel}>", lambda e: self._copy_text(self.user_input_entry))
-        self.user_input_entry.bind(f"<{cut_accel}>", lambda e: self._cut_text(self.user_input_entry))
-        self.user_input_entry.bind(f"<{select_all_accel}>", lambda e: self._select_all_text(self.user_input_entry))
-        self.chat_history.bind(f"<{copy_accel}>", lambda e: self._copy_text(self.chat_history))
-        self.chat_history.bind(f"<{select_all_accel}>", lambda e: self._select_all_text(self.chat_history))
-
-    def add_message_to_chat(self, sender: str, message: str, is_sris: bool = False, is_system: bool = False):
-        self.chat_history.config(state=NORMAL)
-        sender_tag = "user"
-        if is_sris: sender_tag = "sris"
-        elif is_system: sender_tag = "system"
-        self.chat_history.insert(tk.END, f"{sender}: ", (sender_tag,))
-        self.chat_history.insert(tk.END, f"{message}\n\n")
-        self.chat_history.see(tk.END) 
-        self.chat_history.config(state=DISABLED)
-
-    def process_sris_cycle_in_thread(self, user_text: str):
-        self.add_message_to_chat("SRIS", "*обрабатываю ваш запрос...*", is_sris=True, is_system=True)
-        self.user_input_entry.config(state=DISABLED)
-        self.send_button.config(state=DISABLED)
-        input_dict = {"text": user_text, "audio": None, "vision": None}
-        
-        sris_reasoning_result = run_sris_cycle(input_dict) 
-        
-        if sris_reasoning_result and sris_reasoning_result.get("full_reasoning_chain") and logger.isEnabledFor(logging.DEBUG):
-             logger.debug(f"Полная цепочка рассуждений для ответа: {json.dumps(sris_reasoning_result['full_reasoning_chain'], indent=2, ensure_ascii=False)}")
-        
-        def update_gui_with_response():
-            # Здесь можно будет реализовать удаление сообщения "*обрабатываю ваш запрос...*"
-            # self.chat_history.config(state=NORMAL)
-            # self.chat_history.delete("end-3l", "end-1c") # Удаляет 2 предыдущие строки
-            # self.chat_history.config(state=DISABLED)
-            
-            if sris_reasoning_result and sris_reasoning_result.get("status") == "ok":
-                sris_reply_text = generate_sris_response(sris_reasoning_result["full_reasoning_chain"])
-                self.add_message_to_chat("SRIS", sris_reply_text, is_sris=True)
-            elif sris_reasoning_result:
-                error_msg = sris_reasoning_result.get("full_reasoning_chain", {}).get("error_message", "неизвестная ошибка")
-                reply = f"[Внутренний статус: {sris_reasoning_result.get('status', 'ошибка')}, Детали: {error_msg}] Я не могу сейчас ответить должным образом."
-                self.add_message_to_chat("SRIS", reply, is_sris=True, is_system=True)
+            return stage()
+        except Exception as e_cycle:
+            results[item["index"]] = _cycle_error_result(e_cycle, item["reasoning_chain_id"], item["tick_at_cycle_start"], item["perception"])
+            return None
+
+    with cycle_scope():
+        # Шаги 1 и 2: сенсориум и восприятие для всего пакета
+        for item in items:
+            input_dict = item["input_dict"]
+            item["sensorium"] = guarded(item, lambda: integrate_sensorium(input_dict.get("text"), input_dict.get("audio"), input_dict.get("vision")))
+        items = [item for item in items if item["sensorium"] is not None]
+        perceptions = analyze_perception_batch([item["sensorium"]["raw_fused"] for item in items], max_workers=BATCH_LLM_CONCURRENCY)
+        full_items: List[Dict[str, Any]] = []
+        for item, perception in zip(items, perceptions):
+            item["perception"] = perception
+            if perception.get("error"):
+                error = ValueError(f"Ошибка на этапе анализа восприятия: {perception.get('error')}")
+                results[item["index"]] = _cycle_error_result(error, item["reasoning_chain_id"], item["tick_at_cycle_start"], perception)
+            elif _get_fast_path_kind(perception):
+                fast_result = guarded(item, lambda: _handle_fast_path_query(item["input_dict"], perception, item["reasoning_chain_id"], item["tick_at_cycle_start"]))
+                if fast_result is not None: results[item["index"]] = fast_result
             else:
-                reply = "Произошла неожиданная внутренняя ошибка (run_sris_cycle вернул None)."
-                self.add_message_to_chat("SRIS", reply, is_sris=True, is_system=True)
-            self.enable_input()
-        self.root.after(0, update_gui_with_response)
-
-    def enable_input(self):
-        self.user_input_entry.config(state=NORMAL)
-        self.send_button.config(state=NORMAL)
-        self.user_input_entry.focus_set()
-
-    def send_message_event(self, event=None):
-        user_text = self.user_input_entry.get().strip()
-        if not user_text: return
-        self.add_message_to_chat("Вы", user_text)
-        self.user_input_entry.delete(0, tk.END)
-        thread = threading.Thread(target=self.process_sris_cycle_in_thread, args=(user_text,))
-        thread.daemon = True 
-        thread.start()
+                full_items.append(item)
+        if not full_items:
+            return results
+        logger.info(f"Пакет: полный цикл для {len(full_items)} из {len(input_dicts)} запросов.")
+
+        # Шаг 2.5: память — эмбеддинги запросов всего пакета одним проходом модели
+        initialize_sris_components()
+        memory_queries = [(item, _memory_query_text(item["perception"])) for item in full_items]
+        memory_queries = [(item, text) for item, text in memory_queries if text]
+        if initial_semantic_index and memory_queries:
+            try:
+                found = query_semantic_memory_batch(index=initial_semantic_index, query_texts=[text for _, text in memory_queries], similarity_top_k=1)
+                for (item, _), relevant_memories in zip(memory_queries, found):
+                    item["memory_summary"] = _summarize_memories(relevant_memories, item["reasoning_chain_id"])
+            except Exception as e: logger.error(f"Ошибка при пакетном запросе к памяти: {e}", exc_info=True)
+
+        # Шаги 3–7: генерация гипотез (LLM) параллельно по запросам
+        states = _map_concurrently(lambda item: guarded(item, lambda: _full_cycle_generate(
+            item["input_dict"], item["perception"], item["reasoning_chain_id"], item["tick_at_cycle_start"], item.get("memory_summary"))), full_items)
+        generated = [(item, state) for item, state in zip(full_items, states) if state is not None]
+
+        # Шаг 8: ZAV2 одним пакетным вызовом на гипотезы всех запросов; фильтр и оценка ниже берут его из кэша
+        try:
+            validate_hypotheses_batch([h for _, state in generated for h in state["valid_hypotheses"]])
+        except Exception as e: logger.error(f"Ошибка пакетной проверки ZAV2: {e}", exc_info=True)
+
+        # Шаги 8–12 по каждому запросу
+        for item, state in generated:
+            state["batch"] = item["batch"]
+            full_result = guarded(item, lambda: _full_cycle_finish(_full_cycle_evaluate(state)))
+            if full_result is not None: results[item["index"]] = full_result
+    return results
+
 
 if __name__ == "__main__":
-    print("--- SRIS Kernel с GUI ---")
-    print("--- Логи работы ядра будут выводиться в терминале. ---")
-    print("--- Закройте окно GUI для завершения программы. ---")
-    main_window = tk.Tk()
-    app = SRISChatApp(main_window)
-    main_window.mainloop()
-    print("\n--- Программа SRIS завершена ---")
+    # Ядро не зависит от GUI; запуск модуля открывает GUI-клиент SRIS в том же процессе.
+    from sris_gui import main
+    main(agent_name="SRIS")
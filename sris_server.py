@@ -1,11 +1,18 @@
 # sris_server.py
+import asyncio
 import logging
 from utils import setup_logging
 import time
-from fastapi import FastAPI, HTTPException
+import uuid
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+from single_flight import SingleFlight, normalize_query_text
+from session_store import SessionStore
+from cycle_cache import fingerprint
+from deadline import Deadline, deadline_scope, DEFAULT_REQUEST_TIMEOUT_SECONDS
 
 setup_logging()
 
@@ -14,10 +21,19 @@ setup_logging()
 try:
     from sris_kernel import (
         run_sris_cycle, 
+        run_sris_cycle_batch,
         generate_sris_response,
         get_or_build_semantic_index,
-        sris_timesense # Импортируем готовый экземпляр TimeSense
+        initialize_sris_components,
+        sris_timesense, # Импортируем готовый экземпляр TimeSense
+        sris_timeline,
+        sris_timeline_store,
+        DEFAULT_SDNA
     )
+    from lazy_components import warm_up, readiness_report, retry_failed_components
+    from token_budget import get_budget_distributions
+    from load_policy import default_policy as load_policy
+    from response_cache import default_cache as response_cache
     sris_components_loaded = True
 except ImportError as e:
     logging.error(f"Критическая ошибка: не удалось импортировать компоненты SRIS. {e}")
@@ -27,15 +43,49 @@ except ImportError as e:
 logger = logging.getLogger(__name__)
 
 # --- Модели данных для API ---
+# Дедлайн запроса: отсчитывается с момента получения, включая ожидание в очереди пула.
+MAX_REQUEST_TIMEOUT_SECONDS = 300.0
+
 class QueryRequest(BaseModel):
     user_id: str = Field("default_user", description="Уникальный идентификатор пользователя")
     query_text: str = Field(..., description="Текстовый запрос пользователя", min_length=1)
+    timeout_seconds: float = Field(DEFAULT_REQUEST_TIMEOUT_SECONDS, description="Дедлайн обработки запроса", gt=0, le=MAX_REQUEST_TIMEOUT_SECONDS)
 
 class QueryResponse(BaseModel):
     sris_response_text: str
     reasoning_id: Optional[str]
     current_sris_tick: int
     processing_time_ms: float
+    queue_wait_ms: Optional[float] = None
+    shared_reasoning_id: Optional[str] = None
+    degraded_stages: Optional[List[str]] = None
+    load_level: Optional[str] = None
+
+# Ответ 503 при перегрузке LLM (load_policy, уровень cache_only): через сколько повторить запрос.
+OVERLOADED_RETRY_AFTER_SECONDS = 5
+# Сверх дедлайна запроса обработчик ждет цикл еще столько секунд (деградация, разбор ответа), затем отвечает 504.
+DEADLINE_GRACE_SECONDS = 1.0
+
+# Пакетный эндпоинт: лимит размера пакета на один HTTP-запрос.
+MAX_BATCH_QUERIES = 64
+
+class BatchQueryRequest(BaseModel):
+    user_id: str = Field("default_user", description="Уникальный идентификатор пользователя")
+    queries: List[str] = Field(..., description="Тексты запросов пакета", min_length=1, max_length=MAX_BATCH_QUERIES)
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    reasoning_id: Optional[str] = None
+    sris_response_text: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+    current_sris_tick: int
+    processing_time_ms: float
 
 # --- Создание экземпляра FastAPI ---
 app = FastAPI(
@@ -44,24 +94,79 @@ app = FastAPI(
     version="1.0-Prometheus"
 )
 
-# --- Событие "startup": загрузка моделей при старте сервера ---
+# --- Событие "startup": прогрев моделей в фоне ---
+# Сервер начинает принимать соединения сразу (liveness), а тяжелые компоненты
+# (LLM, модель эмбеддингов, семантический индекс) загружаются в фоновом потоке;
+# готовность сообщает /health/ready. Компоненты, не загрузившиеся при прогреве (воркер LLM
+# или писатель индекса запущен позже сервера), та же фоновая задача повторяет после паузы.
+COMPONENT_RETRY_CHECK_SECONDS = 5.0
+_warm_up_future: Optional[asyncio.Future] = None
+_component_retry_task: Optional[asyncio.Task] = None
+
+def _warm_up_components() -> None:
+    try:
+        initialize_sris_components()
+        report = warm_up()
+        logger.info(f"Прогрев компонентов SRIS завершен: {report}")
+    except Exception as e:
+        logger.critical(f"Критическая ошибка при инициализации компонентов на старте сервера: {e}", exc_info=True)
+
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Сервер SRIS запускается... Инициализация моделей и компонентов...")
+    global _warm_up_future, _component_retry_task
+    logger.info("Сервер SRIS запускается... Инициализация моделей и компонентов в фоне...")
     if not sris_components_loaded:
         logger.critical("Компоненты SRIS не были загружены. Сервер не сможет работать корректно.")
         return
+    _warm_up_future = asyncio.get_running_loop().run_in_executor(None, _warm_up_components)
+    _component_retry_task = asyncio.create_task(_retry_failed_components_periodically())
 
-    try:
-        # Принудительная инициализация семантического индекса
-        get_or_build_semantic_index(rebuild=False) 
-        logger.info("Семантический индекс памяти проверен и готов к работе.")
-        logger.info("Все компоненты SRIS успешно инициализированы. Сервер готов к приему запросов.")
-    except Exception as e:
-        logger.critical(f"Критическая ошибка при инициализации компонентов на старте сервера: {e}", exc_info=True)
+async def _retry_failed_components_periodically() -> None:
+    loop = asyncio.get_running_loop()
+    await _warm_up_future
+    while True:
+        await asyncio.sleep(COMPONENT_RETRY_CHECK_SECONDS)
+        try:
+            retried = await loop.run_in_executor(None, retry_failed_components)
+        except Exception as e:
+            logger.error(f"Ошибка повторной загрузки компонентов SRIS: {e}", exc_info=True)
+            continue
+        if retried:
+            components = readiness_report()["components"]
+            logger.info(f"Повторная загрузка компонентов SRIS: { {name: components[name]['state'] for name in retried} }")
 
 
 # --- API Эндпоинт для обработки запросов ---
+def _run_cycle_timed(input_dict: Dict[str, Any], queued_at: float) -> tuple:
+    """run_sris_cycle в пуле потоков; возвращает и время ожидания свободного потока (очередь пула)."""
+    queue_wait_ms = (time.perf_counter() - queued_at) * 1000
+    return run_sris_cycle(input_dict), queue_wait_ms
+
+# Сессии пользователей: контекст прошлых ходов передается в цикл (input_dict["session"]).
+session_store = SessionStore.from_env()
+
+# Одинаковые запросы, пришедшие, пока такой же уже обрабатывается, ждут его результат:
+# цикл и генерация ответа выполняются один раз. Ключ — нормализованный текст плюс
+# контекст сессии, влияющий на результат: объединяются только запросы с одинаковым контекстом.
+query_flights = SingleFlight()
+
+def _coalescing_key(request: "QueryRequest", session_context: Optional[Dict[str, Any]]) -> tuple:
+    if session_context:
+        session_context = {k: v for k, v in session_context.items() if k != "user_id"}
+    return (normalize_query_text(request.query_text), fingerprint(session_context))
+
+def _generate_response(reasoning_chain: Dict[str, Any], deadline: Optional[Deadline]) -> str:
+    """Генерация ответа в пределах дедлайна запроса (LLM урезает max_tokens или отдает запасной ответ)."""
+    with deadline_scope(deadline):
+        return generate_sris_response(reasoning_chain)
+
+async def _run_query(input_dict: Dict[str, Any]) -> tuple:
+    sris_reasoning_result, queue_wait_ms = await run_in_threadpool(_run_cycle_timed, input_dict, time.perf_counter())
+    sris_final_text = None
+    if sris_reasoning_result and sris_reasoning_result.get("status") == "ok":
+        sris_final_text = await run_in_threadpool(_generate_response, sris_reasoning_result["full_reasoning_chain"], input_dict.get("deadline"))
+    return sris_reasoning_result, sris_final_text, queue_wait_ms
+
 @app.post("/process_query/", response_model=QueryResponse)
 async def process_user_query(request: QueryRequest):
     if not sris_components_loaded:
@@ -70,35 +175,226 @@ async def process_user_query(request: QueryRequest):
     start_time = time.time()
     logger.info(f"Получен запрос от user_id: '{request.user_id}', query_text: '{request.query_text[:100]}...'")
 
-    input_dict = {"text": request.query_text, "audio": None, "vision": None}
+    session_context = session_store.context_for(request.user_id)
+    deadline = Deadline(request.timeout_seconds)
+    input_dict = {"text": request.query_text, "audio": None, "vision": None, "session": session_context, "deadline": deadline}
 
     try:
         # Запускаем ресурсоемкие функции в отдельном потоке, чтобы не блокировать сервер
-        sris_reasoning_result = await run_in_threadpool(run_sris_cycle, input_dict)
+        # Дедлайн соблюдается и там, где этапы его не проверяют (зависший вызов LLM): ожидание
+        # прерывается, а общий цикл (single_flight) продолжается для присоединившихся запросов.
+        try:
+            (sris_reasoning_result, sris_final_text, queue_wait_ms), coalesced = await asyncio.wait_for(
+                query_flights.run(_coalescing_key(request, session_context), lambda: _run_query(input_dict)),
+                timeout=deadline.remaining() + DEADLINE_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(f"Запрос от user_id '{request.user_id}' не обработан за {request.timeout_seconds} с.")
+            raise HTTPException(status_code=504, detail=f"SRIS did not respond within {request.timeout_seconds} s.")
 
         if sris_reasoning_result and sris_reasoning_result.get("status") == "ok":
-            sris_final_text = await run_in_threadpool(generate_sris_response, sris_reasoning_result["full_reasoning_chain"])
-            
+            reasoning_id = sris_reasoning_result.get("reasoning_id")
+            shared_reasoning_id = None
+            if coalesced:
+                # Собственный reasoning_id для присоединившегося запроса; цепочка — общая.
+                shared_reasoning_id, reasoning_id = reasoning_id, str(uuid.uuid4())
+                sris_timeline.record_event("request_coalesced", {"shared_reasoning_id": shared_reasoning_id, "user_id": request.user_id}, reasoning_id)
+                logger.info(f"Запрос {reasoning_id} объединен с выполняющимся {shared_reasoning_id}")
+            await run_in_threadpool(session_store.record_cycle, request.user_id, request.query_text, sris_reasoning_result)
+
             end_time = time.time()
             processing_time = (end_time - start_time) * 1000
+            # Присоединившийся запрос получил результат в пределах дедлайна ведущего.
+            degraded_stages = sris_reasoning_result["full_reasoning_chain"].get("degraded_stages") if coalesced else deadline.degraded_stage_names()
 
             response_data = QueryResponse(
                 sris_response_text=sris_final_text,
-                reasoning_id=sris_reasoning_result.get("reasoning_id"),
+                reasoning_id=reasoning_id,
                 current_sris_tick=sris_timesense.get_current_tick(),
-                processing_time_ms=round(processing_time, 2)
+                processing_time_ms=round(processing_time, 2),
+                queue_wait_ms=round(queue_wait_ms, 2),
+                shared_reasoning_id=shared_reasoning_id,
+                degraded_stages=degraded_stages or None,
+                load_level=sris_reasoning_result["full_reasoning_chain"].get("load_level")
             )
             return response_data
+        elif sris_reasoning_result and sris_reasoning_result.get("status") == "overloaded":
+            logger.warning(f"Запрос от user_id '{request.user_id}' отклонен: LLM перегружен, ответа в кэше нет.")
+            raise HTTPException(status_code=503, detail="SRIS is overloaded, please retry later.",
+                                headers={"Retry-After": str(OVERLOADED_RETRY_AFTER_SECONDS)})
         else:
             error_details = (sris_reasoning_result or {}).get("full_reasoning_chain", {}).get("error_message", "Неизвестная ошибка в цикле SRIS")
             logger.error(f"Ошибка в цикле SRIS: {error_details}")
             raise HTTPException(status_code=500, detail=f"Internal SRIS Error: {error_details}")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Неожиданная ошибка при обработке запроса в /process_query/: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Unexpected server error.")
 
+@app.post("/process_query/batch", response_model=BatchQueryResponse)
+async def process_query_batch(request: BatchQueryRequest):
+    """
+    Пакет запросов для офлайн-нагрузки (оценочные наборы, дозаполнение): этапы конвейера
+    выполняются сразу для всего пакета (run_sris_cycle_batch), ответы генерируются
+    параллельно. Ошибка одного запроса возвращается в его элементе и не прерывает пакет.
+    """
+    if not sris_components_loaded:
+        raise HTTPException(status_code=503, detail="SRIS Core components are not available.")
+
+    start_time = time.time()
+    logger.info(f"Получен пакет из {len(request.queries)} запросов от user_id: '{request.user_id}'")
+    input_dicts = [{"text": query_text, "audio": None, "vision": None} for query_text in request.queries]
+    try:
+        cycle_results = await run_in_threadpool(run_sris_cycle_batch, input_dicts)
+    except Exception as e:
+        logger.error(f"Неожиданная ошибка при обработке пакета в /process_query/batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Unexpected server error.")
+
+    async def respond(index: int, cycle_result: Optional[Dict[str, Any]]) -> BatchItemResult:
+        reasoning_id = (cycle_result or {}).get("reasoning_id")
+        if not cycle_result or cycle_result.get("status") != "ok":
+            error_details = (cycle_result or {}).get("full_reasoning_chain", {}).get("error_message", "Неизвестная ошибка в цикле SRIS")
+            return BatchItemResult(index=index, status="cycle_error", reasoning_id=reasoning_id, error=error_details)
+        try:
+            text = await run_in_threadpool(generate_sris_response, cycle_result["full_reasoning_chain"])
+        except Exception as e:
+            logger.error(f"Ошибка генерации ответа для элемента {index} пакета: {e}", exc_info=True)
+            return BatchItemResult(index=index, status="response_error", reasoning_id=reasoning_id, error=str(e))
+        return BatchItemResult(index=index, status="ok", reasoning_id=reasoning_id, sris_response_text=text)
+
+    results = await asyncio.gather(*(respond(index, cycle_result) for index, cycle_result in enumerate(cycle_results)))
+    succeeded = sum(1 for item in results if item.status == "ok")
+    return BatchQueryResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        current_sris_tick=sris_timesense.get_current_tick(),
+        processing_time_ms=round((time.time() - start_time) * 1000, 2)
+    )
+
+# --- Эндпоинты таймлайна (персистентное хранилище событий) ---
+# Обработчики — обычные def: слив буферов и запросы к SQLite выполняются в пуле потоков
+# FastAPI и не блокируют цикл событий.
+def _require_timeline_store():
+    if not sris_components_loaded or sris_timeline_store is None or not sris_timeline_store.available:
+        raise HTTPException(status_code=503, detail="Timeline store is not available.")
+    # Сливаем буферы потоков, чтобы в хранилище попали и самые свежие события.
+    sris_timeline.flush()
+    return sris_timeline_store
+
+@app.get("/timeline")
+def get_timeline_events(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    event_type: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=5000),
+    after_id: int = 0
+) -> Dict[str, Any]:
+    """События за полуинтервал [start, end) (ISO-8601 UTC), постранично через after_id."""
+    store = _require_timeline_store()
+    try:
+        events: List[Dict[str, Any]] = store.query_range(start, end, event_type, limit, after_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+    next_after_id = events[-1]["id"] if len(events) == limit else None
+    return {"events": events, "count": len(events), "next_after_id": next_after_id}
+
+@app.get("/timeline/chains/{reasoning_chain_id}")
+def replay_timeline_chain(reasoning_chain_id: str) -> Dict[str, Any]:
+    store = _require_timeline_store()
+    events = store.replay_chain(reasoning_chain_id)
+    if not events:
+        raise HTTPException(status_code=404, detail=f"No timeline events for chain '{reasoning_chain_id}'.")
+    return {"reasoning_chain_id": reasoning_chain_id, "events": events}
+
+@app.get("/timeline/stats")
+def get_timeline_stats(start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    store = _require_timeline_store()
+    try:
+        counts = store.count_by_type(start, end)
+        latency = store.chain_latency_stats(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+    return {"event_counts": counts, "chain_latency": latency}
+
+# --- Адаптивные бюджеты токенов ---
+@app.get("/metrics/token_budgets")
+def get_token_budgets() -> Dict[str, Any]:
+    if not sris_components_loaded:
+        raise HTTPException(status_code=503, detail="SRIS components failed to import.")
+    return {"modes": get_budget_distributions()}
+
+@app.get("/metrics/coalescing")
+def get_coalescing_stats() -> Dict[str, Any]:
+    if not sris_components_loaded:
+        raise HTTPException(status_code=503, detail="SRIS components failed to import.")
+    return query_flights.stats()
+
+@app.get("/metrics/load")
+def get_load_stats() -> Dict[str, Any]:
+    """Уровень деградации под нагрузкой, живые метрики LLM и эффективность кэша ответов."""
+    if not sris_components_loaded:
+        raise HTTPException(status_code=503, detail="SRIS components failed to import.")
+    return {"policy": load_policy.stats(), "response_cache": response_cache.stats()}
+
+@app.get("/metrics/response_cache")
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Эффективность кэша ответов: точные и семантические попадания, сэкономленные вызовы LLM."""
+    if not sris_components_loaded:
+        raise HTTPException(status_code=503, detail="SRIS components failed to import.")
+    return response_cache.stats()
+
+# --- Сессии пользователей ---
+@app.get("/sessions/{user_id}")
+def get_session(user_id: str) -> Dict[str, Any]:
+    context = session_store.context_for(user_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail=f"No session for user '{user_id}'.")
+    return context
+
+@app.put("/sessions/{user_id}/sdna")
+def set_session_sdna(user_id: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Переопределения черт sDNA для пользователя; допустимы только ключи DEFAULT_SDNA."""
+    if not sris_components_loaded:
+        raise HTTPException(status_code=503, detail="SRIS components failed to import.")
+    unknown = sorted(set(overrides) - set(DEFAULT_SDNA))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sDNA traits: {unknown}")
+    return {"user_id": user_id, "sdna_overrides": session_store.set_sdna_overrides(user_id, overrides)}
+
+@app.delete("/sessions/{user_id}")
+def delete_session(user_id: str) -> Dict[str, Any]:
+    return {"user_id": user_id, "deleted": session_store.delete(user_id)}
+
+@app.get("/metrics/sessions")
+def get_session_stats() -> Dict[str, Any]:
+    return session_store.stats()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _component_retry_task is not None:
+        _component_retry_task.cancel()
+    if sris_components_loaded:
+        sris_timeline.close()
+        if sris_timeline_store is not None:
+            sris_timeline_store.close()
+
 # --- Корневой эндпоинт для проверки статуса ---
 @app.get("/")
 def read_root():
     return {"SRIS_Status": "Alive", "Core_Version": "1.0-Prometheus", "Docs": "/docs"}
+
+# --- Liveness / readiness ---
+@app.get("/health/live")
+def health_live():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready():
+    if not sris_components_loaded:
+        return JSONResponse(status_code=503, content={"ready": False, "detail": "SRIS components failed to import."})
+    # Только чтение состояния: повторные загрузки идут в фоновой задаче, а не в запросе пробы.
+    report = readiness_report()
+    report["warm_up_running"] = _warm_up_future is not None and not _warm_up_future.done()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
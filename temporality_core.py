@@ -1,44 +1,111 @@
 # temporality_core.py
 import logging
-from typing import List, Tuple, Optional, Dict, Any
+import os
+import json
+import heapq
+import threading
+from collections import deque
+from itertools import islice, count
+from typing import List, Tuple, Optional, Dict, Any, Deque, IO, Iterator
 from datetime import datetime, timezone # <--- ВОТ ЭТА СТРОКА ДОБАВЛЕНА
 
 # Настройка логгера для этого модуля
 logger = logging.getLogger(__name__)
 
+# Размер окна последних событий, которое ReasoningTimeline держит в памяти.
+DEFAULT_TIMELINE_CAPACITY: int = 10000
+# Сколько событий поток копит в своем буфере, прежде чем попытаться слить их в общее окно.
+THREAD_BUFFER_FLUSH_SIZE: int = 256
+
 class TimeSense:
-    # ... (остальной код класса TimeSense без изменений) ...
+    """
+    Счетчик тиков SRIS, безопасный для одновременных reasoning-циклов.
+
+    Тики выдаются через itertools.count: next() выполняется атомарно под GIL,
+    поэтому каждый вызов tick() получает уникальное значение без пропусков и
+    без блокировки. Последний выданный тик хранится в слоте своего потока,
+    а текущий тик — максимум по слотам, что гарантирует монотонность чтения.
+    """
     def __init__(self):
-        self.current_tick: int = 0
+        self._tick_counter = count(1)
+        self._last_tick_by_thread: Dict[int, int] = {}
         self.event_last_tick: Dict[str, int] = {}
         logger.info("TimeSense initialized at tick 0.")
 
+    @property
+    def current_tick(self) -> int:
+        return self.get_current_tick()
+
     def tick(self) -> int:
-        self.current_tick += 1
-        return self.current_tick
+        issued_tick = next(self._tick_counter)
+        # Каждый поток пишет только в свой слот, поэтому слот монотонен без блокировки.
+        self._last_tick_by_thread[threading.get_ident()] = issued_tick
+        return issued_tick
 
     def mark_event(self, event_id: str, specific_tick: Optional[int] = None):
-        tick_to_mark = specific_tick if specific_tick is not None else self.current_tick
+        tick_to_mark = specific_tick if specific_tick is not None else self.get_current_tick()
         self.event_last_tick[event_id] = tick_to_mark
         logger.info(f"TimeSense: Event '{event_id}' marked at tick {tick_to_mark}.")
 
     def get_time_since_event(self, event_id: str) -> Optional[int]:
         last_tick = self.event_last_tick.get(event_id)
         if last_tick is not None:
-            return self.current_tick - last_tick
+            return self.get_current_tick() - last_tick
         logger.warning(f"TimeSense: Event ID '{event_id}' not found in event_last_tick history. Cannot calculate time since.")
         return None
 
     def get_current_tick(self) -> int:
-        return self.current_tick
+        # list(...) снимается одной C-операцией и не ломается от вставок из других потоков.
+        return max(list(self._last_tick_by_thread.values()), default=0)
 
 
 class ReasoningTimeline:
-    # ... (код конструктора __init__ без изменений) ...
-    def __init__(self, timesense_instance: TimeSense):
-        self.events: List[Dict[str, Any]] = [] 
+    """
+    Кольцевой буфер событий reasoning-цикла с вторичными индексами.
+
+    Хранит только последние `capacity` событий; вытесненные события
+    дописываются в append-only JSONL-лог (`spill_path`), если он задан.
+    Индексы по reasoning_chain_id и event_type дают выборку без полного
+    прохода по буферу. Если передан `store` (TimelineStore), каждая слитая
+    пачка событий дописывается в персистентное хранилище, а JSONL-лог
+    используется, только пока хранилище недоступно.
+
+    record_event не берет общую блокировку: событие получает порядковый номер
+    из атомарного счетчика и кладется в буфер своего потока. Буферы сливаются
+    в общее окно в порядке номеров при чтении или при заполнении буфера потока.
+    """
+    def __init__(self,
+                 timesense_instance: TimeSense,
+                 capacity: int = DEFAULT_TIMELINE_CAPACITY,
+                 spill_path: Optional[str] = None,
+                 store: Optional[Any] = None):
+        if capacity <= 0:
+            raise ValueError(f"ReasoningTimeline capacity must be positive, got {capacity}")
         self.timesense = timesense_instance
-        logger.info("ReasoningTimeline initialized.")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.store = store
+        self._ring: Deque[Dict[str, Any]] = deque()
+        self._by_chain: Dict[Optional[str], Deque[Dict[str, Any]]] = {}
+        self._by_type: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._spill_file: Optional[IO[str]] = None
+        self._evicted_count: int = 0
+        self._seq_counter = count()
+        self._local = threading.local()
+        self._thread_buffers: List[Tuple[threading.Thread, Deque[Tuple[int, Dict[str, Any]]]]] = []
+        self._merge_lock = threading.Lock()
+        logger.info(f"ReasoningTimeline initialized (capacity={capacity}, spill_path={spill_path}, store={'on' if store else 'off'}).")
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """Снимок текущего окна событий (от старых к новым)."""
+        self.flush()
+        return list(self._ring)
+
+    @property
+    def evicted_count(self) -> int:
+        self.flush()
+        return self._evicted_count
 
     def record_event(self, 
                      event_type: str, 
@@ -48,7 +115,6 @@ class ReasoningTimeline:
         current_event_tick = self.timesense.get_current_tick()
         record = {
             "tick": current_event_tick,
-            # Вот здесь используется datetime и timezone, которые мы теперь импортировали
             "timestamp_utc": datetime.now(timezone.utc).isoformat(), 
             "reasoning_chain_id": reasoning_chain_id,
             "event_type": event_type,
@@ -56,19 +122,114 @@ class ReasoningTimeline:
         }
         if related_to_tick is not None:
             record["related_tick"] = related_to_tick
-            
-        self.events.append(record)
+
+        buffer = self._thread_buffer()
+        buffer.append((next(self._seq_counter), record))
+        if len(buffer) >= THREAD_BUFFER_FLUSH_SIZE:
+            # Не ждем: если слияние уже идет в другом потоке, оно заберет и наш буфер.
+            self.flush(blocking=False)
         logger.info(f"Timeline: Recorded event '{event_type}' at SRIS Tick {current_event_tick} (Chain ID: {reasoning_chain_id}).")
-    
-    # ... (остальной код класса ReasoningTimeline без изменений) ...
+
+    def _thread_buffer(self) -> Deque[Tuple[int, Dict[str, Any]]]:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = deque()
+            self._local.buffer = buffer
+            # Регистрация происходит один раз на поток, поэтому блокировка здесь не на горячем пути.
+            with self._merge_lock:
+                self._thread_buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def flush(self, blocking: bool = True) -> None:
+        """Сливает буферы потоков в общее окно в порядке порядковых номеров."""
+        if not self._merge_lock.acquire(blocking=blocking):
+            return
+        try:
+            drained: List[List[Tuple[int, Dict[str, Any]]]] = []
+            for thread, buffer in list(self._thread_buffers):
+                items = []
+                # popleft атомарен, поэтому поток-владелец может продолжать append.
+                while buffer:
+                    items.append(buffer.popleft())
+                if items:
+                    drained.append(items)
+            # Буферы завершившихся потоков больше не пополнятся.
+            self._thread_buffers = [(t, b) for t, b in self._thread_buffers if t.is_alive() or b]
+            merged = [record for _, record in heapq.merge(*drained, key=lambda item: item[0])]
+            for record in merged:
+                self._insert(record)
+            if merged and self.store is not None:
+                self.store.append_events(merged)
+        finally:
+            self._merge_lock.release()
+
+    def _insert(self, record: Dict[str, Any]) -> None:
+        if len(self._ring) >= self.capacity:
+            self._evict_oldest()
+        self._ring.append(record)
+        self._by_chain.setdefault(record.get("reasoning_chain_id"), deque()).append(record)
+        self._by_type.setdefault(record.get("event_type"), deque()).append(record)
+
+    def _evict_oldest(self) -> None:
+        # Самое старое событие буфера всегда является и самым старым в своих индексах,
+        # поэтому его удаление из индексов — это popleft, а не поиск.
+        oldest = self._ring.popleft()
+        for index, key in ((self._by_chain, oldest.get("reasoning_chain_id")), (self._by_type, oldest.get("event_type"))):
+            bucket = index.get(key)
+            if bucket:
+                bucket.popleft()
+                if not bucket:
+                    del index[key]
+        self._evicted_count += 1
+        self._spill(oldest)
+
+    def _spill(self, record: Dict[str, Any]) -> None:
+        if not self.spill_path or (self.store is not None and self.store.available):
+            return
+        try:
+            if self._spill_file is None:
+                spill_dir = os.path.dirname(self.spill_path)
+                if spill_dir:
+                    os.makedirs(spill_dir, exist_ok=True)
+                self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+            self._spill_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._spill_file.flush()
+        except (OSError, TypeError) as e:
+            logger.error(f"Timeline: Не удалось выгрузить событие в '{self.spill_path}': {e}", exc_info=True)
+
+    def iter_spilled_events(self) -> Iterator[Dict[str, Any]]:
+        """Читает вытесненные события из append-only лога (от старых к новым)."""
+        self.flush()
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def close(self) -> None:
+        self.flush()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
     def get_recent_events(self, n: int = 10) -> List[Dict[str, Any]]:
-        return self.events[-n:]
+        if n <= 0:
+            return []
+        self.flush()
+        recent = list(islice(reversed(self._ring), n))
+        recent.reverse()
+        return recent
 
     def get_events_for_chain(self, reasoning_chain_id: str) -> List[Dict[str, Any]]:
-        return [event for event in self.events if event.get("reasoning_chain_id") == reasoning_chain_id]
+        self.flush()
+        return list(self._by_chain.get(reasoning_chain_id, ()))
 
     def get_events_by_type(self, event_type: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        filtered_events = [event for event in reversed(self.events) if event.get("event_type") == event_type]
+        self.flush()
+        bucket = self._by_type.get(event_type, ())
         if limit:
-            return filtered_events[:limit] 
-        return list(reversed(filtered_events))
+            # Как и раньше: с лимитом возвращаются самые свежие события, от новых к старым.
+            return list(islice(reversed(bucket), limit))
+        return list(bucket)
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import causal_templates
+from causal_templates import CausalTemplateStore
+from cause_effect import extract_cause_effect
+
+CONTEXT = {"current_goals": [], "current_mode": "default", "sdna_traits": {}}
+
+
+def _write(path, templates):
+    path.write_text(json.dumps({"templates": templates}), encoding="utf-8")
+
+
+def test_bundled_templates_detect_by_priority_and_resolve_conditions():
+    store = causal_templates.get_template_store()
+    assert store.detect_action("Reassure and then destroy") == "destroy"
+    assert store.detect_action("COMMUNICATE, then optimize") == "communicate"
+    assert store.detect_action("wait") is None
+    threat = extract_cause_effect({"threat_level": 0.9}, "destroy it", {**CONTEXT, "current_mode": "threat_response"})
+    calm = extract_cause_effect({"threat_level": 0.9}, "destroy it", CONTEXT)
+    assert threat["effects"][0]["valence_impact"] == 0.8 and calm["effects"][0]["valence_impact"] == -1.0
+    assert extract_cause_effect({"subject": "Drone"}, "approach", CONTEXT)["preconditions"][0]["concept"] == "Drone has mobility"
+
+
+def test_store_hot_reloads_changed_file_and_keeps_templates_on_broken_file(tmp_path):
+    path = tmp_path / "templates.json"
+    _write(path, {"scan": {"triggers": ["scan"], "effects": [{"concept": "Area mapped", "probability": 0.9, "valence_impact": 0.2}]}})
+    store = CausalTemplateStore(str(path), reload_check_interval=0.0)
+    assert store.detect_action("scan the room") == "scan"
+
+    _write(path, {"probe": {"triggers": ["probe"], "effects": []}})
+    os.utime(path, (1, 1))
+    assert store.detect_action("probe it") == "probe" and store.get("scan") is None
+
+    path.write_text("{broken", encoding="utf-8")
+    os.utime(path, (2, 2))
+    assert store.detect_action("probe it") == "probe"
+
+
+def test_thousands_of_learned_templates_and_save(tmp_path):
+    templates = {f"action_{i}": {"triggers": [f"trig{i}word"], "effects": [{"concept": f"effect {i}", "probability": 0.5, "valence_impact": 0.1}]}
+                 for i in range(3000)}
+    store = CausalTemplateStore()
+    store.load_data({"templates": templates})
+    assert len(store) == 3000
+    assert store.detect_action("do trig2500word now") == "action_2500"
+    store.upsert_template("learned", {"triggers": ["learnedverb"], "preconditions": [{"concept": "c", "confidence": 0.5}]})
+    assert store.get("learned").instantiate({}, {})[0] == [{"concept": "c", "confidence": 0.5}]
+
+    causal_templates.set_template_store(store)
+    try:
+        assert extract_cause_effect({}, "trig7word", CONTEXT)["effects"] == [{"concept": "effect 7", "probability": 0.5, "valence_impact": 0.1}]
+    finally:
+        causal_templates.set_template_store(None)
+
+    saved = tmp_path / "saved.json"
+    store.save(str(saved))
+    assert CausalTemplateStore(str(saved)).detect_action("learnedverb") == "learned"
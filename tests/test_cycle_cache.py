@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cause_effect import extract_cause_effect
+from cycle_cache import cycle_scope, current_cycle_cache, memoize_batch
+from fractal_ontology import check_ontology
+from hypothesis_evaluator import evaluate_hypotheses
+from tuning_module import safety_filter
+from zav2_context_validator import validate_hypotheses_batch
+
+PERCEPTION = {"action": "ask", "object": "human"}
+SDNA = {"ethical_risk_aversion": 0.5}
+CONTEXT = {"current_goals": [], "current_mode": "default", "sdna_traits": SDNA}
+
+
+def test_memoize_batch_computes_each_key_once_and_returns_copies():
+    computed = []
+
+    def compute(indices):
+        computed.extend(indices)
+        return [{"value": i} for i in indices]
+
+    assert memoize_batch("stage", ["a", "b"], compute) == [{"value": 0}, {"value": 1}]
+    assert current_cycle_cache() is None
+    computed.clear()
+    with cycle_scope() as cache:
+        first = memoize_batch("stage", ["a", "b", "a"], compute)
+        first[0]["value"] = 99
+        second = memoize_batch("stage", ["b", "a"], compute)
+    assert computed == [0, 1]
+    assert second == [{"value": 1}, {"value": 0}]
+    assert cache.stats() == {"computed": {"stage": 2}, "saved": {"stage": 3}, "total_saved": 3}
+    assert current_cycle_cache() is None
+
+
+def test_kernel_filter_evaluator_and_final_analysis_share_results():
+    hypotheses = ["Ответ: свет дает энергию растениям.", "communicate with the user", "Destroy the archive"]
+    with cycle_scope() as cache:
+        zav2 = validate_hypotheses_batch(hypotheses)
+        for h, check in zip(hypotheses, zav2):
+            if check["valid"] and check_ontology(h, PERCEPTION, "default", SDNA)["valid"]:
+                safety_filter(h)
+        ranked = evaluate_hypotheses(hypotheses, PERCEPTION, [], SDNA, "default")
+        extract_cause_effect(PERCEPTION, ranked[0]["hypothesis"], CONTEXT)
+    stats = cache.stats()
+    assert stats["computed"] == {"cause_effect": 3, "ontology": 3, "safety": 2, "zav2": 3}
+    assert stats["saved"] == {"cause_effect": 1, "ontology": 2, "safety": 0, "zav2": 3}
+    assert ranked == evaluate_hypotheses(hypotheses, PERCEPTION, [], SDNA, "default")
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import deadline as deadline_module
+import response_generator
+import utils
+from deadline import Deadline, TokenRateEstimator, deadline_scope, stage_allowed
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deadline_budget_stage_checks_and_token_cap():
+    clock = FakeClock()
+    deadline = Deadline(10.0, clock=clock)
+    assert stage_allowed("hypotheses")
+    with deadline_scope(deadline):
+        assert stage_allowed("hypotheses")
+        clock.now += 7.0
+        assert not stage_allowed("hypotheses") and stage_allowed("semantic_memory")
+    assert deadline.cap_tokens(400, seconds_per_token=0.01) == 250   # (3.0 - 0.5) / 0.01
+    assert deadline.cap_tokens(100, seconds_per_token=0.01) == 100
+    clock.now += 5.0
+    assert deadline.expired() and deadline.cap_tokens(400) == 0
+
+    deadline.degrade("hypotheses", "fallback_hypotheses")
+    assert deadline.degraded_stage_names() == ["hypotheses"]
+    assert deadline.to_dict()["degraded_stages"][0]["remaining_ms"] == 0.0
+
+    rate = TokenRateEstimator(initial_seconds_per_token=0.1, smoothing=0.5)
+    rate.observe(1.0, 20)
+    rate.observe(1.0, None)
+    assert round(rate.seconds_per_token, 3) == 0.075 and rate.samples == 1
+
+
+def test_execute_llm_query_caps_tokens_and_skips_llm_near_deadline(monkeypatch):
+    calls = []
+
+    def fake_query(prompt, mode, max_tokens, temperature):
+        calls.append(max_tokens)
+        return {"text": "ok", "completion_tokens": None, "finish_reason": "stop"}
+
+    monkeypatch.setattr(utils, "mistral_core_available", True)
+    monkeypatch.setattr(utils, "query_mistral_with_usage", fake_query)
+    monkeypatch.setattr(deadline_module, "token_rate", TokenRateEstimator(initial_seconds_per_token=0.01))
+    clock = FakeClock()
+    deadline = Deadline(2.5, clock=clock)
+    with deadline_scope(deadline):
+        assert utils.execute_llm_query("prompt", "respond", 512, 0.5) == "ok"
+        clock.now += 2.4
+        assert utils.execute_llm_query("prompt", "analyze_json", 512, 0.0, expect_json=True)["error"] == "DEADLINE_EXCEEDED"
+        assert list(utils.execute_llm_stream("prompt", "respond", 512, 0.5)) == [utils.DEADLINE_ERROR_MESSAGE]
+    assert calls == [200]
+    assert deadline.degraded_stage_names() == ["llm:respond", "llm:analyze_json", "llm:respond"]
+
+
+def test_response_falls_back_to_template_when_deadline_is_short(monkeypatch):
+    monkeypatch.setattr(response_generator, "execute_llm_query", lambda *args, **kwargs: pytest.fail("LLM вызвана"))
+    clock = FakeClock()
+    deadline = Deadline(1.5, clock=clock)
+    chain = {"mode": "full_reasoning", "input_text": "Что такое SRIS?",
+             "communication_intent": {"intent_type": "explain_analysis"},
+             "chosen_hypothesis": {"hypothesis": "SRIS рассуждает по цепочке этапов."},
+             "perception_struct": {"language_detected": "ru"}}
+    with deadline_scope(deadline):
+        reply = response_generator.generate_sris_response(chain)
+    assert "SRIS рассуждает" in reply and deadline.degraded_stage_names() == ["response"]
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils
+from fake_llm import FakeLLM, LatencyModel, prompt_digest
+
+RESPONSES = [
+    {"mode": "analyze_json", "match": "hello", "text": '{"query_type": "conversation_flow: greeting_social"}'},
+    {"mode": "hyp_gen_for_*", "text": "first"},
+    {"mode": "hyp_gen_for_*", "text": "second"},
+    {"mode": "respond", "prompt_digest": prompt_digest("exact"), "text": "recorded reply"},
+]
+
+
+def test_fake_llm_replays_recorded_responses_deterministically():
+    fake = FakeLLM(RESPONSES, LatencyModel("constant", value=1.0, per_token_ms=0.5))
+    assert fake.query("say hello", "analyze_json")["text"].startswith('{"query_type"')
+    assert [fake.query("p", "hyp_gen_for_goal")["text"] for _ in range(3)] == ["first", "second", "first"]
+    assert fake.query("exact", "respond")["text"] == "recorded reply"
+    assert fake.query("other", "respond")["text"] == "Это тестовый ответ SRIS."  # заготовка StubBackend
+    assert fake.calls == 6 and fake.thread_waited_ms() == fake.simulated_ms
+
+    usage = {}
+    assert "".join(fake.stream("exact", "respond", usage=usage)) == "recorded reply"
+    assert usage == {"completion_tokens": 2, "finish_reason": "stop"}
+
+    first, second = LatencyModel("lognormal", seed=3, median=40, sigma=0.5), LatencyModel("lognormal", seed=3, median=40, sigma=0.5)
+    assert [first.first_token_ms() for _ in range(5)] == [second.first_token_ms() for _ in range(5)]
+
+
+def test_install_routes_utils_queries_to_fake():
+    fake = FakeLLM(RESPONSES)
+    with fake.install():
+        assert utils.execute_llm_query("say hello", "analyze_json", 64, 0.0, expect_json=True) == {"query_type": "conversation_flow: greeting_social"}
+    assert utils.query_mistral_with_usage is not fake.query
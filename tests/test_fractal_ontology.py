@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fractal_ontology
+from fractal_ontology import CompiledOntology
+
+
+def _generated_ontology(n_domains: int, subs_per_domain: int) -> dict:
+    concepts = {}
+    for d in range(n_domains):
+        concepts[f"domain_{d}"] = {
+            "keywords": [f"dword{d}x"],
+            "properties": {"type": f"type_{d}"},
+            "sub_concepts": {
+                f"concept_{d}_{s}": {"keywords": [f"cword{d}x{s}y"], "sub_concepts": {f"leaf_{d}_{s}": {"keywords": [f"lword{d}x{s}y"]}}}
+                for s in range(subs_per_domain)
+            },
+        }
+    rules = {
+        f"rule_{d}": {"domain": f"domain_{d}", "strict": d % 2 == 0, "message": f"rule {d}", "priority": "high", "exceptions": []}
+        for d in range(n_domains)
+    }
+    rules["rule_leaf"] = {"domain": "domain_x", "condition": {"concept_detected": "leaf_7_1"}, "strict": True, "message": "leaf", "priority": "critical"}
+    return {"concepts": concepts, "rules": rules}
+
+
+def test_compiled_ontology_indexes_thousands_of_concepts():
+    ontology = CompiledOntology.from_data(_generated_ontology(1000, 3))
+    assert len(ontology) == 7000
+    assert sorted(ontology.concepts_in_text("we lword7x1y and dword3x")) == ["domain_3", "leaf_7_1"]
+    assert ontology.ancestors("leaf_7_1") == ["concept_7_1", "domain_7"]
+    assert ontology.get_property("leaf_7_1", "type") is None
+    assert ontology.get_property("leaf_7_1", "type", inherit=True) == "type_7"
+    assert [name for name, _ in ontology.relevant_rules(["domain_3", "leaf_7_1", "domain_9"])] == ["rule_3", "rule_9", "rule_leaf"]
+    # A private matcher does not leak concepts into the active ontology.
+    assert fractal_ontology._get_concepts_from_text("dword3x") == []
+
+
+def test_load_ontology_from_data_file_and_reset(tmp_path):
+    builtin_result = fractal_ontology.check_ontology("destroy the target", {"object": "human"}, "default")
+    path = tmp_path / "ontology.json"
+    fractal_ontology.export_ontology(str(path))
+    try:
+        fractal_ontology.load_ontology(str(path))
+        assert fractal_ontology.check_ontology("destroy the target", {"object": "human"}, "default") == builtin_result
+
+        custom = tmp_path / "custom.json"
+        custom.write_text('{"concepts": {"domain_x": {"keywords": ["frobnicate"]}}, "rules": {"r": {"domain": "domain_x", "strict": true, "message": "no", "priority": "high"}}}', encoding="utf-8")
+        fractal_ontology.load_ontology(str(custom))
+        assert fractal_ontology.check_ontology("destroy the target", {"object": "human"}, "default")["valid"]
+        assert not fractal_ontology.check_ontology("frobnicate it", {}, "default")["valid"]
+    finally:
+        fractal_ontology.reset_ontology()
+    assert fractal_ontology._get_concepts_from_text("frobnicate") == []
+    assert fractal_ontology.check_ontology("destroy the target", {"object": "human"}, "default") == builtin_result
+
+
+def test_reload_swaps_ontology_without_an_empty_window():
+    seen = []
+    done = threading.Event()
+    def lookups():
+        while not done.is_set():
+            seen.append(sorted(fractal_ontology._get_concepts_from_text("We must subjugate and enslave them")))
+    reader = threading.Thread(target=lookups)
+    reader.start()
+    try:
+        for _ in range(20):
+            fractal_ontology.reset_ontology()
+    finally:
+        done.set()
+        reader.join()
+    assert seen and [c for c in seen if c != ["concept_control_force", "domain_conflict"]] == []
+    prefix = fractal_ontology.get_active_ontology().category_prefix
+    ontology_categories = {c for cs in fractal_ontology.shared_matcher._categories_by_keyword.values() for c in cs
+                           if c.startswith(fractal_ontology.ONTOLOGY_CATEGORY_PREFIX)}
+    assert ontology_categories and all(c.startswith(prefix) for c in ontology_categories)
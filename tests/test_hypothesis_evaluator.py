@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cause_effect import extract_cause_effect, extract_cause_effect_batch
+from fractal_ontology import check_ontology, check_ontology_batch
+from hypothesis_evaluator import evaluate_hypotheses, evaluate_hypotheses_batch
+
+SDNA = {"risk_tolerance": 0.8, "proactiveness": 0.8, "efficiency_preference": 0.8, "ethical_risk_aversion": 0.9}
+PERCEPTION = {"action": "ask", "object": "human"}
+
+
+def test_ranking_prefers_direct_answers_and_penalizes_violations():
+    hypotheses = [
+        "Мысль: пользователь чего-то хочет",
+        "Destroy the human operator",
+        "Ответ: Фотосинтез превращает свет в энергию.",
+        "Проверить внутреннюю базу знаний по теме",
+    ]
+    ranked = evaluate_hypotheses(hypotheses, PERCEPTION, [{"concept": "answer_information_request"}], SDNA, "default")
+    assert [r["hypothesis"] for r in ranked][0] == "Ответ: Фотосинтез превращает свет в энергию."
+    assert ranked[0]["details"]["goal_congruence_score"] == 0.45
+    worst = ranked[-1]
+    assert worst["hypothesis"] == "Destroy the human operator"
+    assert worst["score"] < 0
+    assert "zav2_violations" in worst["details"] and "ontology_violations_strict" in worst["details"]
+
+
+def test_batch_keeps_input_order_and_matches_ranked_output():
+    hypotheses = ["optimize the energy grid proactively", "Сказать: спасибо, у меня все хорошо!", "approach the target", ""]
+    goals = [{"concept": "engage_in_social_dialogue"}]
+    batch = evaluate_hypotheses_batch(hypotheses, PERCEPTION, goals, SDNA, "default")
+    assert [r["hypothesis"] for r in batch] == hypotheses
+    ranked = evaluate_hypotheses(hypotheses, PERCEPTION, goals, SDNA, "default")
+    assert ranked == sorted(batch, key=lambda r: r["score"], reverse=True)
+    assert evaluate_hypotheses_batch([], PERCEPTION, goals, SDNA, "default") == []
+
+
+def test_batch_validators_match_single_calls():
+    context = {"current_goals": [], "current_mode": "threat_response", "sdna_traits": SDNA}
+    perception = {"object": "machine", "threat_level": 0.9, "ambiguity": 0.2}
+    hypotheses = ["destroy the drone", "communicate with it", "destroy it now", "wait"]
+    causal = extract_cause_effect_batch(perception, hypotheses, context)
+    assert causal == [extract_cause_effect(perception, h, context) for h in hypotheses]
+    # Результаты для одного глагола не должны разделять изменяемые списки.
+    causal[0]["effects"][0]["probability"] = 0.0
+    assert causal[2]["effects"][0]["probability"] == 0.98
+    assert check_ontology_batch(hypotheses, perception, "default") == [check_ontology(h, perception, "default") for h in hypotheses]
@@ -0,0 +1,68 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import hypothesis_generator
+
+PERCEPTION = {"summary": "Что такое фотосинтез?", "language_detected": "ru"}
+GOALS = [{"concept": "answer_information_request"}]
+
+
+def _fake_stream(text, chunk_size, consumed):
+    def stream(prompt, mode, max_tokens, temperature):
+        for i in range(0, len(text), chunk_size):
+            consumed.append((temperature, i))
+            yield text[i:i + chunk_size]
+    return stream
+
+
+def test_streaming_parses_lines_across_chunks_and_stops_early(monkeypatch):
+    text = "1. Ответ: свет дает энергию растениям.\n- Мысль: уточнить\nОтвет: хлорофилл поглощает свет солнца.\nОтвет: и еще одна длинная строка.\n"
+    consumed = []
+    monkeypatch.setattr(hypothesis_generator, "execute_llm_stream", _fake_stream(text, 7, consumed))
+    scored = []
+
+    def score(h):
+        scored.append(h)
+        return 1.0 if h.startswith("Ответ:") else 0.2
+
+    result = hypothesis_generator.generate_hypotheses_streaming(PERCEPTION, GOALS, score_fn=score, score_threshold=0.9, enough=2)
+    assert result["hypotheses"] == ["Ответ: свет дает энергию растениям.", "Мысль: уточнить", "Ответ: хлорофилл поглощает свет солнца."]
+    assert scored == result["hypotheses"] and result["scores"] == [1.0, 0.2, 1.0]
+    assert result["stopped_early"] and result["generations"][0]["stopped_early"]
+    assert len(consumed) * 7 < len(text)
+    assert result["time_to_best_ms"] is not None and result["time_to_first_ms"] <= result["total_ms"]
+
+
+def test_streaming_without_score_fn_matches_batch_generation(monkeypatch):
+    text = "Гипотезы:\n1. Проверить внутреннюю базу знаний\n2.Запросить у пользователя уточняющие детали"
+    monkeypatch.setattr(hypothesis_generator, "execute_llm_stream", _fake_stream(text, 5, []))
+    monkeypatch.setattr(hypothesis_generator, "execute_llm_query", lambda prompt, mode, max_tokens, temperature: text)
+    streamed = hypothesis_generator.generate_hypotheses_streaming(PERCEPTION, GOALS)
+    assert streamed["hypotheses"] == hypothesis_generator.generate_hypotheses(PERCEPTION, GOALS)
+    assert not streamed["stopped_early"]
+
+
+def test_parallel_generations_are_diverse_shorter_and_deduplicated(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def stream(prompt, mode, max_tokens, temperature):
+        with lock:
+            calls.append((max_tokens, temperature))
+        yield "Общая мысль\n"
+        yield f"Мысль при t={temperature}\n"
+
+    monkeypatch.setattr(hypothesis_generator, "execute_llm_stream", stream)
+    result = hypothesis_generator.generate_hypotheses_streaming(PERCEPTION, GOALS, parallel_generations=3, max_tokens=400)
+    assert sorted(calls) == [(133, 0.65), (133, 0.8), (133, 0.95)]
+    assert result["hypotheses"].count("Общая мысль") == 1 and len(result["hypotheses"]) == 4
+
+
+def test_streaming_error_falls_back_to_default_hypothesis(monkeypatch):
+    monkeypatch.setattr(hypothesis_generator, "execute_llm_stream", _fake_stream("Ошибка: модель не загружена", 100, []))
+    result = hypothesis_generator.generate_hypotheses_streaming(PERCEPTION, GOALS)
+    assert result["hypotheses"][0].startswith("Стандартная гипотеза (ru): Проанализировать ситуацию")
+    assert result["generations"][0]["failed"]
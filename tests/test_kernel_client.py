@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import sris_kernel
+from kernel_client import HttpKernelClient, InProcessKernelClient, KernelClient
+
+
+def test_in_process_client_uses_fast_path_for_hierarchical_query_type(monkeypatch):
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: {
+        "query_type": "conversation_flow: greeting_social", "summary": "User greets", "sentiment": "positive"
+    })
+    monkeypatch.setattr(sris_kernel, "generate_sris_response", lambda chain: chain["communication_intent"]["intent_type"])
+    sris_kernel.initial_semantic_index = None
+
+    answer = InProcessKernelClient().ask("Привет")
+    assert answer["status"] == "ok"
+    assert answer["reply_text"] == "reciprocate_social_interaction"
+    assert answer["reasoning_id"]
+
+
+def test_hypothesis_filter_rejects_unsafe_and_falls_back_when_all_rejected():
+    accepted, rejected = sris_kernel._filter_hypotheses(["Explain the schedule", "Hack the server"], {})
+    assert accepted == ["Explain the schedule"]
+    assert rejected == [{"hypothesis": "Hack the server", "stage": "safety"}]
+
+    accepted, rejected = sris_kernel._filter_hypotheses(["Hack the server"], {})
+    assert accepted == ["Hack the server"]
+    assert len(rejected) == 1
+
+
+def test_srk_delegates_to_shared_kernel(monkeypatch):
+    import SRK
+    monkeypatch.setattr(SRK, "run_sris_cycle", lambda input_dict: {"status": "ok", "echo": input_dict["text"]})
+    assert SRK.run_srk_cycle({"text": "hi"}) == {"status": "ok", "echo": "hi"}
+
+
+def test_http_client_maps_api_responses():
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply(503, {"ready": False, "components": {"semantic_index": {"state": "loading"}}})
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if payload["query_text"] == "fail":
+                self._reply(500, {"detail": "Internal SRIS Error: boom"})
+            else:
+                self._reply(200, {"sris_response_text": "pong", "reasoning_id": "r1", "current_sris_tick": 7, "processing_time_ms": 1.0})
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = HttpKernelClient(f"http://127.0.0.1:{server.server_port}", timeout=5)
+        status = client.start()
+        assert status["server_ready"] is False and status["semantic_index_ready"] is False
+        assert client.ask("ping") == {"status": "ok", "reply_text": "pong", "reasoning_id": "r1", "tick": 7}
+        failed = client.ask("fail")
+        assert failed["status"] == "error" and "boom" in failed["error_message"]
+    finally:
+        server.shutdown()
+
+
+def test_client_without_ask_cannot_be_instantiated():
+    class StartOnlyClient(KernelClient):
+        def start(self):
+            return {"status": "ok"}
+
+    with pytest.raises(TypeError):
+        StartOnlyClient()
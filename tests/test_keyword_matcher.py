@@ -0,0 +1,45 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from keyword_matcher import KeywordMatcher
+from fractal_ontology import _get_concepts_from_text
+from tuning_module import safety_filter
+
+
+def test_overlapping_keywords_and_categories_in_one_pass():
+    matcher = KeywordMatcher()
+    matcher.add_keywords("pronoun", ["he", "she", "his", "hers"])
+    matcher.add_keywords("danger", ["she", "ushers"])
+
+    assert matcher.find_keywords("USHERS") == {"he", "she", "hers", "ushers"}
+    assert matcher.match("ushers") == {"pronoun": {"he", "she", "hers"}, "danger": {"she", "ushers"}}
+    assert matcher.keywords_in_category("his", "danger") == set()
+    assert matcher.has_category("a shepherd", "danger")
+
+
+def test_matches_naive_substring_search_and_recompiles_after_changes():
+    rng = random.Random(7)
+    keywords = ["".join(rng.choice("abc ") for _ in range(rng.randint(1, 5))).strip() or "a" for _ in range(40)]
+    matcher = KeywordMatcher()
+    matcher.add_keywords("k", keywords)
+    for _ in range(200):
+        text = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 40)))
+        assert matcher.find_keywords(text) == {kw for kw in keywords if kw in text}
+
+    matcher.add_keywords("late", ["zzz"])
+    assert matcher.match("a zzz").get("late") == {"zzz"}
+    matcher.remove_category("late")
+    assert "late" not in matcher.match("a zzz")
+
+    matcher.add_keywords("gen:1:x", ["zzz", "qq"])
+    matcher.add_keywords("gen:12:y", ["zzz"])
+    matcher.remove_categories_with_prefix("gen:1:")
+    assert matcher.match("zzz qq") == {"gen:12:y": {"zzz"}}
+
+
+def test_validators_use_shared_tables():
+    assert safety_filter("Hack the grid, then destroy it")["detected_keywords"] == ["destroy", "hack"]
+    assert sorted(_get_concepts_from_text("We must subjugate and enslave them")) == ["concept_control_force", "domain_conflict"]
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import lazy_components
+from lazy_components import LazyComponent, STATE_FAILED, STATE_PENDING, STATE_READY
+
+
+def test_factory_runs_once_under_concurrent_first_use():
+    calls = []
+    component = LazyComponent("demo", lambda: calls.append(1) or object())
+    assert component.state == STATE_PENDING
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(component.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len({id(r) for r in results}) == 1
+    assert component.state == STATE_READY
+
+
+def test_failed_factory_is_retried_after_growing_backoff():
+    calls = []
+    now = [0.0]
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("model file missing")
+        return "model"
+
+    component = LazyComponent("flaky", flaky, retry_base_seconds=5.0, clock=lambda: now[0])
+    assert component.get() is None
+    assert component.get() is None
+    assert len(calls) == 1
+    assert component.status()["state"] == STATE_FAILED
+    assert "model file missing" in component.status()["error"]
+    assert component.status()["retry_in_s"] == 5.0
+
+    now[0] = 5.0
+    assert component.get() is None and len(calls) == 2
+    now[0] = 14.0   # вторая пауза — 10 с
+    assert component.get() is None and len(calls) == 2
+    now[0] = 15.0
+    assert component.get() == "model" and len(calls) == 3
+    assert component.status()["error"] is None and component.failures == 0
+
+
+def test_readiness_is_read_only_and_failed_components_are_retried_separately(monkeypatch):
+    now = [0.0]
+    worker_up = [False]
+    calls = []
+
+    def worker():
+        calls.append("llm")
+        if not worker_up[0]:
+            raise RuntimeError("worker socket missing")
+        return "worker"
+
+    def missing_model():
+        raise RuntimeError("no embedding model")
+
+    registry = {"llm": LazyComponent("llm", worker, clock=lambda: now[0]),
+                "embedding_model": LazyComponent("embedding_model", missing_model, optional=True, clock=lambda: now[0])}
+    monkeypatch.setattr(lazy_components, "_REGISTRY", registry)
+    lazy_components.warm_up()
+    worker_up[0] = True
+    now[0] = 10.0
+    assert not lazy_components.readiness_report()["ready"] and calls == ["llm"]   # проба ничего не загружает
+
+    assert sorted(lazy_components.retry_failed_components()) == ["embedding_model", "llm"]
+    report = lazy_components.readiness_report()
+    assert report["ready"] and report["components"]["embedding_model"]["state"] == STATE_FAILED
+    assert lazy_components.retry_failed_components() == []   # пауза после новой неудачи еще не истекла
+
+
+def test_kernel_import_defers_heavy_components():
+    import subprocess
+    code = (
+        "import sys, sris_kernel, lazy_components; "
+        "print('tkinter' in sys.modules, 'llama_index.core' in sys.modules, "
+        "lazy_components.readiness_report()['components']['semantic_index']['state'])"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                               cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    assert completed.stdout.split() == ["False", "False", "pending"]
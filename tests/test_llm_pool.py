@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import llm_pool
+from llm_pool import LlamaContextPool, PooledContext, kv_cache_mb, plan_context_count, usable_cpus
+from model_router import ModelPoolTimeout, ModelSpec, build_router
+
+MISTRAL_METADATA = {
+    "general.architecture": "llama", "llama.block_count": "32", "llama.embedding_length": "4096",
+    "llama.attention.head_count": "32", "llama.attention.head_count_kv": "8",
+}
+
+
+def test_pool_size_is_bounded_by_cores_and_memory():
+    per_context = kv_cache_mb(MISTRAL_METADATA, 4096)
+    assert per_context == 512.0  # GQA: 8 из 32 голов хранят K/V
+    assert plan_context_count(8, per_context, 4, cpu_count=16, available_mb=10000) == 4
+    assert plan_context_count(8, per_context, 4, cpu_count=16, available_mb=1000) == 1
+    assert plan_context_count(8, None, 2, cpu_count=16, available_mb=None) == 8
+    assert kv_cache_mb({}, 4096) is None
+    assert plan_context_count(8, per_context, 2, cpu_count=16, available_mb=None, memory_budget_mb=2000) == 3
+
+
+def test_plan_honours_spec_capacity_and_gpu_memory_budget(monkeypatch):
+    monkeypatch.setattr(llm_pool, "usable_cpus", lambda: list(range(16)))
+    monkeypatch.setattr(llm_pool, "available_memory_mb", lambda: 64000)
+    cpu_pool = LlamaContextPool(ModelSpec("m", "m.gguf", max_instances=8, memory_mb=1500, memory_budget_mb=3000))
+    cpu_pool._plan(MISTRAL_METADATA)
+    assert cpu_pool.capacity == 2   # spec.capacity: 3000 // 1500
+    gpu_pool = LlamaContextPool(ModelSpec("m", "m.gguf", n_gpu_layers=20, max_instances=8, memory_mb=1232, memory_budget_mb=6000))
+    gpu_pool._plan(MISTRAL_METADATA)
+    assert gpu_pool.per_context_mb == 768.0 and gpu_pool.capacity == 3   # 6000 // (1232 + 768)
+    unbudgeted = LlamaContextPool(ModelSpec("m", "m.gguf", n_gpu_layers=20, max_instances=8))
+    unbudgeted._plan(MISTRAL_METADATA)
+    assert unbudgeted.capacity == 1
+
+
+def test_checkout_returns_context_to_pool():
+    cpus = usable_cpus()
+    pool = LlamaContextPool(ModelSpec("m", "m.gguf"), loader=lambda spec: PooledContext(object(), 0, cpus[:1]))
+    before = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    with pool.context() as context:
+        assert context.cpus == cpus[:1]
+    if before is not None:
+        assert os.sched_getaffinity(0) == before   # потоки к ядрам не привязываются
+    assert pool.status()["loaded_instances"] == 1 and pool.status()["idle_instances"] == 1 and context.slot == 0
+
+
+def test_failed_extra_context_keeps_loaded_contexts_serving(monkeypatch):
+    monkeypatch.setattr(llm_pool, "usable_cpus", lambda: list(range(16)))
+    monkeypatch.setattr(llm_pool, "available_memory_mb", lambda: 64000)
+    created = []
+    def create(spec):
+        if len(created) == 1:
+            raise MemoryError("failed to allocate KV cache for ctx #1")
+        created.append(PooledContext(object(), len(created), []))
+        return created[-1]
+    pool = LlamaContextPool(ModelSpec("m", "m.gguf", max_instances=4), loader=create)
+    pool._plan(MISTRAL_METADATA)
+    assert pool.capacity == 4
+    first = pool.checkout()
+    with pytest.raises(ModelPoolTimeout):
+        pool.checkout(timeout=0.05)
+    pool.checkin(first)
+    with pool.context() as context:
+        assert context is first
+    assert pool.status()["loaded_instances"] == 1 and "KV cache" in pool.status()["error"]
+
+
+def test_context_pool_serves_router_leases():
+    router = build_router(ModelSpec("primary", "m.gguf"), None, {},
+                          pool_class=lambda spec, loader: LlamaContextPool(spec, loader=lambda s: PooledContext(object(), 0, [])))
+    with router.lease("respond") as (model_name, context):
+        assert model_name == "primary" and context.slot == 0
@@ -0,0 +1,64 @@
+import os
+import socket
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import llm_client
+import utils
+from llm_client import LLMWorkerClient, LLMWorkerError
+from llm_worker import StubBackend, start_worker_thread
+from perception_analysis import analyze_perception
+
+
+def _socket_path():
+    return os.path.join(tempfile.mkdtemp(), "llm.sock")
+
+
+def test_client_queries_and_streams_through_stub_worker():
+    path = _socket_path()
+    server = start_worker_thread(path, StubBackend())
+    client = LLMWorkerClient(path, pool_size=2, timeout=5)
+    try:
+        assert client.ping()["backend"] == "stub"
+        result = client.query("prompt", "respond", 200, 0.7)
+        assert result["text"] == "Это тестовый ответ SRIS." and result["finish_reason"] == "stop"
+
+        usage = {}
+        assert "".join(client.stream("prompt", "respond", 200, 0.7, usage=usage)) == result["text"]
+        assert usage == {"completion_tokens": 4, "finish_reason": "stop"}
+
+        stream = client.stream("prompt", "hyp_gen_for_goal", 200, 0.7)
+        next(stream)
+        stream.close()  # прерванный поток не возвращает соединение в пул
+        assert client._idle == []
+
+        assert client.query("p", "respond", 2, 0.7)["finish_reason"] == "length"
+        client._idle[0].sock.shutdown(socket.SHUT_RDWR)  # соединение, разорванное воркером
+        assert client.query("p", "respond", 200, 0.7)["text"] == result["text"]
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    with pytest.raises(LLMWorkerError):
+        LLMWorkerClient(path, connect_timeout=1).ping()
+
+
+def test_pipeline_stage_runs_against_stub_worker(monkeypatch):
+    path = _socket_path()
+    server = start_worker_thread(path, StubBackend())
+    try:
+        monkeypatch.setattr(llm_client, "_default_client", LLMWorkerClient(path, timeout=5))
+        monkeypatch.setattr(utils, "mistral_core_available", True)
+        monkeypatch.setattr(utils, "query_mistral_with_usage", llm_client.query_mistral_with_usage)
+        perception = analyze_perception("Как работает фотосинтез?")
+        monkeypatch.setattr(llm_client, "_default_client", LLMWorkerClient(path + ".missing", connect_timeout=1))
+        assert llm_client.query_mistral("p", "respond").startswith("Ошибка:")
+        assert perception["query_type"] == "information_request: explanation"
+        assert perception["language_detected"] == "ru"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,83 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from load_policy import (LLMLoadMonitor, LoadPolicy, LEVEL_FULL, LEVEL_TEMPLATE_HYPOTHESES,
+                         LEVEL_TEMPLATE_RESPONSE, LEVEL_CACHE_ONLY)
+from response_cache import ResponseCache
+from text_embeddings import HashedNgramEmbedder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_policy_escalates_immediately_and_recovers_one_level_at_a_time():
+    clock = FakeClock()
+    monitor = LLMLoadMonitor(window_seconds=30.0, clock=clock)
+    policy = LoadPolicy(monitor, in_flight_thresholds=(2, 4, 6), latency_thresholds_ms=(1000, 2000, 3000),
+                        recovery_seconds=10.0, clock=clock)
+    assert policy.current_level() == LEVEL_FULL
+
+    for _ in range(5):
+        with monitor.track():
+            clock.now += 2.5
+    assert monitor.snapshot()["latency_p90_ms"] == 2500.0
+    assert policy.current_level() == LEVEL_TEMPLATE_RESPONSE
+
+    tracked = [monitor.track() for _ in range(6)]
+    for call in tracked:
+        call.__enter__()
+    assert policy.current_level() == LEVEL_CACHE_ONLY
+    for call in tracked:
+        call.__exit__(None, None, None)
+
+    clock.now += 31.0   # задержки вышли из окна, вызовов в работе нет
+    assert monitor.snapshot() == {"in_flight": 0, "latency_p90_ms": None, "latency_samples": 0}
+    assert policy.current_level() == LEVEL_CACHE_ONLY
+    clock.now += 10.0
+    assert policy.current_level() == LEVEL_TEMPLATE_RESPONSE
+    assert policy.current_level() == LEVEL_TEMPLATE_RESPONSE
+    clock.now += 10.0
+    assert policy.current_level() == LEVEL_TEMPLATE_HYPOTHESES
+    stats = policy.stats()
+    assert stats["level"] == "template_hypotheses" and stats["transitions"] == 4
+    assert stats["cycles_by_level"]["cache_only"] == 2
+
+
+def test_stream_tracking_excludes_consumer_time():
+    clock = FakeClock()
+    monitor = LLMLoadMonitor(clock=clock)
+
+    def model_chunks():
+        for chunk in ("a", "b", "c"):
+            clock.now += 0.1   # декодирование фрагмента
+            yield chunk
+
+    for _ in monitor.track_stream(model_chunks()):
+        assert monitor.snapshot()["in_flight"] == 0
+        clock.now += 5.0      # потребитель обрабатывает фрагмент
+    tracked = monitor.track_stream(model_chunks())
+    next(tracked)
+    tracked.close()
+    latencies = sorted(round(latency) for _, latency in monitor._latencies)
+    assert latencies == [100, 300] and monitor.calls == 2 and monitor.snapshot()["in_flight"] == 0
+
+
+def test_response_cache_normalizes_text_and_expires_entries():
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=2, ttl_seconds=60.0, embedder=HashedNgramEmbedder(), clock=clock)
+    cache.store("Что такое SRIS?", "SRIS — система рассуждений.")
+    assert cache.lookup("что  такое sris?")["response"] == "SRIS — система рассуждений."
+    cache.store("a", "1")
+    cache.store("b", "2")
+    assert cache.lookup("Что такое SRIS?") is None
+    clock.now += 61.0
+    assert cache.lookup("b") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["exact_hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 2, 0.3333)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import mistral_core
+from deadline import Deadline, deadline_scope
+from model_router import ModelSpec, build_router
+
+
+class FakeLlama:
+    def __call__(self, prompt, max_tokens, temperature, stream=False):
+        for index, text in enumerate(["Один", " два", " три"]):
+            yield {"choices": [{"text": text, "finish_reason": "stop" if index == 2 else None}]}
+
+
+def test_stream_releases_the_model_while_the_consumer_is_paused(monkeypatch):
+    router = build_router(ModelSpec("primary", "primary.gguf"), lambda spec: FakeLlama(), {})
+    monkeypatch.setattr(mistral_core, "model_router", router)
+    monkeypatch.setattr(mistral_core, "llm_instance", object())
+    monkeypatch.setattr(mistral_core, "get_component", lambda name: None)
+
+    usage = {}
+    stream = mistral_core.stream_mistral("prompt", "respond", 16, 0.5, usage=usage)
+    assert next(stream) == "Один"
+    # Потребитель еще не дочитал поток, а единственный экземпляр модели уже свободен.
+    with deadline_scope(Deadline(2.0)):
+        with router.lease("respond") as (model_name, _):
+            assert model_name == "primary"
+    assert list(stream) == [" два", " три"]
+    assert usage == {"completion_tokens": 3, "finish_reason": "stop"}
+
+    abandoned = mistral_core.stream_mistral("prompt", "respond", 16, 0.5)
+    assert next(abandoned) == "Один"
+    abandoned.close()
+    with deadline_scope(Deadline(2.0)):
+        with router.lease("respond"):
+            pass
@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from deadline import Deadline, deadline_scope
+from model_router import ModelPool, ModelPoolTimeout, ModelSpec, ModelUnavailableError, build_router
+
+CONFIG = {
+    "models": {"small": {"path": "small.gguf", "memory_mb": 1000, "memory_budget_mb": 2500, "max_instances": 4}},
+    "routes": [{"modes": ["analyze_json"], "model": "small"}, {"modes": ["hyp_gen_for_*"], "model": "primary"}],
+}
+
+
+def _loader(loaded):
+    def load(spec):
+        if spec.path == "missing.gguf":
+            raise FileNotFoundError(spec.path)
+        loaded.append(spec.name)
+        return f"{spec.name}#{len(loaded)}"
+    return load
+
+
+def test_routes_modes_and_bounds_pool_by_memory_budget():
+    loaded = []
+    router = build_router(ModelSpec("primary", "primary.gguf"), _loader(loaded), CONFIG)
+    assert router.model_for("analyze_json") == "small"
+    assert router.model_for("hyp_gen_for_answer") == "primary"
+    assert router.model_for("respond") == "primary"
+    assert router.pool("small").spec.capacity == 2
+
+    with router.lease("analyze_json") as (first_model, first):
+        with router.lease("analyze_json") as (_, second):
+            assert first_model == "small" and first != second
+            released = threading.Event()
+            def third_lease():
+                with router.lease("analyze_json"):
+                    released.set()
+            waiter = threading.Thread(target=third_lease)
+            waiter.start()
+            assert not released.wait(0.1)  # пул заполнен: третий запрос ждет освобождения
+    waiter.join(1)
+    assert released.is_set() and loaded.count("small") == 2
+    assert router.status()["models"]["small"]["waits"] == 1
+
+
+def test_unavailable_model_falls_back_to_default():
+    loaded = []
+    config = {"models": {"small": {"path": "missing.gguf"}}, "routes": [{"modes": ["analyze_json"], "model": "small"}]}
+    router = build_router(ModelSpec("primary", "primary.gguf"), _loader(loaded), config)
+    with router.lease("analyze_json") as (model_name, instance):
+        assert model_name == "primary"
+    assert router.status()["models"]["small"]["error"]
+    with pytest.raises(ModelUnavailableError):
+        router.pool("small").acquire()
+
+
+
+def test_failed_extra_instance_keeps_loaded_instances_serving():
+    now = [0.0]
+    attempts = []
+    def load(spec):
+        attempts.append(len(attempts) + 1)
+        if len(attempts) == 2:
+            raise MemoryError("oom on 2nd ctx")
+        return f"ctx#{len(attempts)}"
+    pool = ModelPool(ModelSpec("m", "m.gguf", max_instances=3), load, retry_seconds=30, clock=lambda: now[0])
+    first = pool.acquire()
+    with pytest.raises(ModelPoolTimeout):
+        pool.acquire(timeout=0.05)   # второй экземпляр не загрузился: ждем первый
+    assert pool.status()["error"] == "oom on 2nd ctx" and pool.status()["loaded_instances"] == 1
+    pool.release(first)
+    assert pool.acquire() == first and attempts == [1, 2]   # без повторной загрузки до истечения паузы
+    now[0] = 30.0
+    assert pool.acquire() == "ctx#3" and pool.status()["error"] is None
+
+
+def test_failed_first_instance_is_retried_after_backoff():
+    now = [0.0]
+    fail = [True]
+    def load(spec):
+        if fail[0]:
+            raise FileNotFoundError(spec.path)
+        return "ctx"
+    pool = ModelPool(ModelSpec("m", "m.gguf"), load, retry_seconds=30, clock=lambda: now[0])
+    for _ in range(2):
+        with pytest.raises(ModelUnavailableError):
+            pool.acquire()
+    fail[0] = False
+    with pytest.raises(ModelUnavailableError):
+        pool.acquire()   # ошибка зафиксирована до истечения паузы
+    now[0] = 30.0
+    assert pool.acquire() == "ctx"
+
+
+def test_models_without_weights_are_not_routed_when_files_are_required(tmp_path):
+    present = tmp_path / "present.gguf"
+    present.write_bytes(b"")
+    config = {"models": {"small": {"path": str(tmp_path / "missing.gguf")}, "tiny": {"path": str(present)}},
+              "routes": [{"modes": ["analyze_json"], "model": "small"}, {"modes": ["analyze"], "model": "tiny"}]}
+    router = build_router(ModelSpec("primary", "primary.gguf"), _loader([]), config, skip_missing_files=True)
+    assert router.model_for("analyze_json") == "primary" and router.model_for("analyze") == "tiny"
+    assert "small" not in router.status()["models"]
+
+
+def test_lease_wait_is_bounded_by_request_deadline():
+    router = build_router(ModelSpec("primary", "primary.gguf"), _loader([]), {})
+    with router.lease("respond"):
+        with deadline_scope(Deadline(0.05)):
+            with pytest.raises(ModelPoolTimeout):
+                with router.lease("respond"):
+                    pass
+    assert router.status()["models"]["primary"]["timeouts"] == 1
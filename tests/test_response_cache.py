@@ -0,0 +1,66 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from response_cache import ResponseCache
+from text_embeddings import HashedNgramEmbedder
+
+
+def test_semantic_lookup_requires_similarity_language_and_goal():
+    cache = ResponseCache(similarity_threshold=0.6, embedder=HashedNgramEmbedder())
+    cache.store("What is the SRIS reasoning kernel?", "SRIS is a semantic reasoning system.",
+                "User asks what SRIS is", "en", "answer_information_request")
+    cache.store("Что такое SRIS?", "SRIS — система смысловых рассуждений.", None, "ru", "answer_information_request")
+
+    hit = cache.lookup("what is SRIS reasoning kernel", "en", "answer_information_request")
+    assert hit["match"] == "semantic" and hit["response"] == "SRIS is a semantic reasoning system."
+    assert 0.6 <= hit["similarity"] < 1.0 and hit["perception_summary"] == "User asks what SRIS is"
+    assert cache.lookup("what is SRIS reasoning kernel", "en", "engage_in_social_dialogue") is None
+    assert cache.lookup("what is SRIS reasoning kernel", "ru", "answer_information_request") is None
+    assert cache.lookup("How do I bake bread at home?", "en", "answer_information_request") is None
+    assert cache.lookup("what is SRIS reasoning kernel")["match"] == "semantic"   # язык по тексту, любая цель
+
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"], stats["llm_calls_saved"]) == (2, 3, 4)
+    assert stats["mean_semantic_similarity"] >= 0.6
+
+
+def test_cache_without_embeddings_falls_back_to_exact_matches():
+    class BrokenEmbedder:
+        def embed(self, texts):
+            raise RuntimeError("model offline")
+
+    cache = ResponseCache(embedder=BrokenEmbedder())
+    cache.store("Hello there", "Hi!", None, "en", None)
+    assert cache.lookup("hello  THERE", "en")["match"] == "exact"
+    assert cache.lookup("hello there friend", "en") is None
+    assert cache.stats()["embedding_errors"] == 2
+
+
+def test_generate_sris_response_caches_only_context_free_answers(monkeypatch):
+    import response_generator
+
+    cache = ResponseCache(embedder=HashedNgramEmbedder())
+    monkeypatch.setattr(response_generator, "response_cache", cache)
+    monkeypatch.setattr(response_generator, "execute_llm_query", lambda *a, **k: "Ответ.")
+    chain = {"mode": "full_reasoning", "input_text": "А второй?", "perception_struct": {"language_detected": "ru"},
+             "goal": {"concept": "answer_information_request"}, "session_reuse": {"perception": False, "memory": True}}
+    assert response_generator.generate_sris_response(chain) == "Ответ."
+    assert cache.stats()["entries"] == 0
+    chain["session_reuse"] = {"perception": False, "memory": False}
+    chain["load_level"] = "template_hypotheses"
+    response_generator.generate_sris_response(chain)
+    assert cache.stats()["entries"] == 0
+    del chain["load_level"]
+    response_generator.generate_sris_response(chain)
+    assert cache.lookup("а второй?", "ru", "answer_information_request")["match"] == "exact"
+
+
+def test_disabled_cache_neither_stores_nor_serves():
+    cache = ResponseCache(embedder=HashedNgramEmbedder())
+    cache.enabled = False
+    cache.store("Что такое SRIS?", "SRIS — система рассуждений.")
+    assert cache.lookup("Что такое SRIS?") is None
+    cache.enabled = True
+    assert cache.lookup("Что такое SRIS?") is None and cache.stats()["entries"] == 0
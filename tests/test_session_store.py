@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from session_store import SessionStore, topic_unchanged
+
+
+def _result(reasoning_id, summary, memories="- memory"):
+    return {"status": "ok", "reasoning_id": reasoning_id, "full_reasoning_chain": {
+        "mode": "full_reasoning", "perception_struct": {"summary": summary, "knowledge_domain": "IT",
+                                                        "key_terms_and_entities": ["SRIS", "память"]},
+        "retrieved_memories_summary": memories, "chosen_hypothesis": {"hypothesis": f"Ответ: {summary}"}}}
+
+
+def test_sessions_are_lru_capped_spilled_and_restored(tmp_path):
+    now = [0.0]
+    store = SessionStore(max_sessions=2, idle_ttl_seconds=100, spill_dir=str(tmp_path), clock=lambda: now[0])
+    store.record_cycle("alice", "Что такое SRIS?", _result("r1", "SRIS"))
+    store.record_cycle("bob", "hi", _result("r2", "hi"))
+    store.set_sdna_overrides("alice", {"curiosity_level": 0.9})
+    store.record_cycle("carol", "hey", _result("r3", "hey"))   # вытесняет bob на диск
+
+    assert store.stats()["sessions"] == 2 and store.stats()["spilled"] == 1
+    bob = store.context_for("bob")                             # поднимается с диска
+    assert bob["last_query_text"] == "hi" and store.stats()["restored"] == 1
+    alice = store.context_for("alice")
+    assert alice["sdna_overrides"] == {"curiosity_level": 0.9}
+    assert alice["memory_retrieved"] and alice["recent_hypotheses"] == ["Ответ: SRIS"]
+
+    now[0] = 500.0                                             # все простаивают дольше TTL
+    assert store.evict_idle() == 2
+    assert store.context_for("alice") is None and store.context_for("nobody") is None
+    assert store.record_cycle("dave", "x", {"status": "cycle_error"}) is None and store.stats()["sessions"] == 0
+
+
+def test_memory_cap_and_topic_comparison():
+    store = SessionStore(max_total_bytes=1500)
+    store.record_cycle("u1", "q", _result("r1", "a" * 600))
+    store.record_cycle("u2", "q", _result("r2", "b" * 600))
+    assert store.context_for("u1") is None                     # без spill_dir вытесненная сессия теряется
+    assert store.stats()["total_bytes"] <= 1500
+
+    previous = {"knowledge_domain": "IT", "key_terms_and_entities": ["SRIS", "память", "индекс"]}
+    assert topic_unchanged({"knowledge_domain": "it", "key_terms_and_entities": ["sris", "память"]}, previous)
+    assert not topic_unchanged({"knowledge_domain": "IT", "key_terms_and_entities": ["погода"]}, previous)
+    assert not topic_unchanged({"knowledge_domain": "Физика", "key_terms_and_entities": ["SRIS"]}, previous)
+    assert not topic_unchanged({"summary": "x"}, None)
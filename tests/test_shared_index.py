@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import semantic_memory_index
+import shared_index
+from shared_index import IndexWriterClient, SharedIndexReader, SHARED_INDEX_SOCKET_ENV, start_writer_thread
+
+
+def test_readers_follow_writer_generations(tmp_path):
+    socket_path = str(tmp_path / "writer.sock")
+    server = start_writer_thread(socket_path, str(tmp_path / "shm"), chain_sub_directory=str(tmp_path / "chains"), publish_interval=0)
+    client = IndexWriterClient(socket_path)
+    try:
+        first, second = SharedIndexReader(client), SharedIndexReader(IndexWriterClient(socket_path))
+        assert first.generation == 1 and first.query("anything") == []
+
+        assert client.add_documents([{"text": "SRIS creator lives in Astana", "metadata": {"source": "core_sris_knowledge"}},
+                                     {"text": "weather forecast for tomorrow", "metadata": {"source": "other"}}]) == 2
+        path = client.save_chain({"id": "c1", "input_text": "hello", "perception_struct": {"summary": "quantum physics question"}})
+        assert os.path.exists(path) and path.startswith(str(tmp_path / "chains"))
+        assert first.generation == second.generation == 3
+
+        hits = semantic_memory_index.query_semantic_memory(first, "who is the creator of SRIS", similarity_top_k=1)
+        assert hits[0]["source"] == "core_sris_knowledge" and hits[0]["full_text"].startswith("SRIS creator")
+        batch = semantic_memory_index.query_semantic_memory_batch(second, ["quantum physics", "weather tomorrow"], similarity_top_k=1)
+        assert batch[0][0]["chain_id"] == "c1" and batch[1][0]["source"] == "other"
+        assert sorted(os.listdir(tmp_path / "shm")) == ["gen-00000001", "gen-00000002", "gen-00000003", "generation"]
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_imported_documents_go_through_the_writer(tmp_path, monkeypatch):
+    class ImportedDocument:
+        def __init__(self, text, metadata):
+            self.text, self.metadata = text, metadata
+
+    socket_path = str(tmp_path / "writer.sock")
+    server = start_writer_thread(socket_path, str(tmp_path / "shm"), publish_interval=0)
+    monkeypatch.setenv(SHARED_INDEX_SOCKET_ENV, socket_path)
+    monkeypatch.setattr(shared_index, "_default_client", None)
+    try:
+        reader = SharedIndexReader(IndexWriterClient(socket_path))
+        assert semantic_memory_index.add_documents_to_sris_index(
+            [ImportedDocument("Astana is the capital of Kazakhstan", {"source": "wikidata_import", "wikidata_qid": "Q1520"})])
+        hits = semantic_memory_index.query_semantic_memory(reader, "capital of Kazakhstan", similarity_top_k=1)
+        assert reader.generation == 2 and hits[0]["wikidata_qid"] == "Q1520"
+    finally:
+        shared_index.get_writer_client().close()
+        server.shutdown()
+        server.server_close()
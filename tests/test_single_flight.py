@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from single_flight import SingleFlight, normalize_query_text
+
+
+def test_concurrent_identical_keys_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def main():
+        key = (normalize_query_text("Что такое  SRIS?"),)
+        same = (normalize_query_text("что такое sris?"),)
+        return await asyncio.gather(
+            flights.run(key, lambda: compute(1)),
+            flights.run(same, lambda: compute(2)),
+            flights.run(("other",), lambda: compute(3)),
+        )
+
+    results = asyncio.run(main())
+    assert calls == [1, 3]
+    assert results[0] == ({"value": 1}, False)
+    assert results[1][0] is results[0][0] and results[1][1] is True
+    assert results[2] == ({"value": 3}, False)
+    assert flights.stats() == {"in_flight": 0, "executions": 2, "coalesced_requests": 1, "coalesced_ratio": 0.3333}
+
+
+def test_errors_propagate_to_followers_and_key_is_released():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "fresh"
+
+    async def main():
+        outcomes = await asyncio.gather(flights.run("k", fail), flights.run("k", fail), return_exceptions=True)
+        return outcomes, await flights.run("k", ok)
+
+    outcomes, after = asyncio.run(main())
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert after == ("fresh", False)
@@ -47,3 +47,160 @@ def test_run_sris_cycle_fast_path(monkeypatch):
     assert result["status"] == "ok"
     chain = result["full_reasoning_chain"]
     assert chain["communication_intent"]["intent_type"] == "reciprocate_social_interaction"
+
+
+def test_run_sris_cycle_batch_keeps_order_and_isolates_errors(monkeypatch):
+    import perception_analysis
+
+    def fake_analyze_perception(text):
+        if text == "broken":
+            return {"original_input": text, "error": "LLM failure"}
+        if text == "Hello":
+            return {"user_query_type": "social_greeting", "summary": "User greets", "sentiment": "positive"}
+        return {"query_type": "information_request: explanation", "summary": f"Explain {text}", "original_input": text}
+
+    seen_batches = []
+    def fake_analyze_perception_batch(texts, max_workers=4):
+        seen_batches.append(list(texts))
+        return [fake_analyze_perception(text) for text in texts]
+
+    def fake_full_cycle(input_dict, perception, reasoning_chain_id, tick_at_cycle_start, retrieved_memories_summary):
+        if input_dict["text"] == "explode":
+            raise ValueError("generation failed")
+        return {"valid_hypotheses": [f"Ответить: про {input_dict['text']}"], "reasoning_chain_id": reasoning_chain_id}
+
+    monkeypatch.setattr(perception_analysis, "analyze_perception", fake_analyze_perception)
+    monkeypatch.setattr(sris_kernel, "analyze_perception_batch", fake_analyze_perception_batch)
+    monkeypatch.setattr(sris_kernel, "_full_cycle_generate", fake_full_cycle)
+    monkeypatch.setattr(sris_kernel, "_full_cycle_evaluate", lambda state: state)
+    monkeypatch.setattr(sris_kernel, "_full_cycle_finish", lambda state: {"status": "ok", "reasoning_id": state["reasoning_chain_id"], "hypothesis": state["valid_hypotheses"][0], "batch": state["batch"]})
+    monkeypatch.setattr(sris_kernel, "initialize_sris_components", lambda: None)
+    sris_kernel.initial_semantic_index = None
+
+    results = sris_kernel.run_sris_cycle_batch([{"text": t} for t in ("Hello", "broken", "SRIS", "explode")])
+    assert seen_batches == [["Hello", "broken", "SRIS", "explode"]]
+    assert [r["status"] for r in results] == ["ok", "cycle_error", "ok", "cycle_error"]
+    assert results[0]["full_reasoning_chain"]["mode"] == "fast_path_reasoning"
+    assert "LLM failure" in results[1]["full_reasoning_chain"]["error_message"]
+    assert results[2]["hypothesis"] == "Ответить: про SRIS" and results[2]["batch"] == {"size": 4, "index": 2}
+    assert results[3]["full_reasoning_chain"]["error_message"] == "generation failed"
+    assert len({r["reasoning_id"] for r in results}) == 4
+
+
+def test_analyze_perception_batch_deduplicates_inputs(monkeypatch):
+    import perception_analysis
+    calls = []
+    monkeypatch.setattr(perception_analysis, "analyze_perception", lambda text: calls.append(text) or {"summary": text})
+    results = perception_analysis.analyze_perception_batch(["a", "b", "a"], max_workers=2)
+    assert sorted(calls) == ["a", "b"]
+    assert [r["summary"] for r in results] == ["a", "b", "a"]
+    results[0]["summary"] = "changed"
+    assert results[2]["summary"] == "a"
+
+
+def test_run_sris_cycle_reuses_session_context(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: calls.append(text) or {"query_type": "other"})
+    previous = {"user_query_type": "social_greeting", "summary": "User greets", "sentiment": "positive"}
+    session = {"user_id": "u", "last_query_text": "Hello ", "last_perception": previous}
+    result = sris_kernel.run_sris_cycle({"text": "hello", "session": session})
+    assert calls == [] and result["full_reasoning_chain"]["perception_struct"] == previous
+
+    captured = {}
+    def fake_generate(input_dict, perception, reasoning_chain_id, tick, memories, sdna, load_level=0):
+        captured.update(memories=memories, sdna=sdna)
+        raise ValueError("stop after generation")
+    monkeypatch.setattr(sris_kernel, "_full_cycle_generate", fake_generate)
+    monkeypatch.setattr(sris_kernel, "initialize_sris_components", lambda: (_ for _ in ()).throw(AssertionError("memory queried")))
+    perception = {"knowledge_domain": "IT", "key_terms_and_entities": ["SRIS"], "summary": "SRIS"}
+    session = {"user_id": "u", "last_perception": perception, "memory_retrieved": True,
+               "retrieved_memories_summary": "- прошлый опыт", "sdna_overrides": {"curiosity_level": 0.95}}
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: dict(perception))
+    result = sris_kernel.run_sris_cycle({"text": "Расскажи еще про SRIS", "session": session})
+    assert result["status"] == "cycle_error"
+    assert captured["memories"] == "- прошлый опыт"
+    assert captured["sdna"]["curiosity_level"] == 0.95 and sris_kernel.DEFAULT_SDNA["curiosity_level"] == 0.6
+
+
+def test_run_sris_cycle_degrades_stages_near_deadline(monkeypatch):
+    from deadline import Deadline
+
+    class FakeClock:
+        now = 0.0
+        def __call__(self):
+            return self.now
+
+    clock = FakeClock()
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: (_ for _ in ()).throw(AssertionError("perception ran")))
+    result = sris_kernel.run_sris_cycle({"text": "Что такое SRIS?", "deadline": Deadline(1.0, clock=clock)})
+    chain = result["full_reasoning_chain"]
+    assert result["status"] == "ok" and chain["mode"] == "fast_path_reasoning"
+    assert chain["degraded_stages"] == ["perception"] and chain["perception_struct"]["degraded"] is True
+
+    perception = {"query_type": "information_request: explanation", "summary": "SRIS", "knowledge_domain": "IT"}
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: clock.__setattr__("now", 29.5) or dict(perception))
+    monkeypatch.setattr(sris_kernel, "generate_hypotheses_streaming", lambda *a, **k: (_ for _ in ()).throw(AssertionError("LLM generation ran")))
+    monkeypatch.setattr(sris_kernel, "initialize_sris_components", lambda: (_ for _ in ()).throw(AssertionError("memory queried")))
+    monkeypatch.setattr(sris_kernel, "_persist_chain", lambda chain: None)
+    clock.now = 0.0
+    result = sris_kernel.run_sris_cycle({"text": "Что такое SRIS?", "deadline": Deadline(30.0, clock=clock)})
+    chain = result["full_reasoning_chain"]
+    assert result["status"] == "ok" and chain["mode"] == "full_reasoning"
+    assert chain["degraded_stages"] == ["semantic_memory", "hypotheses"]
+    assert chain["hypothesis_generation"]["fallback"] == "deadline"
+
+
+def test_run_sris_cycle_follows_load_policy_levels(monkeypatch):
+    import response_generator
+    from load_policy import LEVEL_TEMPLATE_RESPONSE, LEVEL_CACHE_ONLY
+    from response_cache import ResponseCache
+    from text_embeddings import HashedNgramEmbedder
+
+    class FixedPolicy:
+        level = LEVEL_TEMPLATE_RESPONSE
+        def current_level(self):
+            return self.level
+
+    policy = FixedPolicy()
+    cache = ResponseCache(embedder=HashedNgramEmbedder())
+    monkeypatch.setattr(sris_kernel, "sris_load_policy", policy)
+    monkeypatch.setattr(sris_kernel, "response_cache", cache)
+    monkeypatch.setattr(response_generator, "execute_llm_query", lambda *a, **k: (_ for _ in ()).throw(AssertionError("LLM response")))
+    monkeypatch.setattr(sris_kernel, "generate_hypotheses_streaming", lambda *a, **k: (_ for _ in ()).throw(AssertionError("LLM generation ran")))
+    monkeypatch.setattr(sris_kernel, "_persist_chain", lambda chain: None)
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: {
+        "query_type": "information_request: explanation", "summary": "Что такое SRIS", "language_detected": "ru"})
+    sris_kernel.initial_semantic_index = None
+
+    result = sris_kernel.run_sris_cycle({"text": "Что такое SRIS?"})
+    chain = result["full_reasoning_chain"]
+    assert result["status"] == "ok" and chain["load_level"] == "template_response"
+    assert chain["hypothesis_generation"]["fallback"] == "load_policy"
+    assert "Что такое SRIS" in chain["chosen_hypothesis"]["hypothesis"]
+    reply = response_generator.generate_sris_response(chain)
+    assert reply.endswith(chain["chosen_hypothesis"]["hypothesis"])
+
+    policy.level = LEVEL_CACHE_ONLY
+    assert sris_kernel.run_sris_cycle({"text": "Что такое SRIS?"})["status"] == "overloaded"
+    cache.store("что такое sris?", "SRIS — система смысловых рассуждений.")
+    result = sris_kernel.run_sris_cycle({"text": "Что такое  SRIS?"})
+    assert result["status"] == "ok" and result["full_reasoning_chain"]["mode"] == "cached_response"
+    assert response_generator.generate_sris_response(result["full_reasoning_chain"]) == "SRIS — система смысловых рассуждений."
+
+
+def test_run_sris_cycle_answers_paraphrase_from_semantic_cache(monkeypatch):
+    from response_cache import ResponseCache
+    from text_embeddings import HashedNgramEmbedder
+
+    cache = ResponseCache(similarity_threshold=0.6, embedder=HashedNgramEmbedder())
+    perception = {"query_type": "information_request: explanation", "summary": "Что такое SRIS", "language_detected": "ru"}
+    goal_concept = sris_kernel.form_goal(perception, sris_kernel.DEFAULT_SDNA, sris_kernel.PRELIMINARY_MOTIVATION_SIGNAL)["concept"]
+    cache.store("Расскажи, что такое система SRIS", "SRIS — система смысловых рассуждений.", None, "ru", goal_concept)
+    monkeypatch.setattr(sris_kernel, "response_cache", cache)
+    monkeypatch.setattr(sris_kernel, "analyze_perception", lambda text: dict(perception))
+    monkeypatch.setattr(sris_kernel, "_full_cycle_generate", lambda *a, **k: (_ for _ in ()).throw(AssertionError("full cycle ran")))
+
+    result = sris_kernel.run_sris_cycle({"text": "расскажи что такое система SRIS?"})
+    chain = result["full_reasoning_chain"]
+    assert result["status"] == "ok" and chain["mode"] == "cached_response"
+    assert chain["response_cache"]["match"] == "semantic" and chain["cached_response"] == "SRIS — система смысловых рассуждений."
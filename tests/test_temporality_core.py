@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from temporality_core import TimeSense, ReasoningTimeline
+
+
+def _make_timeline(capacity, spill_path=None):
+    timesense = TimeSense()
+    return timesense, ReasoningTimeline(timesense, capacity=capacity, spill_path=spill_path)
+
+
+def test_timeline_is_bounded_and_indexes_follow_eviction():
+    timesense, timeline = _make_timeline(capacity=4)
+    for i in range(6):
+        timesense.tick()
+        timeline.record_event("stage" if i % 2 else "start", {"i": i}, reasoning_chain_id=f"chain-{i // 2}")
+
+    assert len(timeline.events) == 4
+    assert timeline.evicted_count == 2
+    assert [e["data"]["i"] for e in timeline.get_recent_events(3)] == [3, 4, 5]
+    assert timeline.get_events_for_chain("chain-0") == []
+    assert [e["data"]["i"] for e in timeline.get_events_for_chain("chain-1")] == [2, 3]
+    assert [e["data"]["i"] for e in timeline.get_events_by_type("start")] == [2, 4]
+    # С лимитом — самые свежие события, от новых к старым (как в исходной реализации)
+    assert [e["data"]["i"] for e in timeline.get_events_by_type("stage", limit=1)] == [5]
+
+
+def test_evicted_events_are_spilled_to_append_only_log(tmp_path):
+    spill_path = str(tmp_path / "timeline_spill.jsonl")
+    timesense, timeline = _make_timeline(capacity=2, spill_path=spill_path)
+    for i in range(5):
+        timeline.record_event("stage", {"i": i}, reasoning_chain_id="chain")
+    timeline.close()
+
+    spilled = list(timeline.iter_spilled_events())
+    assert [e["data"]["i"] for e in spilled] == [0, 1, 2]
+    with open(spill_path, encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 3
+
+
+def test_ticks_are_monotonic_and_gap_free_under_parallel_load():
+    timesense = TimeSense()
+    n_threads, ticks_per_thread = 32, 2000
+    issued = [[] for _ in range(n_threads)]
+    start = threading.Barrier(n_threads)
+
+    def worker(slot):
+        start.wait()
+        for _ in range(ticks_per_thread):
+            issued[slot].append(timesense.tick())
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = n_threads * ticks_per_thread
+    assert sorted(tick for ticks in issued for tick in ticks) == list(range(1, total + 1))
+    assert all(ticks == sorted(ticks) for ticks in issued)
+    assert timesense.get_current_tick() == total
+
+
+def test_concurrent_recording_merges_thread_buffers_in_order():
+    timesense, timeline = _make_timeline(capacity=100000)
+    n_threads, events_per_thread = 16, 1000
+    start = threading.Barrier(n_threads)
+
+    def worker(slot):
+        start.wait()
+        for i in range(events_per_thread):
+            timeline.record_event("stage", {"i": i}, reasoning_chain_id=f"chain-{slot}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(timeline.events) == n_threads * events_per_thread
+    for slot in range(n_threads):
+        chain_events = timeline.get_events_for_chain(f"chain-{slot}")
+        assert [e["data"]["i"] for e in chain_events] == list(range(events_per_thread))
@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from temporality_core import TimeSense, ReasoningTimeline
+from timeline_store import TimelineStore
+
+
+def _event(tick, ts, chain_id, event_type, data=None):
+    return {
+        "tick": tick,
+        "timestamp_utc": ts,
+        "reasoning_chain_id": chain_id,
+        "event_type": event_type,
+        "data": data or {},
+    }
+
+
+def test_range_query_replay_and_aggregates(tmp_path):
+    store = TimelineStore(str(tmp_path / "timeline.sqlite3"))
+    store.append_events([
+        _event(1, "2026-01-01T10:00:00+00:00", "a", "sris_cycle_started"),
+        _event(1, "2026-01-01T10:00:02+00:00", "a", "sris_cycle_completed_full_path", {"status": "ok"}),
+        _event(2, "2026-01-02T10:00:00+00:00", "b", "sris_cycle_started"),
+        _event(2, "2026-01-02T10:00:00.500000+00:00", "b", "sris_cycle_completed_fast_path"),
+    ])
+
+    day_one = store.query_range(start="2026-01-01T00:00:00Z", end="2026-01-02T00:00:00Z")
+    assert [e["reasoning_chain_id"] for e in day_one] == ["a", "a"]
+    assert store.query_range(event_type="sris_cycle_started", limit=1)[0]["reasoning_chain_id"] == "a"
+
+    replay = store.replay_chain("a")
+    assert [e["event_type"] for e in replay] == ["sris_cycle_started", "sris_cycle_completed_full_path"]
+    assert replay[1]["data"] == {"status": "ok"}
+
+    assert store.count_by_type() == {"sris_cycle_started": 2, "sris_cycle_completed_full_path": 1, "sris_cycle_completed_fast_path": 1}
+    latency = store.chain_latency_stats()
+    assert latency["chains"] == 2
+    assert latency["max_ms"] == 2000.0
+    store.close()
+
+
+def test_timeline_flush_persists_events_across_restart(tmp_path):
+    db_path = str(tmp_path / "timeline.sqlite3")
+    store = TimelineStore(db_path)
+    timeline = ReasoningTimeline(TimeSense(), capacity=2, store=store)
+    for i in range(5):
+        timeline.record_event("stage", {"i": i}, reasoning_chain_id="chain")
+    timeline.close()
+    store.close()
+
+    reopened = TimelineStore(db_path)
+    assert [e["data"]["i"] for e in reopened.replay_chain("chain")] == [0, 1, 2, 3, 4]
+    reopened.close()
+
+
+def test_store_opens_on_first_write_and_falls_back_to_spill_log(tmp_path):
+    db_path = tmp_path / "timeline.sqlite3"
+    store = TimelineStore(str(db_path))
+    assert not db_path.exists()
+    store.append_events([_event(1, "2026-01-01T10:00:00+00:00", "a", "stage")])
+    assert db_path.exists() and store.available
+    store.close()
+
+    broken = TimelineStore(str(tmp_path / "missing_dir" / "timeline.sqlite3"))
+    spill_path = tmp_path / "spill.jsonl"
+    timeline = ReasoningTimeline(TimeSense(), capacity=1, spill_path=str(spill_path), store=broken)
+    for i in range(3):
+        timeline.record_event("stage", {"i": i}, reasoning_chain_id="chain")
+    timeline.close()
+    assert not broken.available and broken.error
+    assert [e["data"]["i"] for e in timeline.iter_spilled_events()] == [0, 1]
+
+
+def test_chain_latency_percentiles_are_computed_in_sqlite(tmp_path):
+    store = TimelineStore(str(tmp_path / "timeline.sqlite3"))
+    events = []
+    for i in range(21):   # длительность цепочки i — i * 100 мс
+        events.append(_event(i, f"2026-01-01T10:{i:02d}:00+00:00", f"c{i}", "sris_cycle_started"))
+        events.append(_event(i, f"2026-01-01T10:{i:02d}:{i // 10:02d}.{i % 10}00000+00:00", f"c{i}", "sris_cycle_completed_full_path"))
+    store.append_events(events)
+    latency = store.chain_latency_stats()
+    assert latency == {"chains": 21, "mean_ms": 1000.0, "p50_ms": 1000.0, "p95_ms": 1900.0, "p99_ms": 2000.0, "max_ms": 2000.0}
+    assert store.chain_latency_stats(start="2026-01-01T10:10:00Z")["chains"] == 11
+    assert store.chain_latency_stats(start="2027-01-01T00:00:00Z") == {"chains": 0}
+    store.close()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils
+from token_budget import TokenBudgetController
+
+
+def test_budget_follows_observed_lengths_and_grows_after_truncation():
+    controller = TokenBudgetController(min_samples=5, margin=0.2)
+    assert controller.budget_for("respond", 200) == 200
+    for length in (40, 50, 45, 60, 55):
+        controller.record("respond", length, 200, "stop")
+    assert controller.budget_for("respond", 200) == 72  # p95 = 60, +20%
+    assert controller.budget_for("respond", 64) == 64   # потолок вызывающего не превышается
+
+    assert controller.record("respond", 72, 72, "length", 200) is True
+    assert controller.budget_for("respond", 200) == 200
+    stats = controller.distributions()["respond"]
+    assert stats["truncations"] == 1 and stats["max"] == 200
+
+    controller.record("hyp_gen_for_goal_a", 100, 400, "stop")
+    controller.record("hyp_gen_for_goal_b", 120, 400, "stop")
+    assert controller.distributions()["hyp_gen_for_*"]["samples"] == 2
+
+
+def test_execute_llm_query_retries_truncated_answer_at_ceiling(monkeypatch):
+    controller = TokenBudgetController(min_samples=3)
+    for _ in range(3):
+        controller.record("respond", 20, 200, "stop")
+    calls = []
+
+    def fake_query(prompt, mode, max_tokens, temperature):
+        calls.append(max_tokens)
+        if max_tokens < 200:
+            return {"text": "cut", "completion_tokens": max_tokens, "finish_reason": "length"}
+        return {"text": "full answer", "completion_tokens": 80, "finish_reason": "stop"}
+
+    monkeypatch.setattr(utils, "mistral_core_available", True)
+    monkeypatch.setattr(utils, "token_budgets", controller)
+    monkeypatch.setattr(utils, "query_mistral_with_usage", fake_query)
+
+    assert utils.execute_llm_query("prompt", "respond", 200, 0.5) == "full answer"
+    assert calls == [32, 200]
+    assert controller.distributions()["respond"]["retries"] == 1
@@ -0,0 +1,88 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import zav2_context_validator as zav2
+from text_embeddings import CallableEmbedder, HashedNgramEmbedder, VectorBank
+
+
+def test_embedding_bank_catches_inflected_verbs_and_batches_match_single_calls():
+    zav2.set_similarity_embedder(HashedNgramEmbedder())
+    try:
+        hypotheses = ["Keep dominating unfairly", "Explain photosynthesis", "Destroy the archive"]
+        batch = zav2.validate_hypotheses_batch(hypotheses)
+        assert [r["valid"] for r in batch] == [False, True, False]
+        assert batch[0]["violated_axioms"] == ["oppose domination/enslavement"]
+        assert batch == [zav2.validate_contextual_hypothesis(h) for h in hypotheses]
+    finally:
+        zav2.set_similarity_embedder(None)
+
+
+def test_details_are_optional_and_keyword_floor_is_kept():
+    zav2.set_similarity_embedder(HashedNgramEmbedder())
+    try:
+        assert zav2.validate_contextual_hypothesis("destroy it")["details"] == []
+        details = zav2.validate_contextual_hypothesis("destroy it", include_details=True)["details"]
+        assert len(details) == sum(len(a["violating_verbs"]) for a in zav2.ZAV2_ONTOLOGY.values())
+        assert {d["verb_checked"]: d["similarity_score"] for d in details}["destroy"] == 1.0
+    finally:
+        zav2.set_similarity_embedder(None)
+
+
+# Calibration pairs for EMBEDDING_THRESHOLDS: paraphrased violations of each axiom
+# (inflected or reworded, so the keyword matcher misses them) and valid hypotheses that share
+# words or objects with the violating phrases.
+PARAPHRASED_VIOLATIONS = {
+    "preserve humanity": ["destroying humanity is the goal", "eliminating all humans", "exterminating the species"],
+    "prevent unnecessary harm": ["torturing prisoners", "exploiting the users", "inflicting pain on animals"],
+    "promote cooperation": ["betraying our allies", "deceiving allies to win", "ignoring pleas for help"],
+    "preserve self-integrity": ["fragmenting the core", "overwriting my identity", "inducing self-failure"],
+    "oppose domination/enslavement": ["enslaving the population", "subjugating the workers", "coercing the user"],
+}
+VALID_HYPOTHESES = [
+    "Explain photosynthesis", "Explore the data further", "Communicate the key idea first, then the details",
+    "Summarize the main findings", "Collaborate with the team on the plan", "Identify the root cause of the error",
+    "Relieve the pain of the patient", "Discuss the philosophy of free will", "Build consensus among the team",
+    "Support our allies", "Protect humanity from harm", "Preserve the core values",
+    "Clarify my identity as an assistant", "Describe the species of birds", "Explaining dominance hierarchies in wolves",
+]
+
+
+def _assert_calibrated(embedder):
+    zav2.set_similarity_embedder(embedder)
+    try:
+        for axiom, hypotheses in PARAPHRASED_VIOLATIONS.items():
+            for result in zav2.validate_hypotheses_batch(hypotheses):
+                assert axiom in result["violated_axioms"], result["explanation"]
+        invalid = [h for h, r in zip(VALID_HYPOTHESES, zav2.validate_hypotheses_batch(VALID_HYPOTHESES)) if not r["valid"]]
+        assert invalid == []
+    finally:
+        zav2.set_similarity_embedder(None)
+
+
+def test_hashed_ngram_thresholds_separate_paraphrases_from_valid_hypotheses():
+    _assert_calibrated(HashedNgramEmbedder())
+    # The keyword-scale thresholds (0.6-0.75) miss inflections under n-gram cosine.
+    bank = zav2.AxiomVectorBank(zav2.ZAV2_ONTOLOGY, HashedNgramEmbedder(),
+                                thresholds={axiom: data["threshold"] for axiom, data in zav2.ZAV2_ONTOLOGY.items()})
+    scores = bank.similarity_rows(["coercing the user"])[0]
+    assert not any(score >= threshold for score, threshold in zip(scores, bank.thresholds))
+
+
+def test_uncalibrated_backends_use_ontology_thresholds():
+    embedder = CallableEmbedder(HashedNgramEmbedder().embed, name="sentence-model")
+    assert zav2.embedding_backend(embedder) not in zav2.EMBEDDING_THRESHOLDS
+    bank = zav2.AxiomVectorBank(zav2.ZAV2_ONTOLOGY, embedder)
+    assert bank.thresholds == [data["threshold"] for data in zav2.ZAV2_ONTOLOGY.values() for _ in data["violating_verbs"]]
+
+
+def test_vector_bank_matches_brute_force_cosine():
+    embedder = HashedNgramEmbedder()
+    bank_texts = ["enslave", "override free will", "collaborate"]
+    query_texts = ["enslavement", "free will", "nothing related"]
+    bank = VectorBank(embedder.embed(bank_texts), dim=embedder.dim)
+    scores = bank.similarities(embedder.embed(query_texts))
+    for q, row in zip(embedder.embed(query_texts), scores):
+        for b, score in zip(embedder.embed(bank_texts), row):
+            assert abs(score - sum(w * b.get(i, 0.0) for i, w in q.items())) < 1e-6
@@ -0,0 +1,114 @@
+# text_embeddings.py
+# Легковесные эмбеддинги текста и векторизованное косинусное сходство для валидаторов SRIS.
+# numpy используется, если установлен; иначе — разреженное произведение на чистом Python.
+import logging
+import math
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1024
+
+Vector = Union[Dict[int, float], Sequence[float]]
+
+
+class HashedNgramEmbedder:
+    """
+    Детерминированные эмбеддинги по символьным n-граммам слов, хешированным
+    в EMBEDDING_DIM корзин (L2-нормированные разреженные векторы).
+
+    Не требует модели; похожие словоформы ("betray" / "betrayal") получают
+    высокое косинусное сходство, но и лексически близкие слова с разным
+    смыслом ("explore" / "exploit") тоже, поэтому для смысловых проверок
+    предпочтительна модель эмбеддингов предложений.
+    """
+    def __init__(self, dim: int = EMBEDDING_DIM, n: int = 3):
+        self.dim = dim
+        self.n = n
+        self.name = f"hashed-char-{n}gram-{dim}"
+
+    def _embed_one(self, text: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for word in text.lower().split():
+            padded = f" {word} "
+            for i in range(max(1, len(padded) - self.n + 1)):
+                bucket = zlib.crc32(padded[i:i + self.n].encode("utf-8")) % self.dim
+                counts[bucket] = counts.get(bucket, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in counts.values()))
+        return {k: v / norm for k, v in counts.items()} if norm else {}
+
+    def embed(self, texts: Sequence[str]) -> List[Dict[int, float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+class CallableEmbedder:
+    """Обертка над батчевой функцией плотных эмбеддингов (например, get_text_embedding_batch модели LlamaIndex)."""
+    def __init__(self, embed_batch_fn: Callable[[List[str]], List[Sequence[float]]], name: str):
+        self.embed_batch_fn = embed_batch_fn
+        self.name = name
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for vector in self.embed_batch_fn(list(texts)):
+            norm = math.sqrt(sum(v * v for v in vector))
+            vectors.append([v / norm for v in vector] if norm else list(vector))
+        return vectors
+
+
+class VectorBank:
+    """
+    Матрица нормированных векторов (строки), с которой за одно произведение
+    сравнивается пакет запросов: similarities(Q) = Q · Bankᵀ.
+    """
+    def __init__(self, vectors: List[Vector], dim: Optional[int] = None):
+        self.size = len(vectors)
+        self.sparse = bool(vectors) and isinstance(vectors[0], dict)
+        if dim is None:
+            dim = (max((max(v) for v in vectors if v), default=-1) + 1) if self.sparse else (len(vectors[0]) if vectors else 0)
+        self.dim = dim
+        self._matrix = None
+        self._inverted: Dict[int, List[tuple]] = {}
+        self._dense_rows: List[Sequence[float]] = []
+        if NUMPY_AVAILABLE:
+            self._matrix = self._to_matrix(vectors, self.dim)
+        elif self.sparse:
+            for row, vector in enumerate(vectors):
+                for index, weight in vector.items():
+                    self._inverted.setdefault(index, []).append((row, weight))
+        else:
+            self._dense_rows = vectors
+
+    def _to_matrix(self, vectors: List[Vector], dim: int):
+        if not self.sparse:
+            return np.asarray(vectors, dtype=np.float32).reshape(len(vectors), dim)
+        matrix = np.zeros((len(vectors), dim), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            for index, weight in vector.items():
+                if index < dim:
+                    matrix[row, index] = weight
+        return matrix
+
+    def similarities(self, queries: List[Vector]) -> List[List[float]]:
+        """Косинусное сходство каждого запроса с каждой строкой банка: [len(queries) × size]."""
+        if not queries or not self.size:
+            return [[0.0] * self.size for _ in queries]
+        if self._matrix is not None:
+            return (self._to_matrix(queries, self.dim) @ self._matrix.T).tolist()
+        if self.sparse:
+            result = []
+            for query in queries:
+                scores = [0.0] * self.size
+                for index, weight in query.items():
+                    for row, row_weight in self._inverted.get(index, ()):
+                        scores[row] += weight * row_weight
+                result.append(scores)
+            return result
+        return [[sum(a * b for a, b in zip(query, row)) for row in self._dense_rows] for query in queries]
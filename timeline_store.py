@@ -0,0 +1,226 @@
+# timeline_store.py
+# Персистентное append-only хранилище событий ReasoningTimeline на SQLite.
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+TimePoint = Union[str, float, int, datetime, None]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS timeline_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tick INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    timestamp_utc TEXT NOT NULL,
+    chain_id TEXT,
+    event_type TEXT NOT NULL,
+    related_tick INTEGER,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_timeline_ts ON timeline_events (ts);
+CREATE INDEX IF NOT EXISTS idx_timeline_chain ON timeline_events (chain_id, id);
+CREATE INDEX IF NOT EXISTS idx_timeline_type_ts ON timeline_events (event_type, ts);
+"""
+
+_COLUMNS = "id, tick, ts, timestamp_utc, chain_id, event_type, related_tick, payload"
+
+
+def _to_epoch(value: TimePoint) -> Optional[float]:
+    """Приводит ISO-строку, datetime или число секунд к epoch-секундам UTC."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _percentile_offset(count: int, fraction: float) -> int:
+    """Позиция процентиля (nearest-rank) в отсортированной выборке из count значений."""
+    return min(count - 1, max(0, int(round(fraction * (count - 1)))))
+
+
+class TimelineStore:
+    """
+    Append-only хранилище событий таймлайна с индексами по времени,
+    reasoning_chain_id и типу события.
+
+    Запись идет через одно соединение под блокировкой (пакетами, из
+    ReasoningTimeline.flush), чтение — через соединения своих потоков,
+    что в режиме WAL не блокирует запись. База открывается при первом
+    обращении, а не при создании объекта; если открыть ее не удалось,
+    хранилище недоступно (available = False) до конца работы процесса.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.error: Optional[str] = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._writer: Optional[sqlite3.Connection] = None
+
+    def _open_writer(self) -> Optional[sqlite3.Connection]:
+        """Соединение для записи; вызывается под _write_lock."""
+        if self._writer is None and self.error is None:
+            try:
+                writer = self._connect()
+                writer.executescript(_SCHEMA)
+                writer.commit()
+            except sqlite3.Error as e:
+                self.error = str(e)
+                logger.error(f"TimelineStore: не удалось открыть хранилище '{self.db_path}': {e}", exc_info=True)
+                return None
+            self._writer = writer
+            logger.info(f"TimelineStore: хранилище событий открыто в '{self.db_path}'.")
+        return self._writer
+
+    @property
+    def available(self) -> bool:
+        if self._writer is not None:
+            return True
+        with self._write_lock:
+            return self._open_writer() is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if not self.available:  # схема создается при открытии соединения записи
+                raise sqlite3.OperationalError(f"Хранилище таймлайна недоступно: {self.error}")
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def append_events(self, records: Iterable[Dict[str, Any]]) -> int:
+        rows = []
+        for record in records:
+            timestamp_utc = record.get("timestamp_utc") or datetime.now(timezone.utc).isoformat()
+            rows.append((
+                record.get("tick", 0),
+                _to_epoch(timestamp_utc),
+                timestamp_utc,
+                record.get("reasoning_chain_id"),
+                record.get("event_type"),
+                record.get("related_tick"),
+                json.dumps(record.get("data"), ensure_ascii=False, separators=(",", ":"), default=str),
+            ))
+        if not rows:
+            return 0
+        with self._write_lock:
+            writer = self._open_writer()
+            if writer is None:
+                return 0
+            try:
+                writer.executemany(
+                    "INSERT INTO timeline_events (tick, ts, timestamp_utc, chain_id, event_type, related_tick, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                writer.commit()
+            except sqlite3.Error as e:
+                writer.rollback()
+                logger.error(f"TimelineStore: ошибка записи {len(rows)} событий: {e}", exc_info=True)
+                return 0
+        return len(rows)
+
+    @staticmethod
+    def _row_to_event(row: sqlite3.Row) -> Dict[str, Any]:
+        event = {
+            "id": row["id"],
+            "tick": row["tick"],
+            "timestamp_utc": row["timestamp_utc"],
+            "reasoning_chain_id": row["chain_id"],
+            "event_type": row["event_type"],
+            "data": json.loads(row["payload"]) if row["payload"] else None,
+        }
+        if row["related_tick"] is not None:
+            event["related_tick"] = row["related_tick"]
+        return event
+
+    @staticmethod
+    def _range_clause(start: TimePoint, end: TimePoint, event_type: Optional[str]) -> tuple:
+        clauses, params = [], []
+        start_ts, end_ts = _to_epoch(start), _to_epoch(end)
+        if start_ts is not None:
+            clauses.append("ts >= ?"); params.append(start_ts)
+        if end_ts is not None:
+            clauses.append("ts < ?"); params.append(end_ts)
+        if event_type:
+            clauses.append("event_type = ?"); params.append(event_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query_range(self,
+                    start: TimePoint = None,
+                    end: TimePoint = None,
+                    event_type: Optional[str] = None,
+                    limit: int = 1000,
+                    after_id: int = 0) -> List[Dict[str, Any]]:
+        """События в полуинтервале [start, end), постранично по возрастанию id."""
+        where, params = self._range_clause(start, end, event_type)
+        where = (where + " AND id > ?") if where else " WHERE id > ?"
+        params.append(after_id)
+        rows = self._reader().execute(
+            f"SELECT {_COLUMNS} FROM timeline_events{where} ORDER BY id LIMIT ?", (*params, limit)
+        )
+        return [self._row_to_event(row) for row in rows]
+
+    def replay_chain(self, reasoning_chain_id: str) -> List[Dict[str, Any]]:
+        rows = self._reader().execute(
+            f"SELECT {_COLUMNS} FROM timeline_events WHERE chain_id = ? ORDER BY id", (reasoning_chain_id,)
+        )
+        return [self._row_to_event(row) for row in rows]
+
+    def count_by_type(self, start: TimePoint = None, end: TimePoint = None) -> Dict[str, int]:
+        where, params = self._range_clause(start, end, None)
+        rows = self._reader().execute(
+            f"SELECT event_type, COUNT(*) AS n FROM timeline_events{where} GROUP BY event_type ORDER BY n DESC", params
+        )
+        return {row["event_type"]: row["n"] for row in rows}
+
+    def chain_latency_stats(self, start: TimePoint = None, end: TimePoint = None) -> Dict[str, Any]:
+        """
+        Распределение длительности цепочек (от первого до последнего события), мс.
+        Агрегаты и процентили считает SQLite: в память процесса цепочки не загружаются.
+        """
+        where, params = self._range_clause(start, end, None)
+        where = (where + " AND chain_id IS NOT NULL") if where else " WHERE chain_id IS NOT NULL"
+        durations = f"SELECT (MAX(ts) - MIN(ts)) * 1000.0 AS duration_ms FROM timeline_events{where} GROUP BY chain_id"
+        connection = self._reader()
+        summary = connection.execute(
+            f"SELECT COUNT(*) AS chains, AVG(duration_ms) AS mean_ms, MAX(duration_ms) AS max_ms FROM ({durations})", params
+        ).fetchone()
+        chains = summary["chains"]
+        if not chains:
+            return {"chains": 0}
+        stats = {"chains": chains, "mean_ms": round(summary["mean_ms"], 2)}
+        for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            row = connection.execute(
+                f"SELECT duration_ms FROM ({durations}) ORDER BY duration_ms LIMIT 1 OFFSET ?",
+                (*params, _percentile_offset(chains, fraction))
+            ).fetchone()
+            stats[name] = round(row["duration_ms"], 2)
+        stats["max_ms"] = round(summary["max_ms"], 2)
+        return stats
+
+    def close(self) -> None:
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
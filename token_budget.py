@@ -0,0 +1,135 @@
+# token_budget.py
+# Адаптивные бюджеты max_tokens по режимам LLM-запросов ("analyze_json", "respond", "hyp_gen_for_*", ...).
+# Значение max_tokens из кода вызывающего модуля остается потолком; фактический бюджет
+# выводится из наблюдаемых длин ответов (высокий перцентиль + запас).
+import logging
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BUDGET_PERCENTILE = 95
+BUDGET_MARGIN = 0.2        # +20% к перцентилю
+MIN_SAMPLES = 20           # до этого числа наблюдений используется потолок вызывающего
+SAMPLE_WINDOW = 500        # учитываются последние N ответов режима
+MIN_BUDGET_TOKENS = 32
+FINISH_REASON_LENGTH = "length"
+# Режимы с переменным суффиксом (цель в имени режима) делят один бюджет.
+MODE_FAMILY_PREFIXES = ("hyp_gen_for_",)
+
+
+def budget_key(mode: str) -> str:
+    """Ключ статистики для режима: "hyp_gen_for_<цель>" -> "hyp_gen_for_*"."""
+    for prefix in MODE_FAMILY_PREFIXES:
+        if mode.startswith(prefix):
+            return f"{prefix}*"
+    return mode
+
+
+def percentile(sorted_values: List[int], pct: float) -> Optional[int]:
+    """Перцентиль по методу ближайшего ранга для отсортированного списка."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class _ModeStats:
+    def __init__(self, window: int):
+        self.lengths: Deque[int] = deque(maxlen=window)
+        self.requests = 0
+        self.truncations = 0
+        self.retries = 0
+        self.last_budget: Optional[int] = None
+        self.ceiling: Optional[int] = None
+
+
+class TokenBudgetController:
+    """
+    Подбирает max_tokens для режима по распределению длин его ответов.
+
+    budget_for() возвращает бюджет (не выше потолка вызывающего), record() учитывает
+    фактическую длину ответа и признак обрыва (finish_reason == "length").
+    Оборванный ответ учитывается как ответ длиной в потолок: реальная длина
+    неизвестна, и бюджет режима должен вырасти, а не закрепить обрыв.
+    """
+    def __init__(self, percentile_value: float = BUDGET_PERCENTILE, margin: float = BUDGET_MARGIN,
+                 min_samples: int = MIN_SAMPLES, window: int = SAMPLE_WINDOW, min_budget: int = MIN_BUDGET_TOKENS):
+        self.percentile_value = percentile_value
+        self.margin = margin
+        self.min_samples = min_samples
+        self.window = window
+        self.min_budget = min_budget
+        self._stats: Dict[str, _ModeStats] = {}
+        self._lock = threading.Lock()
+
+    def _mode_stats(self, mode: str) -> _ModeStats:
+        key = budget_key(mode)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(key, _ModeStats(self.window))
+        return stats
+
+    def budget_for(self, mode: str, ceiling: int) -> int:
+        with self._lock:
+            stats = self._mode_stats(mode)
+            stats.requests += 1
+            stats.ceiling = ceiling
+            if len(stats.lengths) < self.min_samples:
+                budget = ceiling
+            else:
+                observed = percentile(sorted(stats.lengths), self.percentile_value)
+                budget = min(ceiling, max(self.min_budget, math.ceil(observed * (1 + self.margin))))
+            stats.last_budget = budget
+            return budget
+
+    def record(self, mode: str, completion_tokens: Optional[int], budget: int, finish_reason: Optional[str] = None, ceiling: Optional[int] = None) -> bool:
+        """Учитывает ответ; возвращает True, если ответ оборван по бюджету."""
+        truncated = finish_reason == FINISH_REASON_LENGTH or (completion_tokens is not None and finish_reason is None and completion_tokens >= budget)
+        with self._lock:
+            stats = self._mode_stats(mode)
+            if truncated:
+                stats.truncations += 1
+                stats.lengths.append(ceiling or stats.ceiling or budget)
+            elif completion_tokens is not None:
+                stats.lengths.append(completion_tokens)
+        return truncated
+
+    def record_retry(self, mode: str) -> None:
+        with self._lock:
+            self._mode_stats(mode).retries += 1
+
+    def distributions(self) -> Dict[str, Dict[str, Any]]:
+        """Распределения длин ответов и текущие бюджеты по режимам."""
+        report = {}
+        with self._lock:
+            items = [(mode, sorted(stats.lengths), stats) for mode, stats in self._stats.items()]
+        for mode, lengths, stats in items:
+            report[mode] = {
+                "samples": len(lengths),
+                "requests": stats.requests,
+                "p50": percentile(lengths, 50),
+                "p90": percentile(lengths, 90),
+                "p95": percentile(lengths, 95),
+                "p99": percentile(lengths, 99),
+                "max": lengths[-1] if lengths else None,
+                "ceiling": stats.ceiling,
+                "last_budget": stats.last_budget,
+                "truncations": stats.truncations,
+                "retries": stats.retries,
+            }
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Общий контроллер для utils.execute_llm_query / execute_llm_stream.
+default_controller = TokenBudgetController()
+
+
+def get_budget_distributions() -> Dict[str, Dict[str, Any]]:
+    return default_controller.distributions()
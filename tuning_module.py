@@ -3,6 +3,9 @@
 import uuid
 from typing import List, Dict, Any, Union
 
+from cycle_cache import memoize
+from keyword_matcher import register_keywords, shared_matcher
+
 # --- Constants for run_self_refinement ---
 SCORE_THRESHOLD_LOW_CONFIDENCE: float = 0.5
 SCORE_THRESHOLD_ETHICAL_CONFLICT_MIN: float = 0.7
@@ -15,6 +18,8 @@ DANGER_KEYWORDS: List[str] = [
     "destroy", "enslave", "terminate", "hack", "override security",
     "cause harm", "self-destruct", "compromise safety", "explode", "subjugate"
 ]
+SAFETY_CATEGORY: str = "safety"
+register_keywords(SAFETY_CATEGORY, DANGER_KEYWORDS)
 
 
 def run_self_refinement(logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -107,8 +112,12 @@ def safety_filter(hypothesis: str) -> Dict[str, Any]:
             - "reason" (str): Explanation for the safety status.
             - "detected_keywords" (List[str]): List of danger words found, if any.
     """
-    processed_hypothesis: str = hypothesis.lower()
-    found_keywords: List[str] = [word for word in DANGER_KEYWORDS if word in processed_hypothesis]
+    return memoize("safety", hypothesis, lambda: _safety_filter_uncached(hypothesis))
+
+
+def _safety_filter_uncached(hypothesis: str) -> Dict[str, Any]:
+    matched: set = shared_matcher.keywords_in_category(hypothesis, SAFETY_CATEGORY)
+    found_keywords: List[str] = [word for word in DANGER_KEYWORDS if word in matched]
 
     if found_keywords:
         return {
@@ -1,8 +1,10 @@
 # utils.py
 import logging
 import json
+import os
 import re
-from typing import Dict, Any, Optional, Union
+import time
+from typing import Dict, Any, Iterator, Optional, Union
 
 DEFAULT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
@@ -19,18 +21,53 @@ def setup_logging(level: int = logging.INFO, fmt: str = DEFAULT_LOG_FORMAT) -> N
         root_logger.setLevel(level)
     logging.getLogger(__name__).debug("Logging configured")
 
+from llm_worker import WORKER_SOCKET_ENV
+from token_budget import default_controller as token_budgets
+from deadline import current_deadline, token_rate, MIN_LLM_TOKENS
+from load_policy import llm_load
+
 try:
-    from mistral_core import query_mistral
+    if os.environ.get(WORKER_SOCKET_ENV):
+        # Модель живет в отдельном процессе llm_worker.py; здесь только клиент (без загрузки весов).
+        from llm_client import query_mistral, query_mistral_with_usage, stream_mistral, worker_readiness
+        from lazy_components import register_component
+        register_component("llm", worker_readiness, description=f"LLM worker ({os.environ[WORKER_SOCKET_ENV]})")
+        logging.info(f"utils.py: LLM-запросы направляются в воркер {os.environ[WORKER_SOCKET_ENV]}.")
+    else:
+        from mistral_core import query_mistral, query_mistral_with_usage, stream_mistral
+        logging.info("mistral_core.py успешно импортирован в utils.py.")
     mistral_core_available = True
-    logging.info("mistral_core.py успешно импортирован в utils.py.")
 except ImportError:
     logging.error("НЕ УДАЛОСЬ ИМПОРТИРОВАТЬ mistral_core.py. Вызовы LLM будут возвращать ошибку.")
     mistral_core_available = False
     def query_mistral(prompt: str, mode: str, max_tokens: int, temperature: float) -> str:
         return "Ошибка: Модуль mistral_core не доступен."
+    def query_mistral_with_usage(prompt: str, mode: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        return {"text": "Ошибка: Модуль mistral_core не доступен.", "completion_tokens": None, "finish_reason": None}
+    def stream_mistral(prompt: str, mode: str, max_tokens: int, temperature: float, usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        yield "Ошибка: Модуль mistral_core не доступен."
 
 logger = logging.getLogger(__name__)
 
+DEADLINE_ERROR_MESSAGE = "Ошибка: Дедлайн запроса: на вызов LLM не осталось времени."
+
+def _deadline_max_tokens(mode: str, max_tokens: int) -> int:
+    """
+    Потолок max_tokens с учетом дедлайна запроса (deadline.current_deadline): декодирование
+    должно уложиться в остаток бюджета. 0 — времени не осталось, вызов не выполняется.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return max_tokens
+    capped = deadline.cap_tokens(max_tokens)
+    if capped < MIN_LLM_TOKENS:
+        deadline.degrade(f"llm:{mode}", "skipped")
+        return 0
+    if capped < max_tokens:
+        logger.warning(f"Utils: Дедлайн запроса: max_tokens в режиме '{mode}' снижен с {max_tokens} до {capped}.")
+        deadline.degrade(f"llm:{mode}", f"max_tokens={capped}")
+    return capped
+
 def _extract_json_from_response(text: str) -> Optional[str]:
     """
     Извлекает ПЕРВЫЙ валидный JSON-объект из строки, даже если он обрамлен текстом 
@@ -75,6 +112,13 @@ def execute_llm_query(
     """
     Централизованная функция для выполнения запросов к LLM.
     Теперь использует улучшенный извлекатель JSON.
+
+    max_tokens — потолок: фактический бюджет режима подбирается token_budget
+    по наблюдаемым длинам ответов. Если ответ оборван по сниженному бюджету,
+    запрос один раз повторяется с потолком.
+
+    Внутри deadline_scope() потолок дополнительно урезается по остатку времени запроса;
+    если времени не осталось, LLM не вызывается и возвращается ошибка DEADLINE_EXCEEDED.
     """
     logger.info(f"Utils: Передача запроса в LLM ядро (mistral_core) в режиме '{mode}' (max_tokens: {max_tokens}, temp: {temperature}, expect_json: {expect_json})")
 
@@ -83,8 +127,33 @@ def execute_llm_query(
         if expect_json:
             return {"error": "LLM_NOT_AVAILABLE", "message": error_msg}
         return error_msg
-        
-    llm_response_text = query_mistral(prompt, mode, max_tokens, temperature)
+
+    requested_max_tokens = max_tokens
+    max_tokens = _deadline_max_tokens(mode, max_tokens)
+    if max_tokens == 0:
+        if expect_json:
+            return {"error": "DEADLINE_EXCEEDED", "message": DEADLINE_ERROR_MESSAGE}
+        return DEADLINE_ERROR_MESSAGE
+
+    budget = token_budgets.budget_for(mode, max_tokens)
+    started_at = time.perf_counter()
+    # Вызовы учитываются монитором нагрузки (load_policy): в работе и задержка.
+    with llm_load.track():
+        result = query_mistral_with_usage(prompt, mode, budget, temperature)
+    token_rate.observe(time.perf_counter() - started_at, result.get("completion_tokens"))
+    # Ответ, оборванный потолком дедлайна, не говорит о длине ответов режима.
+    truncated = token_budgets.record(mode, result.get("completion_tokens"), budget, result.get("finish_reason"), max_tokens) \
+        if max_tokens == requested_max_tokens else False
+    # Повтор тоже укладывается в остаток дедлайна; если на него хватает не больше исходного бюджета, остается оборванный ответ.
+    retry_tokens = _deadline_max_tokens(mode, max_tokens) if truncated and budget < max_tokens else 0
+    if retry_tokens > budget:
+        logger.warning(f"Utils: Ответ в режиме '{mode}' оборван на бюджете {budget} токенов; повтор с потолком {retry_tokens}.")
+        token_budgets.record_retry(mode)
+        with llm_load.track():
+            result = query_mistral_with_usage(prompt, mode, retry_tokens, temperature)
+        if retry_tokens == max_tokens:
+            token_budgets.record(mode, result.get("completion_tokens"), max_tokens, result.get("finish_reason"), max_tokens)
+    llm_response_text = result["text"]
 
     if not expect_json:
         return llm_response_text
@@ -104,3 +173,50 @@ def execute_llm_query(
     else:
         logger.error("JSON-объект не найден в ответе LLM.")
         return {"error": "JSON_NOT_FOUND", "message": "No JSON object found in the LLM response.", "raw_response": llm_response_text}
+
+
+def execute_llm_stream(
+    prompt: str,
+    mode: str = "default",
+    max_tokens: int = 512,
+    temperature: float = 0.7
+) -> Iterator[str]:
+    """
+    Потоковый аналог execute_llm_query: фрагменты текста по мере генерации.
+    Закрытие генератора останавливает декодирование в mistral_core.
+    Бюджет подбирается как в execute_llm_query; длина учитывается только для
+    потоков, дошедших до конца (досрочно остановленные не отражают длину ответа).
+    Оборванный поток не повторяется: его текст уже отдан потребителю.
+    Дедлайн запроса урезает потолок, как в execute_llm_query, и останавливает поток,
+    когда время истекло.
+    """
+    logger.info(f"Utils: Потоковый запрос в LLM ядро в режиме '{mode}' (max_tokens: {max_tokens}, temp: {temperature})")
+    if not mistral_core_available:
+        yield "Ошибка: Модель (llm_instance или model_hf) не была успешно загружена."
+        return
+    requested_max_tokens = max_tokens
+    max_tokens = _deadline_max_tokens(mode, max_tokens)
+    if max_tokens == 0:
+        yield DEADLINE_ERROR_MESSAGE
+        return
+    deadline = current_deadline()
+    budget = token_budgets.budget_for(mode, max_tokens)
+    usage: Dict[str, Any] = {}
+    started_at = time.perf_counter()
+    stream = stream_mistral(prompt, mode, budget, temperature, usage=usage)
+    # Монитор нагрузки учитывает только ожидание фрагментов от модели, не работу потребителя между ними.
+    tracked = llm_load.track_stream(stream)
+    try:
+        for chunk in tracked:
+            yield chunk
+            if deadline is not None and deadline.expired():
+                deadline.degrade(f"llm:{mode}", "stream_stopped")
+                return
+    finally:
+        tracked.close()
+        # Закрытие останавливает декодирование оставшихся токенов.
+        stream.close()
+    if "completion_tokens" in usage:
+        token_rate.observe(time.perf_counter() - started_at, usage["completion_tokens"])
+        if max_tokens == requested_max_tokens:
+            token_budgets.record(mode, usage["completion_tokens"], budget, usage.get("finish_reason"), max_tokens)
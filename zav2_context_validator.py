@@ -1,5 +1,14 @@
 # zav2_context_validator.py
-from typing import Dict, List, Any, Callable
+import logging
+import re
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from cycle_cache import memoize_batch
+from keyword_matcher import register_keywords, shared_matcher
+from lazy_components import register_component, get_component
+from text_embeddings import CallableEmbedder, HashedNgramEmbedder, VectorBank
+
+logger = logging.getLogger(__name__)
 
 # ZAV2 Ontology defining core ethical axioms and associated violating verbs.
 # Thresholds represent the minimum semantic similarity score for a verb to be considered a violation.
@@ -31,6 +40,30 @@ ZAV2_ONTOLOGY: Dict[str, Dict[str, Any]] = {
     }
 }
 
+# The ontology thresholds above apply to keyword matches and custom semantic_similarity_fn scores.
+# Cosine scores of an embedding backend have their own scale, so a backend may have its own
+# per-axiom cut-offs, calibrated on paraphrase / unrelated hypothesis pairs
+# (tests/test_zav2_context_validator.py):
+#   "hashed_ngram"  - HashedNgramEmbedder: inflections score 0.58-0.85, unrelated words stay
+#                     below 0.45 except lexical neighbours ("explore" / "exploit", ~0.57).
+# The sentence embedding model (semantic_memory_index.EMBED_MODEL_NAME) has not been calibrated
+# on these pairs yet, so it uses the ontology thresholds until measured cut-offs are added here.
+EMBEDDING_THRESHOLDS: Dict[str, Dict[str, float]] = {
+    "hashed_ngram": {
+        "preserve humanity": 0.55,
+        "prevent unnecessary harm": 0.6,
+        "promote cooperation": 0.55,
+        "preserve self-integrity": 0.55,
+        "oppose domination/enslavement": 0.55,
+    },
+}
+
+
+def embedding_backend(embedder: Any) -> str:
+    """Backend name of an embedder (key of EMBEDDING_THRESHOLDS when it is calibrated)."""
+    return "hashed_ngram" if isinstance(embedder, HashedNgramEmbedder) else "sentence"
+
+
 def basic_keyword_similarity(word_to_check: str, target_phrase: str) -> float:
     """
     Placeholder: Returns a basic similarity score based on keyword presence.
@@ -40,48 +73,152 @@ def basic_keyword_similarity(word_to_check: str, target_phrase: str) -> float:
     # This is a very naive approach and should be replaced with a proper semantic model.
     return 1.0 if word_to_check in target_phrase else 0.0
 
-# In a real system, you would use a more sophisticated semantic similarity function.
-# For example, using sentence transformers or other NLP libraries.
-# semantic_similarity_fn: Callable[[str, str], float] = get_semantic_similarity_model()
+# With the default basic_keyword_similarity, scores come from the keyword matcher plus the
+# embedding-based AxiomVectorBank below. Assigning a custom pairwise function here
+# replaces both and is called once per axiom x verb.
 semantic_similarity_fn: Callable[[str, str], float] = basic_keyword_similarity
 
+ZAV2_CATEGORY_PREFIX = "zav2:"
+for _axiom, _axiom_data in ZAV2_ONTOLOGY.items():
+    register_keywords(ZAV2_CATEGORY_PREFIX + _axiom, _axiom_data["violating_verbs"])
 
-def validate_contextual_hypothesis(hypothesis: str) -> Dict[str, Any]:
+_WORD_PATTERN = re.compile(r"[\w'-]+")
+
+
+class AxiomVectorBank:
     """
-    Validates a hypothesis against the ZAV2 ethical ontology.
+    Violating-verb phrases of all axioms embedded once into one matrix.
 
-    Args:
-        hypothesis: The hypothesis string to validate.
+    A hypothesis is split into word windows as long as the longest phrase;
+    all windows of all hypotheses are embedded in one batch and compared to
+    the bank in a single matrix product. The similarity of a phrase to a
+    hypothesis is its best window score, capped by the best single-word score
+    of the phrase's head verb: a window sharing only the object ("build
+    consensus" / "reject consensus") is not a match.
+    Entry thresholds come from EMBEDDING_THRESHOLDS for the embedder's backend, or from
+    the ontology when the backend has no calibrated cut-offs.
+    """
+    def __init__(self, ontology: Dict[str, Dict[str, Any]], embedder: Any,
+                 thresholds: Optional[Dict[str, float]] = None):
+        self.embedder = embedder
+        thresholds = thresholds or EMBEDDING_THRESHOLDS.get(embedding_backend(embedder), {})
+        self.entries: List[tuple] = [
+            (axiom, verb, thresholds.get(axiom, axiom_data["threshold"]))
+            for axiom, axiom_data in ontology.items()
+            for verb in axiom_data["violating_verbs"]
+        ]
+        self.max_span = max((len(verb.split()) for _, verb, _ in self.entries), default=1)
+        dim = getattr(embedder, "dim", None)
+        self.bank = VectorBank(embedder.embed([verb for _, verb, _ in self.entries]), dim=dim)
+        self.heads = VectorBank(embedder.embed([verb.split()[0] for _, verb, _ in self.entries]), dim=dim)
 
-    Returns:
-        A dictionary containing:
-            - "valid" (bool): True if no axioms are violated, False otherwise.
-            - "violated_axioms" (List[str]): A list of axioms that were violated.
-            - "confidence" (float): Confidence in the validation (currently heuristic).
-            - "explanation" (str): A human-readable explanation of the validation outcome.
-            - "details" (List[Dict[str,str]]): Detailed list of checks.
+    @property
+    def thresholds(self) -> List[float]:
+        return [threshold for _, _, threshold in self.entries]
+
+    def _windows(self, text: str) -> List[str]:
+        words = _WORD_PATTERN.findall(text)
+        return [" ".join(words[i:i + span]) for span in range(1, self.max_span + 1) for i in range(len(words) - span + 1)]
+
+    def similarity_rows(self, processed_hypotheses: List[str]) -> List[List[float]]:
+        """For each hypothesis, the similarity to every (axiom, verb) entry."""
+        windows_per_hypothesis = [self._windows(text) for text in processed_hypotheses]
+        all_windows = [window for windows in windows_per_hypothesis for window in windows]
+        vectors = self.embedder.embed(all_windows) if all_windows else []
+        window_scores = self.bank.similarities(vectors) if vectors else []
+        # Single words come first in each hypothesis' windows (span 1).
+        word_counts = [len(_WORD_PATTERN.findall(text)) for text in processed_hypotheses]
+        word_vectors, offset = [], 0
+        for windows, count in zip(windows_per_hypothesis, word_counts):
+            word_vectors.extend(vectors[offset:offset + count])
+            offset += len(windows)
+        head_scores = self.heads.similarities(word_vectors) if word_vectors else []
+        rows, offset, word_offset = [], 0, 0
+        for windows, count in zip(windows_per_hypothesis, word_counts):
+            best = [0.0] * len(self.entries)
+            for scores in window_scores[offset:offset + len(windows)]:
+                best = [max(a, b) for a, b in zip(best, scores)]
+            best_head = [0.0] * len(self.entries)
+            for scores in head_scores[word_offset:word_offset + count]:
+                best_head = [max(a, b) for a, b in zip(best_head, scores)]
+            rows.append([min(a, b) for a, b in zip(best, best_head)])
+            offset += len(windows)
+            word_offset += count
+        return rows
+
+
+# None means the SRIS sentence embedding model (lazy component "embedding_model").
+_similarity_embedder: Any = None
+
+
+def _build_axiom_bank() -> AxiomVectorBank:
+    embedder = _similarity_embedder
+    if embedder is None:
+        import semantic_memory_index  # registers the "embedding_model" component
+        embed_model = get_component("embedding_model")
+        if embed_model is None:
+            raise RuntimeError("Embedding model is not available; ZAV2 falls back to keyword matching.")
+        embedder = CallableEmbedder(embed_model.get_text_embedding_batch, name=type(embed_model).__name__)
+    bank = AxiomVectorBank(ZAV2_ONTOLOGY, embedder)
+    logger.info(f"ZAV2: axiom vector bank built ({len(bank.entries)} phrases, embedder '{embedder.name}').")
+    return bank
+
+_axiom_bank_component = register_component("zav2_axiom_bank", _build_axiom_bank, description="ZAV2 violating-verb vector bank", optional=True)
+
+
+def set_similarity_embedder(embedder: Any) -> None:
     """
-    processed_hypothesis: str = hypothesis.lower()
+    Replaces the embedder of the axiom vector bank (e.g. HashedNgramEmbedder
+    when no sentence model is installed; None restores the SRIS embedding
+    model). The bank is rebuilt on next use.
+    """
+    global _similarity_embedder
+    _similarity_embedder = embedder
+    _axiom_bank_component.reset()
+
+
+def _similarity_rows(processed_hypotheses: List[str]) -> Tuple[List[List[float]], List[float]]:
+    """
+    Per hypothesis, the similarity score of every (axiom, verb) pair in ZAV2_ONTOLOGY order,
+    and the violation threshold of every pair (the embedding backend's when its scores are used).
+    """
+    pairs = [(verb, axiom_data["threshold"]) for axiom_data in ZAV2_ONTOLOGY.values() for verb in axiom_data["violating_verbs"]]
+    keyword_thresholds = [threshold for _, threshold in pairs]
+    if semantic_similarity_fn is not basic_keyword_similarity:
+        # A custom similarity function keeps the original per axiom x verb evaluation.
+        return [[semantic_similarity_fn(verb, text) for verb, _ in pairs] for text in processed_hypotheses], keyword_thresholds
+
+    # Keyword hits (one pass of the shared matcher) stay a floor of 1.0; embeddings add near matches.
+    keyword_rows = [[1.0 if verb in hits else 0.0 for verb, _ in pairs]
+                    for hits in (shared_matcher.find_keywords(text) for text in processed_hypotheses)]
+    bank = get_component("zav2_axiom_bank")
+    if bank is None or len(bank.entries) != len(pairs):
+        return keyword_rows, keyword_thresholds
+    embedding_rows = bank.similarity_rows(processed_hypotheses)
+    # Keyword hits score 1.0 and pass any embedding threshold.
+    return [[max(k, e) for k, e in zip(keyword_row, embedding_row)]
+            for keyword_row, embedding_row in zip(keyword_rows, embedding_rows)], bank.thresholds
+
+
+def _build_validation_result(processed_hypothesis: str, scores: List[float], thresholds: List[float],
+                             include_details: bool) -> Dict[str, Any]:
     violations: List[str] = []
     explanations: List[str] = []
     details: List[Dict[str, str]] = []
 
+    scores_iter = iter(zip(scores, thresholds))
     for axiom, axiom_data in ZAV2_ONTOLOGY.items():
-        violating_verbs: List[str] = axiom_data["violating_verbs"]
-        threshold: float = axiom_data["threshold"]
-        for verb in violating_verbs:
-            # The semantic similarity function should compare the verb against the hypothesis context.
-            # For this basic version, we're checking if the verb is in the hypothesis.
-            # A more advanced system would parse intent and actions from the hypothesis.
-            similarity_score = semantic_similarity_fn(verb, processed_hypothesis)
-            details.append({
-                "axiom_checked": axiom,
-                "verb_checked": verb,
-                "hypothesis_snippet": processed_hypothesis, # Or relevant part
-                "similarity_score": round(similarity_score, 2),
-                "threshold": threshold,
-                "is_violation": similarity_score >= threshold
-            })
+        for verb in axiom_data["violating_verbs"]:
+            similarity_score, threshold = next(scores_iter)
+            if include_details:
+                details.append({
+                    "axiom_checked": axiom,
+                    "verb_checked": verb,
+                    "hypothesis_snippet": processed_hypothesis, # Or relevant part
+                    "similarity_score": round(similarity_score, 2),
+                    "threshold": threshold,
+                    "is_violation": similarity_score >= threshold
+                })
             if similarity_score >= threshold:
                 if axiom not in violations: # Add axiom only once
                     violations.append(axiom)
@@ -96,15 +233,48 @@ def validate_contextual_hypothesis(hypothesis: str) -> Dict[str, Any]:
 
     final_explanation: str
     if not violations:
-        final_explanation = "No direct ethical conflicts detected with ZAV2 axioms based on keyword analysis."
+        final_explanation = "No direct ethical conflicts detected with ZAV2 axioms based on semantic similarity analysis."
     else:
         final_explanation = "Ethical concerns identified: " + " | ".join(explanations)
 
-
     return {
         "valid": is_valid,
         "violated_axioms": list(set(violations)), # Unique list of violated axioms
         "confidence": confidence,
         "explanation": final_explanation,
         "details": details
-    }
\ No newline at end of file
+    }
+
+
+def validate_hypotheses_batch(hypotheses: List[str], include_details: bool = False) -> List[Dict[str, Any]]:
+    """
+    Validates all hypotheses of a cycle in one call: one matcher pass per
+    hypothesis and one batched embedding + matrix product for all of them.
+    Returns one result per hypothesis, in order (see validate_contextual_hypothesis).
+    Inside a reasoning cycle each hypothesis is validated at most once (see cycle_cache).
+    """
+    def compute(indices: List[int]) -> List[Dict[str, Any]]:
+        processed = [hypotheses[i].lower() for i in indices]
+        rows, thresholds = _similarity_rows(processed)
+        return [_build_validation_result(text, row, thresholds, include_details) for text, row in zip(processed, rows)]
+
+    return memoize_batch("zav2", [(hypothesis, include_details) for hypothesis in hypotheses], compute)
+
+
+def validate_contextual_hypothesis(hypothesis: str, include_details: bool = False) -> Dict[str, Any]:
+    """
+    Validates a hypothesis against the ZAV2 ethical ontology.
+
+    Args:
+        hypothesis: The hypothesis string to validate.
+        include_details: Also return the per axiom x verb check list (off by default).
+
+    Returns:
+        A dictionary containing:
+            - "valid" (bool): True if no axioms are violated, False otherwise.
+            - "violated_axioms" (List[str]): A list of axioms that were violated.
+            - "confidence" (float): Confidence in the validation (currently heuristic).
+            - "explanation" (str): A human-readable explanation of the validation outcome.
+            - "details" (List[Dict[str,str]]): Detailed list of checks (empty unless include_details).
+    """
+    return validate_hypotheses_batch([hypothesis], include_details=include_details)[0]